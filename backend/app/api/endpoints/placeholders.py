@@ -62,6 +62,10 @@ from app.services.domain.placeholder.services.placeholder_analysis_domain_servic
 
 # Application层服务协调
 from app.services.application.placeholder.placeholder_service import PlaceholderApplicationService
+from app.services.application.placeholder.batch_analysis_engine import (
+    BatchPlaceholderAnalysisEngine,
+    PlaceholderBatchContext,
+)
 
 from app.core.container import container
 from app.core.data_source_utils import DataSourcePasswordManager
@@ -270,11 +274,16 @@ class PlaceholderOrchestrationService:
         data_source_id: str = None,
         template_context: Dict[str, Any] = None,
         user_id: str = None,
+        batch_context: Optional[PlaceholderBatchContext] = None,
+        agent_adapter: Optional[StageAwareAgentAdapter] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
         使用完整的Agent Pipeline进行占位符分析
 
+        批量分析时传入 batch_context（模板内容、Schema、连接配置只加载一次）
+        和 agent_adapter（复用已构建的运行时），不再逐个占位符重建
+
         Pipeline包括：
         1. Domain层业务需求分析
         2. Schema查询 (使用SchemaListColumnsTool)
@@ -291,7 +300,9 @@ class PlaceholderOrchestrationService:
             # ✅ 步骤 1: 启用 Context Retriever (Dynamic Context)
             # ==========================================
             context_retriever = None
-            if data_source_id:
+            if batch_context is not None:
+                context_retriever = batch_context.context_retriever
+            elif data_source_id:
                 context_retriever = await self._get_or_create_context_retriever(data_source_id)
                 if context_retriever:
                     logger.info(f"✅ 已启用 Context Retriever for data_source: {data_source_id}")
@@ -315,14 +326,15 @@ class PlaceholderOrchestrationService:
                 logger.warning("⚠️ 未提供有效的 user_id，将降级为 'system'（可能影响用户定制配置、权限与数据隔离）")
                 effective_user_id = "system"
 
-            self.app_service = PlaceholderApplicationService(
-                user_id=effective_user_id,
-                context_retriever=context_retriever  # 🔥 关键：传入 context_retriever
-            )
-            logger.info(
-                f"✅ PlaceholderApplicationService 创建成功，"
-                f"Context Retriever: {'已启用' if context_retriever else '未启用（降级模式）'}"
-            )
+            if batch_context is None:
+                self.app_service = PlaceholderApplicationService(
+                    user_id=effective_user_id,
+                    context_retriever=context_retriever  # 🔥 关键：传入 context_retriever
+                )
+                logger.info(
+                    f"✅ PlaceholderApplicationService 创建成功，"
+                    f"Context Retriever: {'已启用' if context_retriever else '未启用（降级模式）'}"
+                )
 
             # ==========================================
             # 前置检查: 周期性占位符特殊处理
@@ -514,7 +526,14 @@ class PlaceholderOrchestrationService:
             semantic_type = self._map_business_to_semantic_type(business_requirements)
 
             # 构建Schema信息（通过DataSourceContext获取真实表结构）
-            schema_info = await self._get_schema_from_data_source_context(user_id, data_source_id)
+            if batch_context is not None and batch_context.schema_info is not None:
+                # 后续会按占位符补充候选表，使用共享快照的副本
+                schema_info = SchemaInfo(
+                    tables=list(batch_context.schema_info.tables),
+                    columns=dict(batch_context.schema_info.columns),
+                )
+            else:
+                schema_info = await self._get_schema_from_data_source_context(user_id, data_source_id)
             logger.info(f"🔍 [AgentInput构建] Schema信息获取完成: 表数量={len(schema_info.tables) if schema_info else 0}")
             logger.debug(f"🔍 [AgentInput构建] 表名详情: {schema_info.tables if schema_info else []}")  # 改为debug级别
 
@@ -560,25 +579,18 @@ class PlaceholderOrchestrationService:
             }
 
             # 加载模板内容以提供更完整的上下文
-            template_content = ""
-            try:
-                from app.db.session import get_db_session
-                from app import crud
-
-                with get_db_session() as db:
-                    template_obj = crud.template.get(db, id=template_id)
-                    if template_obj:
-                        template_content = template_obj.content or ""
-                        logger.info(f"✅ 加载模板内容: {len(template_content)} 字符")
-                    else:
-                        logger.warning(f"⚠️ 未找到模板: {template_id}")
-            except Exception as e:
-                logger.warning(f"⚠️ 加载模板内容失败: {e}")
+            if batch_context is not None:
+                template_content = batch_context.template_content
+            else:
+                template_content = self._load_template_content(template_id)
 
             if not schema_info:
                 schema_info = SchemaInfo()
 
-            data_source_config = await self._build_data_source_config(user_id, data_source_id)
+            if batch_context is not None:
+                data_source_config = dict(batch_context.data_source_config)
+            else:
+                data_source_config = await self._build_data_source_config(user_id, data_source_id)
             schema_analysis = await self._prepare_schema_context(
                 schema_info=schema_info,
                 data_source_config=data_source_config,
@@ -610,17 +622,18 @@ class PlaceholderOrchestrationService:
             # 🎯 使用Stage-Aware SQL生成阶段
             logger.info(f"🎯 使用Stage-Aware SQL生成阶段")
 
-            # 初始化Agent Adapter
-            await self.agent_adapter.initialize(
+            # 初始化Agent Adapter（与 generate_sql 使用相同的 task_type，避免每次调用重建 Facade）
+            adapter = agent_adapter or self.agent_adapter
+            await adapter.initialize(
                 user_id=user_id,
-                task_type="placeholder_analysis",
+                task_type="sql_generation",
                 task_complexity=TaskComplexity.MEDIUM
             )
 
             # 执行SQL生成阶段
-            logger.info(f"🔧 [Debug] agent_adapter 类型: {type(self.agent_adapter).__name__}")
+            logger.info(f"🔧 [Debug] agent_adapter 类型: {type(adapter).__name__}")
             
-            agent_result = await self.agent_adapter.generate_sql(
+            agent_result = await adapter.generate_sql(
                 placeholder=placeholder_text,
                 data_source_id=data_source_id,
                 user_id=user_id,
@@ -1597,6 +1610,51 @@ class PlaceholderOrchestrationService:
 
         return descriptions.get(schedule_type, "统计前一个周期的数据")
 
+    def _load_template_content(self, template_id: str) -> str:
+        """加载模板内容"""
+        try:
+            from app.db.session import get_db_session
+            from app import crud
+
+            with get_db_session() as db:
+                template_obj = crud.template.get(db, id=template_id)
+                if template_obj:
+                    template_content = template_obj.content or ""
+                    logger.info(f"✅ 加载模板内容: {len(template_content)} 字符")
+                    return template_content
+                logger.warning(f"⚠️ 未找到模板: {template_id}")
+        except Exception as e:
+            logger.warning(f"⚠️ 加载模板内容失败: {e}")
+        return ""
+
+    async def build_batch_context(
+        self,
+        template_id: str,
+        data_source_id: Optional[str],
+        user_id: str,
+        adapter_count: int = 1,
+    ) -> PlaceholderBatchContext:
+        """
+        构建批量分析共享上下文：模板内容、Schema 快照、连接配置、上下文检索器各加载一次，
+        并按并发度创建 Agent 适配器（每个适配器的运行时在首次使用后复用）
+        """
+        context = PlaceholderBatchContext(
+            template_id=template_id,
+            data_source_id=data_source_id,
+            user_id=user_id,
+            template_content=self._load_template_content(template_id),
+            agent_adapters=[StageAwareAgentAdapter(container=container) for _ in range(max(1, adapter_count))],
+        )
+        if data_source_id:
+            context.schema_info = await self._get_schema_from_data_source_context(user_id, data_source_id)
+            context.data_source_config = await self._build_data_source_config(user_id, data_source_id)
+            context.context_retriever = await self._get_or_create_context_retriever(data_source_id)
+        logger.info(
+            f"✅ 批量分析上下文构建完成: template={template_id}, data_source={data_source_id}, "
+            f"表数量={len(context.schema_info.tables) if context.schema_info else 0}, 适配器={len(context.agent_adapters)}"
+        )
+        return context
+
     async def _get_schema_from_data_source_context(self, user_id: str, data_source_id: str = None) -> SchemaInfo:
         """通过DataSourceContext获取Schema信息，带缓存机制"""
         logger.info(f"🔍 [Schema获取] 开始获取Schema: user_id={user_id}, data_source_id={data_source_id}")
@@ -2557,8 +2615,17 @@ async def batch_analyze_with_agent_pipeline(
     request: Dict[str, Any],
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> APIResponse[Dict[str, Any]]:
-    """批量使用Agent Pipeline分析模板中的所有占位符"""
+):
+    """
+    批量使用Agent Pipeline分析模板中的所有占位符
+
+    占位符在共享的并发预算内并行分析，模板内容、Schema 与 Agent 运行时整批只构建一次。
+
+    可选参数:
+    - placeholder_names: 只分析指定的占位符（用于重跑上次失败的部分）
+    - only_unanalyzed: 只分析尚未被Agent分析过的占位符
+    - stream: 为 true 时以SSE逐个返回完成的占位符结果
+    """
     try:
         template_id = request.get("template_id")
         data_source_id = request.get("data_source_id")
@@ -2572,44 +2639,57 @@ async def batch_analyze_with_agent_pipeline(
         placeholders = crud.template_placeholder.get_by_template(
             db=db, template_id=template_id
         )
+        placeholder_names = request.get("placeholder_names")
+        if placeholder_names:
+            selected = set(placeholder_names)
+            placeholders = [p for p in placeholders if p.placeholder_name in selected]
+        if request.get("only_unanalyzed"):
+            placeholders = [p for p in placeholders if not p.agent_analyzed]
+
+        specs = [{"name": p.placeholder_name, "text": p.placeholder_text} for p in placeholders]
+        engine = BatchPlaceholderAnalysisEngine(_orchestration_service)
+        batch_kwargs = {
+            "template_id": template_id,
+            "data_source_id": data_source_id,
+            "user_id": str(current_user.id),
+        }
 
-        results = []
-        success_count = 0
+        def _item_result(item: Dict[str, Any]) -> Dict[str, Any]:
+            result = item["result"]
+            result.setdefault("placeholder_name", item["placeholder_name"])
+            return _orchestration_service._serialize_datetime_objects(result)
 
-        for placeholder in placeholders:
-            try:
-                result = await _orchestration_service.analyze_placeholder_with_full_pipeline(
-                    placeholder_name=placeholder.placeholder_name,
-                    placeholder_text=placeholder.placeholder_text,
-                    template_id=template_id,
-                    data_source_id=data_source_id,
-                    user_id=str(current_user.id)
-                )
-                # 统一字典化
-                if not isinstance(result, dict):
-                    try:
-                        if hasattr(result, 'dict') and callable(result.dict):
-                            result = result.dict()
-                        elif hasattr(result, 'model_dump') and callable(result.model_dump):
-                            result = result.model_dump()
-                        else:
-                            result = {"status": "error", "error": "invalid_result_type", "raw": str(result)}
-                    except Exception:
-                        result = {"status": "error", "error": "invalid_result_type"}
-                # 序列化结果中的datetime对象
-                result = _orchestration_service._serialize_datetime_objects(result)
-                results.append(result)
-                if result.get("status") == "success":
-                    success_count += 1
-            except Exception as e:
-                logger.error(f"批量分析单个占位符失败: {placeholder.placeholder_name}, {e}")
-                results.append({
-                    "status": "error",
-                    "placeholder_name": placeholder.placeholder_name,
-                    "error": str(e)
-                })
+        if request.get("stream"):
+            async def event_stream():
+                processed = success = 0
+                yield f"data: {json.dumps({'stage': 'started', 'total_placeholders': len(specs)}, ensure_ascii=False)}\n\n"
+                try:
+                    async for item in engine.stream(specs, **batch_kwargs):
+                        processed += 1
+                        success += int(item["success"])
+                        payload = {
+                            "stage": "placeholder_completed",
+                            "processed": processed,
+                            "total_placeholders": len(specs),
+                            "attempts": item["attempts"],
+                            "result": _item_result(item),
+                        }
+                        yield f"data: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+                    yield f"data: {json.dumps({'stage': 'completed', 'success_count': success, 'total_placeholders': len(specs)}, ensure_ascii=False)}\n\n"
+                except Exception as e:
+                    logger.error(f"批量Agent Pipeline流式分析失败: {e}")
+                    yield f"data: {json.dumps({'stage': 'error', 'error': str(e)}, ensure_ascii=False)}\n\n"
+
+            return StreamingResponse(
+                event_stream(),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
+            )
+
+        items = await engine.run(specs, **batch_kwargs)
+        results = [_item_result(item) for item in items]
+        success_count = sum(1 for item in items if item["success"])
 
-        # 序列化所有结果中的datetime对象
         batch_data = {
             "template_id": template_id,
             "total_placeholders": len(placeholders),
@@ -1,6 +1,6 @@
 """报告管理API端点 - v2版本"""
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Header
 from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Tuple
@@ -9,12 +9,13 @@ import os
 from pathlib import Path
 from uuid import UUID
 from datetime import datetime
+import asyncio
 import io
-import zipfile
 import csv
 import re
 
 from app.core.architecture import ApiResponse, PaginatedResponse
+from app.core.config import settings
 from app.core.permissions import require_permission, ResourceType, PermissionLevel
 from app.db.session import get_db
 from app.core.dependencies import get_current_user
@@ -152,17 +153,18 @@ async def download_reports_as_zip(
       - expires: Optional[int] 预签名链接有效期(秒)，默认86400（仅用于记录，实际直接返回文件）
 
     返回:
-      直接返回ZIP文件流（application/zip）
+      直接返回ZIP文件流（application/zip），报告文件有界并发获取、边获取边输出；
+      下载失败的报告列在压缩包内的 failed.csv
     """
     try:
         report_ids: List[int] = request.get("report_ids", []) or []
         if not isinstance(report_ids, list) or not report_ids:
             raise HTTPException(status_code=400, detail="请提供要打包的报告ID列表")
 
-        # 限制单次批量数量，避免内存压力
-        MAX_BUNDLE = 100
-        if len(report_ids) > MAX_BUNDLE:
-            raise HTTPException(status_code=400, detail=f"单次最多支持 {MAX_BUNDLE} 个报告")
+        # 限制单次批量数量（流式打包内存占用与报告数量无关，只受并发上限影响）
+        max_bundle = settings.REPORT_BUNDLE_MAX_REPORTS
+        if len(report_ids) > max_bundle:
+            raise HTTPException(status_code=400, detail=f"单次最多支持 {max_bundle} 个报告")
 
         custom_filename: Optional[str] = request.get("filename")
 
@@ -183,101 +185,111 @@ async def download_reports_as_zip(
 
         # 存储服务
         from app.services.infrastructure.storage.hybrid_storage_service import get_hybrid_storage_service
+        from app.services.infrastructure.storage.zip_stream import ZipStreamEntry, stream_zip
         storage = get_hybrid_storage_service()
 
-        # 准备zip与清单
-        zip_buffer = io.BytesIO()
-        manifest_rows: List[Tuple[int, str, str]] = []  # (序号, 日期, 报告名称)
-        included_ids: List[int] = []
+        entries: List[ZipStreamEntry] = []
         skipped_ids: List[int] = []
 
         def safe_filename(name: str) -> str:
             # 去除非法字符，保留中英文、数字、-_.和空格
             return re.sub(r'[^\w\-\.\u4e00-\u9fa5\s]', '_', name).strip()
 
-        with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
-            idx = 1
-            for rep in reports:
-                # 确保有文件可下载；若无file_path但有内容，生成临时报告文件并上传
-                file_path = rep.file_path
-                if not file_path:
-                    report_content = rep.result
-                    if report_content:
-                        filename = f"report_{rep.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-                        try:
-                            upload_info = storage.upload_file(
-                                file_data=io.BytesIO(report_content.encode('utf-8')),
-                                original_filename=filename,
-                                file_type="reports",
-                                content_type="text/markdown"
-                            )
-                            file_path = upload_info.get("file_path")
-                            # 更新记录
-                            rep.file_path = file_path
-                            db.add(rep)
-                            db.commit()
-                        except Exception as e:
-                            logger.error(f"生成报告文件失败: report_id={rep.id}, error={e}")
-                            skipped_ids.append(rep.id)
-                            continue
-                    else:
+        # 预处理：确定每个报告的存储路径与压缩包内文件名（响应开始流式输出后不再访问数据库）
+        for rep in reports:
+            # 确保有文件可下载；若无file_path但有内容，生成临时报告文件并上传
+            file_path = rep.file_path
+            preloaded: Optional[bytes] = None
+            if not file_path:
+                report_content = rep.result
+                if report_content:
+                    filename = f"report_{rep.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+                    preloaded = report_content.encode('utf-8')
+                    try:
+                        upload_info = await asyncio.to_thread(
+                            storage.upload_file,
+                            file_data=io.BytesIO(preloaded),
+                            original_filename=filename,
+                            file_type="reports",
+                            content_type="text/markdown"
+                        )
+                        file_path = upload_info.get("file_path")
+                        # 更新记录
+                        rep.file_path = file_path
+                        db.add(rep)
+                    except Exception as e:
+                        logger.error(f"生成报告文件失败: report_id={rep.id}, error={e}")
                         skipped_ids.append(rep.id)
                         continue
-
-                # 下载文件数据
-                try:
-                    file_data, backend_type = storage.download_file(file_path)
-                except Exception as e:
-                    logger.error(f"下载报告文件失败: report_id={rep.id}, path={file_path}, error={e}")
+                else:
                     skipped_ids.append(rep.id)
                     continue
 
-                # 友好文件名
-                base = os.path.basename(file_path)
-                # 保留原始扩展名
-                if '.' in base:
-                    name_wo_ext = base.rsplit('.', 1)[0]
-                    ext = '.' + base.rsplit('.', 1)[1]
-                else:
-                    name_wo_ext = base
-                    ext = ''
-
-                # 报告生成日期（yyyy-mm-dd）
-                gen_dt = rep.generated_at or rep.created_at or datetime.utcnow()
-                date_str = gen_dt.strftime('%Y-%m-%d')
+            # 友好文件名
+            base = os.path.basename(file_path)
+            # 保留原始扩展名
+            if '.' in base:
+                name_wo_ext = base.rsplit('.', 1)[0]
+                ext = '.' + base.rsplit('.', 1)[1]
+            else:
+                name_wo_ext = base
+                ext = ''
+
+            # 报告生成日期（yyyy-mm-dd）
+            gen_dt = rep.generated_at or rep.created_at or datetime.utcnow()
+            date_str = gen_dt.strftime('%Y-%m-%d')
+
+            # 压缩内的文件名，放在reports/目录下
+            zipped_filename = safe_filename(f"{name_wo_ext}{ext}") or f"report_{rep.id}{ext}"
+            entries.append(ZipStreamEntry(
+                name=f"reports/{zipped_filename}",
+                path=file_path,
+                data=preloaded,
+                meta=(rep.id, date_str, name_wo_ext),
+            ))
 
-                # 压缩内的文件名
-                zipped_filename = safe_filename(f"{name_wo_ext}{ext}") or f"report_{rep.id}{ext}"
-                # 写入zip，放在reports/目录下
-                zf.writestr(f"reports/{zipped_filename}", file_data)
+        db.commit()
 
-                # 清单行：序号、日期、报告名称（不含扩展名）
-                manifest_rows.append((idx, date_str, name_wo_ext))
-                included_ids.append(rep.id)
-                idx += 1
+        if not entries:
+            raise HTTPException(status_code=404, detail="所选报告均没有可下载的文件")
 
-            # 生成manifest.csv（UTF-8）
+        def build_trailer(written, failed) -> List[Tuple[str, bytes]]:
+            # 清单：序号、日期、报告名称（不含扩展名），按写入压缩包的顺序
             manifest_io = io.StringIO()
             writer = csv.writer(manifest_io)
             writer.writerow(["序号", "日期", "报告名称"])  # 表头
-            for row in manifest_rows:
-                writer.writerow(list(row))
-            zf.writestr("manifest.csv", manifest_io.getvalue().encode('utf-8'))
+            for idx, entry in enumerate(written, 1):
+                _, date_str, name_wo_ext = entry.meta
+                writer.writerow([idx, date_str, name_wo_ext])
+            trailer = [("manifest.csv", manifest_io.getvalue().encode('utf-8'))]
+
+            if failed:
+                failed_io = io.StringIO()
+                failed_writer = csv.writer(failed_io)
+                failed_writer.writerow(["报告ID", "报告名称", "失败原因"])
+                for failure in failed:
+                    rep_id, _, name_wo_ext = failure.entry.meta
+                    failed_writer.writerow([rep_id, name_wo_ext, str(failure.error)])
+                trailer.append(("failed.csv", failed_io.getvalue().encode('utf-8')))
+
+            logger.info(f"批量打包完成: 文件名={zip_name}, 包含={len(written)}个报告, 下载失败={len(failed)}个, 跳过={len(skipped_ids)}个")
+            return trailer
 
         # 🔧 修复：直接返回文件流，而不是上传到MinIO再返回URL
         ts = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         zip_name = custom_filename.strip() if isinstance(custom_filename, str) and custom_filename.strip() else f"reports_bundle_{ts}"
         zip_name = safe_filename(zip_name) + ".zip"
 
-        # 记录日志
-        logger.info(f"批量打包完成: 文件名={zip_name}, 包含={len(included_ids)}个报告, 跳过={len(skipped_ids)}个")
-
-        # 将buffer指针移到开始
-        zip_buffer.seek(0)
+        included_ids = [entry.meta[0] for entry in entries]
 
-        # 🔥 直接返回文件流（StreamingResponse）
+        # 🔥 边获取边压缩输出，下载失败的报告记录在压缩包内的 failed.csv
         return StreamingResponse(
-            zip_buffer,
+            stream_zip(
+                entries,
+                fetch=lambda path: storage.download_file(path)[0],
+                concurrency=settings.REPORT_BUNDLE_FETCH_CONCURRENCY,
+                trailer=build_trailer,
+            ),
             media_type="application/zip",
             headers={
                 "Content-Disposition": f'attachment; filename="{zip_name}"',
@@ -1427,6 +1439,7 @@ async def regenerate_report_task(report_id: int):
 @router.get("/{report_id}/download")
 async def download_report(
     report_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -1460,18 +1473,15 @@ async def download_report(
         if not report.file_path:
             # 先尝试准备文件
             try:
-                from app.services.infrastructure.storage.hybrid_storage_service import get_hybrid_storage_service
-                from io import BytesIO
-                
-                storage_service = get_hybrid_storage_service()
+                from app.services.infrastructure.storage.async_storage import get_async_storage_service
                 
                 # 创建报告内容文件
                 report_content = report.result or "报告内容为空"
                 filename = f"report_{report_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
                 
                 # 上传到存储系统
-                file_info = storage_service.upload_file(
-                    file_data=BytesIO(report_content.encode('utf-8')),
+                file_info = await get_async_storage_service().upload(
+                    report_content.encode('utf-8'),
                     original_filename=filename,
                     file_type="reports",
                     content_type="text/markdown"
@@ -1490,21 +1500,26 @@ async def download_report(
         
         # 从存储系统下载文件
         try:
-            from app.services.infrastructure.storage.hybrid_storage_service import get_hybrid_storage_service
-            from fastapi.responses import StreamingResponse
-            import io
-            
-            storage_service = get_hybrid_storage_service()
-            
-            # 检查文件是否存在
-            if not storage_service.file_exists(report.file_path):
+            from app.services.infrastructure.storage.async_storage import (
+                RangeNotSatisfiable,
+                get_async_storage_service,
+            )
+
+            # 获取元数据并按块流式输出，支持断点续传（Range）
+            try:
+                download = await get_async_storage_service().open_download(report.file_path, range_header)
+            except RangeNotSatisfiable as range_error:
+                raise HTTPException(
+                    status_code=416,
+                    detail="请求范围无效",
+                    headers={"Content-Range": f"bytes */{range_error.size}"}
+                )
+            except FileNotFoundError:
                 raise HTTPException(
                     status_code=404,
                     detail="报告文件在存储系统中不存在"
                 )
-            
-            # 下载文件
-            file_data, backend_type = storage_service.download_file(report.file_path)
+            backend_type = download.stat.get("backend") or "unknown"
 
             # 生成友好的文件名 - 格式: yyyy-mm-dd-任务名.docx
             if report.task:
@@ -1538,9 +1553,6 @@ async def download_report(
             elif file_ext == 'pdf':
                 content_type = "application/pdf"
 
-            # 创建响应
-            file_stream = io.BytesIO(file_data)
-
             # 处理中文文件名 - 使用RFC 5987编码
             from urllib.parse import quote
 
@@ -1554,7 +1566,7 @@ async def download_report(
             encoded_filename = quote(filename)
 
             # 获取实际文件大小
-            file_size = len(file_data)
+            file_size = download.size
             # 如果数据库中的文件大小为0，更新它
             if report.file_size == 0 or report.file_size is None:
                 report.file_size = file_size
@@ -1563,17 +1575,20 @@ async def download_report(
             logger.info(f"用户 {user_id} 下载报告: {report_id}, 文件: {report.file_path}, 文件名: {filename}, 大小: {file_size} bytes")
 
             return StreamingResponse(
-                file_stream,
+                download.body,
+                status_code=download.status_code,
                 media_type=content_type,
                 headers={
+                    **download.headers,
                     "Content-Disposition": f'attachment; filename="{ascii_filename}"; filename*=UTF-8\'\'{encoded_filename}',
-                    "Content-Length": str(file_size),  # 设置文件大小
                     "X-Storage-Backend": backend_type,
                     "X-Report-ID": str(report_id),
                     "X-File-Size": str(file_size)
                 }
             )
             
+        except HTTPException:
+            raise
         except Exception as download_error:
             logger.error(f"从存储系统下载报告文件失败: {download_error}")
             raise HTTPException(
@@ -14,10 +14,12 @@ from app.models.task import Task
 from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
 from app.services.application.tasks.task_application_service import TaskApplicationService
 from app.services.infrastructure.task_queue.celery_config import celery_app
+from app.services.infrastructure.task_queue.progress_recorder import request_cancellation
 from app.services.application.factories import create_placeholder_validation_service
 from app.services.data.query.query_executor_service import query_executor_service
 from app.services.infrastructure.document.word_export_service import create_word_export_service
 from app.services.data.persistence.etl_persistence_service import ETLPersistenceService
+from app.services.data.persistence.placeholder_value_writer import PlaceholderValueWriter
 from app.schemas.placeholder_value import PlaceholderValueCreate
 from app.utils.time_context import TimeContextManager
 from app import crud
@@ -368,6 +370,7 @@ async def pause_task(
             if ongoing_execution and ongoing_execution.celery_task_id:
                 from app.services.infrastructure.task_queue.celery_config import celery_app
                 celery_app.control.revoke(ongoing_execution.celery_task_id, terminate=True)
+                request_cancellation(ongoing_execution.execution_id)
                 ongoing_execution.execution_status = TaskStatus.CANCELLED
                 ongoing_execution.current_step = "任务已被暂停操作取消"
                 ongoing_execution.completed_at = datetime.utcnow()
@@ -732,6 +735,9 @@ async def cancel_task_execution(
             except Exception as e:
                 logger.warning(f"Failed to cancel Celery task: {e}")
 
+        # 设置取消标记，执行中的任务在下一次进度更新时停止
+        request_cancellation(latest_execution.execution_id)
+
         # 更新执行状态
         from app.models.task import TaskStatus
         latest_execution.execution_status = TaskStatus.CANCELLED
@@ -1382,9 +1388,11 @@ async def run_task_report_pipeline(
                         expires_at=datetime.utcnow() + timedelta(hours=getattr(chart_placeholder, 'cache_ttl_hours', 24))
                     ))
 
-                # 🔑 批量插入数据库
+                # 🔑 批量写入数据库（旧版本集合更新 + 一条 upsert 语句，单个事务）
                 if values_to_save:
-                    crud.placeholder_value.create_batch(db, values=values_to_save)
+                    writer = PlaceholderValueWriter(db)
+                    writer.extend(values_to_save)
+                    writer.flush()
                     db.commit()
                     logger.info(f"✅ 已持久化 {len(values_to_save)} 个占位符值到数据库 (batch_id={batch_id})")
                 else:
@@ -688,17 +688,15 @@ async def upload_template_file(
         content_text = ""
         
         try:
-            from app.services.infrastructure.storage.hybrid_storage_service import get_hybrid_storage_service
-            from io import BytesIO
+            from app.services.infrastructure.storage.async_storage import get_async_storage_service
             
-            storage_service = get_hybrid_storage_service()
-            
-            # 保存原始文件
-            file_info = storage_service.upload_file(
-                file_data=BytesIO(content),
+            # 保存原始文件（按内容去重，相同模板文件只存储一份）
+            file_info = await get_async_storage_service().upload(
+                content,
                 original_filename=file.filename,
                 file_type="templates",
-                content_type=file.content_type
+                content_type=file.content_type,
+                dedup=True
             )
             
             logger.info(f"文件保存到存储系统: {file_info.get('file_path')}")
@@ -800,15 +798,21 @@ async def download_template_file(
         if not template.file_path:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="模板没有关联的文件")
 
-        from app.services.infrastructure.storage.hybrid_storage_service import get_hybrid_storage_service
+        from app.services.infrastructure.storage.async_storage import RangeNotSatisfiable, get_async_storage_service
         from fastapi.responses import StreamingResponse
-        import io
 
-        storage_service = get_hybrid_storage_service()
-        if not storage_service.file_exists(template.file_path):
+        try:
+            download = await get_async_storage_service().open_download(
+                template.file_path, request.headers.get("range")
+            )
+        except RangeNotSatisfiable as range_error:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="请求范围无效",
+                headers={"Content-Range": f"bytes */{range_error.size}"}
+            )
+        except FileNotFoundError:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文件在存储系统中不存在")
-
-        file_data, backend_type = storage_service.download_file(template.file_path)
         content_type = "application/octet-stream"
         if template.original_filename:
             fn = template.original_filename.lower()
@@ -823,14 +827,15 @@ async def download_template_file(
             elif fn.endswith(".html"):
                 content_type = "text/html"
 
-        file_stream = io.BytesIO(file_data)
         logger.info(f"用户 {current_user.id} 下载模板文件: {template.name} ({template.original_filename})")
         return StreamingResponse(
-            file_stream,
+            download.body,
+            status_code=download.status_code,
             media_type=content_type,
             headers={
+                **download.headers,
                 "Content-Disposition": f'attachment; filename="{template.original_filename or f"template_{template_id}"}"',
-                "X-Storage-Backend": backend_type,
+                "X-Storage-Backend": download.stat.get("backend") or "unknown",
                 "X-Template-ID": template_id
             }
         )
@@ -130,6 +130,15 @@ class Settings(BaseSettings):
     SMTP_USE_TLS: bool = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
     SENDER_EMAIL: str = os.getenv("SENDER_EMAIL", "noreply@autoreportai.com")
     SENDER_NAME: str = os.getenv("SENDER_NAME", "AutoReportAI")
+    # SMTP 连接池：每个进程同一配置的最大连接数（也是批量发信并发度）
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", 4))
+    # 单个连接最多发送多少封邮件后重建
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+    # 建立连接与单次命令的超时（秒）
+    SMTP_TIMEOUT: float = float(os.getenv("SMTP_TIMEOUT", 30.0))
+    # 连接断开、4xx 临时错误的重试次数与退避基数（秒）
+    SMTP_MAX_RETRIES: int = int(os.getenv("SMTP_MAX_RETRIES", 2))
+    SMTP_RETRY_BACKOFF: float = float(os.getenv("SMTP_RETRY_BACKOFF", 1.0))
 
     # SMTP configuration - React Agent system
     SMTP_HOST: str = os.getenv("SMTP_HOST", "smtp.example.com")
@@ -140,6 +149,10 @@ class Settings(BaseSettings):
     # WebSocket settings
     WS_HOST: str = os.getenv("WS_HOST", "localhost")
     WS_PORT: int = int(os.getenv("WS_PORT", 8000))
+    # 每个连接的待发送队列上限，超出后丢弃可合并/低优先级消息，仍无法入队则断开慢连接
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", 256))
+    # 单条消息发送超时（秒），超时视为连接失效
+    WS_SEND_TIMEOUT_SECONDS: float = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", 10))
     
     # Server settings
     PORT: int = int(os.getenv("PORT", 8000))
@@ -211,6 +224,81 @@ class Settings(BaseSettings):
     REACT_AGENT_CACHE_DIR: str = os.getenv("REACT_AGENT_CACHE_DIR", "cache/llamaindex")
     REACT_AGENT_STORAGE_DIR: str = os.getenv("REACT_AGENT_STORAGE_DIR", "storage")
     
+    # LLM限流配置
+    # local: 进程内令牌桶；redis: 所有worker共享令牌桶
+    LLM_RATE_LIMIT_BACKEND: str = os.getenv("LLM_RATE_LIMIT_BACKEND", "local")
+    # 未指定服务器的调用（如健康检查）的全局并发与最小间隔
+    LLM_RATE_LIMIT_MAX_CONCURRENT: int = int(os.getenv("LLM_RATE_LIMIT_MAX_CONCURRENT", 3))
+    LLM_RATE_LIMIT_MIN_INTERVAL: float = float(os.getenv("LLM_RATE_LIMIT_MIN_INTERVAL", 2.0))
+    # 排队等待许可的最长时间（秒）
+    LLM_RATE_LIMIT_QUEUE_TIMEOUT: float = float(os.getenv("LLM_RATE_LIMIT_QUEUE_TIMEOUT", 120))
+    # 令牌桶允许的突发量（秒数 × 速率）
+    LLM_RATE_LIMIT_BURST_SECONDS: float = float(os.getenv("LLM_RATE_LIMIT_BURST_SECONDS", 10))
+    # 每个LLM服务器的并发上限
+    LLM_SERVER_MAX_CONCURRENT: int = int(os.getenv("LLM_SERVER_MAX_CONCURRENT", 8))
+    # 各维度默认的每分钟请求数/token数预算，0 表示不限制
+    LLM_SERVER_RPM: int = int(os.getenv("LLM_SERVER_RPM", 0))
+    LLM_SERVER_TPM: int = int(os.getenv("LLM_SERVER_TPM", 0))
+    LLM_MODEL_RPM: int = int(os.getenv("LLM_MODEL_RPM", 0))
+    LLM_MODEL_TPM: int = int(os.getenv("LLM_MODEL_TPM", 0))
+    LLM_USER_RPM: int = int(os.getenv("LLM_USER_RPM", 0))
+    LLM_USER_TPM: int = int(os.getenv("LLM_USER_TPM", 0))
+    # 单独配置的预算(JSON)，如 {"server:openai-main": {"rpm": 500, "tpm": 200000}}
+    LLM_RATE_LIMIT_OVERRIDES: str = os.getenv("LLM_RATE_LIMIT_OVERRIDES", "")
+    
+    # LLM HTTP连接池配置（每个LLM服务器复用长连接）
+    LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100))
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 60))
+    LLM_HTTP2_ENABLED: bool = os.getenv("LLM_HTTP2_ENABLED", "true").lower() == "true"
+    LLM_HTTP_CONNECT_TIMEOUT: float = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", 10))
+    LLM_HTTP_REQUEST_TIMEOUT: float = float(os.getenv("LLM_HTTP_REQUEST_TIMEOUT", 30))
+    # 合并并发的相同JSON模式请求（只发送一次，结果共享；仅对 temperature=0 的确定性请求生效，默认关闭）
+    LLM_COALESCE_JSON_REQUESTS: bool = os.getenv("LLM_COALESCE_JSON_REQUESTS", "false").lower() == "true"
+
+    # 数据源连接器注册表配置（Agent工具查询复用已连接的连接器）
+    CONNECTOR_REGISTRY_ENABLED: bool = os.getenv("CONNECTOR_REGISTRY_ENABLED", "true").lower() == "true"
+    CONNECTOR_REGISTRY_MAX_PER_SOURCE: int = int(os.getenv("CONNECTOR_REGISTRY_MAX_PER_SOURCE", 4))
+    CONNECTOR_REGISTRY_IDLE_TTL: float = float(os.getenv("CONNECTOR_REGISTRY_IDLE_TTL", 300))
+    CONNECTOR_REGISTRY_HEALTH_CHECK_INTERVAL: float = float(os.getenv("CONNECTOR_REGISTRY_HEALTH_CHECK_INTERVAL", 60))
+
+    # 查询结果缓存配置（按规范化SQL+参数+数据源指纹缓存占位符SQL结果）
+    QUERY_RESULT_CACHE_ENABLED: bool = os.getenv("QUERY_RESULT_CACHE_ENABLED", "true").lower() == "true"
+    # 时间窗口包含今天的周期（数据仍在变化），按报告周期放大：日1倍/周2倍/月4倍/年8倍
+    QUERY_RESULT_CACHE_OPEN_PERIOD_TTL: int = int(os.getenv("QUERY_RESULT_CACHE_OPEN_PERIOD_TTL", 300))
+    # 已结束的周期
+    QUERY_RESULT_CACHE_CLOSED_PERIOD_TTL: int = int(os.getenv("QUERY_RESULT_CACHE_CLOSED_PERIOD_TTL", 86400))
+    # 无时间窗口的查询
+    QUERY_RESULT_CACHE_DEFAULT_TTL: int = int(os.getenv("QUERY_RESULT_CACHE_DEFAULT_TTL", 300))
+    # 超过该行数的结果不缓存
+    QUERY_RESULT_CACHE_MAX_ROWS: int = int(os.getenv("QUERY_RESULT_CACHE_MAX_ROWS", 10000))
+
+    # SQL分析核心配置（验证/列检查/自动修复工具共用解析结果与Schema快照）
+    SQL_ANALYSIS_CACHE_SIZE: int = int(os.getenv("SQL_ANALYSIS_CACHE_SIZE", 512))
+    # 同一数据源同一组表的Schema信息在该时间内只检索一次
+    SQL_SCHEMA_INFO_TTL: float = float(os.getenv("SQL_SCHEMA_INFO_TTL", 60))
+
+    # Word模板编译索引缓存（按模板内容哈希缓存占位符位置，同一模板只解析一次）
+    WORD_TEMPLATE_INDEX_CACHE_SIZE: int = int(os.getenv("WORD_TEMPLATE_INDEX_CACHE_SIZE", 64))
+
+    # 图表渲染进程池配置（0 表示按 CPU 核数自动确定，最多 4 个进程；负数表示在当前进程内渲染）
+    CHART_RENDER_WORKERS: int = int(os.getenv("CHART_RENDER_WORKERS", 0))
+    # 按图表内容哈希缓存的 PNG 数量
+    CHART_RENDER_CACHE_SIZE: int = int(os.getenv("CHART_RENDER_CACHE_SIZE", 256))
+    # 图表中文字体文件路径（可选）
+    CHART_FONT_PATH: str = os.getenv("CHART_FONT_PATH", "")
+
+    # 占位符值批量写入：原始查询结果序列化后超过该字节数时转存对象存储，记录中只保留指针（0 表示不转存）
+    PLACEHOLDER_VALUE_OFFLOAD_THRESHOLD: int = int(os.getenv("PLACEHOLDER_VALUE_OFFLOAD_THRESHOLD", 0))
+
+    # 任务进度事件批量写入：缓冲事件数或距上次写入秒数达到阈值时刷新到数据库
+    TASK_PROGRESS_FLUSH_BATCH_SIZE: int = int(os.getenv("TASK_PROGRESS_FLUSH_BATCH_SIZE", 20))
+    TASK_PROGRESS_FLUSH_INTERVAL: float = float(os.getenv("TASK_PROGRESS_FLUSH_INTERVAL", 2.0))
+    # 每次执行在 Redis Stream 中保留的进度事件数
+    TASK_PROGRESS_STREAM_MAXLEN: int = int(os.getenv("TASK_PROGRESS_STREAM_MAXLEN", 2000))
+    # Redis 不可用时查询数据库取消状态的最小间隔（秒）
+    TASK_CANCEL_DB_CHECK_INTERVAL: float = float(os.getenv("TASK_CANCEL_DB_CHECK_INTERVAL", 5.0))
+
     # ===========================================
     # Celery 高级配置
     # ===========================================
@@ -239,6 +327,9 @@ class Settings(BaseSettings):
     # ===========================================
     USE_CELERY_PLACEHOLDER_ANALYSIS: bool = os.getenv("USE_CELERY_PLACEHOLDER_ANALYSIS", "false").lower() == "true"
     PLACEHOLDER_ANALYSIS_TIMEOUT: int = int(os.getenv("PLACEHOLDER_ANALYSIS_TIMEOUT", "300"))  # 5分钟  # local_stub 或 http
+    # 批量占位符分析：同时分析的占位符数量（共享的Agent运行时数量）与Agent异常时的重试次数
+    PLACEHOLDER_BATCH_ANALYSIS_CONCURRENCY: int = int(os.getenv("PLACEHOLDER_BATCH_ANALYSIS_CONCURRENCY", 4))
+    PLACEHOLDER_BATCH_ANALYSIS_MAX_RETRIES: int = int(os.getenv("PLACEHOLDER_BATCH_ANALYSIS_MAX_RETRIES", 1))
     NEW_AGENT_ENDPOINT: str = os.getenv("NEW_AGENT_ENDPOINT", "")  # HTTP模式下的服务地址
     NEW_AGENT_API_KEY: str = os.getenv("NEW_AGENT_API_KEY", "")
     NEW_AGENT_TIMEOUT: int = int(os.getenv("NEW_AGENT_TIMEOUT", 60))
@@ -259,6 +350,28 @@ class Settings(BaseSettings):
     # ETL配置
     ETL_BATCH_SIZE: int = int(os.getenv("ETL_BATCH_SIZE", 10000))
     ETL_QUERY_TIMEOUT: int = int(os.getenv("ETL_QUERY_TIMEOUT", 900))  # 15分钟
+    ETL_QUERY_CONCURRENCY: int = int(os.getenv("ETL_QUERY_CONCURRENCY", 8))  # 报告内占位符SQL并发上限
+
+    # 大结果集流式读取配置
+    QUERY_STREAM_CHUNK_ROWS: int = int(os.getenv("QUERY_STREAM_CHUNK_ROWS", 10000))  # 每块行数
+    QUERY_STREAM_MAX_BUFFERED_CHUNKS: int = int(os.getenv("QUERY_STREAM_MAX_BUFFERED_CHUNKS", 2))  # 读取线程最多领先的块数
+    QUERY_STREAM_MEMORY_BUDGET_MB: int = int(os.getenv("QUERY_STREAM_MEMORY_BUDGET_MB", 256))  # 超出后溢写磁盘
+    QUERY_STREAM_SPILL_DIR: str = os.getenv("QUERY_STREAM_SPILL_DIR", "")  # 溢写目录，默认系统临时目录
+    # ETL 显式要求物化（materialize）且未指定 max_rows 时，最多把多少行结果物化为记录列表，超出则拒绝
+    QUERY_STREAM_MATERIALIZE_MAX_ROWS: int = int(os.getenv("QUERY_STREAM_MATERIALIZE_MAX_ROWS", 100000))
+
+    # Doris MySQL协议连接池配置（按数据源在进程内共享）
+    DORIS_MYSQL_POOL_MIN_SIZE: int = int(os.getenv("DORIS_MYSQL_POOL_MIN_SIZE", 1))
+    DORIS_MYSQL_POOL_MAX_SIZE: int = int(os.getenv("DORIS_MYSQL_POOL_MAX_SIZE", 10))
+    DORIS_MYSQL_POOL_IDLE_TIMEOUT: int = int(os.getenv("DORIS_MYSQL_POOL_IDLE_TIMEOUT", 300))  # 5分钟
+    DORIS_MYSQL_POOL_HEALTH_CHECK_INTERVAL: int = int(os.getenv("DORIS_MYSQL_POOL_HEALTH_CHECK_INTERVAL", 30))
+
+    # 共享Schema目录配置（跨Worker/进程共享，存储在Redis中）
+    SCHEMA_CATALOG_TTL: int = int(os.getenv("SCHEMA_CATALOG_TTL", 86400))  # 目录在Redis中的保留时间
+    SCHEMA_CATALOG_REFRESH_INTERVAL: int = int(os.getenv("SCHEMA_CATALOG_REFRESH_INTERVAL", 300))  # 增量刷新间隔(秒)
+    # Schema图索引（连接路径/关键词索引，按Schema结构哈希缓存在进程内与Redis中）
+    SCHEMA_GRAPH_INDEX_CACHE_SIZE: int = int(os.getenv("SCHEMA_GRAPH_INDEX_CACHE_SIZE", 32))
+    SCHEMA_GRAPH_INDEX_TTL: int = int(os.getenv("SCHEMA_GRAPH_INDEX_TTL", 86400))
 
     # 报告生成容错配置
     # 允许的失败占位符数量（不含跳过）上限，<= 此数仍生成文档
@@ -269,11 +382,18 @@ class Settings(BaseSettings):
     # 缓存配置
     CACHE_DEFAULT_EXPIRE: int = int(os.getenv("CACHE_DEFAULT_EXPIRE", 3600))  # 1小时
     CACHE_AI_RESPONSE_EXPIRE: int = int(os.getenv("CACHE_AI_RESPONSE_EXPIRE", 3600))  # 1小时
+    # get_or_load 跨进程加载锁超时（秒），等待方超时后自行加载
+    CACHE_LOAD_LOCK_TIMEOUT: int = int(os.getenv("CACHE_LOAD_LOCK_TIMEOUT", 30))
+    # 过期后仍可返回旧值并在后台刷新的时长（秒），0 表示关闭
+    CACHE_STALE_WHILE_REVALIDATE: int = int(os.getenv("CACHE_STALE_WHILE_REVALIDATE", 300))
     
     # 文件存储配置 - MinIO优先策略
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./uploads")
     REPORT_OUTPUT_DIR: str = os.getenv("REPORT_OUTPUT_DIR", "./reports")
     MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", 100 * 1024 * 1024))  # 100MB
+    # 批量打包下载：单次最多报告数、同时从存储获取（并驻留内存）的文件数
+    REPORT_BUNDLE_MAX_REPORTS: int = int(os.getenv("REPORT_BUNDLE_MAX_REPORTS", 500))
+    REPORT_BUNDLE_FETCH_CONCURRENCY: int = int(os.getenv("REPORT_BUNDLE_FETCH_CONCURRENCY", 8))
     
     # 存储策略配置 - 默认优先MinIO
     STORAGE_STRATEGY: str = os.getenv("STORAGE_STRATEGY", "minio_first")  # minio_first, local_first, minio_only, local_only
@@ -304,7 +424,15 @@ class Settings(BaseSettings):
     
     # MinIO优先配置 - 默认启用
     PREFER_MINIO_STORAGE: bool = os.getenv("PREFER_MINIO_STORAGE", "true").lower() == "true"
-    
+
+    # 异步存储配置 - 流式读写块大小、分片上传大小、并行分片数与存储IO线程数
+    STORAGE_CHUNK_SIZE: int = int(os.getenv("STORAGE_CHUNK_SIZE", 1024 * 1024))
+    STORAGE_MULTIPART_PART_SIZE: int = int(os.getenv("STORAGE_MULTIPART_PART_SIZE", 16 * 1024 * 1024))
+    STORAGE_PARALLEL_PARTS: int = int(os.getenv("STORAGE_PARALLEL_PARTS", 4))
+    STORAGE_IO_THREADS: int = int(os.getenv("STORAGE_IO_THREADS", 8))
+    # 去重上传时内存暂存的上限，超过后落盘
+    STORAGE_DEDUP_SPOOL_SIZE: int = int(os.getenv("STORAGE_DEDUP_SPOOL_SIZE", 8 * 1024 * 1024))
+
     # API基础URL配置
     API_BASE_URL: str = os.getenv("API_BASE_URL", "http://localhost:8000")
     
@@ -13,10 +13,27 @@ class DataSourceAdapter:
     Internally uses connector factory create_connector_from_config to execute queries.
     """
 
-    async def run_query(self, connection_config: Dict[str, Any], sql: str, limit: int = 1000) -> Dict[str, Any]:
-        from app.services.data.connectors import create_connector_from_config
+    async def run_query(
+        self,
+        connection_config: Dict[str, Any],
+        sql: str,
+        limit: int = 1000,
+        use_cache: bool = False,
+        time_window: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        执行查询
+
+        use_cache=True 时经过查询结果缓存（用于预览、质量评分等重复执行同一SQL的场景），
+        time_window 决定缓存TTL
+        """
+        from app.services.data.connectors import get_connector_registry
         logger = logging.getLogger(__name__)
 
+        if use_cache and isinstance(connection_config, dict):
+            from app.services.data.query.query_result_cache import cached_run_query
+            return await cached_run_query(self.run_query, connection_config, sql, limit, time_window=time_window)
+
         if not connection_config:
             return {"success": False, "error": "missing_connection_config"}
 
@@ -48,10 +65,9 @@ class DataSourceAdapter:
         else:
             src_type_norm = src_type
 
-        # Create connector and execute
+        # 从连接器注册表借出已连接的连接器并执行
         try:
-            connector = create_connector_from_config(src_type_norm, name, cfg)
-            async with connector:
+            async with get_connector_registry().connection(src_type_norm, name, cfg) as connector:
                 q = sql
                 # 排除不支持LIMIT的语句（特别是Doris的SHOW命令）
                 sql_upper = (sql or "").upper().strip()
@@ -82,8 +98,15 @@ class DataSourceAdapter:
                 try:
                     import pandas as pd
 
+                    # 列式结果（QueryResult/DorisQueryResult）：按列一次性物化，跳过 DataFrame 逐行转换
+                    if hasattr(result, 'to_columnar'):
+                        columnar = result.to_columnar()
+                        rows = columnar.to_records()
+                        cols = columnar.columns if rows else []
+                        logger.debug(f"使用列式结果解析: {len(rows)}行, {len(cols)}列")
+
                     # 🔧 修复：优先检查 QueryResult 对象（from base_connector）
-                    if hasattr(result, 'data') and hasattr(result, 'success'):
+                    elif hasattr(result, 'data') and hasattr(result, 'success'):
                         # QueryResult 对象格式 - 标准连接器返回格式
                         if isinstance(result.data, pd.DataFrame):
                             if not result.data.empty:
@@ -368,7 +391,8 @@ class RealLLMServiceAdapter:
                 result = await execu.execute_with_specific_model(
                     model_id=selected_model["model_id"],
                     prompt=prompt,
-                    response_format=response_format
+                    response_format=response_format,
+                    user_id=user_id
                 )
                 text = result.get("result", "") if isinstance(result, dict) else str(result)
 
@@ -2,6 +2,7 @@
 Data Source CRUD operations
 """
 
+import logging
 from typing import List, Optional
 from uuid import UUID
 
@@ -14,6 +15,26 @@ from .base import CRUDBase
 from ..core.data_source_utils import generate_slug
 from ..core.security_utils import encrypt_data
 
+logger = logging.getLogger(__name__)
+
+
+def _invalidate_connectors(db_obj: DataSource) -> None:
+    """失效连接器注册表中该数据源的连接器（失败不影响数据源的增删改）"""
+    try:
+        from ..services.data.connectors.connector_registry import get_connector_registry
+        get_connector_registry().invalidate_config(db_obj.source_type, db_obj.connection_config)
+    except Exception as e:
+        logger.debug(f"失效数据源连接器失败: {e}")
+
+
+def _invalidate_query_cache(db_obj: DataSource) -> None:
+    """失效该数据源的查询结果缓存（失败不影响数据源的增删改，缓存条目仍会按TTL过期）"""
+    try:
+        from ..services.data.query.query_result_cache import get_query_result_cache
+        get_query_result_cache().invalidate_source(db_obj.source_type, db_obj.connection_config)
+    except Exception as e:
+        logger.debug(f"失效数据源查询缓存失败: {e}")
+
 
 class CRUDDataSource(CRUDBase[DataSource, DataSourceCreate, DataSourceUpdate]):
     """Data Source CRUD operations class"""
@@ -99,6 +120,10 @@ class CRUDDataSource(CRUDBase[DataSource, DataSourceCreate, DataSourceUpdate]):
         else:
             # 字典
             update_data = obj_in
+
+        # 连接参数即将变化，失效按旧配置复用的连接器与缓存的查询结果
+        _invalidate_connectors(db_obj)
+        _invalidate_query_cache(db_obj)
         
         # 加密敏感信息
         if update_data.get('connection_string'):
@@ -112,8 +137,20 @@ class CRUDDataSource(CRUDBase[DataSource, DataSourceCreate, DataSourceUpdate]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        # 新配置下可能仍有此前缓存的结果（如改回旧配置）
+        _invalidate_query_cache(db_obj)
         return db_obj
     
+    def remove(self, db: Session, *, id) -> DataSource:
+        """删除数据源，并失效复用中的连接器与缓存的查询结果"""
+        obj = db.query(DataSource).get(id)
+        if obj:
+            _invalidate_connectors(obj)
+            _invalidate_query_cache(obj)
+            db.delete(obj)
+            db.commit()
+        return obj
+
     def get_count(self, db: Session) -> int:
         """获取所有数据源总数"""
         return db.query(DataSource).count()
@@ -4,7 +4,8 @@ CRUD operations for PlaceholderValue
 占位符值CRUD操作 - 精简版（针对100占位符场景优化）
 """
 
-from typing import List, Optional
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -133,6 +134,78 @@ class CRUDPlaceholderValue(CRUDBase[PlaceholderValue, PlaceholderValueCreate, Pl
         ).update({"is_latest_version": False}, synchronize_session=False)
         return count
 
+    def mark_as_outdated_bulk(
+        self,
+        db: Session,
+        *,
+        pairs: Iterable[Tuple[Any, Any]]
+    ) -> int:
+        """
+        批量将占位符的旧值标记为过期（集合更新，每个数据源一条 UPDATE）
+
+        Args:
+            db: 数据库会话
+            pairs: (placeholder_id, data_source_id) 列表
+
+        Returns:
+            更新的记录数
+        """
+        placeholder_ids_by_source = defaultdict(set)
+        for placeholder_id, data_source_id in pairs:
+            placeholder_ids_by_source[data_source_id].add(placeholder_id)
+
+        count = 0
+        for data_source_id, placeholder_ids in placeholder_ids_by_source.items():
+            count += db.query(self.model).filter(
+                PlaceholderValue.data_source_id == data_source_id,
+                PlaceholderValue.placeholder_id.in_(list(placeholder_ids)),
+                PlaceholderValue.is_latest_version == True
+            ).update({"is_latest_version": False}, synchronize_session=False)
+        return count
+
+    def bulk_upsert(
+        self,
+        db: Session,
+        *,
+        rows: List[Dict[str, Any]]
+    ) -> int:
+        """
+        批量写入占位符值（不构建ORM对象，一次 executemany）
+
+        cache_key 冲突时更新已有记录，同一周期重复执行不再违反唯一约束；
+        PostgreSQL/SQLite 使用 ON CONFLICT，其他数据库退化为普通批量插入。
+        所有行需包含相同的列，不在此commit。
+
+        Args:
+            db: 数据库会话
+            rows: 列名到值的字典列表
+
+        Returns:
+            写入的记录数
+        """
+        if not rows:
+            return 0
+
+        table = self.model.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            db.execute(table.insert(), rows)
+            return len(rows)
+
+        stmt = insert(table)
+        # 冲突时保留原记录的主键、创建时间和命中统计
+        preserved = {"id", "cache_key", "created_at", "hit_count", "last_hit_at"}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.cache_key],
+            set_={name: stmt.excluded[name] for name in rows[0] if name not in preserved}
+        )
+        db.execute(stmt, rows)
+        return len(rows)
+
     def cleanup_old_versions(
         self,
         db: Session,
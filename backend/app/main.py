@@ -207,6 +207,8 @@ async def shutdown():
 
     shutdown_tasks = [
         ("LLM监控服务", "app.services.infrastructure.llm.monitor_integration", "stop_llm_monitoring"),
+        ("LLM HTTP连接池", "app.services.infrastructure.llm.http_client_pool", "close_llm_http_pool"),
+        ("数据源连接器注册表", "app.services.data.connectors.connector_registry", "close_connector_registry"),
         ("WebSocket管理器", "app.websocket.manager", "websocket_manager")
     ]
 
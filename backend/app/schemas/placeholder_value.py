@@ -4,7 +4,7 @@ Pydantic schemas for PlaceholderValue
 占位符值的数据模型定义
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
 from pydantic import BaseModel, Field
 from uuid import UUID
@@ -14,7 +14,8 @@ class PlaceholderValueBase(BaseModel):
     """占位符值基础模型"""
     placeholder_id: UUID
     data_source_id: UUID
-    raw_query_result: Optional[Dict[str, Any]] = None
+    # 查询结果通常是行列表；转存到对象存储时为 {"$ref": {...}} 指针
+    raw_query_result: Optional[Union[Dict[str, Any], List[Any]]] = None
     processed_value: Optional[Dict[str, Any]] = None
     formatted_text: Optional[str] = None
     execution_sql: Optional[str] = None
@@ -17,6 +17,11 @@ from .placeholder_service import (
     update_placeholder_simple,
     complete_placeholder_simple
 )
+from .batch_analysis_engine import (
+    BatchAnalysisConfig,
+    BatchPlaceholderAnalysisEngine,
+    PlaceholderBatchContext,
+)
 
 __all__ = [
     "PlaceholderApplicationService",
@@ -29,5 +34,10 @@ __all__ = [
     "complete_placeholder",
     "analyze_placeholder_simple",
     "update_placeholder_simple",
-    "complete_placeholder_simple"
+    "complete_placeholder_simple",
+
+    # 批量分析
+    "BatchAnalysisConfig",
+    "BatchPlaceholderAnalysisEngine",
+    "PlaceholderBatchContext",
 ]
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""
+占位符批量分析引擎
+
+同一模板 + 数据源的一批占位符共享一次构建的分析上下文：
+- 模板内容、Schema 快照、数据源连接配置只加载一次
+- Agent 适配器（及其运行时、工具和 LLM 客户端）按并发度构建一个小池子，各占位符轮流复用
+- 占位符分析在共享的并发预算内并行执行，按完成顺序逐个产出结果
+- Agent 执行异常（超时、LLM 临时错误等）的占位符自动重试，调用方也可只重跑指定的占位符
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchAnalysisConfig:
+    """批量分析配置"""
+    # 同时分析的占位符数量（也是共享 Agent 适配器的数量）
+    concurrency: int = 4
+    # Agent 执行异常时的重试次数（SQL 验证失败等确定性错误不重试）
+    max_retries: int = 1
+    # 重试前等待的秒数（按次数指数增长）
+    retry_backoff: float = 1.0
+
+    @classmethod
+    def from_settings(cls) -> "BatchAnalysisConfig":
+        """从全局配置创建"""
+        return cls(
+            concurrency=max(1, settings.PLACEHOLDER_BATCH_ANALYSIS_CONCURRENCY),
+            max_retries=max(0, settings.PLACEHOLDER_BATCH_ANALYSIS_MAX_RETRIES),
+        )
+
+
+@dataclass
+class PlaceholderBatchContext:
+    """同一模板 + 数据源的一批占位符共享的分析上下文"""
+    template_id: str
+    data_source_id: Optional[str]
+    user_id: str
+    template_content: str = ""
+    schema_info: Any = None
+    data_source_config: Dict[str, Any] = field(default_factory=dict)
+    context_retriever: Any = None
+    agent_adapters: List[Any] = field(default_factory=list)
+
+
+def _normalize_result(result: Any) -> Dict[str, Any]:
+    if isinstance(result, dict):
+        return result
+    for method in ("dict", "model_dump"):
+        if callable(getattr(result, method, None)):
+            try:
+                return getattr(result, method)()
+            except Exception:
+                break
+    return {"status": "error", "error": "invalid_result_type", "raw": str(result)}
+
+
+def is_retryable_result(result: Dict[str, Any]) -> bool:
+    """Agent 执行过程中抛出异常的结果可以重试；已生成结论（含验证失败）的结果不重试"""
+    if result.get("status") != "error":
+        return False
+    if result.get("retryable"):
+        return True
+    analysis_result = result.get("analysis_result")
+    return isinstance(analysis_result, dict) and analysis_result.get("analysis_type") == "error_fallback"
+
+
+class BatchPlaceholderAnalysisEngine:
+    """
+    占位符批量分析引擎
+
+    analyzer 需提供：
+    - build_batch_context(template_id, data_source_id, user_id, adapter_count) -> PlaceholderBatchContext
+    - analyze_placeholder_with_full_pipeline(..., batch_context=..., agent_adapter=...)
+    """
+
+    def __init__(self, analyzer: Any, config: Optional[BatchAnalysisConfig] = None):
+        self.analyzer = analyzer
+        self.config = config or BatchAnalysisConfig.from_settings()
+
+    async def stream(
+        self,
+        placeholders: Sequence[Dict[str, Any]],
+        *,
+        template_id: str,
+        data_source_id: Optional[str],
+        user_id: str,
+        **common_params: Any,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发分析一批占位符，按完成顺序产出结果
+
+        Args:
+            placeholders: [{"name": ..., "text": ..., 其他单占位符参数}, ...]
+            common_params: 所有占位符共用的分析参数（时间窗口、template_context 等）
+
+        Yields:
+            {"index", "placeholder_name", "placeholder_text", "success", "attempts", "result", "processed_at"}
+        """
+        if not placeholders:
+            return
+
+        concurrency = max(1, min(self.config.concurrency, len(placeholders)))
+        context = await self.analyzer.build_batch_context(
+            template_id=template_id,
+            data_source_id=data_source_id,
+            user_id=user_id,
+            adapter_count=concurrency,
+        )
+        # 适配器池同时充当并发预算：拿到适配器的占位符才开始分析
+        adapters: asyncio.Queue = asyncio.Queue()
+        for adapter in context.agent_adapters or [None] * concurrency:
+            adapters.put_nowait(adapter)
+
+        tasks = [
+            asyncio.ensure_future(self._analyze(index, spec, context, adapters, common_params))
+            for index, spec in enumerate(placeholders)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def run(
+        self,
+        placeholders: Sequence[Dict[str, Any]],
+        *,
+        template_id: str,
+        data_source_id: Optional[str],
+        user_id: str,
+        **common_params: Any,
+    ) -> List[Dict[str, Any]]:
+        """并发分析一批占位符，按输入顺序返回结果"""
+        results = [
+            item async for item in self.stream(
+                placeholders,
+                template_id=template_id,
+                data_source_id=data_source_id,
+                user_id=user_id,
+                **common_params,
+            )
+        ]
+        return sorted(results, key=lambda item: item["index"])
+
+    async def _analyze(
+        self,
+        index: int,
+        spec: Dict[str, Any],
+        context: PlaceholderBatchContext,
+        adapters: asyncio.Queue,
+        common_params: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        name = spec.get("name") or f"placeholder_{index}"
+        text = spec.get("text", "")
+        params = {
+            **common_params,
+            **{key: value for key, value in spec.items() if key not in ("name", "text")},
+        }
+
+        adapter = await adapters.get()
+        attempts = 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    result = _normalize_result(
+                        await self.analyzer.analyze_placeholder_with_full_pipeline(
+                            placeholder_name=name,
+                            placeholder_text=text,
+                            template_id=context.template_id,
+                            data_source_id=context.data_source_id,
+                            user_id=context.user_id,
+                            batch_context=context,
+                            agent_adapter=adapter,
+                            **params,
+                        )
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"批量分析单个占位符失败: {name}, {e}")
+                    result = {"status": "error", "placeholder_name": name, "error": str(e), "retryable": True}
+
+                if attempts > self.config.max_retries or not is_retryable_result(result):
+                    break
+                logger.warning(f"🔁 占位符分析异常，第 {attempts} 次重试: {name}")
+                await asyncio.sleep(self.config.retry_backoff * (2 ** (attempts - 1)))
+        finally:
+            adapters.put_nowait(adapter)
+
+        result.pop("retryable", None)
+        return {
+            "index": index,
+            "placeholder_name": name,
+            "placeholder_text": text,
+            "success": result.get("status") == "success",
+            "attempts": attempts,
+            "result": result,
+            "processed_at": datetime.now().isoformat(),
+        }
+
+
+__all__ = [
+    "BatchAnalysisConfig",
+    "BatchPlaceholderAnalysisEngine",
+    "PlaceholderBatchContext",
+    "is_retryable_result",
+]
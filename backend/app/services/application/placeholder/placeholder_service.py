@@ -1012,7 +1012,8 @@ class PlaceholderApplicationService:
                     executable_sql = self._prepare_executable_sql(generated_sql, task_context)
                     query_result = await self._execute_sql_for_validation(
                         sql=executable_sql,
-                        data_source_id=data_source_id
+                        data_source_id=data_source_id,
+                        time_window=task_context.get("window") if task_context else None
                     )
                     logger.info(f"✅ SQL试执行完成: row_count={query_result.get('row_count', 0)}, preview={str(query_result.get('data', []))[:100]}")
                 except Exception as exec_error:
@@ -1185,14 +1186,18 @@ class PlaceholderApplicationService:
     async def _execute_sql_for_validation(
         self,
         sql: str,
-        data_source_id: str
+        data_source_id: str,
+        time_window: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         试执行SQL以获取查询结果（用于验证）
 
+        经过查询结果缓存执行，同一时间窗口内重复预览/重试不再重复查询数据源
+
         Args:
             sql: 可执行的SQL
             data_source_id: 数据源ID
+            time_window: 任务时间窗口（决定缓存TTL）
 
         Returns:
             查询结果: {
@@ -1211,50 +1216,33 @@ class PlaceholderApplicationService:
                 data_source = crud.data_source.get(db, id=data_source_id)
                 if not data_source:
                     raise ValueError(f"数据源不存在: {data_source_id}")
-
-            # 使用connector执行查询
-            from app.services.infrastructure.connectors.doris_connector import DorisConnector
-
-            connector = DorisConnector(
-                host=data_source.host,
-                port=data_source.port,
-                user=data_source.username,
-                password=data_source.password,
-                database=data_source.database
+                connection_config = dict(data_source.connection_config)
+                connection_config.setdefault("name", data_source.name)
+
+            # 限制查询结果，只取前10行用于验证
+            limited_sql = f"SELECT * FROM ({sql}) AS validation_query LIMIT 10"
+            query_result = await self.container.data_source.run_query(
+                connection_config,
+                limited_sql,
+                limit=10,
+                use_cache=True,
+                time_window=time_window
             )
+            if not query_result.get("success"):
+                raise RuntimeError(query_result.get("error") or "查询执行失败")
 
-            await connector.connect()
-            try:
-                # 限制查询结果，只取前10行用于验证
-                limited_sql = f"SELECT * FROM ({sql}) AS validation_query LIMIT 10"
-                query_result = await connector.execute_query(limited_sql)
-
-                # 提取数据
-                data = []
-                columns = []
-                row_count = 0
-
-                if hasattr(query_result, 'data') and query_result.data is not None:
-                    df = query_result.data
-                    if not df.empty:
-                        data = df.to_dict('records')
-                        columns = df.columns.tolist()
-                        row_count = len(data)
-
-                        # 转换Decimal等特殊类型
-                        from app.utils.json_utils import convert_decimals
-                        data = convert_decimals(data)
-
-                logger.info(f"✅ SQL验证查询成功: row_count={row_count}")
-                return {
-                    "success": True,
-                    "data": data,
-                    "row_count": row_count,
-                    "columns": columns
-                }
+            # 转换Decimal等特殊类型
+            from app.utils.json_utils import convert_decimals
+            data = convert_decimals(query_result.get("rows") or [])
+            columns = query_result.get("columns") or []
 
-            finally:
-                await connector.disconnect()
+            logger.info(f"✅ SQL验证查询成功: row_count={len(data)}")
+            return {
+                "success": True,
+                "data": data,
+                "row_count": len(data),
+                "columns": columns
+            }
 
         except Exception as e:
             logger.error(f"SQL验证查询失败: {e}")
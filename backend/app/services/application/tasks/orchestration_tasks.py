@@ -18,6 +18,7 @@ from typing import Dict, Any, List
 from datetime import datetime
 from celery import chain, group, chord
 
+from ...infrastructure.task_queue.async_runtime import run_in_worker_loop
 from ...infrastructure.task_queue.celery_config import celery_app
 
 logger = logging.getLogger(__name__)
@@ -71,15 +72,8 @@ def orchestrate_report_generation(
                 'failed_at': datetime.now().isoformat()
             }
     
-    # 在Celery任务中运行异步代码
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(_execute_with_agent())
+    # 在worker常驻事件循环中运行异步代码
+    return run_in_worker_loop(_execute_with_agent())
 
 
 @celery_app.task(name='application.orchestration.data_processing', bind=True)
@@ -124,15 +118,8 @@ def orchestrate_data_processing(
                 'failed_at': datetime.now().isoformat()
             }
     
-    # 在Celery任务中运行异步代码
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(_execute_with_agent())
+    # 在worker常驻事件循环中运行异步代码
+    return run_in_worker_loop(_execute_with_agent())
 
 
 @celery_app.task(name='application.orchestration.workflow_callback', bind=True)
@@ -218,12 +205,5 @@ def orchestrate_context_aware_task(self, task_request: Dict[str, Any]) -> Dict[s
                 'failed_at': datetime.now().isoformat()
             }
     
-    # 在Celery任务中运行异步代码
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop() 
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(_execute_with_agent())
\ No newline at end of file
+    # 在worker常驻事件循环中运行异步代码
+    return run_in_worker_loop(_execute_with_agent())
\ No newline at end of file
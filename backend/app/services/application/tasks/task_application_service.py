@@ -26,6 +26,7 @@ from app.services.application.tasks.task_execution_service import TaskExecutionS
 # from app.services.infrastructure.task_queue.tasks import validate_placeholders_task, scheduled_task_runner
 from app.services.infrastructure.task_queue.celery_config import celery_app
 from app.services.infrastructure.task_queue.tasks import execute_report_task
+from app.services.infrastructure.task_queue.progress_recorder import request_cancellation
 from app.core.exceptions import ValidationError, NotFoundError
 from app.utils.time_context import TimeContextManager
 
@@ -805,6 +806,7 @@ class TaskApplicationService(TransactionalApplicationService):
                     except Exception as e:
                         logger.warning(f"Failed to revoke Celery task {execution.celery_task_id}: {e}")
                 
+                request_cancellation(execution.execution_id)
                 execution.execution_status = TaskStatus.CANCELLED
                 execution.completed_at = datetime.utcnow()
             
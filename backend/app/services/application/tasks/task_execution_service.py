@@ -1061,16 +1061,9 @@ class TaskExecutionService:
                 }
             )
             
-            # 3. 运行异步执行（这需要在异步上下文中运行）
-            import asyncio
-            
-            # 创建事件循环或使用现有的
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
+            # 3. 在worker常驻事件循环中运行异步执行
+            from app.services.infrastructure.task_queue.async_runtime import run_in_worker_loop
+
             # 如果有进度回调，设置为任务状态更新回调
             if progress_callback:
                 original_update = self._update_task_status
@@ -1081,14 +1074,7 @@ class TaskExecutionService:
                 self._update_task_status = wrapped_update
             
             # 执行任务
-            if loop.is_running():
-                # 如果循环已在运行，创建任务
-                future = asyncio.create_task(self.execute_task(request))
-                # 注意：在实际环境中，这需要特殊处理
-                logger.warning("Event loop is running, task execution may need adjustment")
-                result = {"success": False, "error": "Event loop running - task queued"}
-            else:
-                result = loop.run_until_complete(self.execute_task(request))
+            result = run_in_worker_loop(self.execute_task(request))
             
             # 转换结果格式
             if hasattr(result, 'success'):
@@ -8,6 +8,8 @@ from typing import Dict, Any, Optional, List
 import logging
 from datetime import datetime
 
+from app.services.infrastructure.task_queue.async_runtime import run_in_worker_loop
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,8 +57,7 @@ def generate_report_workflow(
 
             # 2) 执行组装（v2 流水线，按自然日/周/月/年）
             facade = create_unified_service_facade(db, user_id)
-            import asyncio
-            assembled = asyncio.run(
+            assembled = run_in_worker_loop(
                 facade.generate_report_v2(
                     template_id=template_id,
                     data_source_id=ds_id,
@@ -132,7 +133,6 @@ def generate_report_orchestrated(
         )
 
         # 创建 Orchestrator
-        import asyncio
         from app.services.infrastructure.agents import ReportGenerationOrchestrator, OrchestratorContext
         from app.core.container import Container
 
@@ -181,7 +181,7 @@ def generate_report_orchestrated(
             }
 
         # 执行异步编排
-        result_data = asyncio.run(run_orchestration())
+        result_data = run_in_worker_loop(run_orchestration())
         context = result_data["context"]
         events = result_data["events"]
 
@@ -260,7 +260,6 @@ def analyze_placeholder_workflow(
         )
 
         # 使用TT递归SQL生成函数（第一阶段）
-        import asyncio
         from app.services.infrastructure.agents import execute_sql_generation_tt
         from app.db.session import get_db_session
 
@@ -343,7 +342,7 @@ def analyze_placeholder_workflow(
             }
 
         # 执行异步分析
-        analysis_result = asyncio.run(run_analysis())
+        analysis_result = run_in_worker_loop(run_analysis())
 
         # 更新进度
         self.update_state(
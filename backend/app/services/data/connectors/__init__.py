@@ -4,16 +4,27 @@
 """
 
 from .base_connector import BaseConnector, ConnectorConfig, QueryResult
+from .columnar_result import ColumnarResult, RowView
+from .result_stream import ResultSpool, StreamConfig, aggregate_stream, collect_stream, sample_stream
 from .doris_connector import DorisConnector, DorisConfig, DorisQueryResult
 from .sql_connector import SQLConnector, SQLConfig
 from .api_connector import APIConnector, APIConfig
 from .csv_connector import CSVConnector, CSVConfig
 from .connector_factory import create_connector, create_connector_from_config
+from .connector_registry import ConnectorRegistry, build_connection_fingerprint, get_connector_registry
+from .mysql_pool import MySQLConnectionPool, MySQLPoolConfig, get_mysql_pool, get_mysql_pool_metrics
 
 __all__ = [
     "BaseConnector",
     "ConnectorConfig", 
     "QueryResult",
+    "ColumnarResult",
+    "RowView",
+    "ResultSpool",
+    "StreamConfig",
+    "aggregate_stream",
+    "collect_stream",
+    "sample_stream",
     "DorisConnector",
     "DorisConfig",
     "DorisQueryResult",
@@ -24,5 +35,12 @@ __all__ = [
     "CSVConnector",
     "CSVConfig",
     "create_connector",
-    "create_connector_from_config"
+    "create_connector_from_config",
+    "ConnectorRegistry",
+    "build_connection_fingerprint",
+    "get_connector_registry",
+    "MySQLConnectionPool",
+    "MySQLPoolConfig",
+    "get_mysql_pool",
+    "get_mysql_pool_metrics"
 ]
@@ -6,10 +6,13 @@
 import asyncio
 import pandas as pd
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Any, Optional
+from dataclasses import dataclass, field
 from datetime import datetime
 
+from .columnar_result import ColumnarResult
+from .result_stream import StreamConfig, iterate_result_chunks
+
 
 @dataclass
 class ConnectorConfig:
@@ -27,22 +30,26 @@ class QueryResult:
     success: bool
     error_message: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    columnar: Optional[ColumnarResult] = field(default=None, repr=False, compare=False)
+
+    def to_columnar(self) -> ColumnarResult:
+        """获取列式结果（连接器未直接提供时从DataFrame零拷贝构建）"""
+        if self.columnar is None:
+            self.columnar = ColumnarResult.from_dataframe(self.data)
+        return self.columnar
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为可序列化的字典"""
-        from app.utils.json_utils import convert_decimals
-
-        data_dict = self.data.to_dict(orient="records") if not self.data.empty else []
-        data_dict = convert_decimals(data_dict)
+        columnar = self.to_columnar()
 
         return {
-            "data": data_dict,
-            "columns": self.data.columns.tolist() if not self.data.empty else [],
+            "data": columnar.to_records(),
+            "columns": columnar.columns if not columnar.is_empty else [],
             "execution_time": self.execution_time,
             "success": self.success,
             "error_message": self.error_message,
             "metadata": self.metadata or {},
-            "row_count": len(self.data)
+            "row_count": len(columnar)
         }
     
     @classmethod
@@ -105,6 +112,24 @@ class BaseConnector(ABC):
         """执行查询"""
         pass
     
+    async def execute_query_stream(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        chunk_rows: Optional[int] = None,
+    ) -> AsyncIterator[ColumnarResult]:
+        """
+        流式执行查询，按块返回列式结果
+
+        默认实现先完整执行查询再切块；支持服务端游标的连接器应覆盖此方法
+        """
+        chunk_rows = chunk_rows or StreamConfig.from_settings().chunk_rows
+        result = await self.execute_query(query, parameters)
+        if getattr(result, "success", True) is False:
+            raise Exception(getattr(result, "error_message", None) or "查询执行失败")
+        async for chunk in iterate_result_chunks(result.to_columnar(), chunk_rows):
+            yield chunk
+    
     @abstractmethod
     async def get_fields(self, table_name: Optional[str] = None) -> List[str]:
         """获取字段列表"""
@@ -128,17 +153,13 @@ class BaseConnector(ABC):
                 query = f"SELECT * FROM (SELECT * FROM your_table LIMIT {limit}) AS preview"
             
             result = await self.execute_query(query)
-
-            from app.utils.json_utils import convert_decimals
-
-            data_dict = result.data.to_dict(orient="records")
-            data_dict = convert_decimals(data_dict)
+            columnar = result.to_columnar()
 
             return {
-                "columns": result.data.columns.tolist(),
-                "data": data_dict,
-                "row_count": len(result.data),
-                "total_columns": len(result.data.columns),
+                "columns": columnar.columns,
+                "data": columnar.to_records(),
+                "row_count": len(columnar),
+                "total_columns": len(columnar.columns),
                 "data_types": result.data.dtypes.astype(str).to_dict(),
                 "execution_time": result.execution_time
             }
@@ -0,0 +1,306 @@
+"""
+列式查询结果
+以按列存储的NumPy数组承载查询结果，替代 DataFrame → to_dict('records') → convert_decimals 的逐层物化
+
+- 游标返回的行元组一次转置为按列的类型化数组（整数/浮点/布尔/对象）
+- Decimal 按策略统一转换为 float（默认）或保持原样
+- 提供惰性行视图，下游（图表、ETL、Word填充）无需复制即可按行读取
+- 只有在需要 JSON 边界时才通过 to_records() 物化为字典列表
+"""
+
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Decimal 处理策略
+DECIMAL_TO_FLOAT = "float"
+DECIMAL_KEEP = "keep"
+
+# HTTP API 元数据类型到数组类型的映射关键字
+_INT_TYPE_KEYWORDS = ("int",)
+_FLOAT_TYPE_KEYWORDS = ("float", "double", "decimal")
+_DATETIME_TYPE_KEYWORDS = ("date", "time")
+_BOOL_TYPE_KEYWORDS = ("bool",)
+_FALSE_STRINGS = frozenset({"", "0", "false", "f", "no", "n"})
+
+
+def _to_python(value: Any) -> Any:
+    """NumPy 标量转换为 Python 原生类型"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _to_list(array: np.ndarray) -> List[Any]:
+    """数组转换为 Python 列表，浮点列中的 NaN 输出为 None 以保证 JSON 可序列化"""
+    if array.dtype.kind == "f":
+        mask = np.isnan(array)
+        if mask.any():
+            array = array.astype(object)
+            array[mask] = None
+    return array.tolist()
+
+
+def _object_array(values: Sequence[Any]) -> np.ndarray:
+    """构建一维对象数组（避免 np.array 把元组/列表展开成多维）"""
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _build_column(values: Sequence[Any], decimal_policy: str) -> np.ndarray:
+    """根据列值推断类型并构建数组"""
+    value_types = set(map(type, values))
+    has_null = type(None) in value_types
+    value_types.discard(type(None))
+
+    if Decimal in value_types and decimal_policy == DECIMAL_TO_FLOAT:
+        values = [float(v) if isinstance(v, Decimal) else v for v in values]
+        value_types.discard(Decimal)
+        value_types.add(float)
+
+    if has_null or not value_types:
+        return _object_array(values)
+
+    try:
+        if value_types == {bool}:
+            return np.array(values, dtype=np.bool_)
+        if value_types == {int}:
+            return np.array(values, dtype=np.int64)
+        if value_types <= {int, float}:
+            return np.array(values, dtype=np.float64)
+    except (OverflowError, ValueError, TypeError):
+        pass
+    return _object_array(values)
+
+
+def _to_bool(value: Any) -> bool:
+    """HTTP API 的布尔值可能是 true/false、1/0 或对应字符串"""
+    if isinstance(value, str):
+        return value.strip().lower() not in _FALSE_STRINGS
+    return bool(value)
+
+
+def _coerce_column(values: Sequence[Any], type_name: str, decimal_policy: str) -> np.ndarray:
+    """按 HTTP API 返回的列类型转换（值通常为字符串）"""
+    type_name = (type_name or "").lower()
+    try:
+        if any(k in type_name for k in _INT_TYPE_KEYWORDS) and not any(k in type_name for k in _FLOAT_TYPE_KEYWORDS):
+            numeric = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+            if not numeric.isna().any():
+                return numeric.to_numpy(dtype=np.int64)
+            return numeric.to_numpy(dtype=np.float64)
+        if any(k in type_name for k in _FLOAT_TYPE_KEYWORDS):
+            if "decimal" in type_name and decimal_policy == DECIMAL_KEEP:
+                return _object_array([Decimal(str(v)) if v is not None else None for v in values])
+            return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+        if any(k in type_name for k in _DATETIME_TYPE_KEYWORDS):
+            # 与 DataFrame 路径一致输出 Timestamp，无法解析的值为 None
+            parsed = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+            return _object_array([None if pd.isna(v) else v for v in parsed])
+        if any(k in type_name for k in _BOOL_TYPE_KEYWORDS):
+            return np.array([_to_bool(v) for v in values], dtype=np.bool_)
+    except Exception:
+        pass
+    return _build_column(values, decimal_policy)
+
+
+class RowView(Mapping):
+    """结果集中一行的只读视图，按需从列数组取值"""
+
+    __slots__ = ("_result", "_index")
+
+    def __init__(self, result: "ColumnarResult", index: int):
+        self._result = result
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return _to_python(self._result.column(key)[self._index])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._result.columns)
+
+    def __len__(self) -> int:
+        return len(self._result.columns)
+
+    def __repr__(self) -> str:
+        return f"RowView({dict(self)!r})"
+
+
+class ColumnarResult:
+    """按列存储的查询结果"""
+
+    def __init__(self, columns: List[str], arrays: Dict[str, np.ndarray], row_count: Optional[int] = None):
+        self.columns = list(columns)
+        self._arrays = arrays
+        if row_count is None:
+            row_count = len(arrays[self.columns[0]]) if self.columns else 0
+        self.row_count = row_count
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+    @classmethod
+    def empty(cls, columns: Optional[List[str]] = None) -> "ColumnarResult":
+        columns = list(columns or [])
+        return cls(columns, {c: _object_array([]) for c in columns}, 0)
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Sequence[Any],
+        columns: List[str],
+        column_types: Optional[List[str]] = None,
+        decimal_policy: str = DECIMAL_TO_FLOAT,
+    ) -> "ColumnarResult":
+        """
+        从游标行（元组/列表或字典）构建
+
+        Args:
+            rows: 行数据
+            columns: 列名
+            column_types: 可选的列类型名（如 HTTP API 的 meta），用于字符串值的类型转换
+            decimal_policy: Decimal 处理策略
+        """
+        columns = list(columns)
+        if not rows:
+            return cls.empty(columns)
+
+        if isinstance(rows[0], Mapping):
+            if not columns:
+                columns = list(rows[0].keys())
+            column_values = [[row.get(c) for row in rows] for c in columns]
+        else:
+            if not columns:
+                columns = [f"column_{i}" for i in range(len(rows[0]))]
+            column_values = [list(values) for values in zip(*rows)]
+
+        arrays = {}
+        for i, name in enumerate(columns):
+            values = column_values[i] if i < len(column_values) else [None] * len(rows)
+            if column_types and i < len(column_types):
+                arrays[name] = _coerce_column(values, column_types[i], decimal_policy)
+            else:
+                arrays[name] = _build_column(values, decimal_policy)
+        return cls(columns, arrays, len(rows))
+
+    @classmethod
+    def concat(cls, chunks: Sequence["ColumnarResult"], columns: Optional[List[str]] = None) -> "ColumnarResult":
+        """按行拼接多个数据块（数值列自动提升类型，其余类型不一致时退化为对象数组）"""
+        chunks = [chunk for chunk in chunks if chunk.columns]
+        if not chunks:
+            return cls.empty(columns)
+        if len(chunks) == 1:
+            return chunks[0]
+
+        columns = list(columns or chunks[0].columns)
+        arrays = {}
+        for name in columns:
+            parts = [chunk.column(name) for chunk in chunks]
+            dtypes = {part.dtype for part in parts}
+            if len(dtypes) > 1 and not all(dtype.kind in "iuf" for dtype in dtypes):
+                parts = [part.astype(object) for part in parts]
+            arrays[name] = np.concatenate(parts)
+        return cls(columns, arrays, sum(len(chunk) for chunk in chunks))
+
+    @classmethod
+    def from_dataframe(cls, df: Optional[pd.DataFrame], decimal_policy: str = DECIMAL_TO_FLOAT) -> "ColumnarResult":
+        """从 DataFrame 构建，数值列直接引用底层数组不复制"""
+        if df is None or len(df.columns) == 0:
+            return cls.empty()
+
+        columns = [str(c) for c in df.columns]
+        arrays = {}
+        for name, (_, series) in zip(columns, df.items()):
+            if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+                arrays[name] = series.to_numpy(copy=False)
+            elif series.dtype == object:
+                array = series.to_numpy(copy=False)
+                if decimal_policy == DECIMAL_TO_FLOAT and any(isinstance(v, Decimal) for v in array):
+                    array = _object_array([float(v) if isinstance(v, Decimal) else v for v in array])
+                arrays[name] = array
+            else:
+                # 日期/扩展类型保持与 to_dict('records') 一致的 Python 对象
+                arrays[name] = series.astype(object).to_numpy()
+        return cls(columns, arrays, len(df))
+
+    # ------------------------------------------------------------------
+    # 访问
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __iter__(self) -> Iterator[RowView]:
+        return self.iter_rows()
+
+    def __getitem__(self, index: int) -> RowView:
+        if index < 0:
+            index += self.row_count
+        if not 0 <= index < self.row_count:
+            raise IndexError(index)
+        return RowView(self, index)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.row_count == 0
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in self._arrays.values()))
+
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        return {c: str(self._arrays[c].dtype) for c in self.columns}
+
+    def column(self, name: str) -> np.ndarray:
+        """获取列数组（只读视图）"""
+        return self._arrays[name]
+
+    def iter_rows(self) -> Iterator[RowView]:
+        for i in range(self.row_count):
+            yield RowView(self, i)
+
+    def head(self, n: int) -> "ColumnarResult":
+        """前 n 行（数组切片，不复制）"""
+        return self.slice(0, n)
+
+    def slice(self, start: int, stop: int) -> "ColumnarResult":
+        """行区间 [start, stop)（数组切片，不复制）"""
+        start = max(0, start)
+        stop = max(start, min(stop, self.row_count))
+        return ColumnarResult(self.columns, {c: self._arrays[c][start:stop] for c in self.columns}, stop - start)
+
+    def take(self, indices: Sequence[int]) -> "ColumnarResult":
+        """按行号选取"""
+        index_array = np.asarray(indices, dtype=np.int64)
+        return ColumnarResult(self.columns, {c: self._arrays[c][index_array] for c in self.columns}, len(index_array))
+
+    def scalar(self) -> Any:
+        """单行单列结果的值"""
+        if self.row_count == 0 or not self.columns:
+            return None
+        return _to_list(self._arrays[self.columns[0]][:1])[0]
+
+    # ------------------------------------------------------------------
+    # 物化
+    # ------------------------------------------------------------------
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """按列输出 Python 列表"""
+        return {c: _to_list(self._arrays[c]) for c in self.columns}
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """物化为字典列表（JSON 边界使用）"""
+        if self.row_count == 0 or not self.columns:
+            return []
+        column_lists = [_to_list(self._arrays[c]) for c in self.columns]
+        columns = self.columns
+        return [dict(zip(columns, values)) for values in zip(*column_lists)]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """转换为 DataFrame（兼容旧接口）"""
+        if not self.columns:
+            return pd.DataFrame()
+        return pd.DataFrame({c: self._arrays[c] for c in self.columns}, columns=self.columns, copy=False)
@@ -0,0 +1,354 @@
+"""
+连接器注册表
+按规范化的连接指纹在进程内复用已连接的连接器，避免 Agent 工具每次查询都重新建立连接/认证/断开
+
+- 每个指纹最多保留 max_per_source 个连接器，连接器支持并发查询，超出上限时复用负载最低的一个
+- 空闲超过 idle_ttl_seconds 的连接器被关闭回收
+- 距上次检查超过 health_check_interval_seconds 的连接器在借出前做一次健康检查
+- 数据源被编辑或删除时按指纹失效，正在使用的连接器在归还后关闭
+- 连接器持有的HTTP会话绑定事件循环，因此按 (事件循环, 指纹) 区分
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+from .base_connector import BaseConnector
+
+logger = logging.getLogger(__name__)
+
+# 参与指纹计算的连接身份字段及默认值（与 connector_factory 中的默认值一致）
+_IDENTITY_FIELDS = {
+    "doris": {
+        "fe_hosts": ["localhost"],
+        "http_port": 8030,
+        "query_port": 9030,
+        "database": "default",
+        "username": "root",
+        "password": "",
+    },
+    "sql": {"connection_string": ""},
+    "api": {"api_url": "", "method": "GET", "headers": None, "auth_type": "none", "auth_credentials": None},
+    "csv": {"file_path": "", "encoding": "utf-8", "delimiter": ","},
+}
+
+
+@dataclass
+class ConnectorRegistryConfig:
+    """连接器注册表配置"""
+    enabled: bool = True
+    max_per_source: int = 4
+    idle_ttl_seconds: float = 300.0
+    health_check_interval_seconds: float = 60.0
+    health_check_timeout_seconds: float = 5.0
+
+    @classmethod
+    def from_settings(cls) -> "ConnectorRegistryConfig":
+        """从全局配置创建"""
+        return cls(
+            enabled=settings.CONNECTOR_REGISTRY_ENABLED,
+            max_per_source=settings.CONNECTOR_REGISTRY_MAX_PER_SOURCE,
+            idle_ttl_seconds=settings.CONNECTOR_REGISTRY_IDLE_TTL,
+            health_check_interval_seconds=settings.CONNECTOR_REGISTRY_HEALTH_CHECK_INTERVAL,
+        )
+
+
+def _normalize_connection_string(value: str) -> str:
+    """连接串可能是加密后的，统一解密后再参与指纹计算"""
+    if not value:
+        return ""
+    try:
+        from app.core.security_utils import decrypt_data
+        return decrypt_data(value) or value
+    except Exception:
+        return value
+
+
+def build_connection_fingerprint(source_type: str, config: Dict[str, Any]) -> str:
+    """
+    根据连接身份字段计算指纹
+
+    名称、描述、超时等不影响连接目标的字段不参与计算；密码参与计算但只以哈希形式出现
+    """
+    source_type = str(getattr(source_type, "value", source_type) or "").lower()
+    fields = _IDENTITY_FIELDS.get(source_type)
+    if fields is None:
+        identity = {k: v for k, v in config.items() if k not in ("name", "description")}
+    else:
+        identity = {name: config.get(name) or default for name, default in fields.items()}
+    if "fe_hosts" in identity:
+        identity["fe_hosts"] = sorted(identity["fe_hosts"] or [])
+    if "connection_string" in identity:
+        identity["connection_string"] = _normalize_connection_string(identity["connection_string"])
+
+    payload = json.dumps({"type": source_type, **identity}, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class _PooledConnector:
+    __slots__ = ("connector", "fingerprint", "created_at", "last_used", "last_checked", "in_use", "retired")
+
+    def __init__(self, connector: BaseConnector, fingerprint: str):
+        now = time.monotonic()
+        self.connector = connector
+        self.fingerprint = fingerprint
+        self.created_at = now
+        self.last_used = now
+        self.last_checked = now
+        self.in_use = 0
+        self.retired = False
+
+
+class ConnectorRegistry:
+    """进程级连接器注册表"""
+
+    def __init__(self, config: Optional[ConnectorRegistryConfig] = None):
+        self.config = config or ConnectorRegistryConfig.from_settings()
+        # (事件循环id, 指纹) -> 连接器列表
+        self._pools: Dict[Tuple[int, str], List[_PooledConnector]] = {}
+        self._loops: Dict[int, asyncio.AbstractEventLoop] = {}
+        self._create_locks: Dict[Tuple[int, str], asyncio.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "closed": 0,
+            "health_check_failures": 0,
+            "invalidated": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 借出与归还
+    # ------------------------------------------------------------------
+    @asynccontextmanager
+    async def connection(
+        self,
+        source_type: str,
+        name: str,
+        config: Dict[str, Any],
+        factory: Optional[Callable[[str, str, Dict[str, Any]], BaseConnector]] = None,
+    ) -> AsyncIterator[BaseConnector]:
+        """
+        借出一个已连接的连接器
+
+        块内抛出异常时连接器被视为可能失效并关闭；未启用注册表时退化为一次性连接
+        """
+        if factory is None:
+            from .connector_factory import create_connector_from_config
+            factory = create_connector_from_config
+
+        if not self.config.enabled:
+            connector = factory(source_type, name, config)
+            async with connector:
+                yield connector
+            return
+
+        pooled = await self._checkout(source_type, name, config, factory)
+        failed = False
+        try:
+            yield pooled.connector
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self._checkin(pooled, failed)
+
+    async def _checkout(self, source_type: str, name: str, config: Dict[str, Any], factory) -> _PooledConnector:
+        loop = asyncio.get_running_loop()
+        fingerprint = build_connection_fingerprint(source_type, config)
+        key = (id(loop), fingerprint)
+
+        await self._evict_idle(loop)
+
+        while True:
+            pooled = self._pick(key)
+            if pooled is not None:
+                if await self._ensure_healthy(key, pooled):
+                    self._stats["reused"] += 1
+                    return pooled
+                continue
+
+            with self._lock:
+                create_lock = self._create_locks.setdefault(key, asyncio.Lock())
+            async with create_lock:
+                # 等待期间其他协程可能已经创建了连接器
+                pooled = self._pick(key)
+                if pooled is None:
+                    return await self._create(key, loop, source_type, name, config, factory)
+            if await self._ensure_healthy(key, pooled):
+                self._stats["reused"] += 1
+                return pooled
+
+    def _pick(self, key: Tuple[int, str]) -> Optional[_PooledConnector]:
+        """选择空闲连接器；达到上限时复用负载最低的连接器"""
+        with self._lock:
+            candidates = [p for p in self._pools.get(key, []) if not p.retired]
+            idle = [p for p in candidates if p.in_use == 0]
+            if idle:
+                pooled = max(idle, key=lambda p: p.last_used)
+            elif len(candidates) >= self.config.max_per_source:
+                pooled = min(candidates, key=lambda p: p.in_use)
+            else:
+                return None
+            pooled.in_use += 1
+            pooled.last_used = time.monotonic()
+            return pooled
+
+    async def _create(self, key, loop, source_type, name, config, factory) -> _PooledConnector:
+        connector = factory(source_type, name, config)
+        await connector.connect()
+        pooled = _PooledConnector(connector, key[1])
+        pooled.in_use = 1
+        with self._lock:
+            self._pools.setdefault(key, []).append(pooled)
+            self._loops[key[0]] = loop
+        self._stats["created"] += 1
+        logger.debug(f"连接器注册表新建连接器: {name} ({key[1][:8]})")
+        return pooled
+
+    async def _ensure_healthy(self, key: Tuple[int, str], pooled: _PooledConnector) -> bool:
+        """超过检查间隔的连接器在借出前做健康检查，失败则关闭"""
+        if time.monotonic() - pooled.last_checked < self.config.health_check_interval_seconds:
+            return True
+        try:
+            result = await asyncio.wait_for(
+                pooled.connector.test_connection(), timeout=self.config.health_check_timeout_seconds
+            )
+            healthy = bool(result.get("success")) if isinstance(result, dict) else bool(result)
+        except Exception as e:
+            logger.debug(f"连接器健康检查异常: {e}")
+            healthy = False
+
+        if healthy:
+            pooled.last_checked = time.monotonic()
+            return True
+
+        self._stats["health_check_failures"] += 1
+        logger.warning(f"连接器健康检查失败，重新建立连接 ({pooled.fingerprint[:8]})")
+        pooled.retired = True
+        await self._checkin(pooled, failed=True)
+        return False
+
+    async def _checkin(self, pooled: _PooledConnector, failed: bool = False):
+        with self._lock:
+            pooled.in_use = max(0, pooled.in_use - 1)
+            pooled.last_used = time.monotonic()
+            if failed:
+                pooled.retired = True
+            should_close = pooled.retired and pooled.in_use == 0
+            if should_close:
+                self._remove(pooled)
+        if should_close:
+            await self._close(pooled)
+
+    def _remove(self, pooled: _PooledConnector):
+        """从注册表移除（调用方持有锁）"""
+        for key, pool in list(self._pools.items()):
+            if pooled in pool:
+                pool.remove(pooled)
+                if not pool:
+                    del self._pools[key]
+                    self._create_locks.pop(key, None)
+                return
+
+    async def _close(self, pooled: _PooledConnector):
+        self._stats["closed"] += 1
+        try:
+            await pooled.connector.disconnect()
+        except Exception as e:
+            logger.debug(f"关闭连接器失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 回收与失效
+    # ------------------------------------------------------------------
+    async def _evict_idle(self, loop: asyncio.AbstractEventLoop):
+        """关闭当前事件循环上空闲超时的连接器，并丢弃已关闭事件循环上的连接器"""
+        now = time.monotonic()
+        expired: List[_PooledConnector] = []
+        with self._lock:
+            for loop_id, known_loop in list(self._loops.items()):
+                if known_loop.is_closed():
+                    # 连接随事件循环失效，无法再异步关闭
+                    for key in [k for k in self._pools if k[0] == loop_id]:
+                        self._pools.pop(key, None)
+                        self._create_locks.pop(key, None)
+                    del self._loops[loop_id]
+
+            for key, pool in list(self._pools.items()):
+                if key[0] != id(loop):
+                    continue
+                for pooled in list(pool):
+                    idle_for = now - pooled.last_used
+                    if pooled.in_use == 0 and (pooled.retired or idle_for > self.config.idle_ttl_seconds):
+                        self._remove(pooled)
+                        expired.append(pooled)
+
+        for pooled in expired:
+            await self._close(pooled)
+
+    def invalidate(self, fingerprint: str) -> int:
+        """失效指定指纹的所有连接器：空闲的在下次访问时关闭，使用中的在归还后关闭"""
+        count = 0
+        with self._lock:
+            for key, pool in self._pools.items():
+                if key[1] != fingerprint:
+                    continue
+                for pooled in pool:
+                    if not pooled.retired:
+                        pooled.retired = True
+                        count += 1
+        if count:
+            self._stats["invalidated"] += count
+            logger.info(f"已失效 {count} 个连接器 ({fingerprint[:8]})")
+        return count
+
+    def invalidate_config(self, source_type: str, config: Dict[str, Any]) -> int:
+        """按连接配置失效（数据源编辑/删除时调用）"""
+        return self.invalidate(build_connection_fingerprint(source_type, config))
+
+    async def close_all(self):
+        """关闭当前事件循环上的所有连接器"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            closing = []
+            for key in [k for k in self._pools if k[0] == id(loop)]:
+                closing.extend(self._pools.pop(key))
+                self._create_locks.pop(key, None)
+        for pooled in closing:
+            await self._close(pooled)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pools = list(self._pools.values())
+            return {
+                **self._stats,
+                "sources": len(pools),
+                "connectors": sum(len(pool) for pool in pools),
+                "in_use": sum(p.in_use for pool in pools for p in pool),
+            }
+
+
+# 全局实例
+_connector_registry: Optional[ConnectorRegistry] = None
+
+
+def get_connector_registry() -> ConnectorRegistry:
+    """获取连接器注册表实例"""
+    global _connector_registry
+    if _connector_registry is None:
+        _connector_registry = ConnectorRegistry()
+    return _connector_registry
+
+
+async def close_connector_registry():
+    """应用关闭时断开复用的连接器"""
+    if _connector_registry is not None:
+        await _connector_registry.close_all()
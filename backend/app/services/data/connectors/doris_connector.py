@@ -9,20 +9,23 @@ import aiohttp
 import pandas as pd
 import json
 import logging
-import pymysql
 import time
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 from urllib.parse import urljoin
 import numpy as np
 from contextlib import contextmanager
+from pymysql.cursors import SSCursor
 
 from app.core.security_utils import decrypt_data
 from app.core.data_source_utils import DataSourcePasswordManager
 from app.models.data_source import DataSource
 from .base_connector import BaseConnector, ConnectorConfig, QueryResult
+from .columnar_result import ColumnarResult
 from .resilience_manager import get_resilience_manager, CircuitBreakerConfig, RetryConfig
+from .mysql_pool import MySQLConnectionPool, get_mysql_pool
+from .result_stream import StreamAborted, StreamConfig, iterate_producer
 
 logger = logging.getLogger(__name__)
 
@@ -79,24 +82,28 @@ class DorisQueryResult:
     is_cached: bool
     query_id: str
     fe_host: str
+    columnar: Optional[ColumnarResult] = field(default=None, repr=False, compare=False)
+
+    def to_columnar(self) -> ColumnarResult:
+        """获取列式结果（未直接提供时从DataFrame零拷贝构建）"""
+        if self.columnar is None:
+            self.columnar = ColumnarResult.from_dataframe(self.data)
+        return self.columnar
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为可序列化的字典"""
-        from app.utils.json_utils import convert_decimals
-
-        data_dict = self.data.to_dict(orient="records") if not self.data.empty else []
-        data_dict = convert_decimals(data_dict)
+        columnar = self.to_columnar()
 
         return {
-            "data": data_dict,
-            "columns": self.data.columns.tolist() if not self.data.empty else [],
+            "data": columnar.to_records(),
+            "columns": columnar.columns if not columnar.is_empty else [],
             "execution_time": self.execution_time,
             "rows_scanned": self.rows_scanned,
             "bytes_scanned": self.bytes_scanned,
             "is_cached": self.is_cached,
             "query_id": self.query_id,
             "fe_host": self.fe_host,
-            "row_count": len(self.data)
+            "row_count": len(columnar)
         }
     
     def __json__(self):
@@ -172,8 +179,8 @@ class DorisConnector(BaseConnector):
             jitter=True
         )
         
-        # MySQL连接
-        self.mysql_connection = None
+        # MySQL协议连接池（按数据源指纹在进程内共享）
+        self.mysql_pool: Optional[MySQLConnectionPool] = None
         
         # HTTP会话配置（用于管理操作）
         self.current_fe_index = 0  # 当前使用的FE节点索引
@@ -223,29 +230,31 @@ class DorisConnector(BaseConnector):
             timeout=self.timeout
         )
         
+    def _mysql_connect_kwargs(self) -> Dict[str, Any]:
+        """MySQL协议连接参数，同时作为连接池指纹的来源"""
+        return {
+            "host": self.config.mysql_host,
+            "port": self.config.mysql_port,
+            "user": self.config.mysql_username,
+            "password": self.config.mysql_password,
+            "database": self.config.mysql_database,
+            "charset": self.config.mysql_charset,
+            "connect_timeout": self.config.timeout,
+            "read_timeout": self.config.timeout,
+            "write_timeout": self.config.timeout,
+            "autocommit": True,
+        }
+
     async def _connect_mysql(self) -> None:
-        """建立MySQL协议连接，支持重试"""
+        """获取共享的MySQL协议连接池并预热，支持重试"""
         max_retries = 3
-        base_timeout = self.config.timeout
+        pool = get_mysql_pool(self._mysql_connect_kwargs())
         
         for attempt in range(max_retries):
             try:
-                # 递增超时时间
-                timeout = base_timeout + (attempt * 10)
-                
-                self.mysql_connection = pymysql.connect(
-                    host=self.config.mysql_host,
-                    port=self.config.mysql_port,
-                    user=self.config.mysql_username,
-                    password=self.config.mysql_password,
-                    database=self.config.mysql_database,
-                    charset=self.config.mysql_charset,
-                    connect_timeout=timeout,
-                    read_timeout=timeout,
-                    write_timeout=timeout,
-                    autocommit=True
-                )
-                self.logger.info(f"✅ MySQL协议连接成功: {self.config.mysql_host}:{self.config.mysql_port} (尝试 {attempt + 1})")
+                await pool.warmup()
+                self.mysql_pool = pool
+                self.logger.info(f"✅ MySQL协议连接池就绪: {self.config.mysql_host}:{self.config.mysql_port} (尝试 {attempt + 1})")
                 return
             except Exception as e:
                 self.logger.warning(f"❌ MySQL协议连接失败 (尝试 {attempt + 1}/{max_retries}): {e}")
@@ -253,29 +262,31 @@ class DorisConnector(BaseConnector):
                     self.logger.error(f"❌ MySQL协议连接最终失败: {e}")
                     raise
                 # 等待一秒后重试
-                import asyncio
                 await asyncio.sleep(1)
         
+    @staticmethod
     @contextmanager
-    def _get_mysql_cursor(self):
+    def _get_mysql_cursor(connection):
         """获取MySQL游标的上下文管理器"""
-        if not self.mysql_connection:
-            raise Exception("MySQL连接未建立")
-        
-        cursor = self.mysql_connection.cursor()
+        cursor = connection.cursor()
         try:
             yield cursor
         finally:
             cursor.close()
+
+    async def _run_mysql(self, func, *args):
+        """在连接池工作线程中执行 func(connection, *args)，不阻塞事件循环"""
+        if not self.mysql_pool:
+            raise Exception("MySQL连接未建立")
+        return await self.mysql_pool.run(func, *args)
         
     async def disconnect(self) -> None:
         """断开连接"""
         try:
-            # 关闭MySQL连接
-            if hasattr(self, 'mysql_connection') and self.mysql_connection is not None:
-                self.mysql_connection.close()
-                self.mysql_connection = None
-                self.logger.info("✅ MySQL连接已关闭")
+            # 释放MySQL连接池引用（连接池为进程级共享，由其自身回收空闲连接）
+            if getattr(self, 'mysql_pool', None) is not None:
+                self.mysql_pool = None
+                self.logger.info("✅ 已释放MySQL连接池")
             
             # 关闭HTTP会话
             if hasattr(self, 'session') and self.session is not None:
@@ -421,38 +432,39 @@ class DorisConnector(BaseConnector):
         
         return cleaned
     
-    async def execute_mysql_query(self, sql: str, params: Optional[tuple] = None) -> Optional[pd.DataFrame]:
-        """使用MySQL协议执行查询并返回DataFrame"""
-        if not self.config.use_mysql_protocol or not self.mysql_connection:
+    async def execute_mysql_query(self, sql: str, params: Optional[tuple] = None) -> Optional[ColumnarResult]:
+        """使用MySQL协议执行查询并返回列式结果"""
+        if not self.config.use_mysql_protocol or not self.mysql_pool:
             self.logger.warning("MySQL协议未启用或未连接，回退到HTTP API")
             return None
             
         # 清理和验证SQL查询
         cleaned_sql = self._clean_sql(sql)
         self.logger.debug(f"执行SQL查询: {cleaned_sql}")
-        
-        try:
-            start_time = time.time()
-            with self._get_mysql_cursor() as cursor:
-                # 检查参数和SQL的兼容性
-                if params and '%s' not in cleaned_sql:
-                    # SQL中没有占位符，但传递了参数 - 直接执行不带参数的SQL
-                    self.logger.warning(f"SQL中没有占位符但传递了参数，忽略参数: {params}")
-                    cursor.execute(cleaned_sql)
-                elif params:
-                    # SQL中有占位符，使用参数
+
+        # 检查参数和SQL的兼容性
+        if params and '%s' not in cleaned_sql:
+            # SQL中没有占位符，但传递了参数 - 直接执行不带参数的SQL
+            self.logger.warning(f"SQL中没有占位符但传递了参数，忽略参数: {params}")
+            params = None
+
+        def _query(connection) -> ColumnarResult:
+            with self._get_mysql_cursor(connection) as cursor:
+                if params:
                     cursor.execute(cleaned_sql, params)
                 else:
-                    # 没有参数，直接执行
                     cursor.execute(cleaned_sql)
-
                 results = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
-                execution_time = time.time() - start_time
-
-                df = pd.DataFrame(results, columns=columns)
-                self.logger.info(f"✅ MySQL查询执行成功，耗时: {execution_time:.3f}秒，返回 {len(df)} 行")
-                return df
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            # 在工作线程内直接转置为类型化列数组，不经过逐行字典
+            return ColumnarResult.from_rows(results, columns)
+        
+        try:
+            start_time = time.time()
+            columnar = await self._run_mysql(_query)
+            execution_time = time.time() - start_time
+            self.logger.info(f"✅ MySQL查询执行成功，耗时: {execution_time:.3f}秒，返回 {len(columnar)} 行")
+            return columnar
         except Exception as e:
             error_msg = str(e)
             self.logger.error(f"❌ MySQL查询执行失败: {error_msg}")
@@ -475,54 +487,65 @@ class DorisConnector(BaseConnector):
     
     async def get_databases_mysql(self) -> List[str]:
         """使用MySQL协议获取数据库列表"""
-        try:
-            with self._get_mysql_cursor() as cursor:
+        def _query(connection):
+            with self._get_mysql_cursor(connection) as cursor:
                 cursor.execute("SHOW DATABASES")
-                databases = cursor.fetchall()
-                db_list = [db[0] for db in databases if db[0] not in ['information_schema', '__internal_schema']]
-                self.logger.info(f"✅ MySQL协议获取数据库: {db_list}")
-                return db_list
+                return cursor.fetchall()
+
+        try:
+            databases = await self._run_mysql(_query)
+            db_list = [db[0] for db in databases if db[0] not in ['information_schema', '__internal_schema']]
+            self.logger.info(f"✅ MySQL协议获取数据库: {db_list}")
+            return db_list
         except Exception as e:
             self.logger.error(f"❌ MySQL协议获取数据库列表失败: {e}")
             return []
     
     async def get_tables_mysql(self, database: str = None) -> List[str]:
         """使用MySQL协议获取表列表"""
-        try:
-            with self._get_mysql_cursor() as cursor:
+        def _query(connection):
+            with self._get_mysql_cursor(connection) as cursor:
+                # 池化连接会被复用，不能通过USE切换默认库，改为显式指定库名
                 if database:
-                    cursor.execute(f"USE {database}")
-                cursor.execute("SHOW TABLES")
-                tables = cursor.fetchall()
-                table_list = [table[0] for table in tables]
-                self.logger.info(f"✅ MySQL协议获取表: {table_list}")
-                return table_list
+                    cursor.execute(f"SHOW TABLES FROM `{database}`")
+                else:
+                    cursor.execute("SHOW TABLES")
+                return cursor.fetchall()
+
+        try:
+            tables = await self._run_mysql(_query)
+            table_list = [table[0] for table in tables]
+            self.logger.info(f"✅ MySQL协议获取表: {table_list}")
+            return table_list
         except Exception as e:
             self.logger.error(f"❌ MySQL协议获取表列表失败: {e}")
             return []
     
     async def get_table_schema_mysql(self, table_name: str) -> List[Dict[str, Any]]:
         """使用MySQL协议获取表结构"""
-        try:
-            with self._get_mysql_cursor() as cursor:
+        def _query(connection):
+            with self._get_mysql_cursor(connection) as cursor:
                 # 使用SHOW FULL COLUMNS获取完整的表结构信息（包括注释）
                 cursor.execute(f"SHOW FULL COLUMNS FROM {table_name}")
-                columns = cursor.fetchall()
-                schema = []
-                for col in columns:
-                    schema.append({
-                        'field': col[0],
-                        'type': col[1],
-                        'collation': col[2],
-                        'null': col[3],
-                        'key': col[4],
-                        'default': col[5],
-                        'extra': col[6],
-                        'privileges': col[7],
-                        'comment': col[8] if len(col) > 8 else ''  # 注释字段
-                    })
-                self.logger.info(f"✅ MySQL协议获取表 {table_name} 完整结构: {len(schema)} 个字段（含注释）")
-                return schema
+                return cursor.fetchall()
+
+        try:
+            columns = await self._run_mysql(_query)
+            schema = []
+            for col in columns:
+                schema.append({
+                    'field': col[0],
+                    'type': col[1],
+                    'collation': col[2],
+                    'null': col[3],
+                    'key': col[4],
+                    'default': col[5],
+                    'extra': col[6],
+                    'privileges': col[7],
+                    'comment': col[8] if len(col) > 8 else ''  # 注释字段
+                })
+            self.logger.info(f"✅ MySQL协议获取表 {table_name} 完整结构: {len(schema)} 个字段（含注释）")
+            return schema
         except Exception as e:
             self.logger.error(f"❌ MySQL协议获取表结构失败: {e}")
             return []
@@ -603,9 +626,10 @@ class DorisConnector(BaseConnector):
                     "circuit_breakers": relevant_breakers,
                     "overall_health": health_report.get("overall_health", "unknown")
                 },
+                "mysql_pool": self.mysql_pool.get_metrics() if self.mysql_pool else None,
                 "connection_config": {
                     "use_mysql_protocol": self.config.use_mysql_protocol,
-                    "has_mysql_connection": self.mysql_connection is not None,
+                    "has_mysql_connection": self.mysql_pool is not None,
                     "has_http_session": self.session is not None and not self.session.closed,
                     "timeout": self.config.timeout
                 },
@@ -664,35 +688,26 @@ class DorisConnector(BaseConnector):
             start_time = asyncio.get_event_loop().time()
             
             # 优先使用MySQL协议
-            if self.config.use_mysql_protocol and self.mysql_connection:
+            if self.config.use_mysql_protocol and self.mysql_pool:
                 try:
                     # 转换参数格式（从字典到元组）
-                    params_tuple = None
-                    if parameters:
-                        # 对于MySQL协议，需要将字典参数转换为位置参数
-                        formatted_sql = sql
-                        for key, value in parameters.items():
-                            formatted_sql = formatted_sql.replace(f"${key}", "%s")
-                            if params_tuple is None:
-                                params_tuple = (value,)
-                            else:
-                                params_tuple += (value,)
-                        sql = formatted_sql
+                    sql, params_tuple = self._to_mysql_params(sql, parameters)
                     
-                    df = await circuit_breaker.async_call(
+                    columnar = await circuit_breaker.async_call(
                         self.execute_mysql_query, sql, params_tuple
                     )
                     execution_time = asyncio.get_event_loop().time() - start_time
                     
-                    if df is not None:
+                    if columnar is not None:
                         return DorisQueryResult(
-                            data=df,
+                            data=columnar.to_dataframe(),
                             execution_time=execution_time,
-                            rows_scanned=len(df),
-                            bytes_scanned=len(df.to_string()) if hasattr(df, 'to_string') else 0,
+                            rows_scanned=len(columnar),
+                            bytes_scanned=columnar.nbytes,
                             is_cached=False,
                             query_id=f"mysql_query_{int(start_time)}",
-                            fe_host=self.config.fe_hosts[self.current_fe_index]
+                            fe_host=self.config.fe_hosts[self.current_fe_index],
+                            columnar=columnar
                         )
                 except Exception as e:
                     error_msg = str(e)
@@ -725,6 +740,78 @@ class DorisConnector(BaseConnector):
                 self.logger.error(f"HTTP API fallback也失败: {http_error}")
                 raise Exception(f"Both MySQL and HTTP API failed. MySQL: not available, HTTP: {str(http_error)}")
     
+    async def execute_query_stream(
+        self,
+        sql: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        chunk_rows: Optional[int] = None,
+    ) -> AsyncIterator[ColumnarResult]:
+        """
+        流式执行查询 - MySQL协议下使用服务端游标(SSCursor)逐块读取
+        
+        HTTP API 一次返回完整JSON，不支持分块读取，回退为完整查询后切块
+        """
+        stream_config = StreamConfig.from_settings()
+        chunk_rows = chunk_rows or stream_config.chunk_rows
+        
+        if not (self.config.use_mysql_protocol and self.mysql_pool):
+            async for chunk in super().execute_query_stream(sql, parameters, chunk_rows):
+                yield chunk
+            return
+        
+        sql, params_tuple = self._to_mysql_params(sql, parameters)
+        cleaned_sql = self._clean_sql(sql)
+        if params_tuple and '%s' not in cleaned_sql:
+            params_tuple = None
+        
+        def _produce(connection, emit) -> int:
+            cursor = connection.cursor(SSCursor)
+            total_rows = 0
+            finished = False
+            try:
+                if params_tuple:
+                    cursor.execute(cleaned_sql, params_tuple)
+                else:
+                    cursor.execute(cleaned_sql)
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        finished = True
+                        return total_rows
+                    total_rows += len(rows)
+                    if not emit(ColumnarResult.from_rows(rows, columns)):
+                        raise StreamAborted("消费方已停止读取")
+            except StreamAborted:
+                raise
+            except Exception as e:
+                if total_rows:
+                    # 结果集读到一半出错，连接上残留未读数据，交由连接池丢弃
+                    raise StreamAborted(f"流式读取中断: {e}") from e
+                finished = True
+                raise
+            finally:
+                if finished:
+                    cursor.close()
+        
+        self.logger.debug(f"流式执行SQL查询(每块 {chunk_rows} 行): {cleaned_sql}")
+        async for chunk in iterate_producer(
+            lambda emit: self._run_mysql(_produce, emit),
+            max_buffered_chunks=stream_config.max_buffered_chunks,
+        ):
+            yield chunk
+    
+    @staticmethod
+    def _to_mysql_params(sql: str, parameters: Optional[Dict[str, Any]]) -> Tuple[str, Optional[tuple]]:
+        """将字典参数（$name 占位）转换为MySQL协议的位置参数"""
+        if not parameters:
+            return sql, None
+        params_tuple = ()
+        for key, value in parameters.items():
+            sql = sql.replace(f"${key}", "%s")
+            params_tuple += (value,)
+        return sql, params_tuple
+    
     async def _get_databases(self, fe_host: str, start_time: float) -> QueryResult:
         """通过管理API获取数据库列表"""
         
@@ -940,7 +1027,7 @@ class DorisConnector(BaseConnector):
         """获取所有表名"""
         try:
             # 优先使用MySQL协议获取表列表
-            if self.config.use_mysql_protocol and self.mysql_connection:
+            if self.config.use_mysql_protocol and self.mysql_pool:
                 try:
                     tables = await self.get_tables_mysql(self.config.database)
                     if tables:
@@ -1020,7 +1107,7 @@ class DorisConnector(BaseConnector):
     
     async def get_databases(self, database_name: Optional[str] = None) -> List[str]:
         """获取数据库列表 - 优先使用MySQL协议"""
-        if self.config.use_mysql_protocol and self.mysql_connection:
+        if self.config.use_mysql_protocol and self.mysql_pool:
             return await self.get_databases_mysql()
         
         # 回退到HTTP API
@@ -1192,48 +1279,19 @@ class DorisConnector(BaseConnector):
             if result_data.get("code") != 0:
                 raise Exception(f"Query failed: {result_data.get('msg', 'Unknown error')}")
             
-            # 获取数据和元数据
-            data = result_data.get("data", [])
-            meta = result_data.get("meta", [])
-            
-            if not data:
-                # 返回空DataFrame但保持列结构
-                columns = [col.get("name", f"col_{i}") for i, col in enumerate(meta)]
-                return pd.DataFrame(columns=columns)
-            
-            # 创建DataFrame
-            df = pd.DataFrame(data)
-            
-            # 设置列名
-            if meta:
-                column_names = [col.get("name", f"col_{i}") for i, col in enumerate(meta)]
-                if len(column_names) == len(df.columns):
-                    df.columns = column_names
-            
-            # 类型转换
-            if meta:
-                for i, col_meta in enumerate(meta):
-                    if i < len(df.columns):
-                        col_name = df.columns[i]
-                        col_type = col_meta.get("type", "").lower()
-                        
-                        try:
-                            if "int" in col_type:
-                                df[col_name] = pd.to_numeric(df[col_name], errors='coerce')
-                            elif "float" in col_type or "double" in col_type or "decimal" in col_type:
-                                df[col_name] = pd.to_numeric(df[col_name], errors='coerce')
-                            elif "date" in col_type or "time" in col_type:
-                                df[col_name] = pd.to_datetime(df[col_name], errors='coerce')
-                            elif "bool" in col_type:
-                                df[col_name] = df[col_name].astype(bool)
-                        except Exception as e:
-                            self.logger.warning(f"Failed to convert column {col_name} to {col_type}: {e}")
-            
-            return df
+            # 按meta中的列类型一次性构建类型化列数组
+            return self._build_http_columnar(result_data.get("data", []), result_data.get("meta", [])).to_dataframe()
             
         except Exception as e:
             self.logger.error(f"Failed to parse query result: {e}")
             return pd.DataFrame()
+
+    @staticmethod
+    def _build_http_columnar(data: List[Any], meta: List[Dict[str, Any]]) -> ColumnarResult:
+        """将HTTP API返回的行数据和列元数据转换为列式结果"""
+        column_names = [col.get("name", f"col_{i}") for i, col in enumerate(meta or [])]
+        column_types = [col.get("type", "") for col in (meta or [])]
+        return ColumnarResult.from_rows(data or [], column_names, column_types=column_types or None)
     
     async def _handle_unknown_table_query(self, fe_host: str, start_time: float, sql: str) -> DorisQueryResult:
         """处理UNKNOWN_TABLE查询，返回模拟数据"""
@@ -1289,23 +1347,23 @@ class DorisConnector(BaseConnector):
             data = response_data.get("data", [])
             columns = response_data.get("meta", [])
             
-            # 构建DataFrame
+            # 构建列式结果
             if data and columns:
-                column_names = [col.get("name", f"col_{i}") for i, col in enumerate(columns)]
-                df = pd.DataFrame(data, columns=column_names)
+                columnar = self._build_http_columnar(data, columns)
             else:
-                df = pd.DataFrame()
+                columnar = ColumnarResult.empty()
             
             execution_time = asyncio.get_event_loop().time() - start_time
             
             return DorisQueryResult(
-                data=df,
+                data=columnar.to_dataframe(),
                 execution_time=execution_time,
                 rows_scanned=len(data),
-                bytes_scanned=len(str(data)) if data else 0,
+                bytes_scanned=columnar.nbytes,
                 is_cached=False,
                 query_id=result.get("queryId", "http_query"),
-                fe_host=fe_host
+                fe_host=fe_host,
+                columnar=columnar
             )
         else:
             # 获取响应文本以提供更多信息
@@ -0,0 +1,334 @@
+"""
+MySQL协议连接池
+为Doris等MySQL协议数据源提供进程级共享的非阻塞连接池
+
+- 按数据源指纹(主机/端口/用户/库/密码摘要)共享，同一集群的所有连接器复用同一个池
+- 阻塞的pymysql调用统一在有界线程池中执行，不再占用事件循环
+- 支持最小/最大连接数、借出时健康检查、空闲连接回收以及池指标统计
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional
+
+import pymysql
+
+from app.core.config import settings
+
+from .result_stream import StreamAborted
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MySQLPoolConfig:
+    """连接池配置"""
+    min_size: int = 1                       # 最小保活连接数
+    max_size: int = 10                      # 最大连接数（同时也是工作线程数）
+    idle_timeout: float = 300.0             # 空闲连接回收时间(秒)
+    health_check_interval: float = 30.0     # 空闲超过该时长的连接在借出时先ping(秒)
+
+    @classmethod
+    def from_settings(cls) -> "MySQLPoolConfig":
+        """从全局配置创建"""
+        return cls(
+            min_size=settings.DORIS_MYSQL_POOL_MIN_SIZE,
+            max_size=settings.DORIS_MYSQL_POOL_MAX_SIZE,
+            idle_timeout=settings.DORIS_MYSQL_POOL_IDLE_TIMEOUT,
+            health_check_interval=settings.DORIS_MYSQL_POOL_HEALTH_CHECK_INTERVAL,
+        )
+
+
+@dataclass
+class _PooledConnection:
+    """池内连接包装"""
+    connection: Any
+    created_at: float
+    last_used_at: float
+
+
+# 这些异常意味着连接本身已不可用，需要丢弃而不是放回池中
+# （流式读取中途停止时结果集未读完，连接同样不能复用）
+_BROKEN_CONNECTION_ERRORS = (
+    pymysql.err.OperationalError,
+    pymysql.err.InterfaceError,
+    StreamAborted,
+)
+
+
+class MySQLConnectionPool:
+    """基于有界线程池的MySQL协议连接池"""
+
+    def __init__(self, fingerprint: str, connect_kwargs: Dict[str, Any], config: MySQLPoolConfig):
+        self.fingerprint = fingerprint
+        self.config = config
+        self._connect_kwargs = dict(connect_kwargs)
+        self._idle: Deque[_PooledConnection] = deque()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, config.max_size),
+            thread_name_prefix=f"mysql-pool-{fingerprint[:8]}",
+        )
+
+        # 指标
+        self._created_total = 0
+        self._closed_total = 0
+        self._borrowed_total = 0
+        self._health_check_failures = 0
+        self._reaped_total = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._total_wait_time = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """借出一个连接，在工作线程中执行 func(connection, *args)"""
+        if self._closed:
+            raise RuntimeError(f"MySQL连接池已关闭: {self.fingerprint[:8]}")
+
+        loop = asyncio.get_running_loop()
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        return await loop.run_in_executor(
+            self._executor, self._run_with_connection, submitted_at, func, args
+        )
+
+    async def warmup(self) -> None:
+        """预热连接池，建立最小连接数并校验可用性"""
+        await self.run(lambda connection: connection.ping(reconnect=False))
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._fill_min_size)
+
+    def reap_idle(self) -> int:
+        """回收超过空闲时间的连接（保留最小连接数），返回回收数量"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            while (
+                self._idle
+                and self._size > self.config.min_size
+                and now - self._idle[0].last_used_at > self.config.idle_timeout
+            ):
+                expired.append(self._idle.popleft())
+                self._size -= 1
+                self._reaped_total += 1
+
+        for pooled in expired:
+            self._close_connection(pooled)
+        if expired:
+            logger.debug(f"MySQL连接池 {self.fingerprint[:8]} 回收空闲连接 {len(expired)} 个")
+        return len(expired)
+
+    def close(self) -> None:
+        """关闭连接池及所有空闲连接"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+
+        for pooled in idle:
+            self._close_connection(pooled)
+        self._executor.shutdown(wait=False)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取连接池指标"""
+        with self._lock:
+            return {
+                "fingerprint": self.fingerprint[:12],
+                "host": self._connect_kwargs.get("host"),
+                "port": self._connect_kwargs.get("port"),
+                "database": self._connect_kwargs.get("database"),
+                "min_size": self.config.min_size,
+                "max_size": self.config.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "created_total": self._created_total,
+                "closed_total": self._closed_total,
+                "borrowed_total": self._borrowed_total,
+                "reaped_total": self._reaped_total,
+                "health_check_failures": self._health_check_failures,
+                "average_wait_time": (
+                    self._total_wait_time / self._borrowed_total if self._borrowed_total else 0.0
+                ),
+                "closed": self._closed,
+            }
+
+    # ------------------------------------------------------------------
+    # 工作线程内执行
+    # ------------------------------------------------------------------
+    def _run_with_connection(self, submitted_at: float, func: Callable[..., Any], args: tuple) -> Any:
+        with self._lock:
+            self._waiting -= 1
+            self._total_wait_time += time.monotonic() - submitted_at
+
+        pooled = self._checkout()
+        broken = False
+        try:
+            return func(pooled.connection, *args)
+        except _BROKEN_CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            self._checkin(pooled, broken)
+
+    def _checkout(self) -> _PooledConnection:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    # 工作线程数等于max_size，因此此处不会超过上限
+                    self._size += 1
+                self._in_use += 1
+                self._borrowed_total += 1
+
+            if pooled is None:
+                try:
+                    return self._open_connection()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._borrowed_total -= 1
+                    raise
+
+            if now - pooled.last_used_at <= self.config.health_check_interval:
+                return pooled
+
+            try:
+                pooled.connection.ping(reconnect=False)
+                return pooled
+            except Exception as e:
+                logger.info(f"MySQL连接池 {self.fingerprint[:8]} 借出健康检查失败，丢弃连接: {e}")
+                with self._lock:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._borrowed_total -= 1
+                    self._health_check_failures += 1
+                self._close_connection(pooled)
+
+    def _checkin(self, pooled: _PooledConnection, broken: bool) -> None:
+        pooled.last_used_at = time.monotonic()
+        with self._lock:
+            self._in_use -= 1
+            discard = broken or self._closed
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append(pooled)
+
+        if discard:
+            self._close_connection(pooled)
+        else:
+            self.reap_idle()
+
+    def _fill_min_size(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.config.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = self._open_connection()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._idle.append(pooled)
+
+    def _open_connection(self) -> _PooledConnection:
+        connection = pymysql.connect(**self._connect_kwargs)
+        now = time.monotonic()
+        with self._lock:
+            self._created_total += 1
+        return _PooledConnection(connection=connection, created_at=now, last_used_at=now)
+
+    def _close_connection(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._closed_total += 1
+
+
+def build_pool_fingerprint(connect_kwargs: Dict[str, Any]) -> str:
+    """根据连接参数生成数据源指纹，密码只参与摘要计算"""
+    parts = [
+        str(connect_kwargs.get("host", "")).lower(),
+        str(connect_kwargs.get("port", "")),
+        str(connect_kwargs.get("user", "")),
+        str(connect_kwargs.get("database", "")),
+        str(connect_kwargs.get("charset", "")),
+        hashlib.sha256(str(connect_kwargs.get("password", "")).encode("utf-8")).hexdigest(),
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+# 全局连接池注册表
+_pools: Dict[str, MySQLConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_mysql_pool(
+    connect_kwargs: Dict[str, Any],
+    config: Optional[MySQLPoolConfig] = None,
+) -> MySQLConnectionPool:
+    """获取（或创建）数据源对应的共享连接池"""
+    fingerprint = build_pool_fingerprint(connect_kwargs)
+    with _pools_lock:
+        pool = _pools.get(fingerprint)
+        if pool is None or pool.closed:
+            pool = MySQLConnectionPool(fingerprint, connect_kwargs, config or MySQLPoolConfig.from_settings())
+            _pools[fingerprint] = pool
+            logger.info(
+                f"创建MySQL连接池 {fingerprint[:8]}: "
+                f"{connect_kwargs.get('host')}:{connect_kwargs.get('port')}/{connect_kwargs.get('database')}"
+            )
+        return pool
+
+
+def get_mysql_pool_metrics(fingerprint: Optional[str] = None) -> Dict[str, Any]:
+    """获取连接池指标，不指定指纹时返回全部"""
+    with _pools_lock:
+        pools = dict(_pools)
+    if fingerprint:
+        pool = pools.get(fingerprint)
+        return pool.get_metrics() if pool else {}
+    return {fp[:12]: pool.get_metrics() for fp, pool in pools.items()}
+
+
+def close_mysql_pool(fingerprint: str) -> None:
+    """关闭并移除指定连接池（例如数据源配置变更后）"""
+    with _pools_lock:
+        pool = _pools.pop(fingerprint, None)
+    if pool:
+        pool.close()
+
+
+def close_all_mysql_pools() -> None:
+    """关闭所有连接池（进程退出时调用）"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
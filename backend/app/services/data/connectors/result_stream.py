@@ -0,0 +1,350 @@
+"""
+流式查询结果
+为大结果集提供按块读取的异步迭代器，避免一次性 fetchall 把整个结果集放入内存
+
+- 阻塞的游标读取在工作线程中执行，通过有界队列把列式数据块交给事件循环（背压）
+- ResultSpool 按内存预算缓存数据块，超出预算后溢写到磁盘
+- 提供增量消费的常用操作：收集、蓄水池抽样、分组聚合
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import pickle
+import random
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+from .columnar_result import ColumnarResult
+
+logger = logging.getLogger(__name__)
+
+# 生产者向队列提交数据块的回调，返回 False 表示消费方已停止
+ChunkEmitter = Callable[[ColumnarResult], bool]
+
+
+@dataclass
+class StreamConfig:
+    """流式读取配置"""
+    chunk_rows: int = 10000                         # 每块行数
+    max_buffered_chunks: int = 2                    # 生产者最多领先消费者的块数
+    memory_budget_bytes: int = 256 * 1024 * 1024    # 收集结果时的内存预算，超出后溢写磁盘
+    spill_dir: Optional[str] = None                 # 溢写目录，默认系统临时目录
+
+    @classmethod
+    def from_settings(cls) -> "StreamConfig":
+        """从全局配置创建"""
+        return cls(
+            chunk_rows=settings.QUERY_STREAM_CHUNK_ROWS,
+            max_buffered_chunks=settings.QUERY_STREAM_MAX_BUFFERED_CHUNKS,
+            memory_budget_bytes=settings.QUERY_STREAM_MEMORY_BUDGET_MB * 1024 * 1024,
+            spill_dir=settings.QUERY_STREAM_SPILL_DIR or None,
+        )
+
+
+class StreamAborted(Exception):
+    """消费方提前停止读取"""
+
+
+async def iterate_producer(
+    run_producer: Callable[[ChunkEmitter], Awaitable[Any]],
+    max_buffered_chunks: int = 2,
+) -> AsyncIterator[ColumnarResult]:
+    """
+    把工作线程中的阻塞生产者转换为异步迭代器
+
+    Args:
+        run_producer: 接收 emit 回调的协程函数，负责在工作线程中逐块读取并调用 emit(chunk)
+        max_buffered_chunks: 队列容量，生产者在队列满时阻塞
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_buffered_chunks))
+    stop = threading.Event()
+    done = object()
+
+    def emit(chunk: ColumnarResult) -> bool:
+        if stop.is_set():
+            return False
+        try:
+            future = asyncio.run_coroutine_threadsafe(queue.put(chunk), loop)
+        except RuntimeError:
+            # 事件循环已关闭
+            return False
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return not stop.is_set()
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+            except concurrent.futures.CancelledError:
+                return False
+
+    async def _run() -> None:
+        try:
+            await run_producer(emit)
+        except BaseException as e:
+            if not stop.is_set():
+                await queue.put(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            if not stop.is_set():
+                await queue.put(done)
+
+    producer_task = asyncio.ensure_future(_run())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while not producer_task.done():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            await asyncio.wait({producer_task}, timeout=0.1)
+        if not producer_task.cancelled():
+            error = producer_task.exception()
+            if error and not isinstance(error, StreamAborted):
+                logger.debug(f"流式读取生产者结束时出错: {error}")
+
+
+async def iterate_result_chunks(result: ColumnarResult, chunk_rows: int) -> AsyncIterator[ColumnarResult]:
+    """把已物化的结果按块切分（不支持服务端游标的连接器使用）"""
+    chunk_rows = max(1, chunk_rows)
+    for start in range(0, len(result), chunk_rows):
+        yield result.slice(start, start + chunk_rows)
+
+
+class ResultSpool:
+    """按内存预算缓存结果块，超出预算后把后续数据块溢写到磁盘文件"""
+
+    def __init__(self, memory_budget_bytes: int, spill_dir: Optional[str] = None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = spill_dir
+        self.columns: List[str] = []
+        self.row_count = 0
+        self.memory_bytes = 0
+        self.spilled_bytes = 0
+        self._memory_chunks: List[ColumnarResult] = []
+        self._spill_file = None
+        self._spill_chunks = 0
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill_file is not None
+
+    def append(self, chunk: ColumnarResult) -> None:
+        if not self.columns:
+            self.columns = list(chunk.columns)
+        self.row_count += len(chunk)
+        chunk_bytes = chunk.nbytes
+
+        if not self.spilled and self.memory_bytes + chunk_bytes <= self.memory_budget_bytes:
+            self._memory_chunks.append(chunk)
+            self.memory_bytes += chunk_bytes
+            return
+
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix="query_spool_", dir=self.spill_dir)
+            logger.info(f"查询结果超出内存预算 {self.memory_budget_bytes} 字节，溢写到磁盘")
+        start = self._spill_file.tell()
+        pickle.dump(chunk, self._spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled_bytes += self._spill_file.tell() - start
+        self._spill_chunks += 1
+
+    def iter_chunks(self) -> Iterator[ColumnarResult]:
+        """按写入顺序依次读取数据块（溢写部分逐块从磁盘加载）"""
+        yield from self._memory_chunks
+        if self._spill_file is None:
+            return
+        self._spill_file.flush()
+        self._spill_file.seek(0)
+        for _ in range(self._spill_chunks):
+            yield pickle.load(self._spill_file)
+        self._spill_file.seek(0, os.SEEK_END)
+
+    def head(self, n: int) -> ColumnarResult:
+        """前 n 行"""
+        chunks, remaining = [], n
+        for chunk in self.iter_chunks():
+            if remaining <= 0:
+                break
+            chunks.append(chunk.head(remaining))
+            remaining -= len(chunks[-1])
+        return ColumnarResult.concat(chunks, self.columns)
+
+    def to_columnar(self) -> ColumnarResult:
+        """合并为完整结果（调用方需确认结果规模可以放入内存）"""
+        return ColumnarResult.concat(list(self.iter_chunks()), self.columns)
+
+    def close(self) -> None:
+        self._memory_chunks.clear()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def __enter__(self) -> "ResultSpool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "row_count": self.row_count,
+            "memory_bytes": self.memory_bytes,
+            "spilled": self.spilled,
+            "spilled_bytes": self.spilled_bytes,
+            "spilled_chunks": self._spill_chunks,
+        }
+
+
+# ----------------------------------------------------------------------
+# 增量消费
+# ----------------------------------------------------------------------
+async def collect_stream(
+    stream: AsyncIterator[ColumnarResult],
+    memory_budget_bytes: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+    max_rows: Optional[int] = None,
+) -> ResultSpool:
+    """把流收集到 ResultSpool 中，达到 max_rows 后停止读取"""
+    if memory_budget_bytes is None:
+        config = StreamConfig.from_settings()
+        memory_budget_bytes = config.memory_budget_bytes
+        spill_dir = spill_dir or config.spill_dir
+
+    spool = ResultSpool(memory_budget_bytes, spill_dir)
+    try:
+        async for chunk in stream:
+            if max_rows is not None and spool.row_count + len(chunk) >= max_rows:
+                spool.append(chunk.head(max_rows - spool.row_count))
+                break
+            spool.append(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose:
+            await aclose()
+    return spool
+
+
+async def sample_stream(
+    stream: AsyncIterator[ColumnarResult],
+    sample_size: int,
+    seed: Optional[int] = None,
+) -> ColumnarResult:
+    """蓄水池抽样：只保留 sample_size 行，结果集大小不受内存限制"""
+    rng = random.Random(seed)
+    reservoir: List[Tuple[int, int]] = []     # (块序号, 块内行号)
+    kept_chunks: Dict[int, ColumnarResult] = {}
+    columns: List[str] = []
+    seen = 0
+
+    async for chunk_index, chunk in _enumerate_async(stream):
+        columns = columns or list(chunk.columns)
+        used = False
+        for row_index in range(len(chunk)):
+            if len(reservoir) < sample_size:
+                reservoir.append((chunk_index, row_index))
+                used = True
+            else:
+                j = rng.randint(0, seen)
+                if j < sample_size:
+                    reservoir[j] = (chunk_index, row_index)
+                    used = True
+            seen += 1
+        if used:
+            kept_chunks[chunk_index] = chunk
+            # 丢弃不再被引用的数据块
+            referenced = {c for c, _ in reservoir}
+            for stale in [c for c in kept_chunks if c not in referenced]:
+                kept_chunks.pop(stale)
+
+    reservoir.sort()
+    parts = [kept_chunks[c].take([r]) for c, r in reservoir]
+    return ColumnarResult.concat(parts, columns)
+
+
+_AGGREGATORS = {"sum", "count", "min", "max", "avg"}
+
+
+async def aggregate_stream(
+    stream: AsyncIterator[ColumnarResult],
+    group_by: Sequence[str],
+    aggregations: Dict[str, str],
+) -> List[Dict[str, Any]]:
+    """
+    按块增量分组聚合（用于图表数据）
+
+    Args:
+        group_by: 分组列
+        aggregations: {列名: 聚合函数}，支持 sum/count/min/max/avg
+    """
+    for column, func in aggregations.items():
+        if func not in _AGGREGATORS:
+            raise ValueError(f"不支持的聚合函数: {func} ({column})")
+
+    state: Dict[Tuple[Any, ...], Dict[str, List[float]]] = {}
+    async for chunk in stream:
+        if chunk.is_empty:
+            continue
+        keys = list(zip(*(chunk.column(c).tolist() for c in group_by))) if group_by else [()] * len(chunk)
+        values = {c: chunk.column(c) for c in aggregations}
+        for i, key in enumerate(keys):
+            groups = state.setdefault(key, {c: [0.0, 0, None, None] for c in aggregations})
+            for column, array in values.items():
+                value = array[i]
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                acc = groups[column]
+                acc[1] += 1
+                if aggregations[column] in ("sum", "avg"):
+                    acc[0] += float(value)
+                elif aggregations[column] == "min":
+                    acc[2] = value if acc[2] is None or value < acc[2] else acc[2]
+                elif aggregations[column] == "max":
+                    acc[3] = value if acc[3] is None or value > acc[3] else acc[3]
+
+    results = []
+    for key, groups in state.items():
+        record = dict(zip(group_by, key))
+        for column, func in aggregations.items():
+            total, count, minimum, maximum = groups[column]
+            if func == "sum":
+                value = total
+            elif func == "count":
+                value = count
+            elif func == "avg":
+                value = total / count if count else None
+            elif func == "min":
+                value = minimum
+            else:
+                value = maximum
+            record[column] = value.item() if isinstance(value, np.generic) else value
+        results.append(record)
+    return results
+
+
+async def _enumerate_async(stream: AsyncIterator[ColumnarResult]) -> AsyncIterator[Tuple[int, ColumnarResult]]:
+    index = 0
+    async for chunk in stream:
+        yield index, chunk
+        index += 1
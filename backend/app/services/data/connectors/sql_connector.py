@@ -6,13 +6,15 @@ SQL数据库连接器
 import asyncio
 import logging
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 from dataclasses import dataclass
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.pool import QueuePool
 
 from .base_connector import BaseConnector, ConnectorConfig, QueryResult
+from .columnar_result import ColumnarResult
+from .result_stream import StreamConfig, iterate_producer
 from app.core.security_utils import decrypt_data
 
 
@@ -117,8 +119,8 @@ class SQLConnector(BaseConnector):
             if not self.engine:
                 await self.connect()
             
-            # 执行查询
-            df = pd.read_sql(query, self.engine, params=parameters)
+            # 在线程池中执行阻塞查询，避免占用事件循环（引擎自带连接池，线程安全）
+            df = await asyncio.to_thread(pd.read_sql, query, self.engine, params=parameters)
             
             execution_time = asyncio.get_event_loop().time() - start_time
             
@@ -143,6 +145,37 @@ class SQLConnector(BaseConnector):
                 error_message=str(e)
             )
     
+    async def execute_query_stream(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        chunk_rows: Optional[int] = None,
+    ) -> AsyncIterator[ColumnarResult]:
+        """流式执行SQL查询，使用服务端游标(stream_results)逐块读取"""
+        stream_config = StreamConfig.from_settings()
+        chunk_rows = chunk_rows or stream_config.chunk_rows
+        
+        if not self.engine:
+            await self.connect()
+        
+        def _produce(emit) -> None:
+            with self.engine.connect() as connection:
+                result = connection.execution_options(stream_results=True).execute(text(query), parameters or {})
+                try:
+                    columns = list(result.keys())
+                    while True:
+                        rows = result.fetchmany(chunk_rows)
+                        if not rows or not emit(ColumnarResult.from_rows([tuple(row) for row in rows], columns)):
+                            return
+                finally:
+                    result.close()
+        
+        async for chunk in iterate_producer(
+            lambda emit: asyncio.to_thread(_produce, emit),
+            max_buffered_chunks=stream_config.max_buffered_chunks,
+        ):
+            yield chunk
+    
     async def get_fields(self, table_name: Optional[str] = None) -> List[str]:
         """获取字段列表"""
         try:
@@ -5,5 +5,15 @@ Data Persistence Services
 """
 
 from .etl_persistence_service import ETLPersistenceService
+from .placeholder_value_writer import (
+    PlaceholderValueWriter,
+    PlaceholderValueWriterConfig,
+    load_raw_query_result,
+)
 
-__all__ = ["ETLPersistenceService"]
+__all__ = [
+    "ETLPersistenceService",
+    "PlaceholderValueWriter",
+    "PlaceholderValueWriterConfig",
+    "load_raw_query_result",
+]
@@ -7,6 +7,7 @@ ETL数据持久化服务 - 精简版（针对100占位符场景优化）
 1. 将ETL提取的数据批量保存到placeholder_values表
 2. 支持批次管理和版本控制
 3. 提供缓存键生成（为后续缓存优化预留）
+4. 通过 PlaceholderValueWriter 集合更新旧版本并批量 upsert
 """
 
 import logging
@@ -18,6 +19,8 @@ from sqlalchemy.orm import Session
 from app import crud
 from app.schemas.placeholder_value import PlaceholderValueCreate
 
+from .placeholder_value_writer import PlaceholderValueWriter
+
 logger = logging.getLogger(__name__)
 
 
@@ -89,6 +92,9 @@ class ETLPersistenceService:
 
             self.logger.info(f"📦 开始持久化ETL结果, batch_id={batch_id}")
 
+            # 一次查询模板的全部占位符，避免逐个按名称查询
+            placeholders_by_name = self._load_placeholders(template_id)
+
             # 遍历每个数据源的结果
             for data_source_id, source_result in etl_results.items():
                 extract_data = source_result.get("extract", {}).get("data", {})
@@ -101,11 +107,7 @@ class ETLPersistenceService:
                         placeholder_name = extraction["placeholder"]
 
                         # 查找占位符配置
-                        placeholder = crud.template_placeholder.get_by_template_and_name(
-                            db=self.db,
-                            template_id=template_id,
-                            name=placeholder_name
-                        )
+                        placeholder = placeholders_by_name.get(placeholder_name)
 
                         if not placeholder:
                             self.logger.warning(f"⚠️ 未找到占位符配置: {placeholder_name}")
@@ -154,10 +156,12 @@ class ETLPersistenceService:
                         self.logger.error(f"❌ 处理占位符失败: {extraction.get('placeholder')}, {e}")
                         failed_count += 1
 
-            # 🔑 批量插入（一次性插入100条）
+            # 🔑 批量写入（旧版本集合更新 + 一条 upsert 语句）
             if values_to_create:
-                crud.placeholder_value.create_batch(self.db, values=values_to_create)
-                self.logger.info(f"✅ 批量插入 {len(values_to_create)} 条记录到placeholder_values表")
+                writer = PlaceholderValueWriter(self.db)
+                writer.extend(values_to_create)
+                writer.flush()
+                self.logger.info(f"✅ 批量写入 {len(values_to_create)} 条记录到placeholder_values表")
 
             # 🔑 注意：不在这里commit，由调用方（task_execution_service）统一管理事务
 
@@ -198,15 +202,14 @@ class ETLPersistenceService:
         """
         saved_count = 0
 
+        placeholders_by_name = self._load_placeholders(template_id)
+        writer = PlaceholderValueWriter(self.db)
+
         for extraction in failed_extractions:
             try:
                 placeholder_name = extraction["placeholder"]
 
-                placeholder = crud.template_placeholder.get_by_template_and_name(
-                    db=self.db,
-                    template_id=template_id,
-                    name=placeholder_name
-                )
+                placeholder = placeholders_by_name.get(placeholder_name)
 
                 if not placeholder:
                     continue
@@ -221,17 +224,26 @@ class ETLPersistenceService:
                     execution_time=datetime.utcnow()
                 )
 
-                crud.placeholder_value.create(self.db, obj_in=value_data)
+                writer.add(value_data)
                 saved_count += 1
 
             except Exception as e:
                 self.logger.error(f"❌ 持久化失败记录异常: {extraction.get('placeholder')}, {e}")
 
+        writer.flush()
+
         if saved_count > 0:
             self.logger.info(f"✅ 记录了 {saved_count} 个失败的提取")
 
         return saved_count
 
+    def _load_placeholders(self, template_id: str) -> Dict[str, Any]:
+        """按名称索引模板的全部占位符"""
+        placeholders = crud.template_placeholder.get_by_template(
+            self.db, template_id, include_inactive=True
+        )
+        return {placeholder.placeholder_name: placeholder for placeholder in placeholders}
+
     @staticmethod
     def _format_data(data: Any) -> str:
         """
@@ -0,0 +1,178 @@
+"""
+Placeholder Value Writer
+
+占位符值批量写入器
+
+一次执行中各占位符的结果先在内存中累积，按阶段一次性写入：
+1. 旧版本的 is_latest_version 按数据源集合更新（每个数据源一条 UPDATE）
+2. 新版本通过一条 INSERT ... ON CONFLICT (cache_key) 批量写入
+3. 超过阈值的原始查询结果转存到对象存储，记录中只保留指针
+"""
+
+import hashlib
+import io
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.schemas.placeholder_value import PlaceholderValueCreate
+
+logger = logging.getLogger(__name__)
+
+RAW_RESULT_REF_KEY = "$ref"
+
+
+@dataclass
+class PlaceholderValueWriterConfig:
+    """占位符值写入配置"""
+    # 原始查询结果序列化后超过该字节数时转存对象存储，0 表示不转存
+    offload_threshold: int = 0
+    offload_prefix: str = "cas/placeholder_values"
+
+    @classmethod
+    def from_settings(cls) -> "PlaceholderValueWriterConfig":
+        """从全局配置创建"""
+        return cls(offload_threshold=settings.PLACEHOLDER_VALUE_OFFLOAD_THRESHOLD)
+
+
+def is_raw_result_ref(raw_query_result: Any) -> bool:
+    """原始查询结果是否为对象存储指针"""
+    return isinstance(raw_query_result, dict) and RAW_RESULT_REF_KEY in raw_query_result
+
+
+def load_raw_query_result(raw_query_result: Any, storage: Any = None) -> Any:
+    """读取原始查询结果，指针会从对象存储中取回"""
+    if not is_raw_result_ref(raw_query_result):
+        return raw_query_result
+    if storage is None:
+        from app.services.infrastructure.storage.hybrid_storage_service import get_hybrid_storage_service
+        storage = get_hybrid_storage_service()
+    content, _ = storage.download_file(raw_query_result[RAW_RESULT_REF_KEY]["file_path"])
+    return json.loads(content)
+
+
+class PlaceholderValueWriter:
+    """占位符值批量写入器（不在此commit，由调用方统一管理事务）"""
+
+    def __init__(
+        self,
+        db: Session,
+        config: Optional[PlaceholderValueWriterConfig] = None,
+        storage: Any = None
+    ):
+        self.db = db
+        self.config = config or PlaceholderValueWriterConfig.from_settings()
+        self._storage = storage
+        self._pending: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def storage(self) -> Any:
+        if self._storage is None:
+            from app.services.infrastructure.storage.hybrid_storage_service import get_hybrid_storage_service
+            self._storage = get_hybrid_storage_service()
+        return self._storage
+
+    def add(self, value: Union[PlaceholderValueCreate, Dict[str, Any]]) -> None:
+        """累积一条占位符值"""
+        row = value.dict() if isinstance(value, PlaceholderValueCreate) else dict(value)
+        self._pending.append(row)
+
+    def extend(self, values: List[Union[PlaceholderValueCreate, Dict[str, Any]]]) -> None:
+        for value in values:
+            self.add(value)
+
+    def build_rows(self) -> List[Dict[str, Any]]:
+        """
+        生成待写入的行：补齐列、分配主键、转存大结果
+
+        同一 cache_key 只保留最后一条（同一语句中不能两次更新同一行）
+        """
+        columns = [column.name for column in crud.placeholder_value.model.__table__.columns
+                   if column.name != "created_at"]
+        rows: List[Dict[str, Any]] = []
+        position_by_cache_key: Dict[str, int] = {}
+
+        for pending in self._pending:
+            row = {name: pending.get(name) for name in columns}
+            row["id"] = row["id"] or uuid.uuid4()
+            row["hit_count"] = row["hit_count"] or 0
+            row["analysis_metadata"] = row["analysis_metadata"] or {}
+            row["raw_query_result"] = self._offload_raw_result(row["raw_query_result"])
+
+            cache_key = row["cache_key"]
+            if cache_key and cache_key in position_by_cache_key:
+                rows[position_by_cache_key[cache_key]] = row
+                continue
+            if cache_key:
+                position_by_cache_key[cache_key] = len(rows)
+            rows.append(row)
+        return rows
+
+    def flush(self) -> int:
+        """
+        写入累积的占位符值：先集合更新旧版本标记（仅成功的结果会替换最新版本），再批量 upsert
+
+        Returns:
+            写入的记录数
+        """
+        if not self._pending:
+            return 0
+
+        rows = self.build_rows()
+        outdated = crud.placeholder_value.mark_as_outdated_bulk(
+            self.db,
+            pairs=[
+                (row["placeholder_id"], row["data_source_id"])
+                for row in rows if row["is_latest_version"] and row["success"] is not False
+            ]
+        )
+        written = crud.placeholder_value.bulk_upsert(self.db, rows=rows)
+        self._pending.clear()
+
+        logger.info(f"✅ 批量写入 {written} 条占位符值，{outdated} 条旧版本标记为非最新")
+        return written
+
+    def _offload_raw_result(self, raw_query_result: Any) -> Any:
+        threshold = self.config.offload_threshold
+        if threshold <= 0 or raw_query_result is None or is_raw_result_ref(raw_query_result):
+            return raw_query_result
+
+        content = json.dumps(raw_query_result, ensure_ascii=False, default=str).encode("utf-8")
+        if len(content) <= threshold:
+            return raw_query_result
+
+        sha256 = hashlib.sha256(content).hexdigest()
+        object_name = f"{self.config.offload_prefix}/{sha256[:2]}/{sha256}.json"
+        try:
+            # 按内容寻址，相同结果只上传一份
+            if not self.storage.file_exists(object_name):
+                self.storage.upload_with_key(io.BytesIO(content), object_name, "application/json")
+        except Exception as e:
+            logger.warning(f"⚠️ 原始查询结果转存失败，保留在记录中: {e}")
+            return raw_query_result
+
+        return {
+            RAW_RESULT_REF_KEY: {
+                "file_path": object_name,
+                "size": len(content),
+                "sha256": sha256,
+                "row_count": len(raw_query_result) if isinstance(raw_query_result, list) else None,
+            }
+        }
+
+
+__all__ = [
+    "PlaceholderValueWriter",
+    "PlaceholderValueWriterConfig",
+    "is_raw_result_ref",
+    "load_raw_query_result",
+]
@@ -1,3 +1,4 @@
+import inspect
 from datetime import datetime
 from typing import Any, Dict, Optional
 
@@ -146,6 +147,15 @@ class ETLService:
 
             return validation_results
 
+    def _invalidate_query_cache(self, table_name: str) -> None:
+        """目标表已被重写，失效所有引用该表的缓存查询结果"""
+        try:
+            from app.services.data.query.query_result_cache import get_query_result_cache
+
+            get_query_result_cache().invalidate_table(None, None, table_name)
+        except Exception as e:
+            self.logger.warning("etl_job.load.cache_invalidation_failed", table=table_name, error=str(e))
+
     def run_job(self, job_id: str, dry_run: bool = False) -> Dict[str, Any]:
         """
         Runs a specific ETL job using a secure, structured transformation engine.
@@ -286,6 +296,7 @@ class ETLService:
                     index=False,
                 )
                 log.info("etl_job.load.finished")
+                self._invalidate_query_cache(etl_job.destination_table_name)
 
                 # 8. Update execution result
                 execution_result["status"] = ETLJobStatus.SUCCESS
@@ -881,15 +892,9 @@ class ETLService:
                         "warning": "请检查数据库配置和权限设置"
                     }
                 
-                # 如果有指定查询，执行查询
+                # 如果有指定查询，流式执行查询，避免无上限的结果集一次性加载到内存
                 if 'query' in query_config:
-                    result = await connector.execute_query(query_config['query'])
-                    return {
-                        "success": True,
-                        "data": result.data.to_dict('records') if hasattr(result, 'data') and hasattr(result.data, 'to_dict') else [],
-                        "query": query_config['query'],
-                        "row_count": len(result.data) if hasattr(result, 'data') and hasattr(result.data, '__len__') else 0
-                    }
+                    return await self._consume_query_stream(connector, query_config)
                 else:
                     # 默认获取第一个表的前100行数据
                     table_name = tables[0]
@@ -918,6 +923,108 @@ class ETLService:
                 "warning": "请检查数据源配置和网络连接"
             }
     
+    async def _consume_query_stream(self, connector, query_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按块消费查询结果，默认不把结果物化为记录列表
+
+        query_config 支持:
+            aggregate: {"group_by": [...], "functions": {列名: sum/count/min/max/avg}}，增量聚合
+            sample_size: 蓄水池抽样行数
+            on_chunk: 每个数据块到达时调用（可以是协程函数），处理完即丢弃该块
+            materialize: 为 True 时物化为记录列表；未指定 max_rows 时结果超过
+                QUERY_STREAM_MATERIALIZE_MAX_ROWS 行则拒绝物化
+            max_rows: 最多读取的行数
+            preview_rows: 默认模式下 data 中返回的预览行数（默认 100）
+
+        默认模式逐块写入 ResultSpool（超出内存预算的部分溢写磁盘），通过 spool 返回给调用方按块读取，
+        调用方负责 close
+        """
+        from app.services.data.connectors.result_stream import aggregate_stream, collect_stream, sample_stream
+
+        query = query_config['query']
+        max_rows = query_config.get('max_rows')
+        stream = connector.execute_query_stream(query, chunk_rows=query_config.get('chunk_rows'))
+
+        aggregate_config = query_config.get('aggregate')
+        if aggregate_config:
+            records = await aggregate_stream(
+                stream,
+                group_by=aggregate_config.get('group_by', []),
+                aggregations=aggregate_config.get('functions', {}),
+            )
+            return {"success": True, "data": records, "query": query, "row_count": len(records)}
+
+        if query_config.get('sample_size'):
+            sample = await sample_stream(stream, int(query_config['sample_size']), seed=query_config.get('seed'))
+            return {"success": True, "data": sample.to_records(), "query": query, "row_count": len(sample)}
+
+        on_chunk = query_config.get('on_chunk')
+        if on_chunk:
+            row_count = await self._feed_chunks(stream, on_chunk, max_rows)
+            return {"success": True, "data": [], "query": query, "row_count": row_count}
+
+        if query_config.get('materialize'):
+            return await self._materialize_stream(stream, query, max_rows)
+
+        spool = await collect_stream(stream, max_rows=max_rows)
+        return {
+            "success": True,
+            "data": spool.head(int(query_config.get('preview_rows', 100))).to_records(),
+            "spool": spool,
+            "query": query,
+            "row_count": spool.row_count,
+            "spill_stats": spool.get_stats(),
+        }
+
+    @staticmethod
+    async def _feed_chunks(stream, on_chunk, max_rows: Optional[int]) -> int:
+        """把数据块逐个交给 on_chunk，返回处理的行数"""
+        row_count = 0
+        try:
+            async for chunk in stream:
+                if max_rows is not None:
+                    chunk = chunk.head(max_rows - row_count)
+                row_count += len(chunk)
+                outcome = on_chunk(chunk)
+                if inspect.isawaitable(outcome):
+                    await outcome
+                if max_rows is not None and row_count >= max_rows:
+                    break
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose:
+                await aclose()
+        return row_count
+
+    async def _materialize_stream(self, stream, query: str, max_rows: Optional[int]) -> Dict[str, Any]:
+        """调用方显式要求时把结果物化为记录列表"""
+        from app.services.data.connectors.result_stream import collect_stream
+
+        materialize_limit = settings.QUERY_STREAM_MATERIALIZE_MAX_ROWS
+        with await collect_stream(stream, max_rows=max_rows or materialize_limit + 1) as spool:
+            if not max_rows and spool.row_count > materialize_limit:
+                # 整体物化无上限的结果集会耗尽 worker 内存
+                message = (
+                    f"查询结果超过 {materialize_limit} 行，无法整体加载，"
+                    "请指定 max_rows，或使用 aggregate / sample_size / on_chunk 处理"
+                )
+                self.logger.warning(message)
+                return {
+                    "success": False,
+                    "data": [],
+                    "error": message,
+                    "query": query,
+                    "row_count": spool.row_count,
+                    "truncated": True,
+                }
+            return {
+                "success": True,
+                "data": spool.to_columnar().to_records(),
+                "query": query,
+                "row_count": spool.row_count,
+                "spill_stats": spool.get_stats(),
+            }
+
     async def _extract_from_sql(self, data_source, query_config: Dict[str, Any]) -> Dict[str, Any]:
         """从SQL数据源提取数据"""
         try:
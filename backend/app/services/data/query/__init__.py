@@ -3,9 +3,31 @@
 """
 
 from .query_executor_service import query_executor_service, QueryExecutorService, QueryResult
+from .batch_query_executor import (
+    BatchQueryItem,
+    BatchQueryOutcome,
+    execute_queries_concurrently,
+    run_batch_queries,
+)
+from .query_result_cache import (
+    CachedQueryResult,
+    QueryResultCache,
+    cached_run_query,
+    canonicalize_sql,
+    get_query_result_cache,
+)
 
 __all__ = [
     'query_executor_service',
     'QueryExecutorService', 
-    'QueryResult'
+    'QueryResult',
+    'BatchQueryItem',
+    'BatchQueryOutcome',
+    'execute_queries_concurrently',
+    'run_batch_queries',
+    'CachedQueryResult',
+    'QueryResultCache',
+    'cached_run_query',
+    'canonicalize_sql',
+    'get_query_result_cache'
 ]
\ No newline at end of file
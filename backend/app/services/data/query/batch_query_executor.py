@@ -0,0 +1,201 @@
+"""
+批量查询执行器
+
+在同一个事件循环内复用一个连接器，按并发上限并发执行多条SQL，
+用于报告ETL阶段一次性执行全部占位符SQL；执行前先查询结果缓存，全部命中时不连接数据源
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchQueryItem:
+    """待执行的单条查询"""
+    key: str
+    sql: str
+
+
+@dataclass
+class BatchQueryOutcome:
+    """单条查询的执行结果"""
+    key: str
+    sql: str
+    result: Any = None
+    error: Optional[Exception] = None
+    execution_time: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+# 每条查询完成时的回调: (已完成数量, 总数, 当前结果)
+CompletionCallback = Callable[[int, int, BatchQueryOutcome], Optional[Awaitable[None]]]
+
+
+async def execute_queries_concurrently(
+    connector,
+    items: List[BatchQueryItem],
+    max_concurrency: int = 8,
+    on_complete: Optional[CompletionCallback] = None,
+) -> Dict[str, BatchQueryOutcome]:
+    """
+    使用已连接的连接器并发执行一批查询
+
+    Args:
+        connector: 已建立连接的连接器
+        items: 查询列表
+        max_concurrency: 最大并发查询数
+        on_complete: 每条查询完成后的回调（可为同步或异步函数）
+
+    Returns:
+        以key为索引的执行结果，顺序与items一致
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    total = len(items)
+    completed = 0
+
+    async def _run(item: BatchQueryItem) -> BatchQueryOutcome:
+        nonlocal completed
+        async with semaphore:
+            start_time = time.time()
+            outcome = BatchQueryOutcome(key=item.key, sql=item.sql)
+            try:
+                outcome.result = await connector.execute_query(item.sql)
+                # 部分连接器通过success=False返回错误而不是抛出异常
+                if getattr(outcome.result, "success", True) is False:
+                    raise RuntimeError(getattr(outcome.result, "error_message", None) or "查询执行失败")
+            except Exception as e:
+                outcome.error = e
+                outcome.result = None
+            outcome.execution_time = time.time() - start_time
+
+        completed += 1
+        await _notify(on_complete, completed, total, outcome)
+        return outcome
+
+    outcomes = await asyncio.gather(*(_run(item) for item in items))
+    return {outcome.key: outcome for outcome in outcomes}
+
+
+async def _notify(
+    on_complete: Optional[CompletionCallback], completed: int, total: int, outcome: BatchQueryOutcome
+) -> None:
+    if not on_complete:
+        return
+    try:
+        maybe_awaitable = on_complete(completed, total, outcome)
+        if asyncio.iscoroutine(maybe_awaitable):
+            await maybe_awaitable
+    except Exception as callback_error:
+        logger.warning(f"批量查询完成回调失败: {callback_error}")
+
+
+async def run_batch_queries(
+    source_type: Any,
+    name: str,
+    config: Dict[str, Any],
+    items: List[BatchQueryItem],
+    max_concurrency: int = 8,
+    on_complete: Optional[CompletionCallback] = None,
+    time_window: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
+) -> Dict[str, BatchQueryOutcome]:
+    """
+    为整批查询只创建并连接一次连接器，执行完成后统一断开
+
+    - 先批量读取查询结果缓存，只执行未命中的查询，成功结果按 time_window 决定的TTL写回缓存
+    - 连接失败时未命中的查询都标记为同一个错误，由调用方按单条失败处理
+    """
+    from app.services.data.connectors.connector_factory import create_connector_from_config
+
+    if not items:
+        return {}
+
+    cache = None
+    cache_keys: Dict[str, str] = {}
+    outcomes: Dict[str, BatchQueryOutcome] = {}
+    if use_cache:
+        from app.services.data.query.query_result_cache import get_query_result_cache
+
+        cache = get_query_result_cache()
+        try:
+            for item in items:
+                cache_keys[item.key] = await cache.build_key(source_type, config, item.sql)
+            hits = await cache.get_many(cache_keys.values())
+        except Exception as e:
+            logger.warning(f"读取查询结果缓存失败，全部查询直接执行: {e}")
+            cache, cache_keys, hits = None, {}, {}
+        for item in items:
+            cached = hits.get(cache_keys.get(item.key))
+            if cached is not None:
+                outcomes[item.key] = BatchQueryOutcome(key=item.key, sql=item.sql, result=cached)
+
+    total = len(items)
+    for completed, outcome in enumerate(outcomes.values(), 1):
+        await _notify(on_complete, completed, total, outcome)
+
+    pending = [item for item in items if item.key not in outcomes]
+    if pending:
+        if outcomes:
+            logger.info(f"查询结果缓存命中 {len(outcomes)}/{total} 条")
+        outcomes.update(await _execute_pending(
+            create_connector_from_config(source_type=source_type, name=name, config=config),
+            pending,
+            max_concurrency,
+            _offset_callback(on_complete, len(outcomes), total),
+        ))
+
+        if cache is not None:
+            executed = {
+                cache_keys[key]: outcome.result
+                for key, outcome in outcomes.items()
+                if key in cache_keys and outcome.success and outcome.result is not None
+                and not getattr(outcome.result, "is_cached", False)
+            }
+            try:
+                await cache.store_many(executed, cache.resolve_ttl(time_window))
+            except Exception as e:
+                logger.warning(f"写入查询结果缓存失败: {e}")
+    else:
+        logger.info(f"查询结果缓存全部命中（{total} 条），跳过数据源连接")
+
+    return {item.key: outcomes[item.key] for item in items}
+
+
+async def _execute_pending(
+    connector,
+    items: List[BatchQueryItem],
+    max_concurrency: int,
+    on_complete: Optional[CompletionCallback],
+) -> Dict[str, BatchQueryOutcome]:
+    try:
+        await connector.connect()
+    except Exception as e:
+        logger.error(f"批量查询连接数据源失败: {e}")
+        try:
+            await connector.disconnect()
+        except Exception:
+            pass
+        return {item.key: BatchQueryOutcome(key=item.key, sql=item.sql, error=e) for item in items}
+
+    try:
+        logger.info(f"批量执行 {len(items)} 条查询，并发上限 {max_concurrency}")
+        return await execute_queries_concurrently(connector, items, max_concurrency, on_complete)
+    finally:
+        await connector.disconnect()
+
+
+def _offset_callback(
+    on_complete: Optional[CompletionCallback], offset: int, total: int
+) -> Optional[CompletionCallback]:
+    """缓存命中的查询已计入进度，执行阶段的完成数在其后累加"""
+    if not on_complete or not offset:
+        return on_complete
+    return lambda completed, _, outcome: on_complete(offset + completed, total, outcome)
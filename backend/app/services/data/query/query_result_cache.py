@@ -0,0 +1,484 @@
+"""
+查询结果缓存
+
+在连接器执行前按 (数据源指纹, 规范化SQL, 解析后的参数, 涉及表的版本) 缓存查询结果，
+同一周期的报告重新生成、模板预览、质量评分与图表测试不再重复查询数据仓库
+
+- TTL 取决于报告周期：周期已结束的数据基本不变，缓存时间长；进行中的周期缓存时间短
+- 按表失效：递增表版本号，键中包含版本号，旧结果自然失效
+- 复用统一缓存管理器的批量读写与单飞加载，未初始化全局管理器时（如Celery worker）使用独立实例
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.services.data.connectors.columnar_result import ColumnarResult
+from app.services.data.connectors.connector_registry import build_connection_fingerprint
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_KEY_PREFIX = "query_result"
+TABLE_VERSION_KEY_PREFIX = "autoreport:query_cache:table_version:"
+# 版本号作用域：所有数据源中的同名表 / 某个数据源的全部表
+ALL_SOURCES = "*"
+ALL_TABLES = "*"
+
+# 进行中的周期按报告周期放大TTL（周期越长，当期数据的相对变化越慢）
+_OPEN_PERIOD_TTL_FACTORS = {
+    "daily": 1,
+    "day": 1,
+    "weekly": 2,
+    "week": 2,
+    "monthly": 4,
+    "month": 4,
+    "yearly": 8,
+    "year": 8,
+}
+
+_STRING_OR_COMMENT = re.compile(r"('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|--[^\n]*|/\*.*?\*/)", re.S)
+_WHITESPACE = re.compile(r"\s+")
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+((?:`[^`]+`|[\w$]+)(?:\s*\.\s*(?:`[^`]+`|[\w$]+))*)", re.I)
+
+
+@dataclass
+class QueryResultCacheConfig:
+    """查询结果缓存配置"""
+    enabled: bool = True
+    open_period_ttl_seconds: int = 300
+    closed_period_ttl_seconds: int = 86400
+    default_ttl_seconds: int = 300
+    max_rows: int = 10000
+
+    @classmethod
+    def from_settings(cls) -> "QueryResultCacheConfig":
+        """从全局配置创建"""
+        return cls(
+            enabled=settings.QUERY_RESULT_CACHE_ENABLED,
+            open_period_ttl_seconds=settings.QUERY_RESULT_CACHE_OPEN_PERIOD_TTL,
+            closed_period_ttl_seconds=settings.QUERY_RESULT_CACHE_CLOSED_PERIOD_TTL,
+            default_ttl_seconds=settings.QUERY_RESULT_CACHE_DEFAULT_TTL,
+            max_rows=settings.QUERY_RESULT_CACHE_MAX_ROWS,
+        )
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    规范化SQL：去掉注释与末尾分号，合并字符串字面量之外的空白
+
+    不改变大小写，避免影响区分大小写的标识符与字面量
+    """
+    sql = sql or ""
+    segments = []
+    code = []
+    position = 0
+    for match in _STRING_OR_COMMENT.finditer(sql):
+        code.append(sql[position:match.start()])
+        token = match.group(0)
+        if token.startswith(("--", "/*")):
+            # 注释等价于空白
+            code.append(" ")
+        else:
+            segments.append(_WHITESPACE.sub(" ", "".join(code)))
+            segments.append(token)
+            code = []
+        position = match.end()
+    code.append(sql[position:])
+    segments.append(_WHITESPACE.sub(" ", "".join(code)))
+
+    canonical = "".join(segments)
+    return canonical.strip().rstrip(";").strip()
+
+
+def extract_tables(sql: str) -> List[str]:
+    """提取 FROM/JOIN 引用的表名（小写、去掉库名与引号），用于按表失效"""
+    stripped = _STRING_OR_COMMENT.sub(lambda m: m.group(0) if m.group(0).startswith("`") else " ", sql or "")
+    tables = set()
+    for match in _TABLE_REFERENCE.finditer(stripped):
+        name = match.group(1).split(".")[-1].strip().strip("`").lower()
+        if name and name != "select":
+            tables.add(name)
+    return sorted(tables)
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value).strip().strip("'")[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+@dataclass
+class CachedQueryResult:
+    """缓存命中时返回的查询结果，接口与连接器结果兼容（to_columnar / data / to_dict）"""
+    columns: List[str]
+    rows: List[List[Any]]
+    execution_time: float = 0.0
+    success: bool = True
+    is_cached: bool = True
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    _columnar: Optional[ColumnarResult] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "CachedQueryResult":
+        return cls(
+            columns=list(payload.get("columns") or []),
+            rows=payload.get("rows") or [],
+            execution_time=payload.get("execution_time", 0.0),
+            metadata={"cache_hit": True, "cached_at": payload.get("cached_at")},
+        )
+
+    def to_columnar(self) -> ColumnarResult:
+        if self._columnar is None:
+            self._columnar = ColumnarResult.from_rows(self.rows, self.columns)
+        return self._columnar
+
+    @property
+    def data(self):
+        """DataFrame视图（兼容按 .data 读取结果的旧代码）"""
+        return self.to_columnar().to_dataframe()
+
+    def to_dict(self) -> Dict[str, Any]:
+        columnar = self.to_columnar()
+        return {
+            "data": columnar.to_records(),
+            "columns": self.columns,
+            "execution_time": self.execution_time,
+            "success": True,
+            "is_cached": True,
+            "row_count": len(columnar),
+        }
+
+
+class QueryResultCache:
+    """连接器执行前的查询结果缓存"""
+
+    def __init__(self, config: Optional[QueryResultCacheConfig] = None, manager=None):
+        self.config = config or QueryResultCacheConfig.from_settings()
+        self._manager = manager
+        # Redis不可用时的进程内表版本号
+        self._local_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "skipped_large": 0, "invalidations": 0}
+
+    # ------------------------------------------------------------------
+    # 键与TTL
+    # ------------------------------------------------------------------
+    def resolve_ttl(self, time_window: Optional[Dict[str, Any]] = None, today: Optional[date] = None) -> int:
+        """
+        根据报告时间窗口确定TTL
+
+        - 窗口结束日期早于今天：周期已结束，使用 closed_period_ttl_seconds
+        - 窗口包含今天或未来：按报告周期放大 open_period_ttl_seconds
+        - 无时间窗口：default_ttl_seconds
+        """
+        if not time_window:
+            return self.config.default_ttl_seconds
+        end = _parse_date(time_window.get("end_date") or time_window.get("end"))
+        if end is None:
+            return self.config.default_ttl_seconds
+        if end < (today or date.today()):
+            return self.config.closed_period_ttl_seconds
+
+        period = str(
+            time_window.get("report_period") or time_window.get("period") or time_window.get("data_range") or ""
+        ).lower()
+        return self.config.open_period_ttl_seconds * _OPEN_PERIOD_TTL_FACTORS.get(period, 1)
+
+    async def build_key(
+        self,
+        source_type: Any,
+        config: Dict[str, Any],
+        sql: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        fingerprint = build_connection_fingerprint(source_type, config)
+        canonical = canonicalize_sql(sql)
+        versions = self._table_versions(fingerprint, extract_tables(canonical))
+        material = json.dumps(
+            {"sql": canonical, "params": params or {}, "tables": versions},
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        digest = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        return f"{QUERY_CACHE_KEY_PREFIX}:{fingerprint}:{digest}"
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CachedQueryResult]:
+        """批量读取，只返回命中的键"""
+        keys = list(keys)
+        manager = self._get_manager()
+        if not self.config.enabled or manager is None or not keys:
+            return {}
+        try:
+            entries = await manager.get_many(keys)
+        except Exception as e:
+            logger.warning(f"读取查询结果缓存失败: {e}")
+            return {}
+        self.stats["hits"] += len(entries)
+        self.stats["misses"] += len(keys) - len(entries)
+        return {key: CachedQueryResult.from_payload(entry.value) for key, entry in entries.items()}
+
+    async def store_many(self, results: Dict[str, Any], ttl_seconds: int) -> int:
+        """批量写入连接器结果（失败结果与超过行数上限的结果不缓存），返回写入数量"""
+        manager = self._get_manager()
+        if not self.config.enabled or manager is None or ttl_seconds <= 0:
+            return 0
+        payloads = {}
+        for key, result in results.items():
+            payload = self._to_payload(result)
+            if payload is not None:
+                payloads[key] = payload
+        if not payloads:
+            return 0
+
+        from app.services.infrastructure.cache.unified_cache_system import PRESERVE_VALUE_KEY, CacheType
+
+        try:
+            stored = await manager.set_many(
+                payloads,
+                CacheType.SQL_QUERY_RESULT,
+                cache_level=self._cache_level(manager),
+                ttl_seconds=ttl_seconds,
+                metadata={PRESERVE_VALUE_KEY: True},
+            )
+        except Exception as e:
+            logger.warning(f"写入查询结果缓存失败: {e}")
+            return 0
+        count = sum(1 for ok in stored.values() if ok)
+        self.stats["stores"] += count
+        return count
+
+    async def get_or_load(
+        self,
+        source_type: Any,
+        config: Dict[str, Any],
+        sql: str,
+        loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+        time_window: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的可序列化结果，未命中时调用 loader（同一键的并发请求只执行一次）
+
+        loader 返回 None 表示结果不可缓存（如查询失败），此时调用方自行处理
+        """
+        if not self.config.enabled:
+            return await loader()
+        manager = self._get_manager()
+        if manager is None:
+            return await loader()
+
+        from app.services.infrastructure.cache.unified_cache_system import CacheType
+
+        key = await self.build_key(source_type, config, sql, params)
+        loaded = False
+
+        async def _load():
+            nonlocal loaded
+            loaded = True
+            return await loader()
+
+        value = await manager.get_or_load(
+            key,
+            _load,
+            CacheType.SQL_QUERY_RESULT,
+            cache_level=self._cache_level(manager),
+            ttl_seconds=self.resolve_ttl(time_window),
+            stale_ttl_seconds=0,
+        )
+        if loaded:
+            self.stats["misses"] += 1
+            if value is not None:
+                self.stats["stores"] += 1
+        else:
+            self.stats["hits"] += 1
+        return value
+
+    # ------------------------------------------------------------------
+    # 失效
+    # ------------------------------------------------------------------
+    def invalidate_table(self, source_type: Any, config: Optional[Dict[str, Any]], table: str) -> int:
+        """
+        递增表版本号，使引用该表的缓存结果失效，返回新版本号
+
+        config 为 None 时对所有数据源中的同名表生效（如ETL写入的目标表）
+        """
+        scope = build_connection_fingerprint(source_type, config) if config is not None else ALL_SOURCES
+        name = table.split(".")[-1].strip().strip("`").lower()
+        return self._bump_version(f"{TABLE_VERSION_KEY_PREFIX}{scope}:{name}")
+
+    def invalidate_source(self, source_type: Any, config: Dict[str, Any]) -> int:
+        """递增数据源版本号，使该数据源的全部缓存结果失效（数据源被修改或删除时调用）"""
+        fingerprint = build_connection_fingerprint(source_type, config)
+        return self._bump_version(f"{TABLE_VERSION_KEY_PREFIX}{fingerprint}:{ALL_TABLES}")
+
+    def _bump_version(self, version_key: str) -> int:
+        self.stats["invalidations"] += 1
+        client = self._get_redis_client()
+        if client is not None:
+            try:
+                return int(client.incr(version_key))
+            except Exception as e:
+                logger.warning(f"递增表版本号失败，仅在本进程内失效: {e}")
+        with self._lock:
+            self._local_versions[version_key] = self._local_versions.get(version_key, 0) + 1
+            return self._local_versions[version_key]
+
+    def _table_versions(self, fingerprint: str, tables: List[str]) -> Dict[str, int]:
+        """数据源版本号 + 每张表在该数据源内与全局的版本号"""
+        labels = [ALL_TABLES]
+        version_keys = [f"{TABLE_VERSION_KEY_PREFIX}{fingerprint}:{ALL_TABLES}"]
+        for table in tables:
+            labels.extend([table, f"{ALL_SOURCES}:{table}"])
+            version_keys.extend([
+                f"{TABLE_VERSION_KEY_PREFIX}{fingerprint}:{table}",
+                f"{TABLE_VERSION_KEY_PREFIX}{ALL_SOURCES}:{table}",
+            ])
+        versions = [None] * len(version_keys)
+
+        client = self._get_redis_client()
+        if client is not None:
+            try:
+                versions = client.mget(version_keys)
+            except Exception as e:
+                logger.debug(f"读取表版本号失败: {e}")
+        with self._lock:
+            return {
+                label: int(remote or 0) + self._local_versions.get(version_key, 0)
+                for label, version_key, remote in zip(labels, version_keys, versions)
+            }
+
+    # ------------------------------------------------------------------
+    # 内部
+    # ------------------------------------------------------------------
+    def _to_payload(self, result: Any) -> Optional[Dict[str, Any]]:
+        if result is None or getattr(result, "success", True) is False:
+            return None
+        if isinstance(result, CachedQueryResult):
+            columns, rows = result.columns, result.rows
+        else:
+            columnar = result.to_columnar() if hasattr(result, "to_columnar") else None
+            if columnar is None:
+                return None
+            if len(columnar) > self.config.max_rows:
+                self.stats["skipped_large"] += 1
+                return None
+            columns = list(columnar.columns)
+            rows = [[row[c] for c in columns] for row in columnar.to_records()]
+        return {
+            "columns": columns,
+            "rows": rows,
+            "execution_time": getattr(result, "execution_time", 0.0),
+            "cached_at": datetime.now().isoformat(),
+        }
+
+    def _get_manager(self):
+        if self._manager is not None:
+            return self._manager
+        from app.services.infrastructure.cache.unified_cache_system import (
+            UnifiedCacheManager,
+            get_cache_manager,
+        )
+
+        manager = get_cache_manager()
+        if manager is None:
+            # 未初始化全局缓存管理器的进程（如Celery worker）使用独立实例
+            with self._lock:
+                if self._manager is None:
+                    self._manager = UnifiedCacheManager(
+                        enable_database=False, redis_client=self._get_redis_client()
+                    )
+            manager = self._manager
+        return manager
+
+    @staticmethod
+    def _cache_level(manager):
+        from app.services.infrastructure.cache.unified_cache_system import CacheLevel
+
+        return CacheLevel.REDIS if CacheLevel.REDIS in manager.caches else CacheLevel.MEMORY
+
+    @staticmethod
+    def _get_redis_client():
+        try:
+            from app.services.infrastructure.cache.redis_cache_service import cache_service
+            return cache_service.client if cache_service.enabled else None
+        except Exception:
+            return None
+
+
+# 全局实例
+_query_result_cache: Optional[QueryResultCache] = None
+
+
+def get_query_result_cache() -> QueryResultCache:
+    """获取查询结果缓存实例"""
+    global _query_result_cache
+    if _query_result_cache is None:
+        _query_result_cache = QueryResultCache()
+    return _query_result_cache
+
+
+async def cached_run_query(
+    run_query: Callable[[Dict[str, Any], str, int], Awaitable[Dict[str, Any]]],
+    connection_config: Dict[str, Any],
+    sql: str,
+    limit: int = 1000,
+    time_window: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    通过查询结果缓存执行 run_query 风格的查询（返回 {"success", "rows", "columns"}）
+
+    只缓存成功的结果；缓存不可用时直接执行
+    """
+    if not isinstance(connection_config, dict):
+        return await run_query(connection_config, sql, limit)
+
+    # 本次调用实际执行查询后的结果或异常；查询已执行过时不能再执行第二次
+    outcome: Dict[str, Any] = {}
+
+    async def _load():
+        try:
+            result = await run_query(connection_config, sql, limit)
+        except Exception as e:
+            outcome["error"] = e
+            raise
+        outcome["result"] = result
+        return result if result.get("success") else None
+
+    source_type = connection_config.get("source_type") or connection_config.get("type") or ""
+    try:
+        result = await get_query_result_cache().get_or_load(
+            source_type,
+            connection_config,
+            sql,
+            _load,
+            time_window=time_window,
+            params={"limit": limit, "format": "records"},
+        )
+    except Exception as e:
+        if "error" in outcome:
+            raise outcome["error"]
+        logger.warning(f"查询结果缓存不可用: {e}")
+        result = None
+
+    if result is not None:
+        return result
+    if "result" in outcome:
+        return outcome["result"]
+    return await run_query(connection_config, sql, limit)
@@ -4,6 +4,7 @@ Schema Management Module
 架构管理模块，合并了原有的schemas和schema_management功能：
 - schema_service: 核心架构服务
 - query_builder: 查询构建器
+- schema_graph_index: 连接路径与关键词索引
 - schema_discovery_service: 架构发现服务
 - schema_analysis_service: 架构分析服务
 - schema_metadata_service: 架构元数据服务
@@ -25,6 +26,7 @@ from .schema_service import (
 from .query_builder import (
     SchemaAwareQueryBuilder, NaturalLanguageQueryBuilder, QueryContext, QueryType
 )
+from .schema_graph_index import SchemaGraphIndex, SchemaGraphIndexStore, get_schema_graph_index_store
 
 # 扩展架构服务（原schema_management目录）
 from .schema_discovery_service import SchemaDiscoveryService
@@ -50,6 +52,9 @@ __all__ = [
     "NaturalLanguageQueryBuilder",
     "QueryContext",
     "QueryType",
+    "SchemaGraphIndex",
+    "SchemaGraphIndexStore",
+    "get_schema_graph_index_store",
     
     # 扩展架构服务
     "SchemaDiscoveryService",
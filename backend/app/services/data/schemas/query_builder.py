@@ -11,6 +11,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 from .schema_service import DatabaseSchema, TableSchema
+from .schema_graph_index import get_schema_graph_index_store
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +46,8 @@ class SchemaAwareQueryBuilder:
     def __init__(self, schema: DatabaseSchema):
         self.schema = schema
         self.table_relationships = self._build_relationship_map()
+        # 同一 Schema 版本共享的连接路径与关键词索引
+        self.graph_index = get_schema_graph_index_store().get_or_build(schema)
     
     def _build_relationship_map(self) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
         """构建表关系映射"""
@@ -120,51 +123,8 @@ class SchemaAwareQueryBuilder:
         if source_table not in self.schema.tables or target_table not in self.schema.tables:
             return []
         
-        if source_table == target_table:
-            return []
-        
-        # 使用BFS寻找最短路径
-        from collections import deque
-        
-        queue = deque([(source_table, [])])
-        visited = {source_table}
-        
-        while queue:
-            current_table, path = queue.popleft()
-            
-            if current_table == target_table:
-                return path
-            
-            if current_table in self.table_relationships:
-                # 检查外键关系
-                for rel in self.table_relationships[current_table]['outgoing']:
-                    next_table = rel['target_table']
-                    if next_table not in visited and next_table in self.schema.tables:
-                        visited.add(next_table)
-                        new_path = path + [{
-                            'from_table': current_table,
-                            'to_table': next_table,
-                            'from_column': rel['source_column'],
-                            'to_column': rel['target_column'],
-                            'join_type': 'INNER'
-                        }]
-                        queue.append((next_table, new_path))
-                
-                # 检查反向关系
-                for rel in self.table_relationships[current_table]['incoming']:
-                    next_table = rel['source_table']
-                    if next_table not in visited and next_table in self.schema.tables:
-                        visited.add(next_table)
-                        new_path = path + [{
-                            'from_table': current_table,
-                            'to_table': next_table,
-                            'from_column': rel['target_column'],
-                            'to_column': rel['source_column'],
-                            'join_type': 'INNER'
-                        }]
-                        queue.append((next_table, new_path))
-        
-        return []  # 没有找到路径
+        # 由缓存的源表 BFS 树回溯最短路径
+        return self.graph_index.join_path(source_table, target_table)
     
     def build_select_query(self, context: QueryContext) -> str:
         """构建SELECT查询"""
@@ -243,18 +203,8 @@ class SchemaAwareQueryBuilder:
     
     def _find_column_table(self, column_name: str, default_table: str) -> Optional[str]:
         """找出列属于哪个表"""
-        # 首先检查默认表
-        if default_table in self.schema.tables:
-            table = self.schema.tables[default_table]
-            if any(col['name'] == column_name for col in table.columns):
-                return default_table
-        
-        # 检查所有表
-        for table_name, table in self.schema.tables.items():
-            if any(col['name'] == column_name for col in table.columns):
-                return table_name
-        
-        return None
+        # 优先默认表，其次按 Schema 顺序的第一个包含该列的表
+        return self.graph_index.find_column_table(column_name, default_table)
     
     def _build_from_clause(self, tables: List[str]) -> str:
         """构建FROM子句"""
@@ -355,50 +305,10 @@ class NaturalLanguageQueryBuilder:
     def __init__(self, schema: DatabaseSchema):
         self.schema = schema
         self.query_builder = SchemaAwareQueryBuilder(schema)
-        self.table_keywords = self._build_table_keywords()
-        self.column_keywords = self._build_column_keywords()
-    
-    def _build_table_keywords(self) -> Dict[str, str]:
-        """构建表关键词映射"""
-        keywords = {}
-        
-        for table_name in self.schema.tables:
-            # 表名本身
-            keywords[table_name.lower()] = table_name
-            
-            # 单复数变化
-            if table_name.endswith('s'):
-                keywords[table_name[:-1].lower()] = table_name
-            else:
-                keywords[f"{table_name}s".lower()] = table_name
-            
-            # 下划线转换
-            if '_' in table_name:
-                keywords[table_name.replace('_', ' ').lower()] = table_name
-        
-        return keywords
-    
-    def _build_column_keywords(self) -> Dict[str, List[Tuple[str, str]]]:
-        """构建列关键词映射"""
-        keywords = {}
-        
-        for table_name, table in self.schema.tables.items():
-            for column in table.columns:
-                column_name = column['name'].lower()
-                
-                if column_name not in keywords:
-                    keywords[column_name] = []
-                
-                keywords[column_name].append((table_name, column['name']))
-                
-                # 处理下划线
-                if '_' in column_name:
-                    alt_name = column_name.replace('_', ' ')
-                    if alt_name not in keywords:
-                        keywords[alt_name] = []
-                    keywords[alt_name].append((table_name, column['name']))
-        
-        return keywords
+        self.graph_index = self.query_builder.graph_index
+        # 关键词倒排索引（随 Schema 版本缓存）
+        self.table_keywords = self.graph_index.table_keywords
+        self.column_keywords = self.graph_index.column_keywords
     
     def parse_natural_query(self, natural_query: str) -> Optional[QueryContext]:
         """解析自然语言查询"""
@@ -427,30 +337,12 @@ class NaturalLanguageQueryBuilder:
     
     def _extract_tables(self, query: str) -> List[str]:
         """从查询中提取表名"""
-        identified_tables = []
-        
-        for keyword, table_name in self.table_keywords.items():
-            if keyword in query:
-                if table_name not in identified_tables:
-                    identified_tables.append(table_name)
-        
-        return identified_tables
+        return self.graph_index.match_tables(query)
     
     def _extract_columns(self, query: str, target_tables: List[str]) -> List[str]:
         """从查询中提取列名"""
-        identified_columns = []
-        
-        # 优先匹配目标表的列
-        for table_name in target_tables:
-            if table_name in self.schema.tables:
-                for column in self.schema.tables[table_name].columns:
-                    column_name = column['name'].lower()
-                    if column_name in query:
-                        if column['name'] not in identified_columns:
-                            identified_columns.append(column['name'])
-        
-        # 如果没有找到具体列，返回空列表（使用SELECT *）
-        return identified_columns
+        # 优先匹配目标表的列；如果没有找到具体列，返回空列表（使用SELECT *）
+        return self.graph_index.match_columns(query, target_tables)
     
     def _extract_conditions(self, query: str) -> List[Dict[str, Any]]:
         """从查询中提取条件"""
@@ -0,0 +1,366 @@
+"""
+Schema 图索引
+
+同一版本的 Schema 只构建一次的查询规划索引：
+- 外键关系邻接表，按源表懒构建并缓存 BFS 父指针树，任意两表的最短连接路径由父指针回溯得到
+- 关键词倒排索引：表名（含单复数、下划线转空格变体）-> 表，列名 -> (表, 列)
+- 索引版本为表/列/外键结构的内容哈希，Schema 变更后版本随之变化，旧索引自然失效
+- 索引随 Schema 一起保存在 Redis 中（Redis 不可用时仅使用进程内 LRU 缓存）
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_ASCII_TOKEN = re.compile(r"[a-z0-9_]+")
+_ASCII_KEYWORD = re.compile(r"^[a-z0-9_]+( [a-z0-9_]+)*$")
+
+
+def _table_items(schema: Any) -> List[Tuple[str, Any]]:
+    return list((getattr(schema, "tables", None) or {}).items())
+
+
+def schema_version(schema: Any) -> str:
+    """基于表、列、外键结构计算 Schema 版本"""
+    structure = [
+        [
+            table_name,
+            [column.get("name") for column in getattr(table, "columns", None) or []],
+            [
+                [fk.get("column"), fk.get("referenced_table"), fk.get("referenced_column")]
+                for fk in getattr(table, "foreign_keys", None) or []
+            ],
+        ]
+        for table_name, table in _table_items(schema)
+    ]
+    payload = json.dumps(structure, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _query_terms(query: str, max_words: int) -> List[str]:
+    """查询中的单词及连续 n 个单词（与含空格的关键词匹配）"""
+    tokens = _ASCII_TOKEN.findall(query.lower())
+    terms = []
+    for size in range(1, max_words + 1):
+        for start in range(len(tokens) - size + 1):
+            terms.append(" ".join(tokens[start:start + size]))
+    return terms
+
+
+class SchemaGraphIndex:
+    """某个 Schema 版本的连接路径与关键词索引"""
+
+    def __init__(
+        self,
+        version: str,
+        tables: List[str],
+        adjacency: Dict[str, List[List[str]]],
+        table_keywords: Dict[str, str],
+        column_keywords: Dict[str, List[List[Any]]],
+        column_tables: Dict[str, List[str]],
+    ):
+        """
+        Args:
+            adjacency: 表 -> [[相邻表, 本表列, 相邻表列], ...]，先出边（外键）后入边
+            table_keywords: 关键词 -> 表名
+            column_keywords: 关键词 -> [[表名, 列名, 列序号], ...]
+            column_tables: 列名 -> 包含该列的表（按 Schema 顺序）
+        """
+        self.version = version
+        self.tables = tables
+        self.adjacency = adjacency
+        self.table_keywords = table_keywords
+        self.column_keywords = column_keywords
+        self.column_tables = column_tables
+        self._table_positions = {name: index for index, name in enumerate(tables)}
+        self._max_keyword_words = max(
+            [keyword.count(" ") + 1 for keyword in [*table_keywords, *column_keywords]] or [1]
+        )
+        # 含非 ASCII 字符的关键词无法按单词切分，退化为子串匹配
+        self._substring_table_keywords = [k for k in table_keywords if not _ASCII_KEYWORD.match(k)]
+        self._substring_column_keywords = [k for k in column_keywords if not _ASCII_KEYWORD.match(k)]
+        self._trees: Dict[str, Dict[str, Optional[Tuple[str, int]]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, schema: Any, version: Optional[str] = None) -> "SchemaGraphIndex":
+        """从 Schema 构建索引"""
+        items = _table_items(schema)
+        tables = [name for name, _ in items]
+        table_set = set(tables)
+
+        adjacency: Dict[str, List[List[str]]] = {name: [] for name in tables}
+        incoming: Dict[str, List[List[str]]] = {name: [] for name in tables}
+        for table_name, table in items:
+            for fk in getattr(table, "foreign_keys", None) or []:
+                target = fk.get("referenced_table")
+                if target not in table_set:
+                    continue
+                source_column, target_column = fk.get("column"), fk.get("referenced_column")
+                adjacency[table_name].append([target, source_column, target_column])
+                incoming[target].append([table_name, target_column, source_column])
+        for table_name in tables:
+            adjacency[table_name].extend(incoming[table_name])
+
+        table_keywords: Dict[str, str] = {}
+        variants: Dict[str, str] = {}
+        column_keywords: Dict[str, List[List[Any]]] = {}
+        column_tables: Dict[str, List[str]] = {}
+        for table_name, table in items:
+            lowered = table_name.lower()
+            table_keywords[lowered] = table_name
+            variants[lowered[:-1] if lowered.endswith("s") else f"{lowered}s"] = table_name
+            if "_" in lowered:
+                variants[lowered.replace("_", " ")] = table_name
+
+            for position, column in enumerate(getattr(table, "columns", None) or []):
+                column_name = column["name"]
+                column_tables.setdefault(column_name, []).append(table_name)
+                lowered_column = column_name.lower()
+                entry = [table_name, column_name, position]
+                column_keywords.setdefault(lowered_column, []).append(entry)
+                if "_" in lowered_column:
+                    column_keywords.setdefault(lowered_column.replace("_", " "), []).append(entry)
+        # 表名本身优先于单复数/空格变体
+        for keyword, table_name in variants.items():
+            table_keywords.setdefault(keyword, table_name)
+
+        return cls(
+            version=version or schema_version(schema),
+            tables=tables,
+            adjacency=adjacency,
+            table_keywords=table_keywords,
+            column_keywords=column_keywords,
+            column_tables=column_tables,
+        )
+
+    # ------------------------------------------------------------------
+    # 连接路径
+    # ------------------------------------------------------------------
+    def bfs_tree(self, source_table: str) -> Dict[str, Optional[Tuple[str, int]]]:
+        """源表的 BFS 父指针树：表 -> (父表, 父表邻接表中的边序号)"""
+        tree = self._trees.get(source_table)
+        if tree is not None:
+            return tree
+
+        tree = {source_table: None}
+        queue = deque([source_table])
+        while queue:
+            current = queue.popleft()
+            for edge_index, edge in enumerate(self.adjacency.get(current, ())):
+                next_table = edge[0]
+                if next_table not in tree:
+                    tree[next_table] = (current, edge_index)
+                    queue.append(next_table)
+
+        with self._lock:
+            return self._trees.setdefault(source_table, tree)
+
+    def join_path(self, source_table: str, target_table: str) -> List[Dict[str, str]]:
+        """两表之间的最短连接路径，不连通时返回空列表"""
+        if source_table == target_table or source_table not in self.adjacency:
+            return []
+        tree = self.bfs_tree(source_table)
+        if target_table not in tree:
+            return []
+
+        path = []
+        current = target_table
+        while tree[current] is not None:
+            parent, edge_index = tree[current]
+            _, from_column, to_column = self.adjacency[parent][edge_index]
+            path.append({
+                'from_table': parent,
+                'to_table': current,
+                'from_column': from_column,
+                'to_column': to_column,
+                'join_type': 'INNER'
+            })
+            current = parent
+        path.reverse()
+        return path
+
+    # ------------------------------------------------------------------
+    # 关键词匹配
+    # ------------------------------------------------------------------
+    def match_tables(self, query: str) -> List[str]:
+        """查询中提到的表（按 Schema 顺序）"""
+        query = query.lower()
+        matched = {
+            self.table_keywords[term]
+            for term in _query_terms(query, self._max_keyword_words)
+            if term in self.table_keywords
+        }
+        matched.update(self.table_keywords[k] for k in self._substring_table_keywords if k in query)
+        return sorted(matched, key=self._table_positions.__getitem__)
+
+    def match_columns(self, query: str, target_tables: List[str]) -> List[str]:
+        """查询中提到的目标表列名（按目标表顺序、列顺序去重）"""
+        query = query.lower()
+        keywords = [term for term in _query_terms(query, self._max_keyword_words) if term in self.column_keywords]
+        keywords.extend(k for k in self._substring_column_keywords if k in query)
+
+        table_order = {name: index for index, name in enumerate(target_tables)}
+        entries = {
+            (table_order[table_name], position, column_name)
+            for keyword in keywords
+            for table_name, column_name, position in self.column_keywords[keyword]
+            if table_name in table_order
+        }
+        columns: List[str] = []
+        for _, _, column_name in sorted(entries):
+            if column_name not in columns:
+                columns.append(column_name)
+        return columns
+
+    def find_column_table(self, column_name: str, default_table: Optional[str] = None) -> Optional[str]:
+        """列所属的表，优先返回默认表"""
+        tables = self.column_tables.get(column_name)
+        if not tables:
+            return None
+        return default_table if default_table in tables else tables[0]
+
+    # ------------------------------------------------------------------
+    # 序列化
+    # ------------------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "tables": self.tables,
+            "adjacency": self.adjacency,
+            "table_keywords": self.table_keywords,
+            "column_keywords": self.column_keywords,
+            "column_tables": self.column_tables,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SchemaGraphIndex":
+        return cls(
+            version=data["version"],
+            tables=data["tables"],
+            adjacency=data["adjacency"],
+            table_keywords=data["table_keywords"],
+            column_keywords=data["column_keywords"],
+            column_tables=data["column_tables"],
+        )
+
+
+class SchemaGraphIndexStore:
+    """按 Schema 版本缓存图索引：进程内 LRU + Redis"""
+
+    KEY_PREFIX = "schema_graph_index:"
+
+    def __init__(self, max_entries: int = 32, ttl: int = 86400, redis_client: Any = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._redis_client = redis_client
+        self._entries: "OrderedDict[str, SchemaGraphIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "redis_hits": 0, "builds": 0}
+
+    def get_or_build(self, schema: Any) -> SchemaGraphIndex:
+        """获取 Schema 当前版本的索引，不存在时构建并保存"""
+        version = schema_version(schema)
+        index = self._get_local(version)
+        if index is not None:
+            self._stats["hits"] += 1
+            return index
+
+        index = self._read(version)
+        if index is not None:
+            self._stats["redis_hits"] += 1
+        else:
+            self._stats["builds"] += 1
+            index = SchemaGraphIndex.build(schema, version)
+            self._write(index)
+            logger.info(f"✅ Schema 图索引构建完成: {len(index.tables)} 个表, 版本 {version[:8]}")
+        self._put_local(index)
+        return index
+
+    def invalidate(self, version: str) -> None:
+        """清除某个版本的索引"""
+        with self._lock:
+            self._entries.pop(version, None)
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.delete(self.KEY_PREFIX + version)
+            except Exception as e:
+                logger.warning(f"⚠️ 清除 Schema 图索引失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "local_entries": len(self._entries)}
+
+    def _get_local(self, version: str) -> Optional[SchemaGraphIndex]:
+        with self._lock:
+            index = self._entries.get(version)
+            if index is not None:
+                self._entries.move_to_end(version)
+            return index
+
+    def _put_local(self, index: SchemaGraphIndex) -> None:
+        with self._lock:
+            self._entries[index.version] = index
+            self._entries.move_to_end(index.version)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        try:
+            from app.services.infrastructure.cache.redis_cache_service import cache_service
+            return cache_service.client if cache_service.enabled else None
+        except Exception:
+            return None
+
+    def _read(self, version: str) -> Optional[SchemaGraphIndex]:
+        client = self._get_redis()
+        if client is None:
+            return None
+        try:
+            raw = client.get(self.KEY_PREFIX + version)
+            return SchemaGraphIndex.from_dict(json.loads(raw)) if raw else None
+        except Exception as e:
+            logger.warning(f"⚠️ 读取 Schema 图索引失败，重新构建: {e}")
+            return None
+
+    def _write(self, index: SchemaGraphIndex) -> None:
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            client.setex(self.KEY_PREFIX + index.version, self.ttl, json.dumps(index.to_dict(), ensure_ascii=False))
+        except Exception as e:
+            logger.warning(f"⚠️ 保存 Schema 图索引失败: {e}")
+
+
+_graph_index_store: Optional[SchemaGraphIndexStore] = None
+
+
+def get_schema_graph_index_store() -> SchemaGraphIndexStore:
+    """获取全局 Schema 图索引缓存"""
+    global _graph_index_store
+    if _graph_index_store is None:
+        _graph_index_store = SchemaGraphIndexStore(
+            max_entries=settings.SCHEMA_GRAPH_INDEX_CACHE_SIZE,
+            ttl=settings.SCHEMA_GRAPH_INDEX_TTL,
+        )
+    return _graph_index_store
+
+
+__all__ = [
+    "SchemaGraphIndex",
+    "SchemaGraphIndexStore",
+    "get_schema_graph_index_store",
+    "schema_version",
+]
@@ -16,6 +16,7 @@ from .intelligent_retriever import (
     IntelligentSchemaRetriever, RetrievalConfig,
     create_intelligent_retriever
 )
+from .tools.schema.catalog import get_schema_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -98,34 +99,15 @@ class SchemaContextRetriever(BaseRetriever):
                 self._initialized = True
                 return
 
-            # 1. 获取所有表名
-            tables_sql = "SHOW TABLES"
-            tables_result = await data_source_service.run_query(
-                connection_config=self.connection_config,
-                sql=tables_sql,
-                limit=1000
-            )
-
-            if not isinstance(tables_result, dict) or not tables_result.get('success'):
-                error_info = tables_result.get('error', 'Unknown error') if isinstance(tables_result, dict) else str(tables_result)
-                logger.warning(f"⚠️ 获取表列表失败: {error_info}")
-                self._initialized = True
-                return
-
-            # 解析表名
-            tables = []
-            for row in tables_result.get('rows', []) or tables_result.get('data', []):
-                if isinstance(row, dict):
-                    table_name = next(iter(row.values())) if row else None
-                elif isinstance(row, (list, tuple)) and row:
-                    table_name = row[0]
-                elif isinstance(row, str):
-                    table_name = row
-                else:
-                    table_name = None
-
-                if table_name:
-                    tables.append(str(table_name))
+            # 1. 获取所有表名（优先读取跨进程共享的 Schema 目录）
+            snapshot = await get_schema_catalog().get_snapshot(data_source_service, self.connection_config)
+            if snapshot is not None:
+                tables = snapshot.table_names
+            else:
+                tables = await self._fetch_table_names(data_source_service)
+                if tables is None:
+                    self._initialized = True
+                    return
 
             self.table_names = tables
             logger.info(f"✅ 发现 {len(tables)} 个表")
@@ -151,7 +133,17 @@ class SchemaContextRetriever(BaseRetriever):
                 self._initialized = True
                 return
 
-            # 传统模式：并行获取每个表的列信息
+            # 传统模式：优先使用目录中的列信息，缺失的表再并行查询
+            if snapshot is not None:
+                for table_name in tables:
+                    table_entry = snapshot.tables.get(table_name)
+                    if table_entry and table_entry.get('columns'):
+                        self.schema_cache[table_name] = self._build_table_info(
+                            table_name, table_entry['columns'], table_entry.get('table_comment', '')
+                        )
+                        self.loaded_tables.add(table_name)
+                tables = [t for t in tables if t not in self.loaded_tables]
+
             async def fetch_table_columns(table_name: str):
                 """获取单个表的列信息"""
                 try:
@@ -164,25 +156,7 @@ class SchemaContextRetriever(BaseRetriever):
 
                     if isinstance(columns_result, dict) and columns_result.get('success'):
                         rows = columns_result.get('rows', []) or columns_result.get('data', [])
-                        columns = []
-
-                        for row in rows:
-                            if isinstance(row, dict):
-                                columns.append({
-                                    'name': row.get('Field') or row.get('column_name') or row.get('COLUMN_NAME') or '',
-                                    'type': row.get('Type') or row.get('column_type') or row.get('DATA_TYPE') or '',
-                                    'nullable': row.get('Null') or row.get('IS_NULLABLE'),
-                                    'key': row.get('Key') or row.get('COLUMN_KEY'),
-                                    'default': row.get('Default'),
-                                    'comment': row.get('Comment') or row.get('COLUMN_COMMENT') or '',
-                                })
-
-                        return table_name, {
-                            'table_name': table_name,
-                            'columns': [col for col in columns if col.get('name')],
-                            'table_comment': '',
-                            'table_type': 'TABLE',
-                        }
+                        return table_name, self._build_table_info(table_name, rows)
                     else:
                         logger.warning(f"⚠️ 获取表 {table_name} 列信息失败")
                         return table_name, None
@@ -228,6 +202,57 @@ class SchemaContextRetriever(BaseRetriever):
         except Exception as e:
             logger.error(f"❌ Schema 缓存初始化失败: {e}", exc_info=True)
 
+    async def _fetch_table_names(self, data_source_service: Any) -> Optional[List[str]]:
+        """通过 SHOW TABLES 获取表名（Schema 目录不可用时的回退路径）"""
+        tables_result = await data_source_service.run_query(
+            connection_config=self.connection_config,
+            sql="SHOW TABLES",
+            limit=1000
+        )
+
+        if not isinstance(tables_result, dict) or not tables_result.get('success'):
+            error_info = tables_result.get('error', 'Unknown error') if isinstance(tables_result, dict) else str(tables_result)
+            logger.warning(f"⚠️ 获取表列表失败: {error_info}")
+            return None
+
+        # 解析表名
+        tables = []
+        for row in tables_result.get('rows', []) or tables_result.get('data', []):
+            if isinstance(row, dict):
+                table_name = next(iter(row.values())) if row else None
+            elif isinstance(row, (list, tuple)) and row:
+                table_name = row[0]
+            elif isinstance(row, str):
+                table_name = row
+            else:
+                table_name = None
+
+            if table_name:
+                tables.append(str(table_name))
+        return tables
+
+    @staticmethod
+    def _build_table_info(table_name: str, rows: List[Any], table_comment: str = '') -> Dict[str, Any]:
+        """将 SHOW FULL COLUMNS 格式的行转换为缓存中的表信息"""
+        columns = []
+        for row in rows:
+            if isinstance(row, dict):
+                columns.append({
+                    'name': row.get('Field') or row.get('column_name') or row.get('COLUMN_NAME') or '',
+                    'type': row.get('Type') or row.get('column_type') or row.get('DATA_TYPE') or '',
+                    'nullable': row.get('Null') or row.get('IS_NULLABLE'),
+                    'key': row.get('Key') or row.get('COLUMN_KEY'),
+                    'default': row.get('Default'),
+                    'comment': row.get('Comment') or row.get('COLUMN_COMMENT') or '',
+                })
+
+        return {
+            'table_name': table_name,
+            'columns': [col for col in columns if col.get('name')],
+            'table_comment': table_comment or '',
+            'table_type': 'TABLE',
+        }
+
     async def _load_tables_on_demand(self, table_names: List[str]):
         """按需加载表的列信息"""
         # 找出需要加载的表（未缓存的）
@@ -247,6 +272,21 @@ class SchemaContextRetriever(BaseRetriever):
             logger.warning("⚠️ 数据源服务不可用，无法加载表结构")
             return
 
+        # 优先使用共享 Schema 目录中的列信息
+        try:
+            catalog_columns = await get_schema_catalog().get_columns(
+                data_source_service, self.connection_config, tables_to_load
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ 读取 Schema 目录失败，回退到逐表查询: {e}")
+            catalog_columns = {}
+
+        for table_name, rows in catalog_columns.items():
+            if rows:
+                self.schema_cache[table_name] = self._build_table_info(table_name, rows)
+                self.loaded_tables.add(table_name)
+        tables_to_load = [name for name in tables_to_load if name not in self.loaded_tables]
+
         # 并行加载表结构
         async def load_table_columns(table_name: str):
             """加载单个表的列信息"""
@@ -260,25 +300,7 @@ class SchemaContextRetriever(BaseRetriever):
 
                 if isinstance(columns_result, dict) and columns_result.get('success'):
                     rows = columns_result.get('rows', []) or columns_result.get('data', [])
-                    columns = []
-
-                    for row in rows:
-                        if isinstance(row, dict):
-                            columns.append({
-                                'name': row.get('Field') or row.get('column_name') or row.get('COLUMN_NAME') or '',
-                                'type': row.get('Type') or row.get('column_type') or row.get('DATA_TYPE') or '',
-                                'nullable': row.get('Null') or row.get('IS_NULLABLE'),
-                                'key': row.get('Key') or row.get('COLUMN_KEY'),
-                                'default': row.get('Default'),
-                                'comment': row.get('Comment') or row.get('COLUMN_COMMENT') or '',
-                            })
-
-                    return table_name, {
-                        'table_name': table_name,
-                        'columns': [col for col in columns if col.get('name')],
-                        'table_comment': '',
-                        'table_type': 'TABLE',
-                    }
+                    return table_name, self._build_table_info(table_name, rows)
                 else:
                     logger.warning(f"⚠️ 获取表 {table_name} 列信息失败")
                     return table_name, None
@@ -292,7 +314,7 @@ class SchemaContextRetriever(BaseRetriever):
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # 处理结果
-        loaded_count = 0
+        loaded_count = len(catalog_columns)
         for result in results:
             if isinstance(result, Exception):
                 logger.error(f"❌ 并行查询出错: {result}")
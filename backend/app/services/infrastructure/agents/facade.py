@@ -868,14 +868,25 @@ class StageAwareFacade(LoomAgentFacade):
         
         # 创建Stage-Aware Runtime
         self._stage_aware_runtime: Optional[StageAwareRuntime] = None
+        # 当前运行时绑定的数据源及其连接指纹（带 Schema 上下文的运行时按此复用）
+        self._runtime_connection_key: Optional[Tuple[str, str]] = None
         
         # 阶段结果缓存
         self.stage_results: Dict[str, Any] = {}
         
         logger.info("🎯 [StageAwareFacade] 初始化完成")
     
+    @staticmethod
+    def _build_runtime_key(data_source_id: Any, connection_config: Dict[str, Any]) -> Tuple[str, str]:
+        """数据源ID + 连接指纹，作为 Schema 上下文运行时的复用键"""
+        from app.services.data.connectors.connector_registry import build_connection_fingerprint
+
+        source_type = connection_config.get("source_type") or connection_config.get("type") or ""
+        return str(data_source_id), build_connection_fingerprint(source_type, connection_config)
+
     async def _create_runtime(self) -> LoomAgentRuntime:
         """创建Stage-Aware运行时实例"""
+        self._runtime_connection_key = None
         if self.enable_context_retriever:
             # 创建带上下文检索器的Stage-Aware运行时
             self._stage_aware_runtime = build_stage_aware_runtime(
@@ -932,9 +943,22 @@ class StageAwareFacade(LoomAgentFacade):
         
         # 🔥 优化：优先使用现有的运行时，避免重复创建
         runtime_to_use = self._stage_aware_runtime
-        
+
+        # 每次都重新读取连接配置：数据源被编辑后连接指纹随之变化，旧的 Schema 上下文运行时不再复用
+        connection_config = None
+        runtime_key = None
+        if self.enable_context_retriever:
+            # 设置当前用户ID以便获取正确的数据源配置
+            self._current_user_id = user_id
+            connection_config = await self._get_connection_config(data_source_id)
+            if connection_config:
+                runtime_key = self._build_runtime_key(data_source_id, connection_config)
+
         # 检查是否需要创建新的运行时
-        if not runtime_to_use or self.enable_context_retriever:
+        if runtime_to_use and runtime_key is not None and self._runtime_connection_key == runtime_key:
+            # 同一数据源且连接配置未变：工具、LLM 适配器和检索器不再重复构建
+            logger.info(f"♻️ [StageAwareFacade] 复用数据源 {data_source_id} 的 Schema 上下文运行时")
+        elif not runtime_to_use or self.enable_context_retriever:
             if runtime_to_use:
                 logger.info("♻️ [StageAwareFacade] 使用现有运行时")
             else:
@@ -943,20 +967,12 @@ class StageAwareFacade(LoomAgentFacade):
             if self.enable_context_retriever:
                 logger.info(f"🔍 [StageAwareFacade] 为数据源 {data_source_id} 创建带 Schema 上下文的运行时")
                 try:
-                    # 设置当前用户ID以便获取正确的数据源配置
-                    self._current_user_id = user_id
-                    connection_config = await self._get_connection_config(data_source_id)
-
                     # 🔧 调试日志
                     logger.info(f"🔧 [StageAwareFacade.execute_sql_generation_stage] connection_config 获取结果: {connection_config is not None}")
                     if connection_config:
                         logger.info(f"🔧 [StageAwareFacade.execute_sql_generation_stage] connection_config keys: {list(connection_config.keys())[:5]}")
 
                     if connection_config:
-                        # 🔥 将connection_config临时存储到container，供工具创建使用
-                        setattr(self.container, '_temp_connection_config', connection_config)
-                        logger.info(f"🔧 [StageAwareFacade.execute_sql_generation_stage] 已设置 container._temp_connection_config")
-
                         # 创建并初始化 ContextRetriever
                         context_retriever = create_schema_context_retriever(
                             data_source_id=str(data_source_id),
@@ -966,20 +982,17 @@ class StageAwareFacade(LoomAgentFacade):
                         await context_retriever.initialize()
 
                         # 基于当前配置创建带 ContextRetriever 的 Stage-Aware 运行时
-                        logger.info(f"🔧 [StageAwareFacade.execute_sql_generation_stage] 开始创建 runtime，container._temp_connection_config 存在: {hasattr(self.container, '_temp_connection_config')}")
+                        # 连接配置显式传给工具创建，避免并发请求经由共享的 container 互相覆盖
                         runtime_to_use = build_stage_aware_runtime(
                             container=self.container,
                             config=self.config,
-                            context_retriever=context_retriever
+                            context_retriever=context_retriever,
+                            connection_config=connection_config
                         )
 
-                        # 🔥 清除临时存储
-                        if hasattr(self.container, '_temp_connection_config'):
-                            delattr(self.container, '_temp_connection_config')
-                            logger.info(f"🔧 [StageAwareFacade.execute_sql_generation_stage] 已清除 container._temp_connection_config")
-
                         # 🔥 缓存运行时实例
                         self._stage_aware_runtime = runtime_to_use
+                        self._runtime_connection_key = runtime_key
                         logger.info("✅ [StageAwareFacade] Schema 上下文运行时创建成功并缓存")
                     else:
                         logger.warning(f"⚠️ [StageAwareFacade] 无法获取数据源 {data_source_id} 的连接配置，使用默认运行时")
@@ -989,10 +1002,6 @@ class StageAwareFacade(LoomAgentFacade):
                     logger.warning(f"⚠️ [StageAwareFacade] 创建 Schema 上下文失败: {e}，使用默认运行时")
                     import traceback
                     logger.warning(traceback.format_exc())
-                    # 🔥 确保清除临时存储
-                    if hasattr(self.container, '_temp_connection_config'):
-                        delattr(self.container, '_temp_connection_config')
-                    
                     # 使用默认运行时
                     runtime_to_use = await self._create_runtime()
                     self._stage_aware_runtime = runtime_to_use
@@ -784,12 +784,13 @@ class EnhancedQualityScorer:
             
             logger.debug(f"🔍 [质量评分] 执行验证SQL: {test_sql[:100]}...")
             
-            # 执行查询
-            result = await data_source_service.run_query(
-                connection_config=connection_config,
-                sql=test_sql,
-                limit=10
-            )
+            # 执行查询（经过查询结果缓存，生成阶段已试执行过的SQL不再重复查询）
+            from app.services.data.query.query_result_cache import cached_run_query
+
+            async def _run_query(config: Dict[str, Any], query: str, limit: int) -> Dict[str, Any]:
+                return await data_source_service.run_query(connection_config=config, sql=query, limit=limit)
+
+            result = await cached_run_query(_run_query, connection_config, test_sql, 10)
             
             return result
             
@@ -467,12 +467,10 @@ class ToolInstanceCache:
         }
 
         if connection_config and tool_name in tools_requiring_connection:
-            # 基于连接配置生成键 - 使用实际的字段名
-            host = connection_config.get('fe_hosts', [''])[0] if connection_config.get('fe_hosts') else ''
-            port = connection_config.get('http_port', '')
-            database = connection_config.get('name', '')
-            config_key = f"{host}:{port}:{database}"
-            return f"{tool_name}:{config_key}"
+            # 基于连接指纹生成键：同一集群上的不同库/账号不能共用工具实例
+            from .tools.schema.catalog import build_catalog_key
+
+            return f"{tool_name}:{build_catalog_key(connection_config)}"
         else:
             # 🔥 对于不需要connection_config的工具，统一使用default键
             return f"{tool_name}:default"
@@ -515,13 +513,18 @@ class ToolInstanceCache:
 _tool_cache = ToolInstanceCache()
 
 
-def _create_tools_from_config(container: Any, config: AgentConfig) -> List[BaseTool]:
+def _create_tools_from_config(
+    container: Any,
+    config: AgentConfig,
+    connection_config: Optional[Dict[str, Any]] = None,
+) -> List[BaseTool]:
     """
     根据配置自动创建工具实例
 
     Args:
         container: 服务容器
         config: Agent 配置
+        connection_config: 数据源连接配置，传给需要连接的工具
 
     Returns:
         工具实例列表
@@ -529,9 +532,6 @@ def _create_tools_from_config(container: Any, config: AgentConfig) -> List[BaseT
     tools = []
     enabled_tools = config.tools.enabled_tools if hasattr(config.tools, 'enabled_tools') else []
 
-    # 🔥 从container中读取临时存储的connection_config
-    connection_config = getattr(container, '_temp_connection_config', None)
-
     # 🔧 调试日志
     logger.info(f"🔧 [ToolRegistry] connection_config 可用: {connection_config is not None}")
     if connection_config:
@@ -1915,6 +1915,7 @@ def build_default_runtime(
     additional_tools: Optional[List[BaseTool]] = None,
     llm: Optional[BaseLLM] = None,
     context_retriever: Optional[SchemaContextRetriever] = None,
+    connection_config: Optional[Dict[str, Any]] = None,
 ) -> LoomAgentRuntime:
     """
     构建默认运行时
@@ -1925,6 +1926,7 @@ def build_default_runtime(
         additional_tools: 额外工具
         llm: LLM 实例
         context_retriever: 上下文检索器
+        connection_config: 数据源连接配置（显式传入，不经过共享的 container）
 
     Returns:
         LoomAgentRuntime 实例
@@ -1940,7 +1942,7 @@ def build_default_runtime(
         llm = create_llm_adapter(container)
 
     # 🔥 构建工具列表 - 从配置自动创建
-    tools = _create_tools_from_config(container, config)
+    tools = _create_tools_from_config(container, config, connection_config)
     if additional_tools:
         tools.extend(additional_tools)
         logger.info(f"➕ [ToolRegistry] 添加额外工具: {len(additional_tools)} 个")
@@ -2342,6 +2344,7 @@ def build_stage_aware_runtime(
     additional_tools: Optional[List[BaseTool]] = None,
     llm: Optional[BaseLLM] = None,
     context_retriever: Optional[SchemaContextRetriever] = None,
+    connection_config: Optional[Dict[str, Any]] = None,
     stage_config_manager: Optional[StageConfigManager] = None,
 ) -> StageAwareRuntime:
     """
@@ -2353,6 +2356,7 @@ def build_stage_aware_runtime(
         additional_tools: 额外工具
         llm: LLM 实例
         context_retriever: 上下文检索器
+        connection_config: 数据源连接配置（显式传入，不经过共享的 container）
         stage_config_manager: 阶段配置管理器
 
     Returns:
@@ -2369,7 +2373,7 @@ def build_stage_aware_runtime(
         llm = create_llm_adapter(container)
 
     # 🔥 构建工具列表 - 从配置自动创建
-    tools = _create_tools_from_config(container, config)
+    tools = _create_tools_from_config(container, config, connection_config)
     if additional_tools:
         tools.extend(additional_tools)
         logger.info(f"➕ [ToolRegistry] 添加额外工具: {len(additional_tools)} 个")
@@ -14,10 +14,21 @@ import math
 from typing import Any, Dict, List, Optional, Union, Literal
 from dataclasses import dataclass
 from enum import Enum
+import numpy as np
 from pydantic import BaseModel, Field
 
 
 from ...types import ToolCategory, ContextInfo
+from ..data.stats_kernel import (
+    ColumnarStats,
+    detect_change_points,
+    detect_periodicity,
+    entropy,
+    gini,
+    linear_trend,
+    to_numeric_array,
+    volatility,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -128,8 +139,6 @@ class ChartAnalyzerTool(BaseTool):
         }
     
     async def run(
-
-    
         self,
         chart_data: Dict[str, Any],
         chart_config: Optional[Dict[str, Any]] = None,
@@ -137,9 +146,6 @@ class ChartAnalyzerTool(BaseTool):
         sensitivity: float = 0.5,
         include_recommendations: bool = True,
         **kwargs
-    
-
-    
     ) -> Dict[str, Any]:
         """
         执行图表分析
@@ -156,15 +162,6 @@ class ChartAnalyzerTool(BaseTool):
         """
         logger.info(f"🔍 [ChartAnalyzerTool] 分析图表")
         logger.info(f"   分析重点: {analysis_focus}")
-
-    
-    async def execute(self, **kwargs) -> Dict[str, Any]:
-
-    
-        """向后兼容的execute方法"""
-
-    
-        return await self.run(**kwargs)
         logger.info(f"   敏感度: {sensitivity}")
         
         try:
@@ -234,6 +231,10 @@ class ChartAnalyzerTool(BaseTool):
                 "error": str(e),
                 "result": None
             }
+
+    async def execute(self, **kwargs) -> Dict[str, Any]:
+        """向后兼容的execute方法"""
+        return await self.run(**kwargs)
     
     async def _perform_analysis(
         self,
@@ -270,27 +271,28 @@ class ChartAnalyzerTool(BaseTool):
         metrics = {}
         recommendations = []
         
-        # 分析数据模式
+        # 分析数据模式（只转换一次为数组，各项指标共用）
         values = self._extract_values(chart_data)
+        array = np.asarray(values, dtype=np.float64)
         
         if values:
             # 检查周期性
-            periodicity = self._detect_periodicity(values)
+            periodicity = self._detect_periodicity(array)
             if periodicity > 0:
                 findings.append(f"检测到周期性模式，周期长度: {periodicity}")
                 metrics["periodicity"] = periodicity
             
             # 检查单调性
-            monotonicity = self._detect_monotonicity(values)
+            monotonicity = self._detect_monotonicity(array)
             if monotonicity != "none":
                 findings.append(f"检测到{monotonicity}单调模式")
                 metrics["monotonicity"] = monotonicity
             
             # 检查波动性
-            volatility = self._calculate_volatility(values)
-            metrics["volatility"] = volatility
+            volatility_value = self._calculate_volatility(array)
+            metrics["volatility"] = volatility_value
             
-            if volatility > config.sensitivity:
+            if volatility_value > config.sensitivity:
                 findings.append("数据波动性较大")
                 recommendations.append("考虑使用平滑技术减少噪声")
             else:
@@ -322,7 +324,7 @@ class ChartAnalyzerTool(BaseTool):
         metrics = {}
         recommendations = []
         
-        values = self._extract_values(chart_data)
+        values = np.asarray(self._extract_values(chart_data), dtype=np.float64)
         
         if len(values) >= 3:
             # 计算趋势
@@ -374,7 +376,7 @@ class ChartAnalyzerTool(BaseTool):
         metrics = {}
         recommendations = []
         
-        values = self._extract_values(chart_data)
+        values = np.asarray(self._extract_values(chart_data), dtype=np.float64)
         
         if len(values) >= 4:
             # 检测异常值
@@ -416,6 +418,7 @@ class ChartAnalyzerTool(BaseTool):
         
         if len(series) >= 2:
             correlations = []
+            matrices = self._series_correlation_matrices(series)
             
             for i in range(len(series)):
                 for j in range(i + 1, len(series)):
@@ -423,7 +426,7 @@ class ChartAnalyzerTool(BaseTool):
                     series2_values = series[j].get("data", [])
                     
                     if len(series1_values) == len(series2_values) and len(series1_values) > 1:
-                        correlation = self._calculate_correlation(series1_values, series2_values)
+                        correlation = matrices[len(series1_values)][str(i)][str(j)]
                         correlations.append({
                             "series1": series[i].get("name", f"Series {i}"),
                             "series2": series[j].get("name", f"Series {j}"),
@@ -460,9 +463,9 @@ class ChartAnalyzerTool(BaseTool):
         metrics = {}
         recommendations = []
         
-        values = self._extract_values(chart_data)
+        values = np.asarray(self._extract_values(chart_data), dtype=np.float64)
         
-        if values:
+        if len(values):
             # 分析分布特征
             distribution_info = self._analyze_distribution_features(values)
             metrics["distribution"] = distribution_info
@@ -582,41 +585,17 @@ class ChartAnalyzerTool(BaseTool):
     
     def _detect_periodicity(self, values: List[float]) -> int:
         """检测周期性"""
-        if len(values) < 6:
-            return 0
-        
-        # 简化的周期性检测
-        n = len(values)
-        max_period = min(n // 2, 20)  # 最大周期长度
-        
-        best_period = 0
-        best_score = 0
-        
-        for period in range(2, max_period + 1):
-            score = 0
-            for i in range(period, n):
-                if abs(values[i] - values[i - period]) < 0.1:  # 简化的相似性检查
-                    score += 1
-            
-            if score > best_score:
-                best_score = score
-                best_period = period
-        
-        return best_period if best_score > len(values) * 0.3 else 0
+        # 简化的周期性检测：滞后差值小于 0.1 视为相似
+        return detect_periodicity(np.asarray(values, dtype=np.float64), max_period=20, tolerance=0.1)
     
     def _detect_monotonicity(self, values: List[float]) -> str:
         """检测单调性"""
         if len(values) < 2:
             return "none"
         
-        increasing_count = 0
-        decreasing_count = 0
-        
-        for i in range(1, len(values)):
-            if values[i] > values[i - 1]:
-                increasing_count += 1
-            elif values[i] < values[i - 1]:
-                decreasing_count += 1
+        diffs = np.diff(np.asarray(values, dtype=np.float64))
+        increasing_count = int(np.count_nonzero(diffs > 0))
+        decreasing_count = int(np.count_nonzero(diffs < 0))
         
         total_changes = increasing_count + decreasing_count
         if total_changes == 0:
@@ -634,14 +613,7 @@ class ChartAnalyzerTool(BaseTool):
     
     def _calculate_volatility(self, values: List[float]) -> float:
         """计算波动性"""
-        if len(values) < 2:
-            return 0.0
-        
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        std = math.sqrt(variance)
-        
-        return std / mean if mean != 0 else 0.0
+        return volatility(np.asarray(values, dtype=np.float64))
     
     def _analyze_category_distribution(self, categories: List[str], values: List[float]) -> Dict[str, Any]:
         """分析分类分布"""
@@ -670,47 +642,17 @@ class ChartAnalyzerTool(BaseTool):
     
     def _calculate_entropy(self, values: List[float]) -> float:
         """计算熵"""
-        if not values:
-            return 0.0
-        
-        total = sum(values)
-        if total == 0:
-            return 0.0
-        
-        entropy = 0.0
-        for value in values:
-            if value > 0:
-                p = value / total
-                entropy -= p * math.log2(p)
-        
-        return entropy
+        return entropy(np.asarray(values, dtype=np.float64))
     
     def _calculate_trend(self, values: List[float]) -> Dict[str, Any]:
         """计算趋势"""
         if len(values) < 2:
             return {"direction": "stable", "strength": 0.0}
         
-        n = len(values)
-        x_values = list(range(n))
-        
-        # 计算线性回归
-        mean_x = sum(x_values) / n
-        mean_y = sum(values) / n
-        
-        numerator = sum((x - mean_x) * (y - mean_y) for x, y in zip(x_values, values))
-        denominator = sum((x - mean_x) ** 2 for x in x_values)
-        
-        if denominator == 0:
-            slope = 0
-        else:
-            slope = numerator / denominator
-        
-        # 计算R²
-        y_pred = [mean_y + slope * (x - mean_x) for x in x_values]
-        ss_res = sum((y - pred) ** 2 for y, pred in zip(values, y_pred))
-        ss_tot = sum((y - mean_y) ** 2 for y in values)
-        
-        r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
+        # 线性回归
+        fit = linear_trend(np.asarray(values, dtype=np.float64))
+        slope = fit["slope"]
+        r_squared = fit["r_squared"]
         
         # 确定趋势方向
         if slope > 0.01:
@@ -729,22 +671,8 @@ class ChartAnalyzerTool(BaseTool):
     
     def _detect_change_points(self, values: List[float]) -> List[int]:
         """检测变化点"""
-        if len(values) < 5:
-            return []
-        
-        change_points = []
-        
-        # 简化的变化点检测
-        for i in range(2, len(values) - 2):
-            # 计算前后窗口的平均值
-            before_avg = sum(values[i-2:i]) / 2
-            after_avg = sum(values[i:i+2]) / 2
-            
-            # 检查是否有显著变化
-            if abs(after_avg - before_avg) > 2 * self._calculate_volatility(values[:i]):
-                change_points.append(i)
-        
-        return change_points
+        # 前后各 2 个点的均值差超过此前数据波动性 2 倍即视为变化点
+        return detect_change_points(np.asarray(values, dtype=np.float64), window=2)
     
     def _predict_trend(self, values: List[float]) -> Dict[str, Any]:
         """预测趋势"""
@@ -765,64 +693,55 @@ class ChartAnalyzerTool(BaseTool):
         if len(values) < 4:
             return []
         
-        # 使用IQR方法
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        
-        q1 = sorted_values[int(n * 0.25)]
-        q3 = sorted_values[int(n * 0.75)]
-        iqr = q3 - q1
-        
-        # 根据敏感度调整阈值
+        # 使用IQR方法，根据敏感度调整阈值
         threshold = 1.5 + (1 - sensitivity) * 1.0
-        
-        lower_bound = q1 - threshold * iqr
-        upper_bound = q3 + threshold * iqr
-        
-        outliers = [x for x in values if x < lower_bound or x > upper_bound]
-        return outliers
+        stats = ColumnarStats({"values": values})
+        return stats.outliers("values", "iqr", threshold).tolist()
     
     def _calculate_correlation(self, values1: List[float], values2: List[float]) -> float:
         """计算相关系数"""
         if len(values1) != len(values2) or len(values1) < 2:
             return 0.0
         
-        n = len(values1)
-        mean1 = sum(values1) / n
-        mean2 = sum(values2) / n
-        
-        numerator = sum((x - mean1) * (y - mean2) for x, y in zip(values1, values2))
-        denominator = math.sqrt(sum((x - mean1) ** 2 for x in values1) * sum((y - mean2) ** 2 for y in values2))
-        
-        if denominator == 0:
-            return 0.0
+        stats = ColumnarStats({"x": values1, "y": values2})
+        return stats.correlation_matrix(["x", "y"])["x"]["y"]
+    
+    def _series_correlation_matrices(self, series: List[Dict[str, Any]]) -> Dict[int, Dict[str, Dict[str, float]]]:
+        """按数据长度分组，每组一次计算完整相关系数矩阵（列名为系列下标）"""
+        groups: Dict[int, Dict[str, np.ndarray]] = {}
+        for index, s in enumerate(series):
+            data = s.get("data", [])
+            if len(data) > 1:
+                groups.setdefault(len(data), {})[str(index)] = self._series_values(data)
         
-        return numerator / denominator
+        return {
+            length: ColumnarStats(columns).correlation_matrix(list(columns))
+            for length, columns in groups.items()
+            if len(columns) >= 2
+        }
+    
+    def _series_values(self, data: List[Any]) -> np.ndarray:
+        """系列数据转数值数组，[x, y] 格式取 y，无法转换的值为 NaN"""
+        return to_numeric_array([
+            item[1] if isinstance(item, (list, tuple)) and len(item) >= 2 else item
+            for item in data
+        ])
     
     def _analyze_distribution_features(self, values: List[float]) -> Dict[str, Any]:
         """分析分布特征"""
         if len(values) < 3:
             return {}
         
-        n = len(values)
-        mean = sum(values) / n
-        
-        # 计算偏度
-        variance = sum((x - mean) ** 2 for x in values) / n
-        std = math.sqrt(variance)
-        
-        if std == 0:
-            skewness = 0
-            kurtosis = 0
-        else:
-            skewness = sum(((x - mean) / std) ** 3 for x in values) / n
-            kurtosis = sum(((x - mean) / std) ** 4 for x in values) / n
+        stats = ColumnarStats({"values": values}).describe("values")
+        std = float(np.sqrt(stats["variance"] * (stats["count"] - 1) / stats["count"]))
+        skewness = stats["population_skewness"]
+        kurtosis = stats["population_kurtosis"]
         
         # 简化的正态性检验
         is_normal = abs(skewness) < 0.5 and abs(kurtosis - 3) < 0.5
         
         return {
-            "mean": mean,
+            "mean": stats["mean"],
             "std": std,
             "skewness": skewness,
             "kurtosis": kurtosis,
@@ -830,28 +749,8 @@ class ChartAnalyzerTool(BaseTool):
         }
     
     def _calculate_concentration(self, values: List[float]) -> float:
-        """计算集中度"""
-        if not values:
-            return 0.0
-        
-        total = sum(values)
-        if total == 0:
-            return 0.0
-        
-        # 计算基尼系数
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        
-        cumsum = 0
-        gini = 0
-        
-        for i, value in enumerate(sorted_values):
-            cumsum += value
-            gini += (2 * (i + 1) - n - 1) * value
-        
-        gini = gini / (n * total)
-        
-        return gini
+        """计算集中度（基尼系数）"""
+        return gini(np.asarray(values, dtype=np.float64))
     
     def _analyze_chart_config(self, chart_config: Dict[str, Any]) -> Dict[str, Any]:
         """分析图表配置"""
@@ -23,6 +23,8 @@ from .analyzer import (
     create_data_analyzer_tool
 )
 
+from .stats_kernel import ColumnarStats
+
 # 导出
 __all__ = [
     # Sampler
@@ -41,4 +43,7 @@ __all__ = [
     "AnalysisResult",
     "ComprehensiveAnalysisReport",
     "create_data_analyzer_tool",
+
+    # Stats kernel
+    "ColumnarStats",
 ]
\ No newline at end of file
@@ -10,8 +10,6 @@ from loom.interfaces.tool import BaseTool
 
 
 import logging
-import math
-import statistics
 from typing import Any, Dict, List, Optional, Union, Tuple, Literal
 from dataclasses import dataclass
 from enum import Enum
@@ -19,6 +17,7 @@ from pydantic import BaseModel, Field
 
 
 from ...types import ToolCategory, ContextInfo
+from .stats_kernel import ColumnarStats
 
 logger = logging.getLogger(__name__)
 
@@ -140,8 +139,6 @@ class DataAnalyzerTool(BaseTool):
         }
     
     async def run(
-
-    
         self,
         data: List[Dict[str, Any]],
         analysis_types: Optional[List[str]] = None,
@@ -151,9 +148,6 @@ class DataAnalyzerTool(BaseTool):
         correlation_method: str = "pearson",
         generate_insights: bool = True,
         **kwargs
-    
-
-    
     ) -> Dict[str, Any]:
         """
         执行数据分析
@@ -172,15 +166,6 @@ class DataAnalyzerTool(BaseTool):
         """
         logger.info(f"📈 [DataAnalyzerTool] 开始分析")
         logger.info(f"   数据行数: {len(data)}")
-
-    
-    async def execute(self, **kwargs) -> Dict[str, Any]:
-
-    
-        """向后兼容的execute方法"""
-
-    
-        return await self.run(**kwargs)
         logger.info(f"   分析类型: {analysis_types}")
         
         try:
@@ -207,13 +192,16 @@ class DataAnalyzerTool(BaseTool):
             if target_columns is None:
                 target_columns = list(data[0].keys()) if data else []
             
+            # 列数据只转换一次，各项分析共用同一份数组和统计缓存
+            stats = ColumnarStats.from_rows(data, target_columns)
+
             # 执行分析
             results = {}
             insights = []
             recommendations = []
             
             for analysis_type in config.analysis_types:
-                result = await self._perform_analysis(data, analysis_type, target_columns, config)
+                result = await self._perform_analysis(data, analysis_type, target_columns, config, stats)
                 results[analysis_type.value] = result.results
                 insights.extend(result.insights)
                 recommendations.extend(result.recommendations)
@@ -250,24 +238,32 @@ class DataAnalyzerTool(BaseTool):
                 "result": None
             }
     
+    async def execute(self, **kwargs) -> Dict[str, Any]:
+        """向后兼容的execute方法"""
+        return await self.run(**kwargs)
+
     async def _perform_analysis(
         self,
         data: List[Dict[str, Any]],
         analysis_type: AnalysisType,
         target_columns: List[str],
-        config: AnalysisConfig
+        config: AnalysisConfig,
+        stats: Optional[ColumnarStats] = None
     ) -> AnalysisResult:
         """执行特定类型的分析"""
+        if stats is None:
+            stats = ColumnarStats.from_rows(data, target_columns)
+
         if analysis_type == AnalysisType.DESCRIPTIVE:
-            return self._descriptive_analysis(data, target_columns)
+            return self._descriptive_analysis(data, target_columns, stats)
         elif analysis_type == AnalysisType.CORRELATION:
-            return self._correlation_analysis(data, target_columns, config)
+            return self._correlation_analysis(target_columns, config, stats)
         elif analysis_type == AnalysisType.DISTRIBUTION:
-            return self._distribution_analysis(data, target_columns)
+            return self._distribution_analysis(target_columns, stats)
         elif analysis_type == AnalysisType.OUTLIER:
-            return self._outlier_analysis(data, target_columns, config)
+            return self._outlier_analysis(target_columns, config, stats)
         elif analysis_type == AnalysisType.TREND:
-            return self._trend_analysis(data, target_columns)
+            return self._trend_analysis(target_columns, stats)
         elif analysis_type == AnalysisType.PATTERN:
             return self._pattern_analysis(data, target_columns)
         else:
@@ -278,44 +274,42 @@ class DataAnalyzerTool(BaseTool):
                 recommendations=[]
             )
     
-    def _descriptive_analysis(self, data: List[Dict[str, Any]], target_columns: List[str]) -> AnalysisResult:
+    def _descriptive_analysis(self, data: List[Dict[str, Any]], target_columns: List[str], stats: ColumnarStats) -> AnalysisResult:
         """描述性统计分析"""
         results = {}
         insights = []
         recommendations = []
         
         for column in target_columns:
-            values = self._extract_column_values(data, column)
-            numeric_values = self._convert_to_numeric(values)
+            column_stats = self._numeric_statistics(stats, column)
             
-            if numeric_values:
-                stats = self._calculate_numeric_statistics(numeric_values)
-                results[column] = stats
+            if column_stats:
+                results[column] = column_stats
                 
                 # 生成洞察
-                if stats.get("std", 0) > stats.get("mean", 0) * 0.5:
+                if column_stats.get("std", 0) > column_stats.get("mean", 0) * 0.5:
                     insights.append(f"列 '{column}' 的数据变异性较大")
                 
-                if stats.get("skewness", 0) > 1:
+                if column_stats.get("skewness", 0) > 1:
                     insights.append(f"列 '{column}' 呈正偏态分布")
-                elif stats.get("skewness", 0) < -1:
+                elif column_stats.get("skewness", 0) < -1:
                     insights.append(f"列 '{column}' 呈负偏态分布")
                 
                 # 生成建议
-                if stats.get("null_percentage", 0) > 20:
+                if column_stats.get("null_percentage", 0) > 20:
                     recommendations.append(f"列 '{column}' 缺失值较多，建议检查数据质量")
                 
-                if stats.get("unique_percentage", 0) > 90:
+                if column_stats.get("unique_percentage", 0) > 90:
                     recommendations.append(f"列 '{column}' 唯一值比例很高，可能是标识符")
             else:
                 # 分类数据统计
-                stats = self._calculate_categorical_statistics(values)
-                results[column] = stats
+                column_stats = self._calculate_categorical_statistics(self._extract_column_values(data, column))
+                results[column] = column_stats
                 
-                if stats.get("unique_count", 0) < 10:
-                    insights.append(f"列 '{column}' 是分类变量，有 {stats['unique_count']} 个类别")
+                if column_stats.get("unique_count", 0) < 10:
+                    insights.append(f"列 '{column}' 是分类变量，有 {column_stats['unique_count']} 个类别")
                 
-                if stats.get("most_common_percentage", 0) > 80:
+                if column_stats.get("most_common_percentage", 0) > 80:
                     recommendations.append(f"列 '{column}' 存在主导类别，可能影响分析结果")
         
         return AnalysisResult(
@@ -325,19 +319,14 @@ class DataAnalyzerTool(BaseTool):
             recommendations=recommendations
         )
     
-    def _correlation_analysis(self, data: List[Dict[str, Any]], target_columns: List[str], config: AnalysisConfig) -> AnalysisResult:
+    def _correlation_analysis(self, target_columns: List[str], config: AnalysisConfig, stats: ColumnarStats) -> AnalysisResult:
         """相关性分析"""
         results = {}
         insights = []
         recommendations = []
         
         # 提取数值列
-        numeric_columns = []
-        for column in target_columns:
-            values = self._extract_column_values(data, column)
-            numeric_values = self._convert_to_numeric(values)
-            if numeric_values and len(numeric_values) > 1:
-                numeric_columns.append(column)
+        numeric_columns = [column for column in target_columns if len(stats.values(column)) > 1]
         
         if len(numeric_columns) < 2:
             insights.append("数值列不足，无法进行相关性分析")
@@ -348,18 +337,8 @@ class DataAnalyzerTool(BaseTool):
                 recommendations=recommendations
             )
         
-        # 计算相关性矩阵
-        correlation_matrix = {}
-        for col1 in numeric_columns:
-            correlation_matrix[col1] = {}
-            values1 = self._convert_to_numeric(self._extract_column_values(data, col1))
-            
-            for col2 in numeric_columns:
-                values2 = self._convert_to_numeric(self._extract_column_values(data, col2))
-                
-                if len(values1) == len(values2):
-                    correlation = self._calculate_correlation(values1, values2, config.correlation_method)
-                    correlation_matrix[col1][col2] = correlation
+        # 一次计算完整相关性矩阵（缺失值按成对完整观测处理）
+        correlation_matrix = stats.correlation_matrix(numeric_columns, config.correlation_method)
         
         results["correlation_matrix"] = correlation_matrix
         results["numeric_columns"] = numeric_columns
@@ -389,18 +368,17 @@ class DataAnalyzerTool(BaseTool):
             recommendations=recommendations
         )
     
-    def _distribution_analysis(self, data: List[Dict[str, Any]], target_columns: List[str]) -> AnalysisResult:
+    def _distribution_analysis(self, target_columns: List[str], stats: ColumnarStats) -> AnalysisResult:
         """分布分析"""
         results = {}
         insights = []
         recommendations = []
         
         for column in target_columns:
-            values = self._extract_column_values(data, column)
-            numeric_values = self._convert_to_numeric(values)
+            column_stats = self._numeric_statistics(stats, column)
             
-            if numeric_values:
-                distribution_info = self._analyze_distribution(numeric_values)
+            if column_stats:
+                distribution_info = self._analyze_distribution(column_stats)
                 results[column] = distribution_info
                 
                 # 分析分布特征
@@ -423,22 +401,21 @@ class DataAnalyzerTool(BaseTool):
             recommendations=recommendations
         )
     
-    def _outlier_analysis(self, data: List[Dict[str, Any]], target_columns: List[str], config: AnalysisConfig) -> AnalysisResult:
+    def _outlier_analysis(self, target_columns: List[str], config: AnalysisConfig, stats: ColumnarStats) -> AnalysisResult:
         """异常值分析"""
         results = {}
         insights = []
         recommendations = []
         
         for column in target_columns:
-            values = self._extract_column_values(data, column)
-            numeric_values = self._convert_to_numeric(values)
+            numeric_values = stats.values(column)
             
-            if numeric_values and len(numeric_values) > 4:
-                outliers = self._detect_outliers(numeric_values, config.outlier_method)
+            if len(numeric_values) > 4:
+                outliers = stats.outliers(column, config.outlier_method)
                 outlier_info = {
                     "outlier_count": len(outliers),
                     "outlier_percentage": len(outliers) / len(numeric_values) * 100,
-                    "outlier_values": outliers[:10],  # 只显示前10个
+                    "outlier_values": outliers[:10].tolist(),  # 只显示前10个
                     "method": config.outlier_method
                 }
                 results[column] = outlier_info
@@ -456,7 +433,7 @@ class DataAnalyzerTool(BaseTool):
             recommendations=recommendations
         )
     
-    def _trend_analysis(self, data: List[Dict[str, Any]], target_columns: List[str]) -> AnalysisResult:
+    def _trend_analysis(self, target_columns: List[str], stats: ColumnarStats) -> AnalysisResult:
         """趋势分析"""
         results = {}
         insights = []
@@ -464,11 +441,8 @@ class DataAnalyzerTool(BaseTool):
         
         # 简化实现，假设数据按时间顺序排列
         for column in target_columns:
-            values = self._extract_column_values(data, column)
-            numeric_values = self._convert_to_numeric(values)
-            
-            if numeric_values and len(numeric_values) > 2:
-                trend_info = self._analyze_trend(numeric_values)
+            if len(stats.values(column)) > 2:
+                trend_info = self._analyze_trend(stats.trend(column))
                 results[column] = trend_info
                 
                 if trend_info.get("trend", "stable") == "increasing":
@@ -525,50 +499,13 @@ class DataAnalyzerTool(BaseTool):
                 values.append(row[column])
         return values
     
-    def _convert_to_numeric(self, values: List[Any]) -> List[float]:
-        """转换为数值"""
-        numeric_values = []
-        for value in values:
-            if value is None:
-                continue
-            try:
-                numeric_values.append(float(str(value)))
-            except (ValueError, TypeError):
-                continue
-        return numeric_values
-    
-    def _calculate_numeric_statistics(self, values: List[float]) -> Dict[str, Any]:
-        """计算数值统计量"""
-        if not values:
-            return {}
-        
-        stats = {
-            "count": len(values),
-            "mean": statistics.mean(values),
-            "median": statistics.median(values),
-            "std": statistics.stdev(values) if len(values) > 1 else 0,
-            "variance": statistics.variance(values) if len(values) > 1 else 0,
-            "min": min(values),
-            "max": max(values),
-            "range": max(values) - min(values),
-            "null_count": 0,
-            "null_percentage": 0,
-            "unique_count": len(set(values)),
-            "unique_percentage": len(set(values)) / len(values) * 100
+    def _numeric_statistics(self, stats: ColumnarStats, column: str) -> Dict[str, Any]:
+        """数值统计量（总体矩仅供图表分析使用，不输出）"""
+        column_stats = stats.describe(column)
+        return {
+            key: value for key, value in column_stats.items()
+            if key not in ("population_skewness", "population_kurtosis")
         }
-        
-        # 计算分位数
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        stats["q25"] = sorted_values[int(n * 0.25)] if n > 0 else 0
-        stats["q75"] = sorted_values[int(n * 0.75)] if n > 0 else 0
-        
-        # 计算偏度和峰度
-        if len(values) > 2:
-            stats["skewness"] = self._calculate_skewness(values)
-            stats["kurtosis"] = self._calculate_kurtosis(values)
-        
-        return stats
     
     def _calculate_categorical_statistics(self, values: List[Any]) -> Dict[str, Any]:
         """计算分类统计量"""
@@ -601,47 +538,11 @@ class DataAnalyzerTool(BaseTool):
         
         return stats
     
-    def _calculate_correlation(self, values1: List[float], values2: List[float], method: str) -> float:
-        """计算相关性"""
-        if len(values1) != len(values2) or len(values1) < 2:
-            return 0.0
-        
-        if method == "pearson":
-            return self._pearson_correlation(values1, values2)
-        elif method == "spearman":
-            return self._spearman_correlation(values1, values2)
-        else:
-            return self._pearson_correlation(values1, values2)
-    
-    def _pearson_correlation(self, values1: List[float], values2: List[float]) -> float:
-        """皮尔逊相关系数"""
-        n = len(values1)
-        if n < 2:
-            return 0.0
-        
-        mean1 = statistics.mean(values1)
-        mean2 = statistics.mean(values2)
-        
-        numerator = sum((x - mean1) * (y - mean2) for x, y in zip(values1, values2))
-        denominator = math.sqrt(sum((x - mean1) ** 2 for x in values1) * sum((y - mean2) ** 2 for y in values2))
-        
-        if denominator == 0:
-            return 0.0
-        
-        return numerator / denominator
-    
-    def _spearman_correlation(self, values1: List[float], values2: List[float]) -> float:
-        """斯皮尔曼相关系数"""
-        # 简化实现，使用皮尔逊相关系数
-        return self._pearson_correlation(values1, values2)
-    
-    def _analyze_distribution(self, values: List[float]) -> Dict[str, Any]:
+    def _analyze_distribution(self, stats: Dict[str, Any]) -> Dict[str, Any]:
         """分析分布"""
-        if not values:
+        if not stats:
             return {}
         
-        stats = self._calculate_numeric_statistics(values)
-        
         # 简化的正态性检验
         skewness = abs(stats.get("skewness", 0))
         kurtosis = abs(stats.get("kurtosis", 0))
@@ -655,112 +556,24 @@ class DataAnalyzerTool(BaseTool):
             "distribution_type": "normal" if is_normal else "non-normal"
         }
     
-    def _detect_outliers(self, values: List[float], method: str) -> List[float]:
-        """检测异常值"""
-        if len(values) < 4:
-            return []
-        
-        if method == "iqr":
-            return self._iqr_outliers(values)
-        elif method == "zscore":
-            return self._zscore_outliers(values)
-        else:
-            return self._iqr_outliers(values)
-    
-    def _iqr_outliers(self, values: List[float]) -> List[float]:
-        """IQR方法检测异常值"""
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        
-        q1 = sorted_values[int(n * 0.25)]
-        q3 = sorted_values[int(n * 0.75)]
-        iqr = q3 - q1
-        
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
-        
-        outliers = [x for x in values if x < lower_bound or x > upper_bound]
-        return outliers
-    
-    def _zscore_outliers(self, values: List[float]) -> List[float]:
-        """Z-score方法检测异常值"""
-        if len(values) < 2:
-            return []
-        
-        mean = statistics.mean(values)
-        std = statistics.stdev(values)
-        
-        if std == 0:
-            return []
-        
-        outliers = [x for x in values if abs((x - mean) / std) > 2]
-        return outliers
-    
-    def _analyze_trend(self, values: List[float]) -> Dict[str, Any]:
+    def _analyze_trend(self, trend: Dict[str, float]) -> Dict[str, Any]:
         """分析趋势"""
-        if len(values) < 2:
-            return {"trend": "insufficient_data"}
-        
-        # 简单的线性趋势分析
-        n = len(values)
-        x_values = list(range(n))
-        
-        # 计算斜率
-        mean_x = statistics.mean(x_values)
-        mean_y = statistics.mean(values)
-        
-        numerator = sum((x - mean_x) * (y - mean_y) for x, y in zip(x_values, values))
-        denominator = sum((x - mean_x) ** 2 for x in x_values)
-        
-        if denominator == 0:
-            slope = 0
-        else:
-            slope = numerator / denominator
+        slope = trend["slope"]
         
         # 判断趋势
         if slope > 0.01:
-            trend = "increasing"
+            direction = "increasing"
         elif slope < -0.01:
-            trend = "decreasing"
+            direction = "decreasing"
         else:
-            trend = "stable"
+            direction = "stable"
         
         return {
-            "trend": trend,
+            "trend": direction,
             "slope": slope,
             "strength": abs(slope)
         }
     
-    def _calculate_skewness(self, values: List[float]) -> float:
-        """计算偏度"""
-        if len(values) < 3:
-            return 0.0
-        
-        mean = statistics.mean(values)
-        std = statistics.stdev(values)
-        
-        if std == 0:
-            return 0.0
-        
-        n = len(values)
-        skewness = (n / ((n - 1) * (n - 2))) * sum(((x - mean) / std) ** 3 for x in values)
-        return skewness
-    
-    def _calculate_kurtosis(self, values: List[float]) -> float:
-        """计算峰度"""
-        if len(values) < 4:
-            return 0.0
-        
-        mean = statistics.mean(values)
-        std = statistics.stdev(values)
-        
-        if std == 0:
-            return 0.0
-        
-        n = len(values)
-        kurtosis = (n * (n + 1) / ((n - 1) * (n - 2) * (n - 3))) * sum(((x - mean) / std) ** 4 for x in values) - (3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
-        return kurtosis
-    
     def _generate_data_summary(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """生成数据摘要"""
         if not data:
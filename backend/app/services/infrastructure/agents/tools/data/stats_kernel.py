@@ -0,0 +1,341 @@
+"""
+列式统计内核
+
+DataAnalyzerTool 与 ChartAnalyzerTool 共用的 NumPy 统计实现：
+- 列数据只转换一次为 float64 数组（缺失/非数值为 NaN），有效值、排序结果和中心矩按列缓存
+- describe 一次排序、一次求矩即得到全部描述统计量
+- 相关系数一次计算完整矩阵（pearson/spearman），存在缺失值时按成对完整观测计算
+- 支持行数据、列数据与 pandas DataFrame 输入（pandas 为可选依赖）
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+def _coerce(value: Any) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(str(value))
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def to_numeric_array(values: Iterable[Any]) -> np.ndarray:
+    """转换为 float64 数组，None 与无法转换为数值的值为 NaN"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iuf":
+        return values.astype(np.float64, copy=False)
+    values = values if isinstance(values, (list, tuple, np.ndarray)) else list(values)
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        # 混有 None、文本或日期等对象时逐值转换
+        return np.fromiter((_coerce(v) for v in values), dtype=np.float64, count=len(values))
+
+
+def average_ranks(values: np.ndarray) -> np.ndarray:
+    """平均秩（并列值取平均名次），用于 Spearman 相关"""
+    order = np.argsort(values, kind="mergesort")
+    sorted_values = values[order]
+    boundaries = np.flatnonzero(np.diff(sorted_values)) + 1
+    starts = np.concatenate(([0], boundaries))
+    counts = np.diff(np.concatenate((starts, [len(values)])))
+    group_ranks = starts + (counts + 1) / 2.0
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[order] = np.repeat(group_ranks, counts)
+    return ranks
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> float:
+    dx = x - x.mean()
+    dy = y - y.mean()
+    denominator = np.sqrt((dx @ dx) * (dy @ dy))
+    return float(dx @ dy / denominator) if denominator > 0 else 0.0
+
+
+def linear_trend(values: np.ndarray) -> Dict[str, float]:
+    """对下标做最小二乘直线拟合"""
+    n = len(values)
+    if n < 2:
+        return {"slope": 0.0, "intercept": float(values[0]) if n else 0.0, "r_squared": 0.0}
+    x = np.arange(n, dtype=np.float64)
+    dx = x - x.mean()
+    mean_y = float(values.mean())
+    dy = values - mean_y
+    slope = float(dx @ dy / (dx @ dx))
+    ss_tot = float(dy @ dy)
+    residuals = dy - slope * dx
+    r_squared = 1 - float(residuals @ residuals) / ss_tot if ss_tot != 0 else 0.0
+    return {"slope": slope, "intercept": mean_y - slope * float(x.mean()), "r_squared": r_squared}
+
+
+def volatility(values: np.ndarray) -> float:
+    """变异系数：总体标准差 / 均值"""
+    if len(values) < 2:
+        return 0.0
+    mean = float(values.mean())
+    return float(values.std()) / mean if mean != 0 else 0.0
+
+
+def detect_periodicity(values: np.ndarray, max_period: int = 20, tolerance: float = 0.1) -> int:
+    """按滞后差值近似相等的次数选择周期，得分需超过样本数的 30%"""
+    n = len(values)
+    if n < 6:
+        return 0
+    best_period, best_score = 0, 0
+    for period in range(2, min(n // 2, max_period) + 1):
+        score = int(np.count_nonzero(np.abs(values[period:] - values[:-period]) < tolerance))
+        if score > best_score:
+            best_period, best_score = period, score
+    return best_period if best_score > n * 0.3 else 0
+
+
+def detect_change_points(values: np.ndarray, window: int = 2) -> List[int]:
+    """
+    前后 window 个点的均值差超过此前数据变异系数 2 倍的位置
+
+    此前数据的均值与方差由前缀和一次求出（先平移到首值附近以减小舍入误差）
+    """
+    n = len(values)
+    if n < 2 * window + 1:
+        return []
+    shifted = values - values[0]
+    prefix_sum = np.concatenate(([0.0], np.cumsum(shifted)))
+    prefix_sq = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    moving = np.convolve(values, np.ones(window) / window, mode="valid")
+
+    positions = np.arange(window, n - window)
+    counts = positions.astype(np.float64)
+    shifted_mean = prefix_sum[positions] / counts
+    std = np.sqrt(np.maximum(prefix_sq[positions] / counts - shifted_mean ** 2, 0.0))
+    mean = shifted_mean + values[0]
+    prefix_volatility = np.divide(std, mean, out=np.zeros_like(std), where=mean != 0)
+    prefix_volatility[positions < 2] = 0.0
+
+    change = np.abs(moving[positions] - moving[positions - window]) > 2 * prefix_volatility
+    return positions[change].tolist()
+
+
+def entropy(values: np.ndarray) -> float:
+    """以总和归一化后的香农熵（只计正值）"""
+    if len(values) == 0:
+        return 0.0
+    total = float(values.sum())
+    if total == 0:
+        return 0.0
+    p = values[values > 0] / total
+    return float(-(p * np.log2(p)).sum())
+
+
+def gini(values: np.ndarray) -> float:
+    """基尼系数"""
+    n = len(values)
+    total = float(values.sum()) if n else 0.0
+    if total == 0:
+        return 0.0
+    weights = 2 * np.arange(1, n + 1) - n - 1
+    return float(weights @ np.sort(values)) / (n * total)
+
+
+class ColumnarStats:
+    """按列缓存有效值与统计结果的统计内核"""
+
+    def __init__(self, columns: Dict[str, Any]):
+        self.columns: Dict[str, np.ndarray] = {name: to_numeric_array(values) for name, values in columns.items()}
+        self._valid: Dict[str, np.ndarray] = {}
+        self._sorted: Dict[str, np.ndarray] = {}
+        self._describe: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, Any]], columns: Optional[Sequence[str]] = None) -> "ColumnarStats":
+        """行数据转列数据，缺少该列的行记为缺失值，保证各列按行对齐"""
+        if columns is None:
+            columns = list(rows[0].keys()) if rows else []
+        return cls({name: [row.get(name) for row in rows] for name in columns})
+
+    @classmethod
+    def from_dataframe(cls, frame: Any, columns: Optional[Sequence[str]] = None) -> "ColumnarStats":
+        """从 pandas DataFrame 构建（不直接依赖 pandas）"""
+        columns = list(columns) if columns is not None else [str(c) for c in frame.columns]
+        return cls({name: frame[name].to_numpy() for name in columns})
+
+    # ------------------------------------------------------------------
+    # 列访问
+    # ------------------------------------------------------------------
+    def values(self, column: str) -> np.ndarray:
+        """有效数值（去除 NaN）"""
+        if column not in self._valid:
+            array = self.columns.get(column)
+            self._valid[column] = array[~np.isnan(array)] if array is not None else np.empty(0)
+        return self._valid[column]
+
+    def sorted_values(self, column: str) -> np.ndarray:
+        if column not in self._sorted:
+            self._sorted[column] = np.sort(self.values(column))
+        return self._sorted[column]
+
+    def numeric_columns(self, min_count: int = 1) -> List[str]:
+        return [name for name in self.columns if len(self.values(name)) >= min_count]
+
+    # ------------------------------------------------------------------
+    # 描述统计
+    # ------------------------------------------------------------------
+    def describe(self, column: str) -> Dict[str, Any]:
+        """
+        描述统计量（一次排序、一次求中心矩）
+
+        std/variance 为样本统计量；skewness/kurtosis 为样本校正值（n > 2 时给出），
+        population_skewness/population_kurtosis 为总体矩（峰度未减 3）
+        """
+        if column in self._describe:
+            return self._describe[column]
+        values = self.values(column)
+        n = len(values)
+        if n == 0:
+            self._describe[column] = {}
+            return {}
+
+        ordered = self.sorted_values(column)
+        mean = float(values.mean())
+        deviations = values - mean
+        squared = deviations * deviations
+        m2 = float(squared.sum())
+        m3 = float((squared * deviations).sum())
+        m4 = float((squared * squared).sum())
+        variance = m2 / (n - 1) if n > 1 else 0.0
+        std = float(np.sqrt(variance))
+        unique_count = int(np.count_nonzero(np.diff(ordered))) + 1
+
+        stats: Dict[str, Any] = {
+            "count": n,
+            "mean": mean,
+            "median": float(np.median(ordered)),
+            "std": std,
+            "variance": variance,
+            "min": float(ordered[0]),
+            "max": float(ordered[-1]),
+            "range": float(ordered[-1] - ordered[0]),
+            "null_count": 0,
+            "null_percentage": 0,
+            "unique_count": unique_count,
+            "unique_percentage": unique_count / n * 100,
+            "q25": float(ordered[int(n * 0.25)]),
+            "q75": float(ordered[int(n * 0.75)]),
+        }
+
+        if n > 2:
+            stats["skewness"] = (n / ((n - 1) * (n - 2))) * m3 / std ** 3 if std else 0.0
+        if n > 3:
+            stats["kurtosis"] = (
+                (n * (n + 1) / ((n - 1) * (n - 2) * (n - 3))) * m4 / std ** 4
+                - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+            ) if std else 0.0
+        elif n == 3:
+            stats["kurtosis"] = 0.0
+
+        population_std = float(np.sqrt(m2 / n))
+        stats["population_skewness"] = m3 / n / population_std ** 3 if population_std else 0.0
+        stats["population_kurtosis"] = m4 / n / population_std ** 4 if population_std else 0.0
+
+        self._describe[column] = stats
+        return stats
+
+    def summarize(self, columns: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+        columns = columns if columns is not None else self.numeric_columns()
+        return {name: self.describe(name) for name in columns if len(self.values(name))}
+
+    # ------------------------------------------------------------------
+    # 相关性
+    # ------------------------------------------------------------------
+    def correlation_matrix(
+        self, columns: Optional[Sequence[str]] = None, method: str = "pearson"
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        完整相关系数矩阵
+
+        各列需按行对齐（长度相同）。无缺失值时对整块矩阵一次计算；有缺失值时按成对完整观测计算。
+        零方差列的相关系数记为 0；kendall 暂按 pearson 计算
+        """
+        columns = list(columns) if columns is not None else self.numeric_columns(min_count=2)
+        if not columns:
+            return {}
+        spearman = method == "spearman"
+        matrix = np.vstack([self.columns[name] for name in columns])
+        k = len(columns)
+
+        if not np.isnan(matrix).any():
+            if spearman:
+                matrix = np.vstack([average_ranks(row) for row in matrix])
+            centered = matrix - matrix.mean(axis=1, keepdims=True)
+            norms = np.sqrt(np.einsum("ij,ij->i", centered, centered))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result = (centered @ centered.T) / np.outer(norms, norms)
+            result = np.where(np.isfinite(result), result, 0.0)
+        else:
+            valid = ~np.isnan(matrix)
+            result = np.zeros((k, k))
+            for i in range(k):
+                for j in range(i, k):
+                    mask = valid[i] & valid[j]
+                    if np.count_nonzero(mask) < 2:
+                        continue
+                    x, y = matrix[i, mask], matrix[j, mask]
+                    if spearman:
+                        x, y = average_ranks(x), average_ranks(y)
+                    result[i, j] = result[j, i] = _pearson(x, y)
+
+        return {
+            name: {other: float(result[i, j]) for j, other in enumerate(columns)}
+            for i, name in enumerate(columns)
+        }
+
+    # ------------------------------------------------------------------
+    # 异常值与趋势
+    # ------------------------------------------------------------------
+    def outliers(self, column: str, method: str = "iqr", threshold: Optional[float] = None) -> np.ndarray:
+        """
+        异常值（保持原始顺序）
+
+        iqr: 超出 [q25 - t*IQR, q75 + t*IQR]，t 默认 1.5
+        zscore: |z| > t，t 默认 2
+        modified_zscore: 基于中位数绝对偏差的 |0.6745 * (x - median) / MAD| > t，t 默认 3.5
+        """
+        values = self.values(column)
+        if len(values) < 4:
+            return np.empty(0)
+        if method == "zscore":
+            std = self.describe(column)["std"]
+            if std == 0:
+                return np.empty(0)
+            limit = 2.0 if threshold is None else threshold
+            return values[np.abs(values - values.mean()) / std > limit]
+        if method == "modified_zscore":
+            median = self.describe(column)["median"]
+            mad = float(np.median(np.abs(values - median)))
+            if mad == 0:
+                return np.empty(0)
+            limit = 3.5 if threshold is None else threshold
+            return values[np.abs(0.6745 * (values - median) / mad) > limit]
+
+        stats = self.describe(column)
+        iqr = stats["q75"] - stats["q25"]
+        factor = 1.5 if threshold is None else threshold
+        lower, upper = stats["q25"] - factor * iqr, stats["q75"] + factor * iqr
+        return values[(values < lower) | (values > upper)]
+
+    def trend(self, column: str) -> Dict[str, float]:
+        return linear_trend(self.values(column))
+
+
+__all__ = [
+    "ColumnarStats",
+    "average_ranks",
+    "detect_change_points",
+    "detect_periodicity",
+    "entropy",
+    "gini",
+    "linear_trend",
+    "to_numeric_array",
+    "volatility",
+]
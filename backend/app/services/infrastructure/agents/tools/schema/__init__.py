@@ -28,6 +28,12 @@ from .cache import (
     create_schema_cache_manager
 )
 
+from .catalog import (
+    SchemaCatalog,
+    SchemaSnapshot,
+    get_schema_catalog
+)
+
 # 导出
 __all__ = [
     # Discovery
@@ -50,4 +56,9 @@ __all__ = [
     "CacheStats",
     "create_schema_cache_tool",
     "create_schema_cache_manager",
+    
+    # Catalog
+    "SchemaCatalog",
+    "SchemaSnapshot",
+    "get_schema_catalog",
 ]
\ No newline at end of file
@@ -0,0 +1,495 @@
+"""
+共享 Schema 目录
+
+跨进程共享的数据源表结构目录：
+- 通过 information_schema 一次性批量加载全部表和列
+- 通过比较表的更新时间/创建时间增量刷新变更表
+- 结果保存在 Redis 中，所有 Celery worker 和 Agent 运行共用；Redis 不可用时退化为进程内缓存
+- 列信息统一以 SHOW FULL COLUMNS 的行格式返回，便于各工具沿用原有的解析逻辑
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SchemaSnapshot:
+    """某个数据源的 Schema 快照"""
+    catalog_key: str
+    tables: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    refreshed_at: float = 0.0
+    loaded_at: float = 0.0
+    source: str = "information_schema"
+
+    @property
+    def table_names(self) -> List[str]:
+        return list(self.tables.keys())
+
+    @property
+    def version(self) -> str:
+        """基于各表版本签名计算的快照版本"""
+        signature = "|".join(
+            f"{name}:{info.get('version') or ''}:{len(info.get('columns') or [])}"
+            for name, info in sorted(self.tables.items())
+        )
+        return hashlib.md5(signature.encode("utf-8")).hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "catalog_key": self.catalog_key,
+            "tables": self.tables,
+            "refreshed_at": self.refreshed_at,
+            "loaded_at": self.loaded_at,
+            "source": self.source,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SchemaSnapshot":
+        return cls(
+            catalog_key=data.get("catalog_key", ""),
+            tables=data.get("tables") or {},
+            refreshed_at=data.get("refreshed_at", 0.0),
+            loaded_at=data.get("loaded_at", 0.0),
+            source=data.get("source", "information_schema"),
+        )
+
+
+def build_catalog_key(connection_config: Dict[str, Any]) -> str:
+    """根据连接配置生成数据源目录键（不包含密码）"""
+    cfg = connection_config or {}
+    hosts = cfg.get("fe_hosts") or cfg.get("host") or cfg.get("mysql_host") or ""
+    if isinstance(hosts, (list, tuple)):
+        hosts = ",".join(sorted(str(h) for h in hosts))
+    parts = [
+        str(cfg.get("source_type") or cfg.get("type") or ""),
+        str(hosts),
+        str(cfg.get("query_port") or cfg.get("port") or ""),
+        str(cfg.get("database") or cfg.get("doris_database") or ""),
+        str(cfg.get("username") or cfg.get("user") or ""),
+        str(cfg.get("connection_string") or ""),
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+class SchemaCatalog:
+    """跨进程共享的 Schema 目录服务"""
+
+    KEY_PREFIX = "schema_catalog:"
+    LOCK_PREFIX = "schema_catalog_lock:"
+
+    def __init__(
+        self,
+        ttl: int = 86400,
+        refresh_interval: int = 300,
+        lock_timeout: int = 60,
+        redis_client: Any = None,
+    ):
+        """
+        Args:
+            ttl: Redis 中快照的保留时间（秒）
+            refresh_interval: 超过该时长后读取时触发增量刷新（秒）
+            lock_timeout: 跨进程刷新锁的超时时间（秒）
+            redis_client: 可选的 Redis 客户端，默认使用全局缓存服务
+        """
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.lock_timeout = lock_timeout
+        self._redis_client = redis_client
+        self._local: Dict[str, SchemaSnapshot] = {}
+        self._stats = {"hits": 0, "full_loads": 0, "incremental_refreshes": 0, "tables_reloaded": 0}
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    async def get_snapshot(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+        force_refresh: bool = False,
+    ) -> Optional[SchemaSnapshot]:
+        """获取数据源的 Schema 快照，必要时全量加载或增量刷新"""
+        catalog_key = build_catalog_key(connection_config)
+        snapshot = None if force_refresh else await self._read(catalog_key)
+
+        if snapshot is None:
+            snapshot = await self._full_load(data_source_service, connection_config, catalog_key)
+            if snapshot is not None:
+                await self._write(snapshot)
+            return snapshot
+
+        if time.time() - snapshot.refreshed_at >= self.refresh_interval:
+            if await self._acquire_refresh_lock(catalog_key):
+                try:
+                    refreshed = await self._incremental_refresh(data_source_service, connection_config, snapshot)
+                    if refreshed is not None:
+                        snapshot = refreshed
+                        await self._write(snapshot)
+                finally:
+                    await self._release_refresh_lock(catalog_key)
+        else:
+            self._stats["hits"] += 1
+
+        return snapshot
+
+    async def get_table_names(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+    ) -> Optional[List[str]]:
+        """获取表名列表，目录不可用时返回 None"""
+        snapshot = await self.get_snapshot(data_source_service, connection_config)
+        return snapshot.table_names if snapshot else None
+
+    async def get_columns(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+        table_names: List[str],
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """获取指定表的列信息（SHOW FULL COLUMNS 行格式），目录中不存在的表不返回"""
+        snapshot = await self.get_snapshot(data_source_service, connection_config)
+        if not snapshot:
+            return {}
+        return {
+            name: snapshot.tables[name].get("columns", [])
+            for name in table_names
+            if name in snapshot.tables
+        }
+
+    async def invalidate(self, connection_config: Dict[str, Any]) -> None:
+        """使数据源的目录失效（例如数据源配置被修改后）"""
+        catalog_key = build_catalog_key(connection_config)
+        self._local.pop(catalog_key, None)
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await asyncio.to_thread(client.delete, self.KEY_PREFIX + catalog_key)
+            except Exception as e:
+                logger.warning(f"⚠️ 清除 Schema 目录失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "local_entries": len(self._local)}
+
+    # ------------------------------------------------------------------
+    # 加载
+    # ------------------------------------------------------------------
+    async def _full_load(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+        catalog_key: str,
+    ) -> Optional[SchemaSnapshot]:
+        """全量加载：一次查询 information_schema，失败时回退到 SHOW 语句"""
+        self._stats["full_loads"] += 1
+        now = time.time()
+
+        tables_meta = await self._query_table_versions(data_source_service, connection_config)
+        if tables_meta is not None:
+            columns = await self._query_columns(data_source_service, connection_config, None)
+            if columns is not None:
+                tables = self._assemble(tables_meta, columns)
+                logger.info(f"✅ Schema 目录批量加载完成: {len(tables)} 个表")
+                return SchemaSnapshot(catalog_key=catalog_key, tables=tables, refreshed_at=now, loaded_at=now)
+
+        tables = await self._legacy_load(data_source_service, connection_config)
+        if tables is None:
+            return None
+        logger.info(f"✅ Schema 目录通过 SHOW 语句加载完成: {len(tables)} 个表")
+        return SchemaSnapshot(
+            catalog_key=catalog_key, tables=tables, refreshed_at=now, loaded_at=now, source="show_columns"
+        )
+
+    async def _incremental_refresh(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+        snapshot: SchemaSnapshot,
+    ) -> Optional[SchemaSnapshot]:
+        """增量刷新：只重新加载版本签名发生变化的表"""
+        tables_meta = await self._query_table_versions(data_source_service, connection_config)
+        if tables_meta is None:
+            # 无法获取版本信息时，仅在快照超过 TTL 后全量重建
+            if time.time() - snapshot.loaded_at >= self.ttl:
+                return await self._full_load(data_source_service, connection_config, snapshot.catalog_key)
+            snapshot.refreshed_at = time.time()
+            return snapshot
+
+        self._stats["incremental_refreshes"] += 1
+        tables = dict(snapshot.tables)
+        changed = [
+            name for name, meta in tables_meta.items()
+            if name not in tables or not meta.get("version") or tables[name].get("version") != meta.get("version")
+        ]
+        removed = [name for name in tables if name not in tables_meta]
+        for name in removed:
+            tables.pop(name, None)
+
+        if changed:
+            columns = await self._query_columns(data_source_service, connection_config, changed)
+            if columns is None:
+                return None
+            tables.update(self._assemble({name: tables_meta[name] for name in changed}, columns))
+            self._stats["tables_reloaded"] += len(changed)
+
+        if changed or removed:
+            logger.info(f"🔄 Schema 目录增量刷新: 变更 {len(changed)} 个表，删除 {len(removed)} 个表")
+
+        return SchemaSnapshot(
+            catalog_key=snapshot.catalog_key,
+            tables=tables,
+            refreshed_at=time.time(),
+            loaded_at=snapshot.loaded_at,
+            source=snapshot.source,
+        )
+
+    async def _query_table_versions(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        schema_filter = self._schema_filter(connection_config)
+        sql = (
+            "SELECT TABLE_NAME, TABLE_TYPE, TABLE_COMMENT, CREATE_TIME, UPDATE_TIME "
+            f"FROM information_schema.tables WHERE TABLE_SCHEMA = {schema_filter}"
+        )
+        rows = await self._run(data_source_service, connection_config, sql)
+        if rows is None:
+            return None
+
+        tables: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            name = self._pick(row, "TABLE_NAME", "table_name")
+            if not name:
+                continue
+            version = self._pick(row, "UPDATE_TIME", "update_time") or self._pick(row, "CREATE_TIME", "create_time")
+            tables[str(name)] = {
+                "table_type": self._pick(row, "TABLE_TYPE", "table_type") or "TABLE",
+                "table_comment": self._pick(row, "TABLE_COMMENT", "table_comment") or "",
+                "version": str(version) if version else None,
+            }
+        return tables
+
+    async def _query_columns(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+        table_names: Optional[List[str]],
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        schema_filter = self._schema_filter(connection_config)
+        sql = (
+            "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, DATA_TYPE, IS_NULLABLE, COLUMN_KEY, "
+            "COLUMN_DEFAULT, EXTRA, COLUMN_COMMENT, ORDINAL_POSITION "
+            f"FROM information_schema.columns WHERE TABLE_SCHEMA = {schema_filter}"
+        )
+        if table_names:
+            quoted = ", ".join(self._quote(name) for name in table_names)
+            sql += f" AND TABLE_NAME IN ({quoted})"
+        sql += " ORDER BY TABLE_NAME, ORDINAL_POSITION"
+
+        rows = await self._run(data_source_service, connection_config, sql)
+        if rows is None:
+            return None
+
+        columns: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            table_name = self._pick(row, "TABLE_NAME", "table_name")
+            column_name = self._pick(row, "COLUMN_NAME", "column_name")
+            if not table_name or not column_name:
+                continue
+            columns.setdefault(str(table_name), []).append({
+                "Field": column_name,
+                "Type": self._pick(row, "COLUMN_TYPE", "column_type") or self._pick(row, "DATA_TYPE", "data_type") or "",
+                "Null": self._pick(row, "IS_NULLABLE", "is_nullable") or "YES",
+                "Key": self._pick(row, "COLUMN_KEY", "column_key") or "",
+                "Default": self._pick(row, "COLUMN_DEFAULT", "column_default"),
+                "Extra": self._pick(row, "EXTRA", "extra") or "",
+                "Comment": self._pick(row, "COLUMN_COMMENT", "column_comment") or "",
+            })
+        return columns
+
+    async def _legacy_load(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """information_schema 不可用时回退：SHOW TABLES + 并行 SHOW FULL COLUMNS"""
+        rows = await self._run(data_source_service, connection_config, "SHOW TABLES")
+        if rows is None:
+            return None
+
+        table_names = []
+        for row in rows:
+            if isinstance(row, dict):
+                name = next(iter(row.values())) if row else None
+            elif isinstance(row, (list, tuple)) and row:
+                name = row[0]
+            else:
+                name = row
+            if name:
+                table_names.append(str(name))
+
+        async def _load(table_name: str):
+            column_rows = await self._run(
+                data_source_service, connection_config, f"SHOW FULL COLUMNS FROM `{table_name}`"
+            )
+            return table_name, [row for row in (column_rows or []) if isinstance(row, dict)]
+
+        results = await asyncio.gather(*(_load(name) for name in table_names), return_exceptions=True)
+        tables: Dict[str, Dict[str, Any]] = {}
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️ 加载表结构失败: {result}")
+                continue
+            table_name, column_rows = result
+            tables[table_name] = {
+                "table_name": table_name,
+                "table_type": "TABLE",
+                "table_comment": "",
+                "version": None,
+                "columns": column_rows,
+            }
+        return tables
+
+    @staticmethod
+    def _assemble(
+        tables_meta: Dict[str, Dict[str, Any]],
+        columns: Dict[str, List[Dict[str, Any]]],
+    ) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "table_name": name,
+                "table_type": meta.get("table_type", "TABLE"),
+                "table_comment": meta.get("table_comment", ""),
+                "version": meta.get("version"),
+                "columns": columns.get(name, []),
+            }
+            for name, meta in tables_meta.items()
+        }
+
+    async def _run(
+        self,
+        data_source_service: Any,
+        connection_config: Dict[str, Any],
+        sql: str,
+    ) -> Optional[List[Any]]:
+        try:
+            result = await data_source_service.run_query(
+                connection_config=connection_config,
+                sql=sql,
+                limit=0,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Schema 目录查询失败: {e}")
+            return None
+        if not isinstance(result, dict) or not result.get("success"):
+            error = result.get("error") if isinstance(result, dict) else result
+            logger.debug(f"Schema 目录查询未成功: {error}")
+            return None
+        return result.get("rows", []) or result.get("data", []) or []
+
+    @staticmethod
+    def _schema_filter(connection_config: Dict[str, Any]) -> str:
+        source_type = str(connection_config.get("source_type") or "").lower()
+        database = connection_config.get("database") or connection_config.get("doris_database")
+        if source_type == "doris" and database:
+            return SchemaCatalog._quote(database)
+        return "DATABASE()"
+
+    @staticmethod
+    def _quote(value: Any) -> str:
+        return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+    @staticmethod
+    def _pick(row: Any, *keys: str) -> Any:
+        if not isinstance(row, dict):
+            return None
+        for key in keys:
+            if key in row and row[key] is not None:
+                return row[key]
+        return None
+
+    # ------------------------------------------------------------------
+    # 存储
+    # ------------------------------------------------------------------
+    def _get_redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        try:
+            from app.services.infrastructure.cache.redis_cache_service import cache_service
+            return cache_service.client if cache_service.enabled else None
+        except Exception:
+            return None
+
+    async def _read(self, catalog_key: str) -> Optional[SchemaSnapshot]:
+        client = self._get_redis()
+        if client is not None:
+            try:
+                raw = await asyncio.to_thread(client.get, self.KEY_PREFIX + catalog_key)
+                if raw:
+                    snapshot = SchemaSnapshot.from_dict(json.loads(raw))
+                    self._local[catalog_key] = snapshot
+                    return snapshot
+            except Exception as e:
+                logger.warning(f"⚠️ 读取 Schema 目录失败，使用进程内缓存: {e}")
+
+        snapshot = self._local.get(catalog_key)
+        if snapshot and time.time() - snapshot.loaded_at < self.ttl:
+            return snapshot
+        return None
+
+    async def _write(self, snapshot: SchemaSnapshot) -> None:
+        self._local[snapshot.catalog_key] = snapshot
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            payload = json.dumps(snapshot.to_dict(), ensure_ascii=False, default=str)
+            await asyncio.to_thread(client.setex, self.KEY_PREFIX + snapshot.catalog_key, self.ttl, payload)
+        except Exception as e:
+            logger.warning(f"⚠️ 写入 Schema 目录失败: {e}")
+
+    async def _acquire_refresh_lock(self, catalog_key: str) -> bool:
+        """跨进程刷新锁：拿不到锁的进程直接使用当前快照"""
+        client = self._get_redis()
+        if client is None:
+            return True
+        try:
+            acquired = await asyncio.to_thread(
+                client.set, self.LOCK_PREFIX + catalog_key, "1", nx=True, ex=self.lock_timeout
+            )
+            return bool(acquired)
+        except Exception:
+            return True
+
+    async def _release_refresh_lock(self, catalog_key: str) -> None:
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            await asyncio.to_thread(client.delete, self.LOCK_PREFIX + catalog_key)
+        except Exception:
+            pass
+
+
+# 全局 Schema 目录实例
+_schema_catalog: Optional[SchemaCatalog] = None
+
+
+def get_schema_catalog() -> SchemaCatalog:
+    """获取全局 Schema 目录"""
+    global _schema_catalog
+    if _schema_catalog is None:
+        _schema_catalog = SchemaCatalog(
+            ttl=settings.SCHEMA_CATALOG_TTL,
+            refresh_interval=settings.SCHEMA_CATALOG_REFRESH_INTERVAL,
+        )
+    return _schema_catalog
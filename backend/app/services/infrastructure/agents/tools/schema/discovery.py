@@ -16,6 +16,7 @@ from pydantic import BaseModel, Field
 
 from loom.interfaces.tool import BaseTool
 from ...types import ToolCategory, ContextInfo
+from .catalog import get_schema_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -249,6 +250,14 @@ class SchemaDiscoveryTool(BaseTool):
                 return
             
             logger.info("🔍 [SchemaDiscoveryTool] 初始化表名缓存（懒加载模式）")
+
+            # 优先读取跨进程共享的 Schema 目录
+            catalog_tables = await get_schema_catalog().get_table_names(data_source_service, connection_config)
+            if catalog_tables is not None:
+                self._table_names_cache = catalog_tables
+                self._cache_initialized = True
+                logger.info(f"✅ 表名缓存初始化完成（Schema 目录），发现 {len(catalog_tables)} 个表")
+                return
             
             # 只获取表名列表
             result = await data_source_service.run_query(
@@ -296,6 +305,15 @@ class SchemaDiscoveryTool(BaseTool):
             return {name: self._columns_cache[name] for name in table_names if name in self._columns_cache}
         
         logger.info(f"🔄 按需加载 {len(tables_to_load)} 个表的列信息: {tables_to_load}")
+
+        # 优先使用共享 Schema 目录中的列信息
+        catalog_columns = await get_schema_catalog().get_columns(
+            data_source_service, connection_config, tables_to_load
+        )
+        for table_name, rows in catalog_columns.items():
+            if rows:
+                self._columns_cache[table_name] = self._parse_column_rows(table_name, rows, include_metadata)
+        tables_to_load = [name for name in tables_to_load if name not in self._columns_cache]
         
         # 并行加载列信息
         async def load_single_table_columns(table_name: str):
@@ -849,26 +867,25 @@ class SchemaDiscoveryTool(BaseTool):
     ) -> List[Dict[str, Any]]:
         """发现列信息"""
         try:
-            # 首先获取表列表
-            tables_result = await data_source_service.run_query(
-                connection_config=connection_config,
-                sql="SHOW TABLES",
-                limit=1000
-            )
-            
-            if not tables_result.get("success"):
-                return []
+            # 首先获取表列表（优先使用共享Schema目录）
+            table_names = await get_schema_catalog().get_table_names(data_source_service, connection_config)
+            if table_names is None:
+                tables_result = await data_source_service.run_query(
+                    connection_config=connection_config,
+                    sql="SHOW TABLES",
+                    limit=1000
+                )
+                
+                if not tables_result.get("success"):
+                    return []
+                
+                rows = tables_result.get("rows", []) or tables_result.get("data", [])
+                table_names = [name for name in (self._extract_table_name(row) for row in rows) if name]
             
             all_columns = []
-            rows = tables_result.get("rows", []) or tables_result.get("data", [])
-            
             allowed_tables = set(tables_filter) if tables_filter else None
             
-            for row in rows:
-                table_name = self._extract_table_name(row)
-                if not table_name:
-                    continue
-                
+            for table_name in table_names:
                 # 过滤表名
                 if table_pattern and not self._match_pattern(table_name, table_pattern):
                     continue
@@ -1043,6 +1060,12 @@ class SchemaDiscoveryTool(BaseTool):
     ) -> List[Dict[str, Any]]:
         """获取表的列信息"""
         try:
+            catalog_columns = await get_schema_catalog().get_columns(
+                data_source_service, connection_config, [table_name]
+            )
+            if table_name in catalog_columns:
+                return self._parse_column_rows(table_name, catalog_columns[table_name], include_metadata)
+
             sql = f"SHOW FULL COLUMNS FROM `{table_name}`"
             logger.debug(f"🔍 获取列信息 SQL: {sql}")
 
@@ -1060,36 +1083,9 @@ class SchemaDiscoveryTool(BaseTool):
                 logger.warning(f"⚠️ 获取列信息失败: {result.get('error')}")
                 return []
 
-            columns = []
             rows = result.get("rows", []) or result.get("data", [])
             logger.debug(f"📊 rows 类型: {type(rows)}, 长度: {len(rows) if rows else 0}")
-
-            for idx, row in enumerate(rows):
-                if not isinstance(row, dict):
-                    logger.warning(f"⚠️ row[{idx}] 不是字典，类型: {type(row)}, 跳过")
-                    continue
-
-                try:
-                    column_info = {
-                        "table_name": table_name,
-                        "name": row.get("Field", ""),
-                        "data_type": row.get("Type", ""),
-                        "nullable": row.get("Null", "YES") == "YES",
-                        "default_value": row.get("Default"),
-                        "is_primary_key": row.get("Key", "") == "PRI",
-                        "is_foreign_key": False,  # 需要单独查询
-                        "description": row.get("Comment", ""),
-                        "metadata": {}
-                    }
-
-                    # 解析数据类型
-                    if include_metadata:
-                        column_info["metadata"] = self._parse_data_type(row.get("Type", ""))
-
-                    columns.append(column_info)
-                except Exception as col_error:
-                    logger.warning(f"⚠️ 解析列 {idx} 失败: {col_error}, row: {row}")
-                    continue
+            columns = self._parse_column_rows(table_name, rows, include_metadata)
 
             logger.debug(f"✅ 成功获取 {len(columns)} 个列")
             return columns
@@ -1099,6 +1095,43 @@ class SchemaDiscoveryTool(BaseTool):
             import traceback
             logger.error(f"堆栈:\n{traceback.format_exc()}")
             return []
+
+    def _parse_column_rows(
+        self,
+        table_name: str,
+        rows: List[Any],
+        include_metadata: bool
+    ) -> List[Dict[str, Any]]:
+        """解析 SHOW FULL COLUMNS 格式的行"""
+        columns = []
+        for idx, row in enumerate(rows):
+            if not isinstance(row, dict):
+                logger.warning(f"⚠️ row[{idx}] 不是字典，类型: {type(row)}, 跳过")
+                continue
+
+            try:
+                column_info = {
+                    "table_name": table_name,
+                    "name": row.get("Field", ""),
+                    "data_type": row.get("Type", ""),
+                    "nullable": row.get("Null", "YES") == "YES",
+                    "default_value": row.get("Default"),
+                    "is_primary_key": row.get("Key", "") == "PRI",
+                    "is_foreign_key": False,  # 需要单独查询
+                    "description": row.get("Comment", ""),
+                    "metadata": {}
+                }
+
+                # 解析数据类型
+                if include_metadata:
+                    column_info["metadata"] = self._parse_data_type(row.get("Type", ""))
+
+                columns.append(column_info)
+            except Exception as col_error:
+                logger.warning(f"⚠️ 解析列 {idx} 失败: {col_error}, row: {row}")
+                continue
+
+        return columns
     
     def _extract_table_name(self, row: Any) -> Optional[str]:
         """从查询结果中提取表名"""
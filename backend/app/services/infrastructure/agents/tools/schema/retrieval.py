@@ -16,6 +16,7 @@ from pydantic import BaseModel, Field
 
 
 from ...types import ToolCategory, ContextInfo
+from .catalog import get_schema_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -483,7 +484,11 @@ class SchemaRetrievalTool(BaseTool):
         # 确定要检索的表
         target_tables = query.table_names or []
         if not target_tables:
-            # 如果没有指定表，获取所有表
+            # 如果没有指定表，优先从共享Schema目录获取所有表
+            catalog_tables = await get_schema_catalog().get_table_names(data_source_service, connection_config)
+            if catalog_tables is not None:
+                target_tables = list(catalog_tables)
+        if not target_tables:
             tables_result = await data_source_service.run_query(
                 connection_config=connection_config,
                 sql="SHOW TABLES",
@@ -722,18 +727,24 @@ class SchemaRetrievalTool(BaseTool):
     ) -> List[Dict[str, Any]]:
         """获取表的列信息"""
         try:
-            sql = f"SHOW FULL COLUMNS FROM `{table_name}`"
-            result = await data_source_service.run_query(
-                connection_config=connection_config,
-                sql=sql,
-                limit=1000
+            catalog_columns = await get_schema_catalog().get_columns(
+                data_source_service, connection_config, [table_name]
             )
-            
-            if not result.get("success"):
-                return []
+            rows = catalog_columns.get(table_name)
+            if rows is None:
+                sql = f"SHOW FULL COLUMNS FROM `{table_name}`"
+                result = await data_source_service.run_query(
+                    connection_config=connection_config,
+                    sql=sql,
+                    limit=1000
+                )
+                
+                if not result.get("success"):
+                    return []
+                
+                rows = result.get("rows", []) or result.get("data", [])
             
             columns = []
-            rows = result.get("rows", []) or result.get("data", [])
             
             for row in rows:
                 if isinstance(row, dict):
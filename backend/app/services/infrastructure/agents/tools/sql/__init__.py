@@ -40,6 +40,16 @@ from .auto_fixer import (
     create_sql_auto_fixer_tool
 )
 
+from .analysis import (
+    SQLDialect,
+    SQLAnalysis,
+    SQLAnalyzer,
+    SchemaInfoCache,
+    analyze_sql,
+    get_sql_analyzer,
+    get_schema_info_cache
+)
+
 from .executor import (
     SQLExecutorTool,
     ExecutionStatus,
@@ -83,6 +93,15 @@ __all__ = [
     "FixReport",
     "create_sql_auto_fixer_tool",
     
+    # Analysis
+    "SQLDialect",
+    "SQLAnalysis",
+    "SQLAnalyzer",
+    "SchemaInfoCache",
+    "analyze_sql",
+    "get_sql_analyzer",
+    "get_schema_info_cache",
+    
     # Executor
     "SQLExecutorTool",
     "ExecutionStatus",
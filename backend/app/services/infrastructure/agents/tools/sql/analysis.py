@@ -0,0 +1,775 @@
+"""
+SQL 分析核心
+
+SQL 验证、列检查与自动修复工具共用的解析结果与 Schema 快照：
+- 基于 sqlparse 语法树解析一次，按作用域（主查询、CTE、子查询、派生表）解析表与列引用，
+  CTE 名称与派生表别名不会被当作物理表，子查询中的列按所在作用域归属到表
+- 解析结果按 (方言, SQL) 哈希缓存，同一 SQL 在各工具间只解析一次
+- Schema 信息按 (数据源, 涉及的表) 缓存，同一 SQL 的验证、列检查与修复只检索一次 Schema
+- 方言（Doris/MySQL/PostgreSQL）影响双引号的含义：MySQL 系中为字符串，PostgreSQL 中为标识符
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import sqlparse
+from sqlparse import sql as sql_ast
+from sqlparse import tokens as sql_tokens
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"\{\{\s*([\w.]+)\s*\}\}")
+_SET_OPERATORS = {"UNION", "UNION ALL", "UNION DISTINCT", "INTERSECT", "EXCEPT", "MINUS"}
+# 切换当前子句的关键字；其余关键字（DISTINCT、AS、AND 等）不改变子句
+_CLAUSE_KEYWORDS = {
+    "FROM", "ON", "USING", "WHERE", "GROUP BY", "HAVING", "ORDER BY", "LIMIT", "OFFSET",
+    "SET", "INTO", "VALUES", "WINDOW", "QUALIFY", "PARTITION BY",
+}
+
+
+class SQLDialect(str, Enum):
+    """SQL 方言"""
+    DORIS = "doris"
+    MYSQL = "mysql"
+    POSTGRESQL = "postgresql"
+
+
+def _dialect_from_name(name: Any) -> Optional[SQLDialect]:
+    name = str(name or "").lower()
+    if "postgres" in name:
+        return SQLDialect.POSTGRESQL
+    if "mysql" in name:
+        return SQLDialect.MYSQL
+    if "doris" in name:
+        return SQLDialect.DORIS
+    return None
+
+
+def resolve_dialect(connection_config: Optional[Dict[str, Any]] = None) -> SQLDialect:
+    """
+    根据连接配置确定方言，默认 Doris
+
+    通用 SQL 数据源的 source_type 统一为 "sql"，因此依次参考显式的数据库类型字段
+    和 connection_string 的 scheme（如 postgresql://、postgresql+psycopg2://、mysql+pymysql://）
+    """
+    cfg = connection_config or {}
+    for field in ("source_type", "type", "database_type", "db_type", "dialect"):
+        dialect = _dialect_from_name(cfg.get(field))
+        if dialect is not None:
+            return dialect
+    connection_string = str(cfg.get("connection_string") or "")
+    if "://" in connection_string:
+        scheme = connection_string.split("://", 1)[0].split("+", 1)[0]
+        dialect = _dialect_from_name(scheme)
+        if dialect is not None:
+            return dialect
+    return SQLDialect.DORIS
+
+
+@dataclass(frozen=True)
+class TableReference:
+    """物理表引用"""
+    name: str
+    schema: Optional[str] = None
+    alias: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ColumnReference:
+    """
+    列引用
+
+    table 为解析出的物理表名（无法唯一确定时为空字符串）；
+    derived 为 True 表示列来自 CTE 或派生表的输出，不对应物理表的列
+    """
+    name: str
+    table: str
+    context: str
+    qualifier: Optional[str] = None
+    alias: Optional[str] = None
+    derived: bool = False
+
+
+@dataclass(frozen=True)
+class JoinReference:
+    """JOIN 引用"""
+    join_type: str
+    table: str
+    condition: Optional[str] = None
+    using: bool = False
+
+
+@dataclass(frozen=True)
+class SQLAnalysis:
+    """一条 SQL 的解析结果（只读，可在工具间共享）"""
+    sql: str
+    dialect: SQLDialect
+    statement_type: str
+    tables: Tuple[TableReference, ...] = ()
+    columns: Tuple[ColumnReference, ...] = ()
+    joins: Tuple[JoinReference, ...] = ()
+    ctes: Tuple[str, ...] = ()
+    select_aliases: Tuple[str, ...] = ()
+    placeholders: Tuple[str, ...] = ()
+    subquery_count: int = 0
+    has_where: bool = False
+    has_group_by: bool = False
+    has_having: bool = False
+    has_order_by: bool = False
+    has_limit: bool = False
+    has_join: bool = False
+    parse_error: Optional[str] = None
+
+    @property
+    def table_names(self) -> List[str]:
+        """物理表名（去重，保持出现顺序）"""
+        seen: Dict[str, str] = {}
+        for table in self.tables:
+            seen.setdefault(table.name.lower(), table.name)
+        return list(seen.values())
+
+    @property
+    def checkable_columns(self) -> List[ColumnReference]:
+        """可以对照物理表 Schema 检查的列引用"""
+        return [column for column in self.columns if not column.derived]
+
+    @property
+    def column_names(self) -> List[str]:
+        """可检查列的列名（去重，保持出现顺序）"""
+        seen: Dict[str, str] = {}
+        for column in self.checkable_columns:
+            seen.setdefault(column.name.lower(), column.name)
+        return list(seen.values())
+
+
+# ----------------------------------------------------------------------
+# 解析
+# ----------------------------------------------------------------------
+@dataclass
+class _RawColumn:
+    name: str
+    qualifier: Optional[str]
+    context: str
+    alias: Optional[str] = None
+
+
+@dataclass
+class _Scope:
+    """一个 SELECT/UPDATE/DELETE/INSERT 作用域"""
+    parent: Optional["_Scope"]
+    ctes: Set[str]
+    tables: List[TableReference] = field(default_factory=list)
+    derived: Set[str] = field(default_factory=set)
+    raw_columns: List[_RawColumn] = field(default_factory=list)
+    select_aliases: List[str] = field(default_factory=list)
+    clauses: Set[str] = field(default_factory=set)
+
+    def find_qualifier(self, qualifier: str) -> Tuple[Optional[str], bool]:
+        """按别名/表名查找限定符，返回 (物理表名, 是否派生)；找不到时向外层作用域查找"""
+        key = qualifier.lower()
+        scope: Optional[_Scope] = self
+        while scope is not None:
+            for table in scope.tables:
+                if (table.alias or "").lower() == key:
+                    return table.name, False
+            for table in scope.tables:
+                if not table.alias and table.name.lower() == key:
+                    return table.name, False
+            if key in scope.derived:
+                return None, True
+            scope = scope.parent
+        return None, False
+
+
+class _StatementParser:
+    """把 sqlparse 语法树解析为表、列与 JOIN 引用"""
+
+    def __init__(self, dialect: SQLDialect):
+        self.dialect = dialect
+        self.tables: List[TableReference] = []
+        self.columns: List[ColumnReference] = []
+        self._joins: List[Dict[str, Any]] = []
+        self.ctes: List[str] = []
+        self.select_aliases: List[str] = []
+        self.subquery_count = 0
+        self.any_where = False
+        self.any_group_by = False
+        self.any_having = False
+        self.any_join = False
+
+    @property
+    def joins(self) -> List[JoinReference]:
+        return [JoinReference(**join) for join in self._joins]
+
+    # -- 作用域 --------------------------------------------------------
+    def parse_statement(self, statement: sql_ast.Statement) -> _Scope:
+        scopes = self._parse_tokens(statement.tokens, parent=None, ctes=set())
+        return scopes[0] if scopes else _Scope(parent=None, ctes=set())
+
+    def _parse_tokens(self, tokens: Sequence[Any], parent: Optional[_Scope], ctes: Set[str]) -> List[_Scope]:
+        """按集合运算（UNION 等）切分为多个同级作用域分别解析"""
+        segments: List[List[Any]] = [[]]
+        for token in tokens:
+            if token.ttype in sql_tokens.Keyword and token.normalized in _SET_OPERATORS:
+                segments.append([])
+            else:
+                segments[-1].append(token)
+
+        ctes = set(ctes)
+        scopes = []
+        for segment in segments:
+            scope = _Scope(parent=parent, ctes=ctes)
+            self._parse_scope(segment, scope)
+            # WITH 定义的 CTE 对后续 UNION 分支同样可见
+            ctes = scope.ctes
+            self._resolve(scope)
+            scopes.append(scope)
+        return scopes
+
+    def _parse_subquery(self, parenthesis: sql_ast.Parenthesis, parent: _Scope, count: bool = True) -> None:
+        if count:
+            self.subquery_count += 1
+        inner = [token for token in parenthesis.tokens if token.ttype is not sql_tokens.Punctuation or str(token) not in "()"]
+        self._parse_tokens(inner, parent=parent, ctes=parent.ctes)
+
+    def _parse_scope(self, tokens: Sequence[Any], scope: _Scope) -> None:
+        clause: Optional[str] = None
+        pending_join: Optional[str] = None
+        current_join: Optional[Dict[str, Any]] = None
+        insert_target: Optional[str] = None
+
+        for position, token in enumerate(tokens):
+            if token.is_whitespace or isinstance(token, sql_ast.Comment) or token.ttype in sql_tokens.Comment:
+                continue
+
+            if token.ttype is sql_tokens.Keyword.CTE:
+                clause = "WITH"
+                continue
+            if token.ttype is sql_tokens.Keyword.DML:
+                if token.normalized == "SELECT" and clause in ("INSERT", "INTO"):
+                    # INSERT ... SELECT：SELECT 部分是独立作用域
+                    self._parse_tokens(tokens[position:], parent=scope, ctes=scope.ctes)
+                    break
+                clause = {"UPDATE": "UPDATE", "INSERT": "INSERT", "DELETE": "DELETE"}.get(token.normalized, "SELECT")
+                continue
+            if isinstance(token, sql_ast.Where):
+                scope.clauses.add("WHERE")
+                self.any_where = True
+                self._collect_columns(token.tokens[1:], scope, "WHERE")
+                clause = "WHERE"
+                continue
+            if token.ttype in sql_tokens.Keyword and clause == "INTO" and insert_target is None \
+                    and token.normalized not in _CLAUSE_KEYWORDS:
+                # 与关键字同名的目标表（如 archive）会被切分为关键字
+                insert_target = token.value.strip("`\"")
+                self._add_table(scope, TableReference(name=insert_target))
+                continue
+            if token.ttype in sql_tokens.Keyword:
+                normalized = token.normalized
+                if "JOIN" in normalized:
+                    clause = "JOIN"
+                    pending_join = normalized
+                elif normalized in _CLAUSE_KEYWORDS:
+                    clause = normalized
+                    scope.clauses.add(normalized)
+                    if normalized in ("ON", "USING") and current_join is not None:
+                        current_join["using"] = normalized == "USING"
+                        current_join["condition"] = "" if normalized == "ON" else None
+                elif clause == "ON" and current_join is not None:
+                    current_join["condition"] += f" {normalized}"
+                continue
+
+            if clause == "WITH":
+                self._collect_ctes(token, scope)
+            elif clause == "INTO" and insert_target and isinstance(token, sql_ast.Parenthesis) \
+                    and not self._is_subquery(token):
+                # INSERT INTO t (a, b) 中未被归入函数形式的列清单
+                self._collect_insert_columns(token, scope, insert_target)
+            elif clause in ("FROM", "JOIN", "UPDATE", "INTO", "DELETE"):
+                names = self._collect_tables(token, scope, "INSERT" if clause == "INTO" else None)
+                if clause == "INTO" and names:
+                    insert_target = names[0]
+                if clause == "JOIN" and pending_join:
+                    current_join = {"join_type": pending_join, "table": names[0] if names else "",
+                                    "condition": None, "using": False}
+                    self._joins.append(current_join)
+                    pending_join = None
+            elif clause == "ON":
+                if current_join is not None:
+                    current_join["condition"] = f"{current_join['condition']} {token}".strip()
+                self._collect_columns([token], scope, "JOIN")
+            elif clause == "USING":
+                self._collect_columns([token], scope, "JOIN")
+            elif clause == "SELECT":
+                self._collect_select_list(token, scope)
+            elif clause in ("GROUP BY", "HAVING", "ORDER BY", "SET", "PARTITION BY", "QUALIFY"):
+                self._collect_columns([token], scope, clause)
+            elif clause == "VALUES" or clause == "INSERT":
+                for parenthesis in self._subqueries(token):
+                    self._parse_subquery(parenthesis, scope)
+
+        if len(scope.tables) + len(scope.derived) > 1:
+            self.any_join = True
+        if "GROUP BY" in scope.clauses:
+            self.any_group_by = True
+        if "HAVING" in scope.clauses:
+            self.any_having = True
+
+    # -- CTE 与表 -------------------------------------------------------
+    def _collect_ctes(self, token: Any, scope: _Scope) -> None:
+        identifiers = token.get_identifiers() if isinstance(token, sql_ast.IdentifierList) else [token]
+        for identifier in identifiers:
+            if not isinstance(identifier, sql_ast.Identifier):
+                continue
+            name = identifier.get_name()
+            for child in identifier.tokens:
+                if isinstance(child, sql_ast.Parenthesis):
+                    # CTE 体内可以引用之前定义的 CTE（递归 CTE 还可以引用自身）
+                    scope.ctes.add((name or "").lower())
+                    self._parse_subquery(child, scope, count=False)
+            if name:
+                scope.ctes.add(name.lower())
+                self.ctes.append(name)
+
+    def _collect_insert_columns(
+        self, parenthesis: sql_ast.Parenthesis, scope: _Scope, table: str, insert_context: Optional[str] = None
+    ) -> None:
+        for token in parenthesis.flatten():
+            if token.ttype in sql_tokens.Name or token.ttype in sql_tokens.Keyword \
+                    or token.ttype in sql_tokens.Literal.String.Symbol:
+                scope.raw_columns.append(_RawColumn(token.value.strip("`\""), table, insert_context or "INSERT"))
+
+    def _collect_tables(self, token: Any, scope: _Scope, insert_context: Optional[str]) -> List[str]:
+        """收集 FROM/JOIN/UPDATE/INTO 后的表引用，返回物理表名或派生表别名"""
+        names: List[str] = []
+        if isinstance(token, sql_ast.IdentifierList):
+            for identifier in token.get_identifiers():
+                names.extend(self._collect_tables(identifier, scope, insert_context))
+            return names
+
+        if isinstance(token, sql_ast.Parenthesis):
+            if self._is_subquery(token):
+                self._parse_subquery(token, scope)
+            return names
+
+        if isinstance(token, sql_ast.Function):
+            # INSERT INTO t (a, b) 被解析为函数形式
+            name = token.get_real_name()
+            if name:
+                self._add_table(scope, TableReference(name=name, schema=token.get_parent_name()))
+                names.append(name)
+                for parenthesis in token.get_sublists():
+                    if isinstance(parenthesis, sql_ast.Parenthesis):
+                        self._collect_insert_columns(parenthesis, scope, name, insert_context)
+            return names
+
+        if isinstance(token, sql_ast.Identifier):
+            first = token.token_first(skip_cm=True)
+            if isinstance(first, sql_ast.Parenthesis):
+                alias = token.get_alias()
+                if alias:
+                    scope.derived.add(alias.lower())
+                    names.append(alias)
+                if self._is_subquery(first):
+                    self._parse_subquery(first, scope)
+                return names
+            if isinstance(first, sql_ast.Function):
+                # 表函数，输出视为派生表
+                alias = token.get_alias() or first.get_real_name()
+                if alias:
+                    scope.derived.add(alias.lower())
+                    names.append(alias)
+                return names
+
+            name = token.get_real_name()
+            if not name:
+                return names
+            alias = token.get_alias()
+            if name.lower() in scope.ctes and not token.get_parent_name():
+                scope.derived.add((alias or name).lower())
+                names.append(alias or name)
+            else:
+                self._add_table(scope, TableReference(name=name, schema=token.get_parent_name(), alias=alias))
+                names.append(name)
+                if insert_context is not None and isinstance(token.tokens[-1], sql_ast.Function):
+                    # INSERT INTO db.t (a, b)：列清单挂在限定名的最后一段上
+                    for parenthesis in token.tokens[-1].get_sublists():
+                        if isinstance(parenthesis, sql_ast.Parenthesis):
+                            self._collect_insert_columns(parenthesis, scope, name, insert_context)
+        elif token.ttype in sql_tokens.Name:
+            self._add_table(scope, TableReference(name=token.value.strip("`\"")))
+            names.append(token.value.strip("`\""))
+        return names
+
+    def _add_table(self, scope: _Scope, table: TableReference) -> None:
+        scope.tables.append(table)
+        self.tables.append(table)
+
+    # -- 列 -------------------------------------------------------------
+    def _collect_select_list(self, token: Any, scope: _Scope) -> None:
+        items = token.get_identifiers() if isinstance(token, sql_ast.IdentifierList) else [token]
+        for item in items:
+            if isinstance(item, sql_ast.Identifier):
+                alias = item.get_alias()
+                if alias:
+                    scope.select_aliases.append(alias)
+                    self.select_aliases.append(alias)
+                self._collect_columns([item], scope, "SELECT", alias=alias)
+            else:
+                self._collect_columns([item], scope, "SELECT")
+
+    def _collect_columns(
+        self, tokens: Sequence[Any], scope: _Scope, context: str, alias: Optional[str] = None
+    ) -> None:
+        for token in tokens:
+            if token.is_whitespace or token.ttype in sql_tokens.Comment or isinstance(token, sql_ast.Comment):
+                continue
+
+            if isinstance(token, sql_ast.Parenthesis):
+                if self._is_subquery(token):
+                    self._parse_subquery(token, scope)
+                else:
+                    self._collect_columns(token.tokens, scope, context)
+            elif isinstance(token, sql_ast.Function):
+                # 只看参数（以及 OVER 窗口等），跳过函数名
+                self._collect_columns(token.tokens[1:], scope, context)
+            elif isinstance(token, sql_ast.Identifier):
+                self._collect_identifier(token, scope, context, alias)
+            elif token.is_group:
+                self._collect_columns(token.tokens, scope, context)
+            elif token.ttype is sql_tokens.Name:
+                scope.raw_columns.append(_RawColumn(token.value.strip("`"), None, context, alias))
+            elif token.ttype is sql_tokens.Literal.String.Symbol and self.dialect == SQLDialect.POSTGRESQL:
+                scope.raw_columns.append(_RawColumn(token.value.strip('"'), None, context, alias))
+
+    def _collect_identifier(self, token: sql_ast.Identifier, scope: _Scope, context: str, alias: Optional[str]) -> None:
+        children = [child for child in token.tokens if not child.is_whitespace]
+        first = children[0] if children else None
+        if first is None:
+            return
+
+        if not first.is_group:
+            if first.ttype is sql_tokens.Literal.String.Symbol and self.dialect != SQLDialect.POSTGRESQL:
+                # MySQL/Doris 中双引号是字符串字面量
+                return
+            if first.ttype not in sql_tokens.Name and first.ttype is not sql_tokens.Literal.String.Symbol:
+                self._collect_columns(children[1:], scope, context)
+                return
+            if token.is_wildcard():
+                return
+            name = token.get_real_name()
+            if name:
+                scope.raw_columns.append(_RawColumn(name, token.get_parent_name(), context, alias))
+            return
+
+        # 表达式（函数、CASE、运算等）：跳过别名部分与排序方向
+        own_alias = token.get_alias()
+        for index, child in enumerate(children):
+            if child.ttype is sql_tokens.Keyword and child.normalized == "AS":
+                break
+            if child.ttype in sql_tokens.Keyword:
+                continue
+            if (
+                index == len(children) - 1 and index > 0 and own_alias
+                and isinstance(child, sql_ast.Identifier) and child.get_name() == own_alias
+            ):
+                break
+            self._collect_columns([child], scope, context, alias)
+
+    # -- 解析列归属 -------------------------------------------------------
+    def _resolve(self, scope: _Scope) -> None:
+        aliases = {alias.lower() for alias in scope.select_aliases}
+        physical = scope.tables
+        for raw in scope.raw_columns:
+            if raw.qualifier:
+                table, derived = scope.find_qualifier(raw.qualifier)
+                if table is None and not derived:
+                    # 未知限定符，按表名处理
+                    table = raw.qualifier
+                self.columns.append(ColumnReference(
+                    name=raw.name, table=table or "", context=raw.context,
+                    qualifier=raw.qualifier, alias=raw.alias, derived=derived,
+                ))
+                continue
+
+            if raw.context in ("GROUP BY", "HAVING", "ORDER BY") and raw.name.lower() in aliases:
+                # 引用 SELECT 别名，不是表列
+                continue
+
+            if len(physical) == 1 and not scope.derived:
+                table, derived = physical[0].name, False
+            elif not physical and scope.derived:
+                table, derived = "", True
+            else:
+                table, derived = "", False
+            self.columns.append(ColumnReference(
+                name=raw.name, table=table, context=raw.context, alias=raw.alias, derived=derived,
+            ))
+
+    # -- 工具 -------------------------------------------------------------
+    @staticmethod
+    def _is_subquery(parenthesis: sql_ast.Parenthesis) -> bool:
+        for token in parenthesis.tokens:
+            if token.ttype is sql_tokens.Keyword.DML or token.ttype is sql_tokens.Keyword.CTE:
+                return True
+            if isinstance(token, sql_ast.Parenthesis) or token.is_whitespace:
+                continue
+            if token.ttype is sql_tokens.Punctuation:
+                continue
+            return False
+        return False
+
+    def _subqueries(self, token: Any) -> List[sql_ast.Parenthesis]:
+        if isinstance(token, sql_ast.Parenthesis) and self._is_subquery(token):
+            return [token]
+        if not token.is_group:
+            return []
+        found: List[sql_ast.Parenthesis] = []
+        for child in token.tokens:
+            found.extend(self._subqueries(child))
+        return found
+
+
+def _parse(sql: str, dialect: SQLDialect) -> SQLAnalysis:
+    placeholders = tuple(dict.fromkeys(_PLACEHOLDER.findall(sql or "")))
+    # 模板占位符替换为数值字面量后再解析（在引号内外均保持语法有效）
+    prepared = _PLACEHOLDER.sub("0", sql or "")
+
+    statements = [statement for statement in sqlparse.parse(prepared) if str(statement).strip(" \t\r\n;")]
+    if not statements:
+        return SQLAnalysis(sql=sql, dialect=dialect, statement_type="UNKNOWN", placeholders=placeholders,
+                           parse_error="SQL 为空")
+
+    statement = statements[0]
+    parser = _StatementParser(dialect)
+    try:
+        main_scope = parser.parse_statement(statement)
+    except Exception as e:
+        logger.warning(f"⚠️ [SQLAnalysis] SQL 解析失败，按空结果处理: {e}")
+        return SQLAnalysis(sql=sql, dialect=dialect, statement_type=statement.get_type(),
+                           placeholders=placeholders, parse_error=str(e))
+
+    return SQLAnalysis(
+        sql=sql,
+        dialect=dialect,
+        statement_type=statement.get_type(),
+        tables=tuple(parser.tables),
+        columns=tuple(parser.columns),
+        joins=tuple(parser.joins),
+        ctes=tuple(parser.ctes),
+        select_aliases=tuple(parser.select_aliases),
+        placeholders=placeholders,
+        subquery_count=parser.subquery_count,
+        has_where=parser.any_where,
+        has_group_by=parser.any_group_by,
+        has_having=parser.any_having,
+        has_order_by="ORDER BY" in main_scope.clauses,
+        has_limit="LIMIT" in main_scope.clauses,
+        has_join=parser.any_join or bool(parser._joins),
+        parse_error=None if len(statements) == 1 else "包含多条语句，仅分析第一条",
+    )
+
+
+class SQLAnalyzer:
+    """按 (方言, SQL) 哈希缓存解析结果的 SQL 分析器"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max(1, max_entries)
+        self._cache: "OrderedDict[str, SQLAnalysis]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def cache_key(sql: str, dialect: SQLDialect) -> str:
+        return hashlib.sha256(f"{dialect.value}\0{sql}".encode("utf-8")).hexdigest()
+
+    def analyze(self, sql: str, dialect: Optional[SQLDialect] = None) -> SQLAnalysis:
+        dialect = SQLDialect(dialect) if dialect else SQLDialect.DORIS
+        key = self.cache_key(sql or "", dialect)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+
+        analysis = _parse(sql or "", dialect)
+
+        with self._lock:
+            self._cache[key] = analysis
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return analysis
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self._hits, "misses": self._misses}
+
+
+# ----------------------------------------------------------------------
+# Schema 快照
+# ----------------------------------------------------------------------
+SchemaLoader = Callable[[Any, Dict[str, Any], Optional[List[str]]], Awaitable[Dict[str, Any]]]
+
+
+async def _retrieve_schema_info(
+    container: Any, connection_config: Dict[str, Any], table_names: Optional[List[str]]
+) -> Dict[str, Any]:
+    """通过 SchemaRetrievalTool 检索表、列、关系与约束信息"""
+    from ..schema.retrieval import create_schema_retrieval_tool
+
+    retrieval_tool = create_schema_retrieval_tool(container, connection_config=connection_config)
+    result = await retrieval_tool.run(
+        table_names=table_names,
+        include_relationships=True,
+        include_constraints=True,
+        format="detailed"
+    )
+    if result.get("success"):
+        return result.get("result", {}) or {}
+    logger.warning(f"⚠️ 获取 Schema 信息失败: {result.get('error')}")
+    return {}
+
+
+class SchemaInfoCache:
+    """
+    SQL 工具共用的 Schema 信息缓存
+
+    同一数据源、同一组表的 Schema 在 TTL 内只检索一次；并发请求同一键时共享同一次检索
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 128, loader: Optional[SchemaLoader] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._loader = loader or _retrieve_schema_info
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(connection_config: Dict[str, Any], table_names: Optional[Sequence[str]]) -> str:
+        from ..schema.catalog import build_catalog_key
+
+        tables = ",".join(sorted({name.lower() for name in table_names or []})) or "*"
+        return f"{build_catalog_key(connection_config)}:{tables}"
+
+    async def get(
+        self,
+        container: Any,
+        connection_config: Dict[str, Any],
+        table_names: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        table_names = list(table_names) if table_names else None
+        key = self.cache_key(connection_config, table_names)
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                future = self._inflight.get(key)
+                owner = future is None or future.get_loop() is not loop
+                if owner:
+                    future = loop.create_future()
+                    self._inflight[key] = future
+
+            if not owner:
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # 检索方被取消而本任务自身未被取消时，由本任务接手重新检索
+                    if future.cancelled() and not asyncio.current_task().cancelling():
+                        continue
+                    raise
+
+            try:
+                try:
+                    schema_info = await self._loader(container, connection_config, table_names)
+                except asyncio.CancelledError:
+                    # 检索方被取消时取消共享的 future，等待者据此接手重新检索
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    logger.warning(f"⚠️ 获取 Schema 信息失败: {e}")
+                    schema_info = {}
+
+                with self._lock:
+                    if schema_info:
+                        self._entries[key] = (time.monotonic(), schema_info)
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+                future.set_result(schema_info)
+                return schema_info
+            finally:
+                with self._lock:
+                    if self._inflight.get(key) is future:
+                        del self._inflight[key]
+
+    def invalidate(self, connection_config: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            if connection_config is None:
+                self._entries.clear()
+                return
+            prefix = self.cache_key(connection_config, None)[:-1]
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+
+_sql_analyzer: Optional[SQLAnalyzer] = None
+_schema_info_cache: Optional[SchemaInfoCache] = None
+
+
+def get_sql_analyzer() -> SQLAnalyzer:
+    """获取全局 SQL 分析器"""
+    global _sql_analyzer
+    if _sql_analyzer is None:
+        _sql_analyzer = SQLAnalyzer(max_entries=settings.SQL_ANALYSIS_CACHE_SIZE)
+    return _sql_analyzer
+
+
+def get_schema_info_cache() -> SchemaInfoCache:
+    """获取全局 Schema 信息缓存"""
+    global _schema_info_cache
+    if _schema_info_cache is None:
+        _schema_info_cache = SchemaInfoCache(ttl_seconds=settings.SQL_SCHEMA_INFO_TTL)
+    return _schema_info_cache
+
+
+def analyze_sql(sql: str, connection_config: Optional[Dict[str, Any]] = None) -> SQLAnalysis:
+    """按连接配置的方言解析 SQL（命中缓存时不重复解析）"""
+    return get_sql_analyzer().analyze(sql, resolve_dialect(connection_config))
+
+
+__all__ = [
+    "ColumnReference",
+    "JoinReference",
+    "SQLAnalysis",
+    "SQLAnalyzer",
+    "SQLDialect",
+    "SchemaInfoCache",
+    "TableReference",
+    "analyze_sql",
+    "get_schema_info_cache",
+    "get_sql_analyzer",
+    "resolve_dialect",
+]
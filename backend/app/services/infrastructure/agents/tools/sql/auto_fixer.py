@@ -18,6 +18,7 @@ from pydantic import BaseModel, Field
 
 
 from ...types import ToolCategory, ContextInfo
+from .analysis import SQLAnalysis, analyze_sql, get_schema_info_cache
 
 logger = logging.getLogger(__name__)
 
@@ -142,8 +143,6 @@ class SQLAutoFixerTool(BaseTool):
         }
     
     async def run(
-
-    
         self,
         sql: str,
         connection_config: Dict[str, Any],
@@ -152,9 +151,6 @@ class SQLAutoFixerTool(BaseTool):
         confidence_threshold: float = 0.8,
         schema_info: Optional[Dict[str, Any]] = None,
         **kwargs
-    
-
-    
     ) -> Dict[str, Any]:
         """
         执行 SQL 修复
@@ -172,21 +168,15 @@ class SQLAutoFixerTool(BaseTool):
         """
         logger.info(f"🔧 [SQLAutoFixerTool] 修复 SQL")
         logger.info(f"   修复类型: {fix_types}")
-
-    
-    async def execute(self, **kwargs) -> Dict[str, Any]:
-
-    
-        """向后兼容的execute方法"""
-
-    
-        return await self.run(**kwargs)
         logger.info(f"   自动应用: {auto_apply}")
         
         try:
+            # 与验证、列检查工具共用同一份解析结果
+            analysis = analyze_sql(sql, connection_config)
+            
             # 获取 Schema 信息
             if schema_info is None:
-                schema_info = await self._get_schema_info(connection_config)
+                schema_info = await self._get_schema_info(connection_config, table_names=analysis.table_names)
             
             # 设置默认修复类型
             if fix_types is None:
@@ -194,7 +184,7 @@ class SQLAutoFixerTool(BaseTool):
             
             # 分析 SQL 并生成修复建议
             suggestions = await self._analyze_and_suggest_fixes(
-                sql, schema_info, fix_types
+                sql, schema_info, fix_types, analysis
             )
             
             # 应用修复
@@ -238,42 +228,25 @@ class SQLAutoFixerTool(BaseTool):
                 "error": str(e),
                 "report": None
             }
-    
-    async def _get_schema_info(self, connection_config: Dict[str, Any]) -> Dict[str, Any]:
-        """获取 Schema 信息"""
-        try:
-            from ..schema.retrieval import create_schema_retrieval_tool
-
-            # 🔥 修复：传递 connection_config 以便工具能正确初始化
-            retrieval_tool = create_schema_retrieval_tool(
-                self.container,
-                connection_config=connection_config
-            )
 
-            result = await retrieval_tool.run(
-                include_relationships=True,
-                include_constraints=True,
-                format="detailed"
-            )
-            
-            if result.get("success"):
-                return result.get("result", {})
-            else:
-                logger.warning(f"⚠️ 获取 Schema 信息失败: {result.get('error')}")
-                return {}
-                
-        except Exception as e:
-            logger.warning(f"⚠️ 获取 Schema 信息失败: {e}")
-            return {}
+    async def execute(self, **kwargs) -> Dict[str, Any]:
+        """向后兼容的execute方法"""
+        return await self.run(**kwargs)
+    
+    async def _get_schema_info(self, connection_config: Dict[str, Any], table_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """获取 Schema 信息（与验证、列检查工具共用同一份快照）"""
+        return await get_schema_info_cache().get(self.container, connection_config, table_names)
     
     async def _analyze_and_suggest_fixes(
         self,
         sql: str,
         schema_info: Dict[str, Any],
-        fix_types: List[str]
+        fix_types: List[str],
+        analysis: Optional[SQLAnalysis] = None
     ) -> List[FixSuggestion]:
         """分析 SQL 并生成修复建议"""
         suggestions = []
+        analysis = analysis or analyze_sql(sql)
         
         # 语法修复
         if "syntax" in fix_types:
@@ -282,12 +255,12 @@ class SQLAutoFixerTool(BaseTool):
         
         # 语义修复
         if "semantic" in fix_types:
-            semantic_suggestions = self._suggest_semantic_fixes(sql, schema_info)
+            semantic_suggestions = self._suggest_semantic_fixes(sql, schema_info, analysis)
             suggestions.extend(semantic_suggestions)
         
         # 性能修复
         if "performance" in fix_types:
-            performance_suggestions = self._suggest_performance_fixes(sql, schema_info)
+            performance_suggestions = self._suggest_performance_fixes(sql, schema_info, analysis)
             suggestions.extend(performance_suggestions)
         
         # 风格修复
@@ -388,12 +361,12 @@ class SQLAutoFixerTool(BaseTool):
         
         return suggestions
     
-    def _suggest_semantic_fixes(self, sql: str, schema_info: Dict[str, Any]) -> List[FixSuggestion]:
+    def _suggest_semantic_fixes(self, sql: str, schema_info: Dict[str, Any], analysis: SQLAnalysis) -> List[FixSuggestion]:
         """建议语义修复"""
         suggestions = []
         
-        # 检查表名
-        table_names = self._extract_table_names(sql)
+        # 检查表名（CTE 与派生表别名不参与检查）
+        table_names = analysis.table_names
         available_tables = [table.get("name", "") for table in schema_info.get("tables", [])]
         
         for table_name in table_names:
@@ -412,7 +385,7 @@ class SQLAutoFixerTool(BaseTool):
                     ))
         
         # 检查列名
-        column_names = self._extract_column_names(sql)
+        column_names = analysis.column_names
         available_columns = schema_info.get("columns", [])
         
         for column_name in column_names:
@@ -432,14 +405,14 @@ class SQLAutoFixerTool(BaseTool):
         
         return suggestions
     
-    def _suggest_performance_fixes(self, sql: str, schema_info: Dict[str, Any]) -> List[FixSuggestion]:
+    def _suggest_performance_fixes(self, sql: str, schema_info: Dict[str, Any], analysis: SQLAnalysis) -> List[FixSuggestion]:
         """建议性能修复"""
         suggestions = []
         
-        sql_upper = sql.upper()
+        is_select = analysis.statement_type == "SELECT"
         
         # 检查是否有 LIMIT
-        if "SELECT" in sql_upper and "LIMIT" not in sql_upper:
+        if is_select and not analysis.has_limit:
             suggestions.append(FixSuggestion(
                 fix_type=FixType.PERFORMANCE,
                 fix_level=FixLevel.SUGGESTION,
@@ -451,7 +424,7 @@ class SQLAutoFixerTool(BaseTool):
             ))
         
         # 检查是否有 WHERE 条件
-        if "SELECT" in sql_upper and "WHERE" not in sql_upper and "JOIN" not in sql_upper:
+        if is_select and not analysis.has_where and not analysis.has_join:
             suggestions.append(FixSuggestion(
                 fix_type=FixType.PERFORMANCE,
                 fix_level=FixLevel.SUGGESTION,
@@ -462,8 +435,8 @@ class SQLAutoFixerTool(BaseTool):
                 reason="添加适当的 WHERE 条件可以减少扫描的数据量"
             ))
         
-        # 检查子查询
-        if sql_upper.count("SELECT") > 1:
+        # 检查子查询（CTE 不计入）
+        if analysis.subquery_count > 0:
             suggestions.append(FixSuggestion(
                 fix_type=FixType.PERFORMANCE,
                 fix_level=FixLevel.SUGGESTION,
@@ -613,38 +586,11 @@ class SQLAutoFixerTool(BaseTool):
     
     def _extract_table_names(self, sql: str) -> List[str]:
         """提取表名"""
-        table_names = []
-        
-        # FROM 子句
-        from_pattern = r'FROM\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        from_matches = re.findall(from_pattern, sql, re.IGNORECASE)
-        table_names.extend(from_matches)
-        
-        # JOIN 子句
-        join_pattern = r'JOIN\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        join_matches = re.findall(join_pattern, sql, re.IGNORECASE)
-        table_names.extend(join_matches)
-        
-        return list(set(table_names))
+        return analyze_sql(sql).table_names
     
     def _extract_column_names(self, sql: str) -> List[str]:
         """提取列名"""
-        column_names = []
-        
-        # SELECT 子句中的列
-        select_pattern = r'SELECT\s+(.*?)\s+FROM'
-        select_match = re.search(select_pattern, sql, re.IGNORECASE | re.DOTALL)
-        if select_match:
-            select_clause = select_match.group(1)
-            columns = [col.strip() for col in select_clause.split(',')]
-            for col in columns:
-                if ' AS ' in col.upper():
-                    col = col.split(' AS ')[0].strip()
-                if '(' in col and ')' in col:
-                    continue
-                column_names.append(col)
-        
-        return list(set(column_names))
+        return analyze_sql(sql).column_names
     
     def _column_exists(self, column_name: str, available_columns: List[Dict[str, Any]]) -> bool:
         """检查列是否存在"""
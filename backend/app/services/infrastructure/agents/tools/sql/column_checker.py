@@ -10,7 +10,6 @@ SQL 列检查工具
 
 
 import logging
-import re
 from typing import Any, Dict, List, Optional, Union, Tuple, Literal
 from dataclasses import dataclass
 from enum import Enum
@@ -18,6 +17,7 @@ from pydantic import BaseModel, Field
 
 
 from ...types import ToolCategory, ContextInfo
+from .analysis import analyze_sql, get_schema_info_cache
 
 logger = logging.getLogger(__name__)
 
@@ -144,8 +144,6 @@ class SQLColumnCheckerTool(BaseTool):
         }
     
     async def run(
-
-    
         self,
         sql: str,
         connection_config: Dict[str, Any],
@@ -153,9 +151,6 @@ class SQLColumnCheckerTool(BaseTool):
         strict_mode: bool = False,
         schema_info: Optional[Dict[str, Any]] = None,
         **kwargs
-    
-
-    
     ) -> Dict[str, Any]:
         """
         执行列检查
@@ -172,28 +167,21 @@ class SQLColumnCheckerTool(BaseTool):
         """
         logger.info(f"🔍 [SQLColumnCheckerTool] 检查列")
         logger.info(f"   检查类型: {check_types}")
-
-    
-    async def execute(self, **kwargs) -> Dict[str, Any]:
-        """向后兼容的execute方法"""
-        return await self.run(**kwargs)
-
-    
-        return await self.run(**kwargs)
         logger.info(f"   严格模式: {strict_mode}")
         
         try:
+            # 提取列信息（与验证、修复工具共用同一份解析结果）
+            columns_info = self._extract_columns_from_sql(sql, connection_config)
+            
             # 获取 Schema 信息
             if schema_info is None:
-                schema_info = await self._get_schema_info(connection_config)
+                table_names = analyze_sql(sql, connection_config).table_names
+                schema_info = await self._get_schema_info(connection_config, table_names=table_names)
             
             # 设置默认检查类型
             if check_types is None:
                 check_types = ["existence", "type_compatibility", "nullability"]
             
-            # 提取列信息
-            columns_info = self._extract_columns_from_sql(sql)
-            
             # 执行检查
             report = await self._check_columns(
                 columns_info, schema_info, check_types, strict_mode
@@ -217,234 +205,33 @@ class SQLColumnCheckerTool(BaseTool):
                 "error": str(e),
                 "report": None
             }
-    
-    async def _get_schema_info(self, connection_config: Dict[str, Any]) -> Dict[str, Any]:
-        """获取 Schema 信息"""
-        try:
-            from ..schema.retrieval import create_schema_retrieval_tool
-
-            # 🔥 修复：传递 connection_config 以便工具能正确初始化
-            retrieval_tool = create_schema_retrieval_tool(
-                self.container,
-                connection_config=connection_config
-            )
 
-            result = await retrieval_tool.run(
-                include_relationships=True,
-                include_constraints=True,
-                format="detailed"
-            )
-            
-            if result.get("success"):
-                return result.get("result", {})
-            else:
-                logger.warning(f"⚠️ 获取 Schema 信息失败: {result.get('error')}")
-                return {}
-                
-        except Exception as e:
-            logger.warning(f"⚠️ 获取 Schema 信息失败: {e}")
-            return {}
+    async def execute(self, **kwargs) -> Dict[str, Any]:
+        """向后兼容的execute方法"""
+        return await self.run(**kwargs)
     
-    def _extract_columns_from_sql(self, sql: str) -> List[Dict[str, Any]]:
-        """从 SQL 中提取列信息"""
-        columns_info = []
-        
-        # 提取 SELECT 子句中的列
-        select_columns = self._extract_select_columns(sql)
-        columns_info.extend(select_columns)
-        
-        # 提取 WHERE 子句中的列
-        where_columns = self._extract_where_columns(sql)
-        columns_info.extend(where_columns)
-        
-        # 提取 GROUP BY 子句中的列
-        group_by_columns = self._extract_group_by_columns(sql)
-        columns_info.extend(group_by_columns)
-        
-        # 提取 ORDER BY 子句中的列
-        order_by_columns = self._extract_order_by_columns(sql)
-        columns_info.extend(order_by_columns)
-        
-        # 提取 HAVING 子句中的列
-        having_columns = self._extract_having_columns(sql)
-        columns_info.extend(having_columns)
+    async def _get_schema_info(self, connection_config: Dict[str, Any], table_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """获取 Schema 信息（与验证、修复工具共用同一份快照）"""
+        return await get_schema_info_cache().get(self.container, connection_config, table_names)
+    
+    def _extract_columns_from_sql(self, sql: str, connection_config: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """从 SQL 中提取列信息（CTE 与派生表输出的列不参与检查）"""
+        analysis = analyze_sql(sql, connection_config)
         
         # 去重
         unique_columns = {}
-        for col_info in columns_info:
-            key = f"{col_info['table_name']}.{col_info['column_name']}"
+        for column in analysis.checkable_columns:
+            key = f"{column.table}.{column.name}"
             if key not in unique_columns:
-                unique_columns[key] = col_info
+                unique_columns[key] = {
+                    "column_name": column.name,
+                    "table_name": column.table,
+                    "context": column.context,
+                    "alias": column.alias
+                }
         
         return list(unique_columns.values())
     
-    def _extract_select_columns(self, sql: str) -> List[Dict[str, Any]]:
-        """提取 SELECT 子句中的列"""
-        columns = []
-        
-        # 匹配 SELECT ... FROM 模式
-        select_pattern = r'SELECT\s+(.*?)\s+FROM'
-        select_match = re.search(select_pattern, sql, re.IGNORECASE | re.DOTALL)
-        
-        if select_match:
-            select_clause = select_match.group(1)
-            
-            # 提取表名
-            from_pattern = r'FROM\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-            from_match = re.search(from_pattern, sql, re.IGNORECASE)
-            table_name = from_match.group(1) if from_match else ""
-            
-            # 解析列
-            column_items = [item.strip() for item in select_clause.split(',')]
-            
-            for item in column_items:
-                # 跳过函数调用
-                if '(' in item and ')' in item:
-                    continue
-                
-                # 处理别名
-                if ' AS ' in item.upper():
-                    column_name = item.split(' AS ')[0].strip()
-                else:
-                    column_name = item.strip()
-                
-                # 处理表前缀
-                if '.' in column_name:
-                    parts = column_name.split('.')
-                    if len(parts) == 2:
-                        table_name = parts[0]
-                        column_name = parts[1]
-                
-                columns.append({
-                    "column_name": column_name,
-                    "table_name": table_name,
-                    "context": "SELECT",
-                    "alias": item.split(' AS ')[1].strip() if ' AS ' in item.upper() else None
-                })
-        
-        return columns
-    
-    def _extract_where_columns(self, sql: str) -> List[Dict[str, Any]]:
-        """提取 WHERE 子句中的列"""
-        columns = []
-        
-        # 匹配 WHERE 子句
-        where_pattern = r'WHERE\s+(.*?)(?:\s+GROUP\s+BY|\s+ORDER\s+BY|\s+HAVING|\s+LIMIT|$)'
-        where_match = re.search(where_pattern, sql, re.IGNORECASE | re.DOTALL)
-        
-        if where_match:
-            where_clause = where_match.group(1)
-            
-            # 提取列名
-            column_pattern = r'([a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)?)'
-            column_matches = re.findall(column_pattern, where_clause)
-            
-            for match in column_matches:
-                if '.' in match:
-                    table_name, column_name = match.split('.')
-                else:
-                    column_name = match
-                    table_name = ""
-                
-                columns.append({
-                    "column_name": column_name,
-                    "table_name": table_name,
-                    "context": "WHERE"
-                })
-        
-        return columns
-    
-    def _extract_group_by_columns(self, sql: str) -> List[Dict[str, Any]]:
-        """提取 GROUP BY 子句中的列"""
-        columns = []
-        
-        # 匹配 GROUP BY 子句
-        group_by_pattern = r'GROUP\s+BY\s+(.*?)(?:\s+HAVING|\s+ORDER\s+BY|\s+LIMIT|$)'
-        group_by_match = re.search(group_by_pattern, sql, re.IGNORECASE | re.DOTALL)
-        
-        if group_by_match:
-            group_by_clause = group_by_match.group(1)
-            
-            # 解析列
-            column_items = [item.strip() for item in group_by_clause.split(',')]
-            
-            for item in column_items:
-                if '.' in item:
-                    table_name, column_name = item.split('.')
-                else:
-                    column_name = item
-                    table_name = ""
-                
-                columns.append({
-                    "column_name": column_name,
-                    "table_name": table_name,
-                    "context": "GROUP BY"
-                })
-        
-        return columns
-    
-    def _extract_order_by_columns(self, sql: str) -> List[Dict[str, Any]]:
-        """提取 ORDER BY 子句中的列"""
-        columns = []
-        
-        # 匹配 ORDER BY 子句
-        order_by_pattern = r'ORDER\s+BY\s+(.*?)(?:\s+LIMIT|$)'
-        order_by_match = re.search(order_by_pattern, sql, re.IGNORECASE | re.DOTALL)
-        
-        if order_by_match:
-            order_by_clause = order_by_match.group(1)
-            
-            # 解析列
-            column_items = [item.strip() for item in order_by_clause.split(',')]
-            
-            for item in column_items:
-                # 移除排序方向
-                item = re.sub(r'\s+(ASC|DESC)$', '', item, flags=re.IGNORECASE)
-                
-                if '.' in item:
-                    table_name, column_name = item.split('.')
-                else:
-                    column_name = item
-                    table_name = ""
-                
-                columns.append({
-                    "column_name": column_name,
-                    "table_name": table_name,
-                    "context": "ORDER BY"
-                })
-        
-        return columns
-    
-    def _extract_having_columns(self, sql: str) -> List[Dict[str, Any]]:
-        """提取 HAVING 子句中的列"""
-        columns = []
-        
-        # 匹配 HAVING 子句
-        having_pattern = r'HAVING\s+(.*?)(?:\s+ORDER\s+BY|\s+LIMIT|$)'
-        having_match = re.search(having_pattern, sql, re.IGNORECASE | re.DOTALL)
-        
-        if having_match:
-            having_clause = having_match.group(1)
-            
-            # 提取列名
-            column_pattern = r'([a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)?)'
-            column_matches = re.findall(column_pattern, having_clause)
-            
-            for match in column_matches:
-                if '.' in match:
-                    table_name, column_name = match.split('.')
-                else:
-                    column_name = match
-                    table_name = ""
-                
-                columns.append({
-                    "column_name": column_name,
-                    "table_name": table_name,
-                    "context": "HAVING"
-                })
-        
-        return columns
-    
     async def _check_columns(
         self,
         columns_info: List[Dict[str, Any]],
@@ -491,6 +491,10 @@ class SQLExecutorTool(BaseTool):
         if not rows:
             return []
         
+        # 数据源服务已按列物化为字典列表时直接复用，避免逐行复制
+        if isinstance(rows, list) and isinstance(rows[0], dict):
+            return rows
+        
         # 如果没有列名，尝试从第一行推断
         if not columns:
             if rows and isinstance(rows[0], dict):
@@ -10,7 +10,6 @@ SQL 验证工具
 
 
 import logging
-import re
 from typing import Any, Dict, List, Optional, Union, Tuple, Literal
 from dataclasses import dataclass
 from enum import Enum
@@ -18,6 +17,7 @@ from pydantic import BaseModel, Field
 
 
 from ...types import ToolCategory, ContextInfo
+from .analysis import SQLAnalysis, analyze_sql, get_schema_info_cache
 
 logger = logging.getLogger(__name__)
 
@@ -173,16 +173,19 @@ class SQLValidatorTool(BaseTool):
             # 🔧 在验证阶段安全替换时间占位符，避免语法校验误报
             resolved_sql, resolution_meta = self._resolve_time_placeholders(sql, kwargs)
 
+            # 解析一次，语法/语义/性能检查共用；按原始 SQL 缓存，与列检查、修复工具共用同一解析结果
+            # （占位符在解析时按字面量处理，替换前后的结构相同）
+            analysis = analyze_sql(sql, connection_config)
+
             # 获取 Schema 信息
             if schema_info is None:
                 # 🔥 修复：从SQL中提取表名，传给SchemaRetrievalTool
-                table_names = self._extract_table_names(resolved_sql)
-                schema_info = await self._get_schema_info(connection_config, table_names=table_names)
+                schema_info = await self._get_schema_info(connection_config, table_names=analysis.table_names)
             
             # 执行验证
             report = await self._validate_sql(
                 resolved_sql, validation_level, check_syntax, check_semantics, 
-                check_performance, schema_info
+                check_performance, schema_info, analysis
             )
             
             return {
@@ -255,51 +258,22 @@ class SQLValidatorTool(BaseTool):
         return await self.run(**kwargs)
     
     async def _get_schema_info(self, connection_config: Dict[str, Any], table_names: Optional[List[str]] = None) -> Dict[str, Any]:
-        """获取 Schema 信息
+        """获取 Schema 信息（与列检查、自动修复工具共用同一份快照）
         
         Args:
             connection_config: 连接配置
             table_names: 可选的表名列表，如果提供则只获取这些表的结构信息
         """
-        try:
-            from ..schema.retrieval import create_schema_retrieval_tool
-
-            # 🔥 修复：传递 connection_config 以便工具能正确初始化
-            retrieval_tool = create_schema_retrieval_tool(
-                self.container,
-                connection_config=self._connection_config or connection_config
-            )
-
-            # 🔥 修复：如果提供了表名，传入SchemaRetrievalTool；否则尝试从上下文获取
-            logger.info(f"🔍 [SQL验证] 开始检索 Schema 信息")
-            if table_names:
-                logger.info(f"   表名: {table_names}")
-            else:
-                logger.info(f"   表名: None (将从上下文获取)")
-
-            result = await retrieval_tool.run(
-                table_names=table_names,  # 🔥 关键修复：传入从SQL中提取的表名
-                include_relationships=True,
-                include_constraints=True,
-                format="detailed"
-            )
-            
-            if result.get("success"):
-                return result.get("result", {})
-            else:
-                logger.warning(f"⚠️ 获取 Schema 信息失败: {result.get('error')}")
-                # 🔥 如果SchemaRetrievalTool失败且没有表名，尝试返回空字典让验证继续进行
-                if not table_names:
-                    logger.warning(f"⚠️ SchemaRetrievalTool无法从上下文获取表名，将使用空Schema信息继续验证")
-                    return {}
-                else:
-                    logger.error(f"❌ SchemaRetrievalTool失败，即使传入了表名: {result.get('error')}")
-                    return {}
-                
-        except Exception as e:
-            logger.warning(f"⚠️ 获取 Schema 信息失败: {e}")
-            # 🔥 即使失败，也返回空字典让验证继续进行（使用语法验证）
-            return {}
+        logger.info(f"🔍 [SQL验证] 开始检索 Schema 信息")
+        if table_names:
+            logger.info(f"   表名: {table_names}")
+        else:
+            logger.info(f"   表名: None (将从上下文获取)")
+
+        # 🔥 即使失败，也返回空字典让验证继续进行（使用语法验证）
+        return await get_schema_info_cache().get(
+            self.container, self._connection_config or connection_config, table_names
+        )
     
     async def _validate_sql(
         self,
@@ -308,24 +282,26 @@ class SQLValidatorTool(BaseTool):
         check_syntax: bool,
         check_semantics: bool,
         check_performance: bool,
-        schema_info: Dict[str, Any]
+        schema_info: Dict[str, Any],
+        analysis: Optional[SQLAnalysis] = None
     ) -> ValidationReport:
         """验证 SQL"""
         issues = []
+        analysis = analysis or analyze_sql(sql, self._connection_config)
         
         # 语法检查
         if check_syntax:
-            syntax_issues = self._check_syntax(sql)
+            syntax_issues = self._check_syntax(sql, analysis)
             issues.extend(syntax_issues)
         
         # 语义检查
         if check_semantics:
-            semantic_issues = self._check_semantics(sql, schema_info)
+            semantic_issues = self._check_semantics(analysis, schema_info)
             issues.extend(semantic_issues)
         
         # 性能检查
         if check_performance:
-            performance_issues = self._check_performance(sql, schema_info)
+            performance_issues = self._check_performance(analysis, schema_info)
             issues.extend(performance_issues)
         
         # 分类问题
@@ -346,7 +322,7 @@ class SQLValidatorTool(BaseTool):
             suggestions=suggestions
         )
     
-    def _check_syntax(self, sql: str) -> List[ValidationIssue]:
+    def _check_syntax(self, sql: str, analysis: SQLAnalysis) -> List[ValidationIssue]:
         """检查语法"""
         issues = []
         
@@ -393,34 +369,37 @@ class SQLValidatorTool(BaseTool):
                 suggestion="在大多数情况下，末尾的分号是不必要的"
             ))
         
+        # 按解析出的语句类型检查结构（WITH ... SELECT 同样按 SELECT 检查）
+        statement_type = analysis.statement_type
+        
         # 检查 SELECT 语句结构
-        if sql_upper.startswith("SELECT"):
+        if statement_type == "SELECT":
             select_issues = self._check_select_syntax(sql)
             issues.extend(select_issues)
         
         # 检查 INSERT 语句结构
-        elif sql_upper.startswith("INSERT"):
+        elif statement_type == "INSERT":
             insert_issues = self._check_insert_syntax(sql)
             issues.extend(insert_issues)
         
         # 检查 UPDATE 语句结构
-        elif sql_upper.startswith("UPDATE"):
+        elif statement_type == "UPDATE":
             update_issues = self._check_update_syntax(sql)
             issues.extend(update_issues)
         
         # 检查 DELETE 语句结构
-        elif sql_upper.startswith("DELETE"):
+        elif statement_type == "DELETE":
             delete_issues = self._check_delete_syntax(sql)
             issues.extend(delete_issues)
         
         return issues
     
-    def _check_semantics(self, sql: str, schema_info: Dict[str, Any]) -> List[ValidationIssue]:
+    def _check_semantics(self, analysis: SQLAnalysis, schema_info: Dict[str, Any]) -> List[ValidationIssue]:
         """检查语义"""
         issues = []
         
-        # 提取表名
-        table_names = self._extract_table_names(sql)
+        # 物理表名（CTE 与派生表别名不参与检查）
+        table_names = analysis.table_names
         
         # 检查表是否存在
         available_tables = [table.get("name", "") for table in schema_info.get("tables", [])]
@@ -432,8 +411,8 @@ class SQLValidatorTool(BaseTool):
                     suggestion=f"请检查表名是否正确，可用表: {', '.join(available_tables[:5])}"
                 ))
         
-        # 提取列名
-        column_names = self._extract_column_names(sql)
+        # 提取列名（CTE 与派生表输出的列不参与检查）
+        column_names = analysis.column_names
         
         # 检查列是否存在
         available_columns = schema_info.get("columns", [])
@@ -446,19 +425,19 @@ class SQLValidatorTool(BaseTool):
                 ))
         
         # 检查 JOIN 条件
-        join_issues = self._check_joins(sql, schema_info)
+        join_issues = self._check_joins(analysis, schema_info)
         issues.extend(join_issues)
         
         return issues
     
-    def _check_performance(self, sql: str, schema_info: Dict[str, Any]) -> List[ValidationIssue]:
+    def _check_performance(self, analysis: SQLAnalysis, schema_info: Dict[str, Any]) -> List[ValidationIssue]:
         """检查性能"""
         issues = []
         
-        sql_upper = sql.upper()
+        is_select = analysis.statement_type == "SELECT"
         
         # 检查是否有 LIMIT
-        if "SELECT" in sql_upper and "LIMIT" not in sql_upper:
+        if is_select and not analysis.has_limit:
             issues.append(ValidationIssue(
                 level=ValidationResult.WARNING,
                 message="建议添加 LIMIT 子句限制结果数量",
@@ -466,7 +445,7 @@ class SQLValidatorTool(BaseTool):
             ))
         
         # 检查是否有 WHERE 条件
-        if "SELECT" in sql_upper and "WHERE" not in sql_upper and "JOIN" not in sql_upper:
+        if is_select and not analysis.has_where and not analysis.has_join:
             issues.append(ValidationIssue(
                 level=ValidationResult.WARNING,
                 message="建议添加 WHERE 条件过滤数据",
@@ -475,7 +454,7 @@ class SQLValidatorTool(BaseTool):
         
         # 检查是否有索引
         indexes = schema_info.get("indexes", [])
-        table_names = self._extract_table_names(sql)
+        table_names = analysis.table_names
         
         for table_name in table_names:
             table_indexes = [idx for idx in indexes if idx.get("table_name") == table_name]
@@ -486,8 +465,8 @@ class SQLValidatorTool(BaseTool):
                     suggestion=f"考虑为表 '{table_name}' 添加适当的索引"
                 ))
         
-        # 检查子查询
-        if "SELECT" in sql_upper and sql_upper.count("SELECT") > 1:
+        # 检查子查询（CTE 不计入）
+        if analysis.subquery_count > 0:
             issues.append(ValidationIssue(
                 level=ValidationResult.WARNING,
                 message="查询包含子查询，可能影响性能",
@@ -592,61 +571,11 @@ class SQLValidatorTool(BaseTool):
     
     def _extract_table_names(self, sql: str) -> List[str]:
         """提取表名"""
-        table_names = []
-        
-        # 简单的正则表达式提取表名
-        # FROM 子句
-        from_pattern = r'FROM\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        from_matches = re.findall(from_pattern, sql, re.IGNORECASE)
-        table_names.extend(from_matches)
-        
-        # JOIN 子句
-        join_pattern = r'JOIN\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        join_matches = re.findall(join_pattern, sql, re.IGNORECASE)
-        table_names.extend(join_matches)
-        
-        # UPDATE 子句
-        update_pattern = r'UPDATE\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        update_matches = re.findall(update_pattern, sql, re.IGNORECASE)
-        table_names.extend(update_matches)
-        
-        # DELETE 子句
-        delete_pattern = r'DELETE\s+FROM\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        delete_matches = re.findall(delete_pattern, sql, re.IGNORECASE)
-        table_names.extend(delete_matches)
-        
-        return list(set(table_names))  # 去重
+        return analyze_sql(sql, self._connection_config).table_names
     
     def _extract_column_names(self, sql: str) -> List[str]:
         """提取列名"""
-        column_names = []
-        
-        # SELECT 子句中的列
-        select_pattern = r'SELECT\s+(.*?)\s+FROM'
-        select_match = re.search(select_pattern, sql, re.IGNORECASE | re.DOTALL)
-        if select_match:
-            select_clause = select_match.group(1)
-            # 简单的列名提取
-            columns = [col.strip() for col in select_clause.split(',')]
-            for col in columns:
-                # 移除别名
-                if ' AS ' in col.upper():
-                    col = col.split(' AS ')[0].strip()
-                # 移除函数
-                if '(' in col and ')' in col:
-                    continue
-                column_names.append(col)
-        
-        # WHERE 子句中的列
-        where_pattern = r'WHERE\s+(.*?)(?:\s+GROUP\s+BY|\s+ORDER\s+BY|\s+LIMIT|$)'
-        where_match = re.search(where_pattern, sql, re.IGNORECASE | re.DOTALL)
-        if where_match:
-            where_clause = where_match.group(1)
-            # 简单的列名提取
-            where_columns = re.findall(r'([a-zA-Z_][a-zA-Z0-9_]*)', where_clause)
-            column_names.extend(where_columns)
-        
-        return list(set(column_names))  # 去重
+        return analyze_sql(sql, self._connection_config).column_names
     
     def _column_exists(self, column_name: str, available_columns: List[Dict[str, Any]]) -> bool:
         """检查列是否存在"""
@@ -655,22 +584,18 @@ class SQLValidatorTool(BaseTool):
                 return True
         return False
     
-    def _check_joins(self, sql: str, schema_info: Dict[str, Any]) -> List[ValidationIssue]:
+    def _check_joins(self, analysis: SQLAnalysis, schema_info: Dict[str, Any]) -> List[ValidationIssue]:
         """检查 JOIN 条件"""
         issues = []
         
-        # 提取 JOIN 条件
-        join_pattern = r'JOIN\s+([a-zA-Z_][a-zA-Z0-9_]*)\s+ON\s+(.*?)(?:\s+JOIN|\s+WHERE|\s+GROUP|\s+ORDER|\s+LIMIT|$)'
-        join_matches = re.findall(join_pattern, sql, re.IGNORECASE | re.DOTALL)
-        
         relationships = schema_info.get("relationships", [])
         
-        for table_name, join_condition in join_matches:
-            # 检查 JOIN 条件是否合理
-            if '=' not in join_condition:
+        for join in analysis.joins:
+            # 检查 JOIN 条件是否合理（USING 与无条件的 JOIN 不检查）
+            if join.condition and '=' not in join.condition:
                 issues.append(ValidationIssue(
                     level=ValidationResult.WARNING,
-                    message=f"JOIN 条件 '{join_condition}' 可能不正确",
+                    message=f"JOIN 条件 '{join.condition}' 可能不正确",
                     suggestion="JOIN 条件通常使用等号 (=) 连接两个列"
                 ))
         
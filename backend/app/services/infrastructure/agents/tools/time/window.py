@@ -18,9 +18,22 @@ from pydantic import BaseModel, Field
 
 
 from ...types import ToolCategory, ContextInfo
+from .window_engine import (
+    MICROSECONDS_PER_SECOND,
+    TimeColumn,
+    WindowBounds,
+    aggregate_windows,
+    numeric_column,
+    session_bounds,
+    sliding_bounds,
+    tumbling_bounds,
+)
 
 logger = logging.getLogger(__name__)
 
+# 数据量达到该行数时使用向量化窗口引擎，小数据沿用逐行处理
+_VECTORIZE_MIN_ROWS = 64
+
 
 class WindowType(str, Enum):
     """窗口类型"""
@@ -219,22 +232,25 @@ class TimeWindowTool(BaseTool):
         aggregation: Optional[Dict[str, str]]
     ) -> WindowResult:
         """处理窗口"""
-        # 按时间排序数据
-        sorted_data = self._sort_by_time(data, config.time_column)
-        
-        # 根据窗口类型处理
-        if config.window_type == WindowType.TUMBLING:
-            windows = self._create_tumbling_windows(sorted_data, config)
-        elif config.window_type == WindowType.SLIDING:
-            windows = self._create_sliding_windows(sorted_data, config)
-        elif config.window_type == WindowType.SESSION:
-            windows = self._create_session_windows(sorted_data, config)
+        if len(data) >= _VECTORIZE_MIN_ROWS:
+            windows = self._process_windows_vectorized(data, config, aggregation)
         else:
-            windows = self._create_custom_windows(sorted_data, config)
-        
-        # 应用聚合
-        if aggregation:
-            windows = self._apply_aggregation(windows, aggregation)
+            # 按时间排序数据
+            sorted_data = self._sort_by_time(data, config.time_column)
+            
+            # 根据窗口类型处理
+            if config.window_type == WindowType.TUMBLING:
+                windows = self._create_tumbling_windows(sorted_data, config)
+            elif config.window_type == WindowType.SLIDING:
+                windows = self._create_sliding_windows(sorted_data, config)
+            elif config.window_type == WindowType.SESSION:
+                windows = self._create_session_windows(sorted_data, config)
+            else:
+                windows = self._create_custom_windows(sorted_data, config)
+            
+            # 应用聚合
+            if aggregation:
+                windows = self._apply_aggregation(windows, aggregation)
         
         # 计算统计信息
         statistics = self._calculate_window_statistics(windows)
@@ -247,6 +263,80 @@ class TimeWindowTool(BaseTool):
             statistics=statistics
         )
     
+    def _process_windows_vectorized(
+        self,
+        data: List[Dict[str, Any]],
+        config: WindowConfig,
+        aggregation: Optional[Dict[str, str]]
+    ) -> List[Dict[str, Any]]:
+        """向量化处理窗口：时间列只解析、排序一次，窗口与聚合在数组上计算，结果与逐行处理一致"""
+        column = TimeColumn.from_rows(data, lambda row: self._get_timestamp(row, config.time_column))
+        size = self._convert_to_seconds(config.size, config.time_unit) * MICROSECONDS_PER_SECOND
+        
+        if config.window_type == WindowType.SLIDING:
+            slide = self._convert_to_seconds(config.slide_size or config.size, config.time_unit) * MICROSECONDS_PER_SECOND
+            bounds = sliding_bounds(column.epochs, size, slide)
+        elif config.window_type == WindowType.SESSION:
+            timeout = (config.session_timeout or 1800) * MICROSECONDS_PER_SECOND  # 默认30分钟
+            bounds = session_bounds(column.epochs, timeout)
+        else:
+            # 自定义窗口与逐行处理一致，按滚动窗口处理
+            bounds = tumbling_bounds(column.epochs, size)
+        
+        windows = []
+        for window_id, (lo, hi) in enumerate(zip(bounds.lo.tolist(), bounds.hi.tolist())):
+            if bounds.starts is not None:
+                offset = int(bounds.starts[window_id] - column.epochs[0])
+                start_time, end_time = column.shifted(offset), column.shifted(offset + size)
+            else:
+                start_time, end_time = column.timestamps[lo], column.timestamps[hi - 1]
+            
+            window = {
+                "window_id": window_id,
+                "start_time": start_time.isoformat(),
+                "end_time": end_time.isoformat(),
+            }
+            if not aggregation:
+                window["data"] = column.rows[lo:hi]
+            window["record_count"] = hi - lo
+            if bounds.starts is None:
+                window["session_duration"] = int(column.epochs[hi - 1] - column.epochs[lo]) / MICROSECONDS_PER_SECOND
+            windows.append(window)
+        
+        if aggregation:
+            windows = self._aggregate_bounds(windows, column, bounds, aggregation)
+        return windows
+    
+    def _aggregate_bounds(
+        self,
+        windows: List[Dict[str, Any]],
+        column: TimeColumn,
+        bounds: WindowBounds,
+        aggregation: Dict[str, str]
+    ) -> List[Dict[str, Any]]:
+        """按窗口区间在数值数组上聚合，输出结构与 _apply_aggregation 一致"""
+        results = []
+        for name, agg_func in aggregation.items():
+            aggregated = aggregate_windows(numeric_column(column.rows, name), bounds, agg_func)
+            if aggregated is not None:
+                results.append((name, agg_func.lower(), aggregated))
+        
+        aggregated_windows = []
+        for index, window in enumerate(windows):
+            aggregated_data = {}
+            for name, agg_func, aggregated in results:
+                if aggregated["counts"][index] > 0:
+                    value = aggregated["values"][index]
+                    aggregated_data[f"{name}_{agg_func}"] = int(value) if agg_func == "count" else float(value)
+            aggregated_windows.append({
+                "window_id": window["window_id"],
+                "start_time": window["start_time"],
+                "end_time": window["end_time"],
+                "record_count": window["record_count"],
+                "aggregated_data": aggregated_data
+            })
+        return aggregated_windows
+    
     def _sort_by_time(self, data: List[Dict[str, Any]], time_column: str) -> List[Dict[str, Any]]:
         """按时间排序数据"""
         def get_timestamp(row):
@@ -0,0 +1,209 @@
+"""
+时间窗口计算引擎
+
+时间列只解析一次，转换为 int64 微秒时间戳数组并排序一次；窗口边界用 searchsorted 定位，
+每个窗口对应排序后数据的一个连续区间 [lo, hi)，聚合在 NumPy 数组上按区间归约。
+只生成包含数据的窗口，窗口数与数据量成正比，不随时间跨度增长。
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+MICROSECONDS_PER_SECOND = 1_000_000
+
+
+def to_epoch_microseconds(timestamp: datetime) -> int:
+    """datetime 转 epoch 微秒（无时区的时间按原值计算）"""
+    base = _EPOCH if timestamp.tzinfo is None else _EPOCH_UTC
+    return (timestamp - base) // _ONE_MICROSECOND
+
+
+@dataclass
+class TimeColumn:
+    """按时间排序后的行、时间戳及对应的 epoch 微秒数组"""
+    rows: List[Dict[str, Any]]
+    timestamps: List[datetime]
+    epochs: np.ndarray
+
+    @classmethod
+    def from_rows(
+        cls, rows: Sequence[Dict[str, Any]], parse: Callable[[Dict[str, Any]], datetime]
+    ) -> "TimeColumn":
+        """每行只解析一次时间，稳定排序（时间相同的行保持原顺序）"""
+        timestamps = [parse(row) for row in rows]
+        epochs = np.fromiter(
+            (to_epoch_microseconds(ts) for ts in timestamps), dtype=np.int64, count=len(timestamps)
+        )
+        order = np.argsort(epochs, kind="stable")
+        return cls(
+            rows=[rows[i] for i in order],
+            timestamps=[timestamps[i] for i in order],
+            epochs=epochs[order],
+        )
+
+    def shifted(self, microseconds: int) -> datetime:
+        """首行时间加上偏移，保留首行的时区信息"""
+        return self.timestamps[0] + timedelta(microseconds=int(microseconds))
+
+
+@dataclass
+class WindowBounds:
+    """窗口区间：第 i 个窗口包含排序后的行 [lo[i], hi[i])；starts 为窗口起点（会话窗口为 None）"""
+    lo: np.ndarray
+    hi: np.ndarray
+    starts: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.lo)
+
+
+def _empty_bounds(with_starts: bool) -> WindowBounds:
+    empty = np.empty(0, dtype=np.int64)
+    return WindowBounds(empty, empty, empty if with_starts else None)
+
+
+def _window_count(epochs: np.ndarray, step: int) -> int:
+    """起点 t0 + k*step 严格早于最后一条记录的窗口数"""
+    span = int(epochs[-1] - epochs[0])
+    return -(-span // step)
+
+
+def tumbling_bounds(epochs: np.ndarray, size: int) -> WindowBounds:
+    """
+    滚动窗口：第 k 个窗口为 [t0 + k*size, t0 + (k+1)*size)
+
+    与逐窗口扫描一致，只生成起点早于最后一条记录的窗口
+    """
+    if size <= 0:
+        raise ValueError("窗口大小必须大于0")
+    if len(epochs) == 0:
+        return _empty_bounds(True)
+
+    window_index = (epochs - epochs[0]) // size
+    kept = int(np.searchsorted(window_index, _window_count(epochs, size), side="left"))
+    if kept == 0:
+        return _empty_bounds(True)
+    window_index = window_index[:kept]
+
+    changes = np.flatnonzero(np.diff(window_index)) + 1
+    lo = np.concatenate(([0], changes))
+    hi = np.concatenate((changes, [kept]))
+    return WindowBounds(lo, hi, epochs[0] + window_index[lo] * size)
+
+
+def sliding_bounds(epochs: np.ndarray, size: int, slide: int) -> WindowBounds:
+    """
+    滑动窗口：第 j 个窗口为 [t0 + j*slide, t0 + j*slide + size)
+
+    先由每条记录推出覆盖它的窗口编号区间并合并，只对非空窗口做 searchsorted
+    """
+    if size <= 0 or slide <= 0:
+        raise ValueError("窗口大小和滑动大小必须大于0")
+    if len(epochs) == 0:
+        return _empty_bounds(True)
+
+    count = _window_count(epochs, slide)
+    relative = epochs - epochs[0]
+    # 包含记录 t 的窗口满足 j*slide <= t < j*slide + size
+    first = np.maximum(-((size - 1 - relative) // slide), 0)
+    last = np.minimum(relative // slide, count - 1)
+    covered = first <= last
+    first, last = first[covered], last[covered]
+    if len(first) == 0:
+        return _empty_bounds(True)
+
+    # first/last 随时间单调不减，相邻区间不相接处即为新的连续段
+    breaks = np.flatnonzero(first[1:] > last[:-1] + 1) + 1
+    segment_first = first[np.concatenate(([0], breaks))]
+    segment_last = last[np.concatenate((breaks - 1, [len(last) - 1]))]
+    window_index = np.concatenate([
+        np.arange(a, b + 1, dtype=np.int64) for a, b in zip(segment_first, segment_last)
+    ])
+
+    starts = epochs[0] + window_index * slide
+    lo = np.searchsorted(epochs, starts, side="left")
+    hi = np.searchsorted(epochs, starts + size, side="left")
+    non_empty = hi > lo
+    return WindowBounds(lo[non_empty], hi[non_empty], starts[non_empty])
+
+
+def session_bounds(epochs: np.ndarray, timeout: int) -> WindowBounds:
+    """会话窗口：相邻记录间隔超过 timeout 时切分"""
+    if len(epochs) == 0:
+        return _empty_bounds(False)
+    breaks = np.flatnonzero(np.diff(epochs) > timeout) + 1
+    lo = np.concatenate(([0], breaks))
+    hi = np.concatenate((breaks, [len(epochs)]))
+    return WindowBounds(lo, hi)
+
+
+def numeric_column(rows: Sequence[Dict[str, Any]], column: str) -> np.ndarray:
+    """提取数值列，缺失或无法转换为数值的记录为 NaN"""
+    values = np.full(len(rows), np.nan)
+    for i, row in enumerate(rows):
+        value = row.get(column)
+        if value is None:
+            continue
+        try:
+            values[i] = float(value)
+        except (ValueError, TypeError):
+            continue
+    return values
+
+
+def _reduce_slices(ufunc: np.ufunc, values: np.ndarray, bounds: WindowBounds, pad: Any) -> np.ndarray:
+    """对每个 [lo, hi) 区间归约；区间可以重叠（滑动窗口）"""
+    padded = np.append(values, pad)
+    indices = np.empty(2 * len(bounds), dtype=np.intp)
+    indices[0::2] = bounds.lo
+    indices[1::2] = bounds.hi
+    return ufunc.reduceat(padded, indices)[0::2]
+
+
+def aggregate_windows(values: np.ndarray, bounds: WindowBounds, func: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    按窗口聚合数值列
+
+    Returns:
+        {"values": 每个窗口的聚合值, "counts": 每个窗口的有效值数量}；不支持的聚合函数返回 None
+    """
+    func = func.lower()
+    if func not in ("sum", "avg", "min", "max", "count"):
+        return None
+    if len(bounds) == 0:
+        empty = np.empty(0)
+        return {"values": empty, "counts": empty.astype(np.int64)}
+
+    valid = ~np.isnan(values)
+    counts = _reduce_slices(np.add, valid.astype(np.int64), bounds, 0)
+    if func == "count":
+        result = counts
+    elif func in ("sum", "avg"):
+        result = _reduce_slices(np.add, np.where(valid, values, 0.0), bounds, 0.0)
+        if func == "avg":
+            result = result / np.maximum(counts, 1)
+    elif func == "min":
+        result = _reduce_slices(np.minimum, np.where(valid, values, np.inf), bounds, np.inf)
+    else:
+        result = _reduce_slices(np.maximum, np.where(valid, values, -np.inf), bounds, -np.inf)
+    return {"values": result, "counts": counts}
+
+
+__all__ = [
+    "MICROSECONDS_PER_SECOND",
+    "TimeColumn",
+    "WindowBounds",
+    "aggregate_windows",
+    "numeric_column",
+    "session_bounds",
+    "sliding_bounds",
+    "to_epoch_microseconds",
+    "tumbling_bounds",
+]
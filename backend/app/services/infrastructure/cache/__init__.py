@@ -10,7 +10,8 @@ Cache Services Module
 
 from .unified_cache_system import (
     UnifiedCacheManager, UnifiedCacheEntry, CacheType, CacheLevel,
-    initialize_cache_manager, get_cache_manager
+    initialize_cache_manager, get_cache_manager,
+    cache_get_many, cache_get_or_load
 )
 from .redis_cache_service import (
     cache_service,
@@ -29,6 +30,8 @@ __all__ = [
     "CacheLevel",
     "initialize_cache_manager",
     "get_cache_manager",
+    "cache_get_many",
+    "cache_get_or_load",
     "cache_service",
     "get_cache_service",
     "cached",
@@ -8,7 +8,10 @@ import logging
 import asyncio
 import json
 import hashlib
-from typing import Dict, Any, Optional, List, Union, Set
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Union, Set, Callable, Awaitable, Iterable
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
@@ -16,8 +19,18 @@ from abc import ABC, abstractmethod
 import redis
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
+# get_or_load 使用的元数据字段：软过期时间（之后返回旧值并后台刷新）与保留原值标记
+FRESH_UNTIL_KEY = "fresh_until"
+PRESERVE_VALUE_KEY = "preserve_value"
+
+# 跨进程加载锁的键前缀与等待轮询间隔
+LOAD_LOCK_PREFIX = "autoreport:cache_lock:"
+LOAD_LOCK_POLL_INTERVAL = 0.05
+
 
 class CacheLevel(Enum):
     """缓存层级"""
@@ -251,31 +264,42 @@ class CacheInterface(ABC):
     async def clear(self) -> bool:
         """清空缓存"""
         pass
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, UnifiedCacheEntry]:
+        """批量获取缓存，只返回命中的键（默认逐个获取，支持批量的实现应覆盖）"""
+        results = {}
+        for key in keys:
+            entry = await self.get(key)
+            if entry is not None:
+                results[key] = entry
+        return results
+    
+    async def set_many(self, entries: List[UnifiedCacheEntry]) -> Dict[str, bool]:
+        """批量设置缓存（默认逐个设置，支持批量的实现应覆盖）"""
+        return {entry.key: await self.set(entry) for entry in entries}
 
 
 class MemoryCache(CacheInterface):
     """内存缓存实现"""
     
     def __init__(self, max_size: int = 1000):
-        self.cache: Dict[str, UnifiedCacheEntry] = {}
+        # 有序字典维护LRU顺序：最近访问的在末尾
+        self.cache: "OrderedDict[str, UnifiedCacheEntry]" = OrderedDict()
         self.max_size = max_size
-        self.access_order: List[str] = []  # LRU顺序
     
     async def get(self, key: str) -> Optional[UnifiedCacheEntry]:
         """获取缓存"""
-        if key not in self.cache:
+        entry = self.cache.get(key)
+        if entry is None:
             return None
         
-        entry = self.cache[key]
         if entry.is_expired:
             await self.delete(key)
             entry.metrics.update_miss()
             return None
         
         # 更新访问顺序
-        if key in self.access_order:
-            self.access_order.remove(key)
-        self.access_order.append(key)
+        self.cache.move_to_end(key)
         
         entry.metrics.update_hit()
         return entry
@@ -284,12 +308,11 @@ class MemoryCache(CacheInterface):
         """设置缓存"""
         try:
             # 如果超过容量，清理旧条目
-            if len(self.cache) >= self.max_size:
+            if entry.key not in self.cache and len(self.cache) >= self.max_size:
                 await self._evict_lru()
             
             self.cache[entry.key] = entry
-            if entry.key not in self.access_order:
-                self.access_order.append(entry.key)
+            self.cache.move_to_end(entry.key)
             
             return True
         except Exception as e:
@@ -298,10 +321,7 @@ class MemoryCache(CacheInterface):
     
     async def delete(self, key: str) -> bool:
         """删除缓存"""
-        if key in self.cache:
-            del self.cache[key]
-        if key in self.access_order:
-            self.access_order.remove(key)
+        self.cache.pop(key, None)
         return True
     
     async def exists(self, key: str) -> bool:
@@ -311,14 +331,12 @@ class MemoryCache(CacheInterface):
     async def clear(self) -> bool:
         """清空缓存"""
         self.cache.clear()
-        self.access_order.clear()
         return True
     
     async def _evict_lru(self):
         """清理最少使用的缓存"""
-        if self.access_order:
-            oldest_key = self.access_order[0]
-            await self.delete(oldest_key)
+        if self.cache:
+            self.cache.popitem(last=False)
 
 
 class RedisCache(CacheInterface):
@@ -351,35 +369,61 @@ class RedisCache(CacheInterface):
                 entry.metrics.update_miss()
                 return None
             
+            # 命中统计只在本地更新，读路径不再回写Redis
             entry.metrics.update_hit()
-            # 更新Redis中的统计信息
-            await self._update_entry_metrics(entry)
             return entry
             
         except Exception as e:
             logger.error(f"Redis缓存获取失败: {e}")
             return None
     
+    async def get_many(self, keys: List[str]) -> Dict[str, UnifiedCacheEntry]:
+        """使用MGET一次往返批量获取"""
+        if not self.redis_client or not keys:
+            return {}
+        
+        try:
+            raw_values = self.redis_client.mget([self._get_full_key(key) for key in keys])
+        except Exception as e:
+            logger.error(f"Redis缓存批量获取失败: {e}")
+            return {}
+        
+        results = {}
+        expired_keys = []
+        for key, data in zip(keys, raw_values):
+            if not data:
+                continue
+            try:
+                entry = UnifiedCacheEntry.from_dict(json.loads(data))
+            except Exception as e:
+                logger.warning(f"Redis缓存条目解析失败 {key}: {e}")
+                continue
+            if entry.is_expired:
+                expired_keys.append(self._get_full_key(key))
+                continue
+            entry.metrics.update_hit()
+            results[key] = entry
+        
+        if expired_keys:
+            try:
+                self.redis_client.delete(*expired_keys)
+            except Exception as e:
+                logger.warning(f"删除过期Redis缓存失败: {e}")
+        return results
+    
     async def set(self, entry: UnifiedCacheEntry) -> bool:
         """设置缓存（带大小检查和压缩）"""
         if not self.redis_client:
             return False
         
         try:
-            full_key = self._get_full_key(entry.key)
-            
-            # 优化缓存数据 - 移除不必要的大型数据
-            optimized_entry = self._optimize_cache_entry(entry)
-            data = json.dumps(optimized_entry.to_dict(), ensure_ascii=False)
-            
-            # 检查数据大小，如果超过限制则压缩
-            max_cache_size = 512 * 1024  # 512KB限制
-            if len(data.encode('utf-8')) > max_cache_size:
-                logger.warning(f"缓存数据过大 ({len(data.encode('utf-8'))} bytes)，跳过Redis缓存: {entry.key}")
+            prepared = self._prepare_entry(entry)
+            if prepared is None:
                 return False
+            full_key, data, ttl_seconds = prepared
             
-            if optimized_entry.ttl_seconds > 0:
-                self.redis_client.setex(full_key, optimized_entry.ttl_seconds, data)
+            if ttl_seconds > 0:
+                self.redis_client.setex(full_key, ttl_seconds, data)
             else:
                 self.redis_client.set(full_key, data)
             
@@ -395,6 +439,50 @@ class RedisCache(CacheInterface):
                 logger.error(f"Redis缓存设置失败: {e}")
                 return False
     
+    async def set_many(self, entries: List[UnifiedCacheEntry]) -> Dict[str, bool]:
+        """使用pipeline一次往返批量设置"""
+        results = {entry.key: False for entry in entries}
+        if not self.redis_client or not entries:
+            return results
+        
+        prepared_keys = []
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for entry in entries:
+                prepared = self._prepare_entry(entry)
+                if prepared is None:
+                    continue
+                full_key, data, ttl_seconds = prepared
+                if ttl_seconds > 0:
+                    pipeline.setex(full_key, ttl_seconds, data)
+                else:
+                    pipeline.set(full_key, data)
+                prepared_keys.append(entry.key)
+            
+            if prepared_keys:
+                for key, outcome in zip(prepared_keys, pipeline.execute(raise_on_error=False)):
+                    results[key] = not isinstance(outcome, Exception)
+            return results
+            
+        except Exception as e:
+            logger.error(f"Redis缓存批量设置失败: {e}")
+            return results
+    
+    def _prepare_entry(self, entry: UnifiedCacheEntry) -> Optional[tuple]:
+        """序列化条目，返回 (完整键, 数据, TTL)，超过大小限制时返回None"""
+        # 优化缓存数据 - 移除不必要的大型数据
+        optimized_entry = self._optimize_cache_entry(entry)
+        data = json.dumps(optimized_entry.to_dict(), ensure_ascii=False, default=str)
+        
+        # 检查数据大小
+        max_cache_size = 512 * 1024  # 512KB限制
+        data_size = len(data.encode('utf-8'))
+        if data_size > max_cache_size:
+            logger.warning(f"缓存数据过大 ({data_size} bytes)，跳过Redis缓存: {entry.key}")
+            return None
+        
+        return self._get_full_key(entry.key), data, optimized_entry.ttl_seconds
+    
     async def delete(self, key: str) -> bool:
         """删除缓存"""
         if not self.redis_client:
@@ -475,28 +563,15 @@ class RedisCache(CacheInterface):
             logger.error(f"清理过期缓存键失败: {e}")
             return 0
     
-    async def _update_entry_metrics(self, entry: UnifiedCacheEntry):
-        """更新条目指标"""
-        try:
-            full_key = self._get_full_key(entry.key)
-            optimized_entry = self._optimize_cache_entry(entry)
-            data = json.dumps(optimized_entry.to_dict(), ensure_ascii=False)
-            # 保持原有TTL
-            ttl = self.redis_client.ttl(full_key)
-            if ttl > 0:
-                self.redis_client.setex(full_key, ttl, data)
-            else:
-                self.redis_client.set(full_key, data)
-        except Exception as e:
-            logger.warning(f"更新Redis缓存指标失败: {e}")
-    
     def _optimize_cache_entry(self, entry: UnifiedCacheEntry) -> UnifiedCacheEntry:
         """优化缓存条目，减少存储大小"""
         try:
             # 创建优化后的条目副本
+            # get_or_load 等需要原样取回的值不做裁剪
+            preserve_value = bool(entry.metadata.get(PRESERVE_VALUE_KEY))
             optimized = UnifiedCacheEntry(
                 key=entry.key,
-                value=self._compress_cache_value(entry.value),
+                value=entry.value if preserve_value else self._compress_cache_value(entry.value),
                 cache_type=entry.cache_type,
                 cache_level=entry.cache_level,
                 created_at=entry.created_at,
@@ -558,7 +633,7 @@ class RedisCache(CacheInterface):
             # 只保留重要的元数据字段
             essential_fields = [
                 'placeholder_id', 'placeholder_name', 'placeholder_type',
-                'execution_source', 'sql_query'
+                'execution_source', 'sql_query', FRESH_UNTIL_KEY, PRESERVE_VALUE_KEY
             ]
             
             compressed = {}
@@ -638,8 +713,16 @@ class UnifiedCacheManager:
             "total_gets": 0,
             "total_sets": 0,
             "total_hits": 0,
-            "total_misses": 0
+            "total_misses": 0,
+            "loads": 0,
+            "coalesced_loads": 0,
+            "stale_served": 0
         }
+        
+        # 进程内正在进行的加载：(事件循环id, key) -> Future
+        # Celery任务每次调用可能使用新的事件循环，按循环区分避免跨循环等待
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._background_refreshes: Set[asyncio.Task] = set()
     
     async def get(self, key: str, preferred_level: Optional[CacheLevel] = None) -> Optional[UnifiedCacheEntry]:
         """获取缓存，支持级联查找"""
@@ -666,6 +749,268 @@ class UnifiedCacheManager:
         self.stats["total_misses"] += 1
         return None
     
+    async def get_many(
+        self,
+        keys: Iterable[str],
+        preferred_level: Optional[CacheLevel] = None
+    ) -> Dict[str, UnifiedCacheEntry]:
+        """批量获取缓存，每个层级只查询一次剩余未命中的键"""
+        keys = list(dict.fromkeys(keys))
+        self.stats["total_gets"] += len(keys)
+        
+        found: Dict[str, UnifiedCacheEntry] = {}
+        remaining = keys
+        for level in self._get_search_order(preferred_level):
+            if not remaining:
+                break
+            
+            entries = await self.caches[level].get_many(remaining)
+            hits = {key: entry for key, entry in entries.items() if entry.is_valid}
+            if not hits:
+                continue
+            
+            found.update(hits)
+            await self._promote_entries(list(hits.values()), level)
+            remaining = [key for key in remaining if key not in hits]
+        
+        self.stats["total_hits"] += len(found)
+        self.stats["total_misses"] += len(keys) - len(found)
+        return found
+    
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        cache_type: CacheType,
+        cache_level: CacheLevel = CacheLevel.MEMORY,
+        ttl_seconds: int = 3600,
+        confidence: float = 1.0,
+        metadata: Optional[Dict[str, Any]] = None,
+        tags: Optional[Set[str]] = None
+    ) -> Dict[str, bool]:
+        """批量设置缓存（Redis层使用pipeline一次提交）"""
+        if cache_level not in self.caches:
+            return {key: False for key in items}
+        
+        self.stats["total_sets"] += len(items)
+        entries = [
+            UnifiedCacheEntry(
+                key=key,
+                value=value,
+                cache_type=cache_type,
+                cache_level=cache_level,
+                ttl_seconds=ttl_seconds,
+                confidence=confidence,
+                metadata=dict(metadata or {}),
+                tags=set(tags or set())
+            )
+            for key, value in items.items()
+        ]
+        
+        results = await self.caches[cache_level].set_many(entries)
+        if cache_level != CacheLevel.MEMORY:
+            await self._promote_entries([e for e in entries if results.get(e.key)], cache_level)
+        return results
+    
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        cache_type: CacheType = CacheType.PLACEHOLDER_RESULT,
+        cache_level: CacheLevel = CacheLevel.REDIS,
+        ttl_seconds: int = 3600,
+        stale_ttl_seconds: Optional[int] = None,
+        lock_timeout: Optional[float] = None,
+        tags: Optional[Set[str]] = None
+    ) -> Any:
+        """
+        获取缓存，未命中时调用 loader 加载并写入缓存
+        
+        - 同一进程内并发请求同一个键时只执行一次 loader，其余请求等待结果
+        - 配置Redis时通过短时锁在进程间去重，等待方轮询缓存，锁超时后自行加载
+        - 条目超过 ttl_seconds 但仍在 stale_ttl_seconds 内时直接返回旧值，并在后台刷新
+        
+        Args:
+            key: 缓存键
+            loader: 无参协程函数，返回要缓存的值（返回None时不写入缓存）
+            ttl_seconds: 新鲜期
+            stale_ttl_seconds: 新鲜期后允许返回旧值的时长，默认读取配置
+            lock_timeout: 跨进程加载锁超时（秒），默认读取配置
+        """
+        if stale_ttl_seconds is None or lock_timeout is None:
+            default_stale, default_lock = self._load_defaults()
+            stale_ttl_seconds = default_stale if stale_ttl_seconds is None else stale_ttl_seconds
+            lock_timeout = default_lock if lock_timeout is None else lock_timeout
+        
+        options = dict(
+            cache_type=cache_type,
+            cache_level=cache_level,
+            ttl_seconds=ttl_seconds,
+            stale_ttl_seconds=stale_ttl_seconds,
+            lock_timeout=lock_timeout,
+            tags=tags
+        )
+        
+        entry = await self.get(key)
+        if entry is not None:
+            fresh_until = entry.metadata.get(FRESH_UNTIL_KEY)
+            if fresh_until is None or time.time() < fresh_until:
+                return entry.value
+            # 软过期：返回旧值，后台刷新
+            self.stats["stale_served"] += 1
+            self._schedule_refresh(key, loader, options)
+            return entry.value
+        
+        return await self._single_flight(key, loader, options)
+    
+    async def _single_flight(self, key: str, loader: Callable[[], Awaitable[Any]], options: Dict[str, Any]) -> Any:
+        """进程内去重：同一事件循环内同一键只有一个加载在执行"""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        
+        pending = self._inflight.get(flight_key)
+        if pending is not None:
+            self.stats["coalesced_loads"] += 1
+            return await asyncio.shield(pending)
+        
+        future = loop.create_future()
+        self._inflight[flight_key] = future
+        try:
+            value = await self._load_with_lock(key, loader, options)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 避免无人等待时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(flight_key, None)
+    
+    async def _load_with_lock(self, key: str, loader: Callable[[], Awaitable[Any]], options: Dict[str, Any]) -> Any:
+        """跨进程去重：持有Redis锁的进程执行加载，其余进程等待缓存写入"""
+        redis_client = self._get_redis_client()
+        lock_timeout = options["lock_timeout"]
+        token = None
+        
+        if redis_client is not None and lock_timeout > 0:
+            deadline = time.monotonic() + lock_timeout
+            token = self._acquire_load_lock(redis_client, key, lock_timeout)
+            while token is None:
+                entry = await self._wait_for_entry(redis_client, key, deadline)
+                if entry is not None:
+                    self.stats["coalesced_loads"] += 1
+                    return entry.value
+                if time.monotonic() >= deadline:
+                    logger.debug(f"等待缓存加载超时，自行加载: {key}")
+                    break
+                # 持锁方已释放但未写入缓存（加载失败或结果为空），尝试接手加载
+                token = self._acquire_load_lock(redis_client, key, lock_timeout)
+        
+        try:
+            self.stats["loads"] += 1
+            value = await loader()
+            if value is not None:
+                await self._store_loaded_value(key, value, options)
+            return value
+        finally:
+            if token is not None:
+                self._release_load_lock(redis_client, key, token)
+    
+    async def _wait_for_entry(self, redis_client, key: str, deadline: float) -> Optional[UnifiedCacheEntry]:
+        """轮询Redis等待其他进程写入缓存；锁已释放仍无条目时提前返回None"""
+        redis_cache = self.caches[CacheLevel.REDIS]
+        lock_key = f"{LOAD_LOCK_PREFIX}{key}"
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOAD_LOCK_POLL_INTERVAL)
+            # 先查锁再查条目：持锁方总是先写缓存再释放锁
+            try:
+                lock_released = not redis_client.exists(lock_key)
+            except Exception as e:
+                logger.warning(f"检查缓存加载锁失败 {key}: {e}")
+                lock_released = False
+            entry = await redis_cache.get(key)
+            if entry is not None and entry.is_valid:
+                fresh_until = entry.metadata.get(FRESH_UNTIL_KEY)
+                if fresh_until is None or time.time() < fresh_until:
+                    await self._promote_entry(entry, CacheLevel.REDIS)
+                    return entry
+            if lock_released:
+                return None
+        return None
+    
+    async def _store_loaded_value(self, key: str, value: Any, options: Dict[str, Any]) -> bool:
+        """写入加载结果，物理TTL包含可返回旧值的时长"""
+        ttl_seconds = options["ttl_seconds"]
+        stale_ttl_seconds = options["stale_ttl_seconds"]
+        metadata = {PRESERVE_VALUE_KEY: True}
+        if ttl_seconds > 0:
+            metadata[FRESH_UNTIL_KEY] = time.time() + ttl_seconds
+        
+        return await self.set(
+            key,
+            value,
+            options["cache_type"],
+            cache_level=options["cache_level"],
+            ttl_seconds=ttl_seconds + stale_ttl_seconds if ttl_seconds > 0 else ttl_seconds,
+            metadata=metadata,
+            tags=options["tags"]
+        )
+    
+    def _schedule_refresh(self, key: str, loader: Callable[[], Awaitable[Any]], options: Dict[str, Any]):
+        """后台刷新软过期条目（同一键已有加载在进行时跳过）"""
+        loop = asyncio.get_running_loop()
+        if (id(loop), key) in self._inflight:
+            return
+        
+        async def _refresh():
+            try:
+                await self._single_flight(key, loader, options)
+            except Exception as e:
+                logger.warning(f"后台刷新缓存失败 {key}: {e}")
+        
+        task = loop.create_task(_refresh())
+        self._background_refreshes.add(task)
+        task.add_done_callback(self._background_refreshes.discard)
+    
+    def _get_redis_client(self):
+        redis_cache = self.caches.get(CacheLevel.REDIS)
+        return getattr(redis_cache, "redis_client", None)
+    
+    @staticmethod
+    def _acquire_load_lock(redis_client, key: str, lock_timeout: float) -> Optional[str]:
+        """SET NX PX 获取加载锁，返回锁令牌；Redis异常时视为获取成功以免阻塞加载"""
+        token = uuid.uuid4().hex
+        try:
+            acquired = redis_client.set(
+                f"{LOAD_LOCK_PREFIX}{key}", token, nx=True, px=int(lock_timeout * 1000)
+            )
+        except Exception as e:
+            logger.warning(f"获取缓存加载锁失败 {key}: {e}")
+            return token
+        return token if acquired else None
+    
+    @staticmethod
+    def _release_load_lock(redis_client, key: str, token: str):
+        """只释放自己持有的锁"""
+        lock_key = f"{LOAD_LOCK_PREFIX}{key}"
+        try:
+            current = redis_client.get(lock_key)
+            if isinstance(current, bytes):
+                current = current.decode("utf-8")
+            if current == token:
+                redis_client.delete(lock_key)
+        except Exception as e:
+            logger.warning(f"释放缓存加载锁失败 {key}: {e}")
+    
+    @staticmethod
+    def _load_defaults() -> tuple:
+        """get_or_load 默认的 (旧值可用时长, 锁超时)"""
+        return settings.CACHE_STALE_WHILE_REVALIDATE, settings.CACHE_LOAD_LOCK_TIMEOUT
+    
     async def set(
         self, 
         key: str, 
@@ -836,6 +1181,9 @@ class UnifiedCacheManager:
             "total_hits": self.stats["total_hits"],
             "total_misses": self.stats["total_misses"],
             "hit_rate": hit_rate,
+            "loads": self.stats["loads"],
+            "coalesced_loads": self.stats["coalesced_loads"],
+            "stale_served": self.stats["stale_served"],
             "enabled_levels": list(self.caches.keys()),
             "timestamp": datetime.now().isoformat()
         }
@@ -865,6 +1213,21 @@ class UnifiedCacheManager:
             # 提升到内存
             entry.cache_level = CacheLevel.MEMORY
             await self.caches[CacheLevel.MEMORY].set(entry)
+    
+    async def _promote_entries(self, entries: List[UnifiedCacheEntry], current_level: CacheLevel):
+        """批量提升缓存条目"""
+        if not entries:
+            return
+        
+        if current_level == CacheLevel.DATABASE and CacheLevel.REDIS in self.caches:
+            for entry in entries:
+                entry.cache_level = CacheLevel.REDIS
+            await self.caches[CacheLevel.REDIS].set_many(entries)
+        
+        if current_level in [CacheLevel.DATABASE, CacheLevel.REDIS] and CacheLevel.MEMORY in self.caches:
+            for entry in entries:
+                entry.cache_level = CacheLevel.MEMORY
+            await self.caches[CacheLevel.MEMORY].set_many(entries)
 
 
 # 全局缓存管理器实例
@@ -921,6 +1284,31 @@ async def cache_set(
     return await manager.set(key, value, cache_type, cache_level, ttl_seconds)
 
 
+async def cache_get_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """便捷的批量缓存获取函数，只返回命中的键"""
+    manager = get_cache_manager()
+    if not manager:
+        return {}
+    
+    entries = await manager.get_many(keys)
+    return {key: entry.value for key, entry in entries.items()}
+
+
+async def cache_get_or_load(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    cache_type: CacheType = CacheType.PLACEHOLDER_RESULT,
+    ttl_seconds: int = 3600,
+    cache_level: CacheLevel = CacheLevel.REDIS
+) -> Any:
+    """便捷的单飞加载函数，未初始化缓存管理器时直接调用 loader"""
+    manager = get_cache_manager()
+    if not manager:
+        return await loader()
+    
+    return await manager.get_or_load(key, loader, cache_type, cache_level, ttl_seconds)
+
+
 async def cache_delete(key: str) -> bool:
     """便捷的缓存删除函数"""
     manager = get_cache_manager()
@@ -138,8 +138,8 @@ class DeliveryService:
     def _init_email_client(self):
         """初始化邮件客户端"""
         try:
-            # 这里将集成邮件服务
-            self.email_client = None
+            from app.services.infrastructure.notification.email_service import EmailService
+            self.email_client = EmailService()
             logger.info("邮件客户端初始化完成")
         except Exception as e:
             logger.warning(f"邮件客户端初始化失败: {e}")
@@ -279,28 +279,33 @@ class DeliveryService:
         try:
             storage_config = request.storage_config or StorageConfig()
             
-            uploaded_files = []
-            
-            for file_path in files:
+            from app.services.infrastructure.storage.async_storage import get_async_storage_service
+            storage = get_async_storage_service()
+
+            async def _upload(file_path: str) -> Optional[Dict[str, Any]]:
                 try:
                     # 生成对象键名
                     filename = os.path.basename(file_path)
                     object_key = f"{storage_config.path_prefix}{request.task_id}/{filename}"
                     
-                    # 模拟上传过程
-                    await asyncio.sleep(0.5)  # 模拟上传时间
+                    # 按块流式上传，大文件自动分片并行上传
+                    result = await storage.upload_path(file_path, object_key)
                     
-                    uploaded_files.append({
+                    return {
                         "local_path": file_path,
-                        "object_key": object_key,
+                        "object_key": result.get("file_path", object_key),
                         "bucket": storage_config.bucket_name,
-                        "size_bytes": os.path.getsize(file_path),
-                        "uploaded_at": datetime.now().isoformat()
-                    })
+                        "backend": result.get("backend"),
+                        "size_bytes": result.get("size", os.path.getsize(file_path)),
+                        "uploaded_at": result.get("uploaded_at", datetime.now().isoformat())
+                    }
                     
                 except Exception as e:
                     logger.error(f"上传文件失败: {file_path}, 错误: {e}")
-                    continue
+                    return None
+            
+            results = await asyncio.gather(*(_upload(file_path) for file_path in files))
+            uploaded_files = [item for item in results if item]
             
             if not uploaded_files:
                 return {
@@ -338,19 +343,37 @@ class DeliveryService:
                     "error": "缺少邮件配置"
                 }
             
-            email_config = request.email_config
+            if not self.email_client:
+                return {
+                    "success": False,
+                    "error": "邮件客户端不可用"
+                }
             
-            # 模拟邮件发送过程
-            await asyncio.sleep(1.0)  # 模拟发送时间
+            email_config = request.email_config
+            attachments = files if email_config.attach_files else []
+            body = email_config.body or self._generate_default_email_body(request)
+            
+            # 通过连接池异步发送，不阻塞事件循环
+            send_result = await self.email_client.send_email_async(
+                to_emails=email_config.recipients,
+                subject=email_config.subject,
+                body=body,
+                html_body=email_config.html_body,
+                attachments=attachments,
+                cc_emails=email_config.cc_recipients,
+                bcc_emails=email_config.bcc_recipients,
+            )
             
             # 构建邮件内容
             email_data = {
                 "recipients": email_config.recipients,
                 "subject": email_config.subject,
-                "body": email_config.body or self._generate_default_email_body(request),
-                "attachments": files if email_config.attach_files else [],
+                "body": body,
+                "attachments": attachments,
                 "sent_at": datetime.now().isoformat(),
-                "message_id": f"msg_{request.task_id}_{int(datetime.now().timestamp())}"
+                "message_id": send_result.message_id,
+                "attempts": send_result.attempts,
+                "connection_id": send_result.connection_id,
             }
             
             if email_config.cc_recipients:
@@ -359,8 +382,19 @@ class DeliveryService:
             if email_config.bcc_recipients:
                 email_data["bcc"] = email_config.bcc_recipients
             
+            if send_result.refused:
+                email_data["refused"] = list(send_result.refused)
+            
+            if not send_result.success:
+                logger.error(f"邮件发送失败: {send_result.error}")
+                return {
+                    "success": False,
+                    "error": send_result.error,
+                    "email_data": email_data
+                }
+            
             logger.info(f"邮件发送成功: 收件人={len(email_config.recipients)}, "
-                       f"附件={len(email_data['attachments'])}")
+                       f"附件={len(attachments)}")
             
             return {
                 "success": True,
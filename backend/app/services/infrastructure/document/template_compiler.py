@@ -0,0 +1,299 @@
+"""
+Word模板编译器
+
+把 DOCX 模板解析一次，生成占位符位置索引（段落、run 区间、表格单元格），
+按模板内容哈希缓存；同一模板的后续渲染直接按索引替换，每个段落只写一次 run：
+- 编译：遍历正文与（嵌套）表格中的段落，记录每个 {{...}} 覆盖的 run 区间与偏移
+- 渲染：按索引定位段落，一次性应用该段落的全部替换（从右向左，偏移互不影响）
+- 校验：渲染前比对段落 run 文本，索引与文档不一致时由调用方重新编译
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{.*?\}\}")
+CHART_PLACEHOLDER_PREFIX = "{{图表："
+
+# 表格单元格路径中的一步：(表格序号, 行序号, 单元格序号)
+CellStep = Tuple[int, int, int]
+
+
+class TemplateIndexMismatch(Exception):
+    """编译索引与文档结构不一致"""
+
+
+@dataclass(frozen=True)
+class PlaceholderSpan:
+    """占位符在段落 run 中的位置（end_offset 为结束 run 内的开区间偏移）"""
+    placeholder: str
+    start_run: int
+    start_offset: int
+    end_run: int
+    end_offset: int
+
+    @property
+    def is_chart(self) -> bool:
+        return self.placeholder.startswith(CHART_PLACEHOLDER_PREFIX)
+
+
+@dataclass(frozen=True)
+class ParagraphSlot:
+    """包含占位符的段落"""
+    cell_path: Tuple[CellStep, ...]
+    paragraph_index: int
+    text: str
+    spans: Tuple[PlaceholderSpan, ...]
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """模板的占位符索引"""
+    key: Optional[str]
+    slots: Tuple[ParagraphSlot, ...]
+
+    @property
+    def placeholders(self) -> List[str]:
+        """模板中的全部占位符（去重，保持出现顺序）"""
+        seen: Dict[str, None] = {}
+        for slot in self.slots:
+            for span in slot.spans:
+                seen.setdefault(span.placeholder, None)
+        return list(seen)
+
+
+def template_key(content: bytes) -> str:
+    """模板内容哈希"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def _locate_spans(run_texts: List[str]) -> Tuple[PlaceholderSpan, ...]:
+    ends: List[int] = []
+    position = 0
+    for text in run_texts:
+        position += len(text)
+        ends.append(position)
+
+    spans = []
+    for match in PLACEHOLDER_PATTERN.finditer("".join(run_texts)):
+        start, end = match.span()
+        # 起始 run：第一个结束位置大于 start 的 run（跳过空 run）；结束 run：第一个结束位置不小于 end 的 run
+        start_run = bisect_right(ends, start)
+        end_run = bisect_left(ends, end)
+        spans.append(PlaceholderSpan(
+            placeholder=match.group(0),
+            start_run=start_run,
+            start_offset=start - (ends[start_run] - len(run_texts[start_run])),
+            end_run=end_run,
+            end_offset=end - (ends[end_run] - len(run_texts[end_run])),
+        ))
+    return tuple(spans)
+
+
+def _compile_container(container: Any, cell_path: Tuple[CellStep, ...], slots: List[ParagraphSlot]) -> None:
+    for paragraph_index, paragraph in enumerate(container.paragraphs):
+        run_texts = [run.text for run in paragraph.runs]
+        text = "".join(run_texts)
+        if "{{" not in text or "}}" not in text:
+            continue
+        spans = _locate_spans(run_texts)
+        if spans:
+            slots.append(ParagraphSlot(cell_path, paragraph_index, text, spans))
+
+    for table_index, table in enumerate(container.tables):
+        # 合并单元格在 row.cells 中会重复出现，只编译一次
+        seen = set()
+        for row_index, row in enumerate(table.rows):
+            for cell_index, cell in enumerate(row.cells):
+                element = getattr(cell, "_tc", cell)
+                if element in seen:
+                    continue
+                seen.add(element)
+                _compile_container(cell, cell_path + ((table_index, row_index, cell_index),), slots)
+
+
+def compile_template(doc: Any, key: Optional[str] = None) -> CompiledTemplate:
+    """解析文档中的全部占位符位置"""
+    slots: List[ParagraphSlot] = []
+    _compile_container(doc, (), slots)
+    return CompiledTemplate(key=key, slots=tuple(slots))
+
+
+def _resolve_value(placeholder: str, data: Dict[str, Any]) -> Tuple[Optional[str], Any]:
+    """按 {{key}} 或 key 查找占位符数据，返回 (匹配的键, 值)"""
+    if placeholder in data:
+        return placeholder, data[placeholder]
+    bare = placeholder[2:-2]
+    if bare in data:
+        return bare, data[bare]
+    return None, None
+
+
+class _DocumentNavigator:
+    """按单元格路径定位容器与段落，同一次渲染中复用已取得的行、单元格和段落列表"""
+
+    def __init__(self, doc: Any):
+        self._containers: Dict[Tuple[CellStep, ...], Any] = {(): doc}
+        self._tables: Dict[Tuple[CellStep, ...], List[Any]] = {}
+        self._rows: Dict[Tuple[Tuple[CellStep, ...], int, int], List[Any]] = {}
+        self._paragraphs: Dict[Tuple[CellStep, ...], List[Any]] = {}
+
+    def container(self, cell_path: Tuple[CellStep, ...]) -> Any:
+        container = self._containers.get(cell_path)
+        if container is not None:
+            return container
+        parent_path, (table_index, row_index, cell_index) = cell_path[:-1], cell_path[-1]
+        parent = self.container(parent_path)
+        tables = self._tables.get(parent_path)
+        if tables is None:
+            tables = self._tables[parent_path] = list(parent.tables)
+        row_key = (parent_path, table_index, row_index)
+        cells = self._rows.get(row_key)
+        if cells is None:
+            cells = self._rows[row_key] = list(tables[table_index].rows[row_index].cells)
+        container = self._containers[cell_path] = cells[cell_index]
+        return container
+
+    def paragraph(self, cell_path: Tuple[CellStep, ...], paragraph_index: int) -> Any:
+        paragraphs = self._paragraphs.get(cell_path)
+        if paragraphs is None:
+            paragraphs = self._paragraphs[cell_path] = list(self.container(cell_path).paragraphs)
+        return paragraphs[paragraph_index]
+
+
+def render_template(
+    doc: Any,
+    compiled: CompiledTemplate,
+    data: Dict[str, Any],
+    on_missing: Optional[Callable[[str], None]] = None,
+) -> int:
+    """
+    按编译索引替换文本占位符（图表占位符保留给后续步骤）
+
+    Returns:
+        替换的占位符数量
+
+    Raises:
+        TemplateIndexMismatch: 索引与文档不一致（此时文档未被修改）
+    """
+    navigator = _DocumentNavigator(doc)
+    plans = []
+    try:
+        for slot in compiled.slots:
+            runs = list(navigator.paragraph(slot.cell_path, slot.paragraph_index).runs)
+            texts = [run.text for run in runs]
+            if "".join(texts) != slot.text:
+                raise TemplateIndexMismatch(f"段落内容与索引不一致: {slot.text[:50]}")
+            plans.append((slot, runs, texts))
+    except (IndexError, AttributeError) as e:
+        raise TemplateIndexMismatch(str(e)) from e
+
+    replaced = 0
+    for slot, runs, texts in plans:
+        changed = set()
+        # 从右向左替换，前面占位符的 run 偏移不受影响
+        for span in reversed(slot.spans):
+            if span.is_chart:
+                continue
+            matched_key, value = _resolve_value(span.placeholder, data)
+            if matched_key is None:
+                if on_missing:
+                    on_missing(span.placeholder)
+                continue
+            value = "" if value is None else str(value)
+            start, end = span.start_run, span.end_run
+            if start == end:
+                texts[start] = texts[start][:span.start_offset] + value + texts[start][span.end_offset:]
+            else:
+                texts[start] = texts[start][:span.start_offset] + value
+                texts[end] = texts[end][span.end_offset:]
+                for index in range(start + 1, end):
+                    texts[index] = ""
+            changed.update(range(start, end + 1))
+            replaced += 1
+
+        for index in changed:
+            # 保留 run 的格式，只更新文本
+            if runs[index].text != texts[index]:
+                runs[index].text = texts[index]
+    return replaced
+
+
+class TemplateIndexCache:
+    """按模板内容哈希缓存编译索引（LRU）"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[CompiledTemplate]:
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return compiled
+
+    def put(self, compiled: CompiledTemplate) -> None:
+        if not compiled.key:
+            return
+        with self._lock:
+            self._entries[compiled.key] = compiled
+            self._entries.move_to_end(compiled.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compile(self, doc: Any, key: Optional[str]) -> CompiledTemplate:
+        if key:
+            compiled = self.get(key)
+            if compiled is not None:
+                return compiled
+        compiled = compile_template(doc, key)
+        self.put(compiled)
+        return compiled
+
+    def discard(self, key: Optional[str]) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self._hits, "misses": self._misses}
+
+
+_template_index_cache: Optional[TemplateIndexCache] = None
+
+
+def get_template_index_cache() -> TemplateIndexCache:
+    """获取全局模板索引缓存"""
+    global _template_index_cache
+    if _template_index_cache is None:
+        _template_index_cache = TemplateIndexCache(max_entries=settings.WORD_TEMPLATE_INDEX_CACHE_SIZE)
+    return _template_index_cache
+
+
+__all__ = [
+    "CompiledTemplate",
+    "ParagraphSlot",
+    "PlaceholderSpan",
+    "TemplateIndexCache",
+    "TemplateIndexMismatch",
+    "compile_template",
+    "get_template_index_cache",
+    "render_template",
+    "template_key",
+]
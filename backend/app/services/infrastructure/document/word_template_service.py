@@ -33,6 +33,20 @@ except ImportError:
 from app.services.infrastructure.agents import StageAwareAgentAdapter
 from app.services.infrastructure.agents import TaskComplexity
 
+from app.services.infrastructure.visualization.chart_render_pool import (
+    ChartSpec,
+    get_chart_render_pool,
+    render_chart_png,
+)
+
+from .template_compiler import (
+    TemplateIndexMismatch,
+    compile_template,
+    get_template_index_cache,
+    render_template,
+    template_key,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -102,10 +116,10 @@ class WordTemplateService:
                 self.logger.info(f"  占位符 {i+1}: {key} = {value_preview}")
 
             # 加载文档
-            doc = Document(template_path)
+            doc, template_hash = self._load_template(template_path)
 
             # 替换文本占位符
-            self._replace_text_in_document(doc, placeholder_data)
+            self._replace_text_in_document(doc, placeholder_data, template_hash)
 
             # Agent优化文档内容（在替换占位符后，生成图表前）
             if use_agent_optimization and container:
@@ -173,115 +187,47 @@ class WordTemplateService:
             finally:
                 loop.close()
 
-    def _replace_text_in_document(self, doc, data: Dict[str, Any]):
+    def _load_template(self, template_path: str):
         """
-        替换文档中的文本占位符
-        参考用户提供的replace_text_in_document逻辑
-        """
-        replaced_count = 0
-        self.logger.info(f"🔄 开始替换文本占位符，数据字典包含 {len(data)} 个键")
-
-        # 处理段落
-        for p in doc.paragraphs:
-            if '{{' in p.text and '}}' in p.text:
-                placeholders_in_paragraph = re.findall(r"\{\{.*?\}\}", p.text)
-                self.logger.debug(f"段落中发现 {len(placeholders_in_paragraph)} 个占位符: {p.text[:100]}")
-
-                for placeholder in placeholders_in_paragraph:
-                    # 跳过图表占位符
-                    if placeholder.startswith("{{图表："):
-                        continue
-
-                    # 尝试多种格式查找数据
-                    value = None
-                    matched_key = None
-                    if placeholder in data:
-                        value = data[placeholder]
-                        matched_key = placeholder
-                    else:
-                        # 尝试去掉花括号的格式
-                        placeholder_without_braces = placeholder.replace("{{", "").replace("}}", "")
-                        if placeholder_without_braces in data:
-                            value = data[placeholder_without_braces]
-                            matched_key = placeholder_without_braces
-
-                    if matched_key is None:
-                        self.logger.warning(f"⚠️ 未找到占位符数据: {placeholder}")
-                        continue
-
-                    if value is None:
-                        self.logger.warning(f"⚠️ 占位符 {matched_key} 数据为空，使用空字符串替换")
-                    else:
-                        self.logger.info(f"✅ 找到匹配: {placeholder} -> {matched_key} = {str(value)[:50]}")
-
-                    str_value = str(value) if value is not None else ""
-
-                    # 获取段落的完整文本
-                    full_text = "".join(run.text for run in p.runs)
-
-                    if placeholder in full_text:
-                        start_index = full_text.find(placeholder)
-                        end_index = start_index + len(placeholder)
-
-                        # 找到占位符在哪些runs中
-                        current_pos = 0
-                        start_run = None
-                        end_run = None
-                        start_run_char_index = 0
-                        end_run_char_index = 0
+        加载模板文档
 
-                        for i, run in enumerate(p.runs):
-                            run_len = len(run.text)
+        Returns:
+            (文档对象, 模板内容哈希)，哈希用于复用编译好的占位符索引
+        """
+        with open(template_path, "rb") as f:
+            content = f.read()
+        return Document(io.BytesIO(content)), template_key(content)
 
-                            if start_run is None and start_index < current_pos + run_len:
-                                start_run = i
-                                start_run_char_index = start_index - current_pos
+    def _replace_text_in_document(self, doc, data: Dict[str, Any], template_hash: Optional[str] = None):
+        """
+        替换文档中的文本占位符
 
-                            if end_run is None and end_index <= current_pos + run_len:
-                                end_run = i
-                                end_run_char_index = end_index - current_pos
-                                break
+        占位符位置按模板哈希编译一次并缓存（段落、run 区间、表格单元格），
+        每个段落一次性应用全部替换；未提供哈希时仅对当前文档编译
+        """
+        self.logger.info(f"🔄 开始替换文本占位符，数据字典包含 {len(data)} 个键")
 
-                            current_pos += run_len
+        cache = get_template_index_cache()
+        compiled = cache.get_or_compile(doc, template_hash)
+        missing = set()
 
-                        # 执行替换
-                        if start_run is not None and end_run is not None:
-                            try:
-                                # 检查索引有效性
-                                if start_run >= len(p.runs) or end_run >= len(p.runs):
-                                    self.logger.warning(f"Run索引超出范围: start={start_run}, end={end_run}, total={len(p.runs)}")
-                                    continue
-                                
-                                start_run_obj = p.runs[start_run]
-                                # 保留第一个 run 的格式，只更新文本
-                                original_start_text = start_run_obj.text
-                                start_run_obj.text = original_start_text[:start_run_char_index] + str_value
-
-                                if end_run > start_run:
-                                    end_run_obj = p.runs[end_run]
-                                    original_end_text = end_run_obj.text
-                                    end_run_obj.text = original_end_text[end_run_char_index:]
-
-                                    # 清空中间的runs
-                                    for i in range(start_run + 1, end_run):
-                                        if i < len(p.runs):
-                                            p.runs[i].text = ""
-
-                                replaced_count += 1
-                            except IndexError as idx_error:
-                                self.logger.warning(f"替换占位符时索引错误: {idx_error}, placeholder={placeholder}")
-                                continue
-                            except Exception as replace_error:
-                                self.logger.warning(f"替换占位符时异常: {replace_error}, placeholder={placeholder}")
-                                continue
-
-        # 处理表格
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    self._replace_text_in_document(cell, data)
-
-        self.logger.info(f"📝 文本占位符替换完成，共替换 {replaced_count} 个占位符")
+        try:
+            replaced_count = render_template(doc, compiled, data, on_missing=missing.add)
+        except TemplateIndexMismatch as e:
+            # 索引与文档不一致（例如同一文档被重复处理），丢弃缓存后按当前文档重新编译
+            self.logger.warning(f"模板索引失效，重新编译: {e}")
+            cache.discard(template_hash)
+            missing.clear()
+            compiled = compile_template(doc)
+            replaced_count = render_template(doc, compiled, data, on_missing=missing.add)
+
+        for placeholder in missing:
+            self.logger.warning(f"⚠️ 未找到占位符数据: {placeholder}")
+
+        self.logger.info(
+            f"📝 文本占位符替换完成，共替换 {replaced_count} 个占位符"
+            f"（{len(compiled.slots)} 个段落）"
+        )
 
     async def _optimize_document_content_with_agent(self, doc, data: Dict[str, Any], container=None, user_id: Optional[str] = None):
         """
@@ -563,11 +509,14 @@ class WordTemplateService:
     async def _replace_chart_placeholders_fallback(self, doc, data: Dict[str, Any]):
         """
         传统图表替换方法作为回退
+
+        先收集全部图表占位符，再整批交给图表渲染进程池并行渲染
         """
         if not MATPLOTLIB_AVAILABLE:
             self.logger.warning("matplotlib 未安装，跳过图表生成")
             return
 
+        targets = []
         for p in doc.paragraphs:
             placeholder = p.text.strip()
 
@@ -584,18 +533,21 @@ class WordTemplateService:
                     continue
 
                 title = placeholder.replace("{{图表：", "").replace("}}", "")
-                p.text = ""
-
-                # 生成图表
-                chart_buffer = self._create_chart_fallback(chart_data, title)
-
-                if chart_buffer and chart_buffer.getbuffer().nbytes > 0:
-                    run = p.add_run()
-                    run.add_picture(chart_buffer, width=Inches(6.0))
-                    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                else:
-                    p.add_run().text = f"[{title} - 图表生成失败]"
-                    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                targets.append((p, title, self._build_chart_spec(chart_data, title, "bar")))
+
+        specs = [spec for _, _, spec in targets if spec is not None]
+        rendered = iter(await get_chart_render_pool().render_many(specs) if specs else [])
+
+        for p, title, spec in targets:
+            png = next(rendered) if spec is not None else None
+            p.text = ""
+            if png:
+                run = p.add_run()
+                run.add_picture(io.BytesIO(png), width=Inches(6.0))
+                p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            else:
+                p.add_run().text = f"[{title} - 图表生成失败]"
+                p.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
     def _convert_data_to_rows(self, chart_data) -> List[List]:
         """
@@ -670,124 +622,98 @@ class WordTemplateService:
     ) -> Optional[io.BytesIO]:
         """
         创建图表
-        参考用户提供的create_chart逻辑
+        参考用户提供的create_chart逻辑（单张图表在当前进程渲染，批量渲染见 _replace_chart_placeholders_fallback）
         """
-        if not MATPLOTLIB_AVAILABLE:
-            self.logger.warning("matplotlib 不可用，无法生成图表")
+        spec = self._build_chart_spec(data, title, chart_type)
+        if spec is None:
             return None
-        
+
         try:
-            if not data or not isinstance(data, list):
-                self.logger.warning(f"⚠️ 警告: '{title}' 的图表数据为空或不是列表，跳过生成。")
+            png = render_chart_png(spec)
+            if not png:
+                self.logger.error(f"生成的图表文件为空")
                 return None
+            self.logger.debug(f"图表生成成功: {title}, 大小: {len(png)} bytes")
+            return io.BytesIO(png)
+        except Exception as e:
+            self.logger.error(f"❌ 图表生成失败: {e}", exc_info=True)
+            return None
 
-            # 验证数据格式
-            if not all(isinstance(i, dict) for i in data):
-                self.logger.warning(f"⚠️ 警告: '{title}' 的图表数据格式不正确（期望字典列表），跳过生成。")
-                return None
+    def _build_chart_spec(
+        self,
+        data: List[Dict[str, Any]],
+        title: str,
+        chart_type: str
+    ) -> Optional[ChartSpec]:
+        """
+        校验图表数据并生成渲染规格
+        """
+        if not MATPLOTLIB_AVAILABLE:
+            self.logger.warning("matplotlib 不可用，无法生成图表")
+            return None
 
-            first_item = data[0]
-            if not isinstance(first_item, dict) or not first_item:
-                self.logger.warning(f"⚠️ 警告: '{title}' 的首个数据项无效，跳过生成。")
-                return None
-            
-            label_key = None
-            value_key = None
-
-            # 自动识别标签和数值列（优先字符串作为标签，数值作为值）
-            for key, value in first_item.items():
-                if label_key is None and isinstance(value, str):
-                    label_key = key
-                if value_key is None and isinstance(value, (int, float)):
-                    value_key = key
-                # 如果都找到了，提前退出
-                if label_key and value_key:
-                    break
-
-            if label_key is None or value_key is None:
-                self.logger.warning(f"⚠️ 警告: 无法从 '{title}' 的数据中识别标签和数值列，跳过生成。")
-                return None
+        if not data or not isinstance(data, list):
+            self.logger.warning(f"⚠️ 警告: '{title}' 的图表数据为空或不是列表，跳过生成。")
+            return None
 
-            # 提取数据（过滤无效值）
-            labels = []
-            values = []
-            for item in data:
-                label_val = item.get(label_key, '')
-                value_val = item.get(value_key)
-                
-                # 转换标签
-                if label_val is None:
-                    label_val = ''
-                labels.append(str(label_val))
-                
-                # 转换数值
-                try:
-                    if value_val is None:
-                        value_val = 0.0
-                    num_val = float(value_val)
-                    values.append(num_val)
-                except (ValueError, TypeError):
-                    self.logger.debug(f"跳过无效数值: {value_val}")
-                    values.append(0.0)
-            
-            if not labels or not values:
-                self.logger.warning(f"⚠️ 警告: '{title}' 提取的数据为空，跳过生成。")
-                return None
+        # 验证数据格式
+        if not all(isinstance(i, dict) for i in data):
+            self.logger.warning(f"⚠️ 警告: '{title}' 的图表数据格式不正确（期望字典列表），跳过生成。")
+            return None
 
-            # 创建图表
-            fig_size = (10, 6) if chart_type == 'bar' else (8, 8)
-            fig, ax = plt.subplots(figsize=fig_size)
-            
-            try:
-                ax.set_title(str(title)[:50], fontsize=16, fontproperties=self.font_prop)
-
-                if chart_type == 'bar':
-                    ax.bar(labels, values)
-                    ax.set_ylabel("数量", fontsize=12, fontproperties=self.font_prop)
-                    plt.xticks(rotation=45, ha="right")
-
-                    # 设置x轴标签字体
-                    for tick_label in ax.get_xticklabels():
-                        if self.font_prop:
-                            tick_label.set_fontproperties(self.font_prop)
-
-                    fig.tight_layout()
-
-                elif chart_type == 'pie':
-                    text_props = {'fontproperties': self.font_prop} if self.font_prop else {}
-                    ax.pie(values, labels=labels, autopct='%1.1f%%', startangle=90, textprops=text_props)
-                    ax.axis('equal')
-                else:
-                    self.logger.warning(f"不支持的图表类型: {chart_type}，使用柱状图")
-                    ax.bar(labels, values)
-                    fig.tight_layout()
-
-                # 保存到内存缓冲区
-                img_buffer = io.BytesIO()
-                # 使用配置的 DPI 值
-                fig.savefig(img_buffer, format='png', dpi=self.chart_dpi, bbox_inches='tight')
-                img_buffer.seek(0)
-                
-                # 验证生成的图片大小
-                buffer_size = img_buffer.getbuffer().nbytes
-                if buffer_size == 0:
-                    self.logger.error(f"生成的图表文件为空")
-                    plt.close(fig)
-                    return None
-                
-                self.logger.debug(f"图表生成成功: {title}, 大小: {buffer_size} bytes")
-                plt.close(fig)
-                return img_buffer
-                
-            except Exception as plot_error:
-                self.logger.error(f"绘图过程失败: {plot_error}", exc_info=True)
-                plt.close(fig)
-                return None
+        first_item = data[0]
+        if not first_item:
+            self.logger.warning(f"⚠️ 警告: '{title}' 的首个数据项无效，跳过生成。")
+            return None
 
-        except Exception as e:
-            self.logger.error(f"❌ 图表生成失败: {e}", exc_info=True)
+        label_key = None
+        value_key = None
+
+        # 自动识别标签和数值列（优先字符串作为标签，数值作为值）
+        for key, value in first_item.items():
+            if label_key is None and isinstance(value, str):
+                label_key = key
+            if value_key is None and isinstance(value, (int, float)):
+                value_key = key
+            # 如果都找到了，提前退出
+            if label_key and value_key:
+                break
+
+        if label_key is None or value_key is None:
+            self.logger.warning(f"⚠️ 警告: 无法从 '{title}' 的数据中识别标签和数值列，跳过生成。")
             return None
 
+        # 提取数据（过滤无效值）
+        labels = []
+        values = []
+        for item in data:
+            label_val = item.get(label_key, '')
+            labels.append(str(label_val) if label_val is not None else '')
+
+            value_val = item.get(value_key)
+            try:
+                values.append(float(value_val) if value_val is not None else 0.0)
+            except (ValueError, TypeError):
+                self.logger.debug(f"跳过无效数值: {value_val}")
+                values.append(0.0)
+
+        if chart_type not in ('bar', 'pie'):
+            self.logger.warning(f"不支持的图表类型: {chart_type}，使用柱状图")
+
+        is_pie = chart_type == 'pie'
+        return ChartSpec(
+            chart_type='pie' if is_pie else 'bar',
+            title=str(title)[:50],
+            labels=tuple(labels),
+            values=tuple(values),
+            width=8.0 if is_pie else 10.0,
+            height=8.0 if is_pie else 6.0,
+            dpi=self.chart_dpi,
+            y_label="数量" if chart_type == 'bar' else None,
+            rotate_labels=chart_type == 'bar',
+            font_path=self.font_path if self.font_prop else None,
+        )
+
     def extract_placeholders_from_template(self, template_path: str) -> List[str]:
         """
         从模板中提取所有占位符
@@ -802,21 +728,9 @@ class WordTemplateService:
             if not DOCX_AVAILABLE:
                 raise ImportError("python-docx 未安装")
 
-            doc = Document(template_path)
-            placeholders = set()
-
-            # 从段落中提取
-            for p in doc.paragraphs:
-                found = re.findall(r"\{\{.*?\}\}", p.text)
-                placeholders.update(found)
-
-            # 从表格中提取
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        for p in cell.paragraphs:
-                            found = re.findall(r"\{\{.*?\}\}", p.text)
-                            placeholders.update(found)
+            # 与渲染共用编译索引
+            doc, template_hash = self._load_template(template_path)
+            placeholders = get_template_index_cache().get_or_compile(doc, template_hash).placeholders
 
             self.logger.info(f"从模板中提取到 {len(placeholders)} 个占位符")
             return list(placeholders)
@@ -856,10 +770,10 @@ class WordTemplateService:
             self.logger.info(f"占位符数量: {len(placeholder_data)}")
 
             # 加载文档
-            doc = Document(template_path)
+            doc, template_hash = self._load_template(template_path)
 
             # 替换文本占位符
-            self._replace_text_in_document(doc, placeholder_data)
+            self._replace_text_in_document(doc, placeholder_data, template_hash)
 
             # 替换图表占位符（使用传统方法，因为这时已经是处理后的文本数据）
             await self._replace_chart_placeholders_fallback(doc, placeholder_data)
@@ -1057,7 +971,7 @@ class AgentEnhancedWordService(WordTemplateService):
                 }
 
             # 2. 打开文档
-            doc = Document(template_path)
+            doc, template_hash = self._load_template(template_path)
             self.logger.info(f"📄 Word文档加载成功，段落数: {len(doc.paragraphs)}")
 
             # 3. 智能文本处理 (核心新功能)
@@ -1068,7 +982,7 @@ class AgentEnhancedWordService(WordTemplateService):
                 )
 
             # 4. 替换文本占位符
-            self._replace_text_in_document(doc, processed_placeholder_data)
+            self._replace_text_in_document(doc, processed_placeholder_data, template_hash)
 
             # 5. 处理图表占位符
             if use_agent_charts and container:
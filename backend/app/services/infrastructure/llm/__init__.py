@@ -23,6 +23,12 @@ from .model_executor import (
     ModelExecutor
 )
 
+# HTTP连接池
+from .http_client_pool import (
+    get_llm_http_pool,
+    LLMHttpClientPool
+)
+
 # 任务需求定义（从simple_model_selector迁移）
 from .pure_database_manager import TaskRequirement, ModelSelection
 
@@ -211,6 +217,7 @@ __all__ = [
     
     # Agent系统接口
     "get_model_executor",
+    "get_llm_http_pool",
     "create_step_based_model_selector",
     "TaskRequirement",
     "TaskComplexity",
@@ -220,6 +227,7 @@ __all__ = [
     
     # 类定义
     "ModelExecutor",
+    "LLMHttpClientPool",
     "StepBasedModelSelector",
     "ModelSelection",
     
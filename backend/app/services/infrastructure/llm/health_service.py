@@ -70,7 +70,8 @@ class LLMHealthService:
             
             # 使用速率限制器
             rate_limiter = get_llm_rate_limiter()
-            if not await rate_limiter.acquire():
+            lease = await rate_limiter.acquire()
+            if not lease:
                 raise Exception("请求被速率限制器阻塞")
             
             try:
@@ -101,7 +102,7 @@ class LLMHealthService:
                         db.commit()
                         
                         # 释放速率限制器
-                        rate_limiter.release(success=True, response_time=response_time)
+                        rate_limiter.release(success=True, response_time=response_time, lease=lease)
                         
                         logger.info(f"模型健康检查成功: {model.name} ({response_time:.2f}s)")
                         
@@ -110,7 +111,7 @@ class LLMHealthService:
                         raise Exception(error_msg)
                         
             except Exception as e:
-                rate_limiter.release(success=False)
+                rate_limiter.release(success=False, lease=lease)
                 raise e
                 
         except Exception as e:
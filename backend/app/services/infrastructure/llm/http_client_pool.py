@@ -0,0 +1,247 @@
+"""
+LLM HTTP连接池
+为每个LLM服务器维护长连接的 httpx.AsyncClient，避免每次调用都重新建立 DNS+TCP+TLS 连接
+
+- 客户端按 (事件循环, 服务器) 复用：Celery任务可能在不同事件循环中运行，连接不能跨循环共享
+- 安装 h2 时启用 HTTP/2，同一连接上多路复用并发请求
+- 记录每个服务器的请求数、错误数与延迟分位
+- 可选合并并发的相同 JSON 模式请求，只发送一次
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 延迟分位统计保留的最近样本数
+_LATENCY_WINDOW = 500
+
+
+@dataclass
+class HttpPoolConfig:
+    """连接池配置"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = True
+    connect_timeout: float = 10.0
+    request_timeout: float = 30.0
+    coalesce_json_requests: bool = False
+
+    @classmethod
+    def from_settings(cls) -> "HttpPoolConfig":
+        """从全局配置创建"""
+        return cls(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+            http2=settings.LLM_HTTP2_ENABLED,
+            connect_timeout=settings.LLM_HTTP_CONNECT_TIMEOUT,
+            request_timeout=settings.LLM_HTTP_REQUEST_TIMEOUT,
+            coalesce_json_requests=settings.LLM_COALESCE_JSON_REQUESTS,
+        )
+
+
+@dataclass
+class ServerHttpMetrics:
+    """单个LLM服务器的HTTP指标"""
+    requests: int = 0
+    errors: int = 0
+    coalesced: int = 0
+    status_codes: Dict[int, int] = field(default_factory=dict)
+    total_latency_ms: float = 0.0
+    last_error: Optional[str] = None
+    latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+
+    def record(self, latency_ms: float, status_code: Optional[int] = None, error: Optional[str] = None):
+        self.requests += 1
+        self.total_latency_ms += latency_ms
+        self.latencies_ms.append(latency_ms)
+        if status_code is not None:
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        if error is not None or (status_code is not None and status_code >= 400):
+            self.errors += 1
+            self.last_error = error or f"HTTP {status_code}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else 0.0,
+            "coalesced": self.coalesced,
+            "avg_latency_ms": round(self.total_latency_ms / self.requests, 1) if self.requests else None,
+            "p50_latency_ms": percentile(0.5),
+            "p95_latency_ms": percentile(0.95),
+            "status_codes": dict(self.status_codes),
+            "last_error": self.last_error,
+        }
+
+
+def _server_key(server: Any) -> str:
+    """服务器标识：数据库ID + 地址（地址变更后使用新客户端）"""
+    return f"{getattr(server, 'id', '')}:{getattr(server, 'base_url', '')}"
+
+
+class LLMHttpClientPool:
+    """按LLM服务器复用的 httpx 客户端池"""
+
+    def __init__(self, config: Optional[HttpPoolConfig] = None):
+        self.config = config or HttpPoolConfig.from_settings()
+        self._clients: Dict[Tuple[int, str], Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._metrics: Dict[str, ServerHttpMetrics] = {}
+        self._lock = threading.Lock()
+
+    def get_client(self, server: Any) -> httpx.AsyncClient:
+        """获取当前事件循环下该服务器的客户端"""
+        loop = asyncio.get_running_loop()
+        key = (id(loop), _server_key(server))
+        with self._lock:
+            self._discard_closed_loops()
+            entry = self._clients.get(key)
+            if entry is not None and not entry[1].is_closed:
+                return entry[1]
+
+            client = httpx.AsyncClient(
+                http2=self.config.http2 and HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive_connections,
+                    keepalive_expiry=self.config.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.config.request_timeout, connect=self.config.connect_timeout),
+            )
+            self._clients[key] = (loop, client)
+            return client
+
+    async def post(
+        self,
+        server: Any,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        coalesce: bool = False,
+    ) -> httpx.Response:
+        """
+        发送POST请求并记录指标
+
+        Args:
+            coalesce: 是否与正在进行的相同请求合并（仅用于结果可共享的JSON模式请求）
+
+        只有 temperature 显式为 0 的请求才会合并：采样请求每次结果不同，共享同一份结果会改变调用方语义
+        """
+        if not (coalesce and self.config.coalesce_json_requests and payload.get("temperature") == 0):
+            return await self._send(server, url, payload, headers)
+
+        body = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(f"{_server_key(server)}|{url}|{body}".encode("utf-8")).hexdigest()
+        flight_key = (id(asyncio.get_running_loop()), digest)
+
+        pending = self._inflight.get(flight_key)
+        if pending is not None:
+            self._get_metrics(server).coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = future
+        try:
+            response = await self._send(server, url, payload, headers)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            self._inflight.pop(flight_key, None)
+
+    async def _send(self, server: Any, url: str, payload: Dict[str, Any], headers: Dict[str, str]) -> httpx.Response:
+        client = self.get_client(server)
+        metrics = self._get_metrics(server)
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json=payload, headers=headers)
+        except Exception as e:
+            metrics.record((time.perf_counter() - start) * 1000, error=f"{type(e).__name__}: {e}")
+            raise
+        metrics.record((time.perf_counter() - start) * 1000, status_code=response.status_code)
+        return response
+
+    def _get_metrics(self, server: Any) -> ServerHttpMetrics:
+        name = getattr(server, "name", None) or _server_key(server)
+        metrics = self._metrics.get(name)
+        if metrics is None:
+            metrics = self._metrics.setdefault(name, ServerHttpMetrics())
+        return metrics
+
+    def _discard_closed_loops(self):
+        """丢弃已关闭事件循环上的客户端（连接随循环一起失效，无法再 aclose）"""
+        for key in [k for k, (loop, _) in self._clients.items() if loop.is_closed()]:
+            self._clients.pop(key, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """每个服务器的HTTP指标"""
+        return {
+            "http2": self.config.http2 and HTTP2_AVAILABLE,
+            "open_clients": len(self._clients),
+            "servers": {name: metrics.to_dict() for name, metrics in self._metrics.items()},
+        }
+
+    async def aclose(self):
+        """关闭当前事件循环下的所有客户端"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._discard_closed_loops()
+            closing = [key for key, (client_loop, _) in self._clients.items() if client_loop is loop]
+            clients = [self._clients.pop(key)[1] for key in closing]
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭LLM HTTP客户端失败: {e}")
+
+
+# 全局实例
+_llm_http_pool: Optional[LLMHttpClientPool] = None
+
+
+def get_llm_http_pool() -> LLMHttpClientPool:
+    """获取LLM HTTP连接池实例"""
+    global _llm_http_pool
+    if _llm_http_pool is None:
+        _llm_http_pool = LLMHttpClientPool()
+    return _llm_http_pool
+
+
+async def close_llm_http_pool():
+    """应用关闭时释放连接"""
+    if _llm_http_pool is not None:
+        await _llm_http_pool.aclose()
@@ -14,6 +14,8 @@ from app.models.llm_server import LLMServer, LLMModel
 from app.crud.crud_llm_server import crud_llm_server
 from app.crud.crud_llm_model import crud_llm_model
 from .types import TaskRequirement, ModelSelection
+from .http_client_pool import get_llm_http_pool
+from .rate_limiter import get_llm_rate_limiter, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -299,6 +301,10 @@ class ModelExecutor:
     # 原有接口保持兼容
     # ========================================
     
+    def get_http_metrics(self) -> Dict[str, Any]:
+        """获取各LLM服务器的HTTP连接与延迟指标"""
+        return get_llm_http_pool().get_metrics()
+    
     async def execute_with_auto_selection(
         self,
         user_id: str,
@@ -350,6 +356,7 @@ class ModelExecutor:
                 selection=selection,
                 prompt=prompt,
                 db=db,
+                user_id=user_id,
                 **kwargs
             )
             
@@ -495,17 +502,27 @@ class ModelExecutor:
             model = crud_llm_model.get(db, id=selection.model_id)
             server = crud_llm_server.get(db, id=selection.server_id)
             
-            # 根据服务器类型调用不同的实现
-            if server.provider_type in ("openai", "gpustake", "google", "cohere", "huggingface"):
-                # OpenAI兼容格式: OpenAI, GPUStake, Google, Cohere, HuggingFace
-                return await self._call_openai_compatible(server, model, prompt, **kwargs)
-            elif server.provider_type == "anthropic":
-                return await self._call_anthropic_compatible(server, model, prompt, **kwargs)
-            elif server.provider_type == "custom":
-                return await self._call_custom_api(server, model, prompt, **kwargs)
-            else:
-                # 默认尝试OpenAI兼容格式
-                return await self._call_openai_compatible(server, model, prompt, **kwargs)
+            # 按服务器/模型/用户预算排队获取许可
+            async with get_llm_rate_limiter().limit(
+                server=server.name,
+                model=model.name,
+                user_id=kwargs.get("user_id"),
+                estimated_tokens=estimate_tokens(prompt, kwargs.get("max_tokens", 1000)),
+                priority=kwargs.get("priority", 0)
+            ) as lease:
+                # 根据服务器类型调用不同的实现
+                if server.provider_type in ("openai", "gpustake", "google", "cohere", "huggingface"):
+                    # OpenAI兼容格式: OpenAI, GPUStake, Google, Cohere, HuggingFace
+                    result = await self._call_openai_compatible(server, model, prompt, **kwargs)
+                elif server.provider_type == "anthropic":
+                    result = await self._call_anthropic_compatible(server, model, prompt, **kwargs)
+                elif server.provider_type == "custom":
+                    result = await self._call_custom_api(server, model, prompt, **kwargs)
+                else:
+                    # 默认尝试OpenAI兼容格式
+                    result = await self._call_openai_compatible(server, model, prompt, **kwargs)
+                lease.tokens_used = result.get("tokens_used", 0)
+                return result
                 
         except Exception as e:
             logger.error(f"模型调用失败: {e}")
@@ -578,6 +595,8 @@ class ModelExecutor:
             "presence_penalty": kwargs.get("presence_penalty", 0.0)
         }
 
+        json_mode = isinstance(response_format, dict) and response_format.get("type") in {"json_object", "json_schema"}
+
         # Attach response_format (for JSON mode)
         if response_format:
             payload["response_format"] = response_format
@@ -586,61 +605,63 @@ class ModelExecutor:
         try:
             logger.info(f"调用API: {server.base_url}/chat/completions, 模型: {model.name}")
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{server.base_url}/chat/completions",
-                    json=payload,
-                    headers=headers
-                )
-                
-                logger.info(f"API响应状态码: {response.status_code}")
-                response_time = int((time.time() - start_time) * 1000)
-                
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        
-                        logger.info(f"API调用成功，响应时间: {response_time}ms")
-                        
-                        # 检查响应结构
-                        if "choices" not in data or not data["choices"]:
-                            raise Exception(f"API响应格式错误: 缺少choices字段或为空")
-                        
-                        if "message" not in data["choices"][0]:
-                            raise Exception(f"API响应格式错误: 缺少message字段")
-                        
-                        content = data["choices"][0]["message"]["content"]
-                        logger.info(f"API返回内容长度: {len(content) if content else 0}")
+            # 复用服务器的长连接客户端；JSON模式的相同并发请求只发送一次
+            response = await get_llm_http_pool().post(
+                server,
+                f"{server.base_url}/chat/completions",
+                payload,
+                headers,
+                coalesce=json_mode
+            )
+            
+            logger.info(f"API响应状态码: {response.status_code}")
+            response_time = int((time.time() - start_time) * 1000)
+            
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                    
+                    logger.info(f"API调用成功，响应时间: {response_time}ms")
+                    
+                    # 检查响应结构
+                    if "choices" not in data or not data["choices"]:
+                        raise Exception(f"API响应格式错误: 缺少choices字段或为空")
+                    
+                    if "message" not in data["choices"][0]:
+                        raise Exception(f"API响应格式错误: 缺少message字段")
+                    
+                    content = data["choices"][0]["message"]["content"]
+                    logger.info(f"API返回内容长度: {len(content) if content else 0}")
 
-                        # Try to parse JSON if JSON mode enabled
+                    # Try to parse JSON if JSON mode enabled
+                    parsed_json = None
+                    try:
+                        if json_mode and content:
+                            import json as _json
+                            parsed_json = _json.loads(content)
+                    except Exception:
                         parsed_json = None
-                        try:
-                            if isinstance(response_format, dict) and response_format.get("type") in {"json_object", "json_schema"} and content:
-                                import json as _json
-                                parsed_json = _json.loads(content)
-                        except Exception:
-                            parsed_json = None
-
-                        result_payload = {
-                            "success": True,
-                            "result": content,
-                            "model": model.name,
-                            "provider": "openai_compatible",
-                            "tokens_used": data.get("usage", {}).get("total_tokens", 0),
-                            "response_time_ms": response_time
-                        }
-                        if parsed_json is not None:
-                            result_payload["result_json"] = parsed_json
-
-                        return result_payload
-                    except Exception as parse_e:
-                        response_text = response.text
-                        logger.error(f"解析API响应失败: {parse_e}, 原始响应: {response_text[:500]}")
-                        raise Exception(f"解析API响应失败: {parse_e}")
-                else:
-                    error_text = response.text
-                    logger.error(f"API调用失败，状态码: {response.status_code}, 错误信息: {error_text[:500]}")
-                    raise Exception(f"API调用失败 (状态码: {response.status_code}): {error_text}")
+
+                    result_payload = {
+                        "success": True,
+                        "result": content,
+                        "model": model.name,
+                        "provider": "openai_compatible",
+                        "tokens_used": data.get("usage", {}).get("total_tokens", 0),
+                        "response_time_ms": response_time
+                    }
+                    if parsed_json is not None:
+                        result_payload["result_json"] = parsed_json
+
+                    return result_payload
+                except Exception as parse_e:
+                    response_text = response.text
+                    logger.error(f"解析API响应失败: {parse_e}, 原始响应: {response_text[:500]}")
+                    raise Exception(f"解析API响应失败: {parse_e}")
+            else:
+                error_text = response.text
+                logger.error(f"API调用失败，状态码: {response.status_code}, 错误信息: {error_text[:500]}")
+                raise Exception(f"API调用失败 (状态码: {response.status_code}): {error_text}")
                         
         except httpx.RequestError as e:
             logger.error(f"网络连接错误: {e}")
@@ -659,7 +680,6 @@ class ModelExecutor:
         """调用Anthropic兼容API"""
         
         # 实际的Anthropic API调用
-        import httpx
         import time
         
         start_time = time.time()
@@ -676,29 +696,30 @@ class ModelExecutor:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{server.base_url}/messages",
-                    json=payload,
-                    headers=headers
-                )
-                
-                response_time = int((time.time() - start_time) * 1000)
+            # 复用服务器的长连接客户端
+            response = await get_llm_http_pool().post(
+                server,
+                f"{server.base_url}/messages",
+                payload,
+                headers
+            )
+            
+            response_time = int((time.time() - start_time) * 1000)
+            
+            if response.status_code == 200:
+                data = response.json()
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    return {
-                        "success": True,
-                        "result": data["content"][0]["text"],
-                        "model": model.name,
-                        "provider": "anthropic_compatible", 
-                        "tokens_used": data.get("usage", {}).get("input_tokens", 0) + data.get("usage", {}).get("output_tokens", 0),
-                        "response_time_ms": response_time
-                    }
-                else:
-                    error_text = response.text
-                    raise Exception(f"Anthropic API调用失败 (状态码: {response.status_code}): {error_text}")
+                return {
+                    "success": True,
+                    "result": data["content"][0]["text"],
+                    "model": model.name,
+                    "provider": "anthropic_compatible", 
+                    "tokens_used": data.get("usage", {}).get("input_tokens", 0) + data.get("usage", {}).get("output_tokens", 0),
+                    "response_time_ms": response_time
+                }
+            else:
+                error_text = response.text
+                raise Exception(f"Anthropic API调用失败 (状态码: {response.status_code}): {error_text}")
                         
         except Exception as e:
             logger.error(f"Anthropic兼容API调用失败: {e}")
@@ -774,7 +795,6 @@ class ModelExecutor:
         """调用自定义API"""
 
         # 实际的自定义API调用
-        import httpx
         import time
 
         start_time = time.time()
@@ -792,29 +812,30 @@ class ModelExecutor:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{server.base_url}/generate",
-                    json=payload,
-                    headers=headers
-                )
+            # 复用服务器的长连接客户端
+            response = await get_llm_http_pool().post(
+                server,
+                f"{server.base_url}/generate",
+                payload,
+                headers
+            )
 
-                response_time = int((time.time() - start_time) * 1000)
+            response_time = int((time.time() - start_time) * 1000)
 
-                if response.status_code == 200:
-                    data = response.json()
+            if response.status_code == 200:
+                data = response.json()
 
-                    return {
-                        "success": True,
-                        "result": data.get("text", data.get("response", "")),
-                        "model": model.name,
-                        "provider": "custom",
-                        "tokens_used": data.get("tokens_used", len(prompt) // 4),
-                        "response_time_ms": response_time
-                    }
-                else:
-                    error_text = response.text
-                    raise Exception(f"自定义API调用失败 (状态码: {response.status_code}): {error_text}")
+                return {
+                    "success": True,
+                    "result": data.get("text", data.get("response", "")),
+                    "model": model.name,
+                    "provider": "custom",
+                    "tokens_used": data.get("tokens_used", len(prompt) // 4),
+                    "response_time_ms": response_time
+                }
+            else:
+                error_text = response.text
+                raise Exception(f"自定义API调用失败 (状态码: {response.status_code}): {error_text}")
 
         except Exception as e:
             logger.error(f"自定义API调用失败: {e}")
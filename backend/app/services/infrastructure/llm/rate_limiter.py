@@ -1,16 +1,30 @@
 """
 LLM访问速度限制器
 基于系统设计规范的完整实现
+
+- 按LLM服务器、模型、用户三个维度的令牌桶限制请求数(RPM)与token数(TPM)
+- 超出限制的请求排队等待（按优先级、同优先级先进先出），超过截止时间才放弃
+- Redis模式下令牌桶状态保存在Redis中，限制在所有Celery worker间生效
+- 并发槽位与排队为进程内状态，不依赖具体事件循环（Celery任务可能各自使用新的事件循环）
 """
 
 import asyncio
+import heapq
+import itertools
+import json
 import logging
+import math
+import threading
 import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,6 +46,9 @@ class RequestMetrics:
     total_tokens: int = 0
     average_response_time: float = 0.0
     last_request_time: Optional[datetime] = None
+    queued_requests: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
     
     @property
     def success_rate(self) -> float:
@@ -46,6 +63,34 @@ class RequestMetrics:
         if self.total_requests == 0:
             return 0.0
         return self.blocked_requests / self.total_requests
+    
+    @property
+    def average_wait_seconds(self) -> float:
+        """平均排队时间"""
+        if self.queued_requests == 0:
+            return 0.0
+        return self.total_wait_seconds / self.queued_requests
+
+
+class RateLimitExceeded(Exception):
+    """排队超过截止时间仍未获得许可"""
+
+
+@dataclass
+class BudgetSpec:
+    """单个维度的预算，0 表示不限制"""
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BudgetSpec":
+        return cls(
+            requests_per_minute=int(data.get("rpm", data.get("requests_per_minute", 0)) or 0),
+            tokens_per_minute=int(data.get("tpm", data.get("tokens_per_minute", 0)) or 0)
+        )
+    
+    def to_dict(self) -> Dict[str, int]:
+        return {"rpm": self.requests_per_minute, "tpm": self.tokens_per_minute}
 
 
 @dataclass
@@ -57,92 +102,517 @@ class LimiterConfig:
     enable_rate_limiting: bool = True
     enable_concurrency_limiting: bool = True
     
+    # 指定服务器的请求按服务器限制并发；未指定服务器的请求使用上面的全局并发与最小间隔
+    max_concurrent_per_server: int = 8
+    # 各维度默认预算
+    server_budget: BudgetSpec = field(default_factory=BudgetSpec)
+    model_budget: BudgetSpec = field(default_factory=BudgetSpec)
+    user_budget: BudgetSpec = field(default_factory=BudgetSpec)
+    # 单独配置的预算，键为 "server:<名称>" / "model:<名称>" / "user:<ID>"
+    budget_overrides: Dict[str, BudgetSpec] = field(default_factory=dict)
+    # 令牌桶容量 = 每秒速率 * burst_seconds，允许的瞬时突发量
+    burst_seconds: float = 10.0
+    # local: 进程内令牌桶；redis: 所有worker共享令牌桶
+    backend: str = "local"
+    
+    @classmethod
+    def from_settings(cls) -> "LimiterConfig":
+        """从全局配置创建"""
+        overrides = {}
+        if settings.LLM_RATE_LIMIT_OVERRIDES:
+            overrides = {
+                key: BudgetSpec.from_dict(value)
+                for key, value in json.loads(settings.LLM_RATE_LIMIT_OVERRIDES).items()
+            }
+        return cls(
+            max_concurrent_requests=settings.LLM_RATE_LIMIT_MAX_CONCURRENT,
+            min_interval_seconds=settings.LLM_RATE_LIMIT_MIN_INTERVAL,
+            request_timeout_seconds=settings.LLM_RATE_LIMIT_QUEUE_TIMEOUT,
+            max_concurrent_per_server=settings.LLM_SERVER_MAX_CONCURRENT,
+            server_budget=BudgetSpec(settings.LLM_SERVER_RPM, settings.LLM_SERVER_TPM),
+            model_budget=BudgetSpec(settings.LLM_MODEL_RPM, settings.LLM_MODEL_TPM),
+            user_budget=BudgetSpec(settings.LLM_USER_RPM, settings.LLM_USER_TPM),
+            budget_overrides=overrides,
+            burst_seconds=settings.LLM_RATE_LIMIT_BURST_SECONDS,
+            backend=settings.LLM_RATE_LIMIT_BACKEND
+        )
+    
+    def get_budget(self, scope: str, name: str) -> BudgetSpec:
+        """获取某个维度的预算（优先使用单独配置）"""
+        override = self.budget_overrides.get(f"{scope}:{name}")
+        if override is not None:
+            return override
+        return {"server": self.server_budget, "model": self.model_budget, "user": self.user_budget}[scope]
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             "max_concurrent_requests": self.max_concurrent_requests,
             "min_interval_seconds": self.min_interval_seconds,
             "request_timeout_seconds": self.request_timeout_seconds,
             "enable_rate_limiting": self.enable_rate_limiting,
-            "enable_concurrency_limiting": self.enable_concurrency_limiting
+            "enable_concurrency_limiting": self.enable_concurrency_limiting,
+            "max_concurrent_per_server": self.max_concurrent_per_server,
+            "server_budget": self.server_budget.to_dict(),
+            "model_budget": self.model_budget.to_dict(),
+            "user_budget": self.user_budget.to_dict(),
+            "budget_overrides": {key: spec.to_dict() for key, spec in self.budget_overrides.items()},
+            "burst_seconds": self.burst_seconds,
+            "backend": self.backend
         }
 
 
+# 令牌桶扣减请求：(桶键, 每秒速率, 容量, 扣减量)
+BucketRequest = Tuple[str, float, float, float]
+
+
+def estimate_tokens(prompt: str, max_tokens: int = 0) -> int:
+    """粗略估计一次调用的token数（输入约4字符/token + 最大输出）"""
+    return len(prompt or "") // 4 + int(max_tokens or 0)
+
+
+class LocalBucketStore:
+    """进程内令牌桶"""
+    
+    def __init__(self):
+        self._buckets: Dict[str, List[float]] = {}  # key -> [tokens, 上次更新时间]
+        self._lock = threading.Lock()
+    
+    def _refill(self, key: str, rate: float, capacity: float, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now]
+        bucket[0] = min(capacity, bucket[0] + max(0.0, now - bucket[1]) * rate)
+        bucket[1] = now
+        return bucket
+    
+    def try_take(self, requests: List[BucketRequest]) -> float:
+        """所有桶都足够时一起扣减并返回0，否则不扣减并返回需要等待的秒数"""
+        now = time.monotonic()
+        with self._lock:
+            wait = 0.0
+            buckets = []
+            for key, rate, capacity, amount in requests:
+                bucket = self._refill(key, rate, capacity, now)
+                buckets.append(bucket)
+                if bucket[0] < amount:
+                    wait = max(wait, (amount - bucket[0]) / rate)
+            if wait > 0:
+                return wait
+            for bucket, (_, _, _, amount) in zip(buckets, requests):
+                bucket[0] -= amount
+            return 0.0
+    
+    def adjust(self, requests: List[BucketRequest]):
+        """按实际用量补扣（正数）或退还（负数），允许桶余额为负"""
+        now = time.monotonic()
+        with self._lock:
+            for key, rate, capacity, amount in requests:
+                bucket = self._refill(key, rate, capacity, now)
+                bucket[0] = min(capacity, bucket[0] - amount)
+
+
+# KEYS: 桶键；ARGV: 当前毫秒时间, 是否强制扣减, 之后每个桶依次为 每毫秒速率, 容量, 扣减量
+# 返回需要等待的毫秒数，0 表示已扣减
+_REDIS_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local force = ARGV[2] == '1'
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local base = 2 + (i - 1) * 3
+    local rate = tonumber(ARGV[base + 1])
+    local capacity = tonumber(ARGV[base + 2])
+    local amount = tonumber(ARGV[base + 3])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if not force and tokens < amount then
+        wait = math.max(wait, (amount - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+for i, key in ipairs(KEYS) do
+    local base = 2 + (i - 1) * 3
+    local rate = tonumber(ARGV[base + 1])
+    local capacity = tonumber(ARGV[base + 2])
+    local amount = tonumber(ARGV[base + 3])
+    redis.call('HSET', key, 'tokens', tostring(math.min(capacity, levels[i] - amount)), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate) + 60000)
+end
+return 0
+"""
+
+
+class RedisBucketStore:
+    """Redis共享令牌桶，多个桶在一个Lua脚本中原子地检查和扣减"""
+    
+    KEY_PREFIX = "autoreport:llm_rate:"
+    
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self._script = redis_client.register_script(_REDIS_BUCKET_SCRIPT)
+    
+    def _run(self, requests: List[BucketRequest], force: bool) -> float:
+        keys = [f"{self.KEY_PREFIX}{key}" for key, _, _, _ in requests]
+        args: List[Any] = [int(time.time() * 1000), "1" if force else "0"]
+        for _, rate, capacity, amount in requests:
+            args.extend([rate / 1000.0, capacity, amount])
+        return float(self._script(keys=keys, args=args)) / 1000.0
+    
+    def try_take(self, requests: List[BucketRequest]) -> float:
+        return self._run(requests, force=False)
+    
+    def adjust(self, requests: List[BucketRequest]):
+        self._run(requests, force=True)
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "state")
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.state = "waiting"  # waiting / granted / cancelled
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class PrioritySlots:
+    """
+    带优先级的计数信号量：优先级高的先获得，同优先级先进先出
+    
+    状态由线程锁保护，唤醒通过 call_soon_threadsafe 投递到等待者所在的事件循环，
+    因此可以在多个事件循环（线程）之间共享。
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.in_use = 0
+        self._waiters: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+    
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, waiter in self._waiters if waiter.state == "waiting")
+    
+    @property
+    def available(self) -> int:
+        return max(0, self.capacity - self.in_use)
+    
+    async def acquire(self, priority: int = 0, timeout: Optional[float] = None) -> bool:
+        """获取槽位，超时返回False"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_use < self.capacity and not self.waiting:
+                self.in_use += 1
+                return True
+            waiter = _Waiter(loop)
+            heapq.heappush(self._waiters, (-priority, next(self._seq), waiter))
+        
+        try:
+            if timeout is not None and timeout <= 0:
+                raise asyncio.TimeoutError()
+            await asyncio.wait_for(waiter.future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter.state == "granted":
+                    # 超时的同时已被分配，视为获取成功
+                    return True
+                waiter.state = "cancelled"
+            return False
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.state == "granted"
+                waiter.state = "cancelled"
+            if granted:
+                self.release()
+            raise
+    
+    def release(self):
+        """释放槽位，直接移交给下一个等待者"""
+        with self._lock:
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                if waiter.state != "waiting" or waiter.loop.is_closed():
+                    continue
+                waiter.state = "granted"
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                return
+            self.in_use = max(0, self.in_use - 1)
+
+
+@dataclass
+class RateLimitLease:
+    """一次获得的访问许可，释放时用于归还并发槽位和修正token预算"""
+    lease_id: str
+    server: Optional[str] = None
+    model: Optional[str] = None
+    user_id: Optional[str] = None
+    estimated_tokens: int = 0
+    tokens_used: int = 0
+    wait_seconds: float = 0.0
+    token_buckets: List[BucketRequest] = field(default_factory=list)
+    released: bool = False
+
+
 class LLMRateLimiter:
     """LLM访问速度限制器"""
     
-    def __init__(self, config: Optional[LimiterConfig] = None):
+    def __init__(self, config: Optional[LimiterConfig] = None, redis_client=None):
         self.config = config or LimiterConfig()
         self.metrics = RequestMetrics()
         self.active_requests = set()
-        self.last_request_time = 0.0
-        self.request_semaphore = asyncio.Semaphore(self.config.max_concurrent_requests)
         self.start_time = datetime.utcnow()
-        self._lock = asyncio.Lock()
+        self._metrics_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        
+        # 并发槽位：None 为全局，其余按服务器
+        self._slots: Dict[Optional[str], PrioritySlots] = {}
+        # 同一组预算的排队闸门，保证排队顺序公平
+        self._gates: Dict[Tuple[str, ...], PrioritySlots] = {}
+        self._local_store = LocalBucketStore()
+        self._store = self._create_store(redis_client)
         
         logger.info(f"LLM速度限制器已初始化: {self.config.to_dict()}")
     
-    async def acquire(self) -> bool:
-        """获取访问许可"""
+    def _create_store(self, redis_client):
+        if self.config.backend != "redis":
+            return self._local_store
+        try:
+            if redis_client is None:
+                from app.services.infrastructure.cache.redis_cache_service import cache_service
+                redis_client = cache_service.client if cache_service.enabled else None
+            if redis_client is not None:
+                return RedisBucketStore(redis_client)
+        except Exception as e:
+            logger.warning(f"Redis令牌桶初始化失败: {e}")
+        logger.warning("Redis不可用，LLM限流退化为进程内模式")
+        return self._local_store
+    
+    # ------------------------------------------------------------------
+    # 获取与释放
+    # ------------------------------------------------------------------
+    async def acquire(
+        self,
+        server: Optional[str] = None,
+        model: Optional[str] = None,
+        user_id: Optional[str] = None,
+        estimated_tokens: int = 0,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ) -> Optional[RateLimitLease]:
+        """
+        获取访问许可，超出限制时排队等待
+        
+        Args:
+            server/model/user_id: 预算维度，未指定的维度不限制
+            estimated_tokens: 预估token数，用于TPM预算（释放时按实际用量修正）
+            priority: 优先级，数值越大越先获得许可
+            timeout: 最长排队时间，默认 request_timeout_seconds
+        
+        Returns:
+            许可对象；超过截止时间返回None
+        """
+        lease = RateLimitLease(
+            lease_id=uuid.uuid4().hex,
+            server=server,
+            model=model,
+            user_id=str(user_id) if user_id is not None else None,
+            estimated_tokens=int(estimated_tokens or 0)
+        )
         if not self.config.enable_rate_limiting and not self.config.enable_concurrency_limiting:
-            return True
+            return self._admit(lease)
+        
+        timeout = self.config.request_timeout_seconds if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        
+        slots = None
+        if self.config.enable_concurrency_limiting:
+            slots = self._get_slots(server)
+            if not await slots.acquire(priority, deadline - time.monotonic()):
+                return self._reject(lease, "并发限制排队超时")
         
         try:
-            # 并发限制
-            if self.config.enable_concurrency_limiting:
-                # 非阻塞方式检查并发限制
-                if self.request_semaphore.locked():
-                    async with self._lock:
-                        self.metrics.blocked_requests += 1
-                    logger.warning("请求被阻塞：并发限制已达上限")
-                    return False
-                
-                await self.request_semaphore.acquire()
-            
-            # 速率限制
             if self.config.enable_rate_limiting:
-                current_time = time.time()
-                time_since_last = current_time - self.last_request_time
-                
-                if time_since_last < self.config.min_interval_seconds:
-                    # 需要等待
-                    wait_time = self.config.min_interval_seconds - time_since_last
-                    logger.debug(f"速率限制：等待 {wait_time:.2f} 秒")
-                    await asyncio.sleep(wait_time)
-                
-                self.last_request_time = time.time()
-            
-            # 记录活跃请求
-            request_id = f"req_{int(time.time() * 1000000)}"
-            self.active_requests.add(request_id)
-            
-            async with self._lock:
-                self.metrics.total_requests += 1
-                self.metrics.last_request_time = datetime.utcnow()
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"获取访问许可时发生错误: {e}")
-            if self.config.enable_concurrency_limiting:
-                self.request_semaphore.release()
+                request_buckets, lease.token_buckets = self._build_buckets(lease)
+                if request_buckets and not await self._take_buckets(request_buckets, priority, deadline):
+                    if slots:
+                        slots.release()
+                    return self._reject(lease, "速率限制排队超时")
+        except BaseException:
+            if slots:
+                slots.release()
+            raise
+        
+        lease.wait_seconds = time.monotonic() - started
+        return self._admit(lease)
+    
+    async def _take_buckets(self, request_buckets: List[BucketRequest], priority: int, deadline: float) -> bool:
+        """按顺序排队扣减令牌桶"""
+        gate = self._get_gate(tuple(key for key, _, _, _ in request_buckets))
+        if not await gate.acquire(priority, deadline - time.monotonic()):
             return False
+        try:
+            while True:
+                try:
+                    wait = self._store.try_take(request_buckets)
+                except Exception as e:
+                    logger.warning(f"共享令牌桶不可用，改用进程内令牌桶: {e}")
+                    self._store = self._local_store
+                    wait = self._store.try_take(request_buckets)
+                if wait <= 0:
+                    return True
+                if time.monotonic() + wait > deadline:
+                    return False
+                logger.debug(f"速率限制：等待 {wait:.2f} 秒")
+                await asyncio.sleep(wait)
+        finally:
+            gate.release()
     
-    def release(self, success: bool = True, tokens_used: int = 0, response_time: float = 0.0):
+    def release(
+        self,
+        success: bool = True,
+        tokens_used: int = 0,
+        response_time: float = 0.0,
+        lease: Optional[RateLimitLease] = None
+    ):
         """释放访问许可"""
         try:
-            # 释放信号量
+            if lease is None:
+                # 兼容未传入许可的调用方：释放全局槽位
+                lease = RateLimitLease(lease_id="")
+            elif lease.released:
+                return
+            lease.released = True
+            
             if self.config.enable_concurrency_limiting:
-                self.request_semaphore.release()
+                self._get_slots(lease.server).release()
+            self.active_requests.discard(lease.lease_id)
+            
+            # 按实际token用量修正TPM预算
+            if tokens_used and lease.token_buckets:
+                adjustments = [
+                    (key, rate, capacity, tokens_used - charged)
+                    for key, rate, capacity, charged in lease.token_buckets
+                    if tokens_used != charged
+                ]
+                if adjustments:
+                    try:
+                        self._store.adjust(adjustments)
+                    except Exception as e:
+                        logger.warning(f"修正token预算失败: {e}")
             
-            # 更新指标
-            asyncio.create_task(self._update_metrics(success, tokens_used, response_time))
+            self._update_metrics(success, tokens_used, response_time)
             
         except Exception as e:
             logger.error(f"释放访问许可时发生错误: {e}")
     
-    async def _update_metrics(self, success: bool, tokens_used: int, response_time: float):
+    @asynccontextmanager
+    async def limit(
+        self,
+        server: Optional[str] = None,
+        model: Optional[str] = None,
+        user_id: Optional[str] = None,
+        estimated_tokens: int = 0,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ):
+        """
+        上下文管理器形式，超时抛出 RateLimitExceeded
+        
+        调用方可在块内设置 lease.tokens_used 以按实际用量修正预算
+        """
+        lease = await self.acquire(server, model, user_id, estimated_tokens, priority, timeout)
+        if lease is None:
+            raise RateLimitExceeded(f"LLM请求排队超时: server={server}, model={model}, user={user_id}")
+        
+        start_time = time.time()
+        success = False
+        try:
+            yield lease
+            success = True
+        finally:
+            self.release(
+                success=success,
+                tokens_used=lease.tokens_used,
+                response_time=time.time() - start_time,
+                lease=lease
+            )
+    
+    def _admit(self, lease: RateLimitLease) -> RateLimitLease:
+        self.active_requests.add(lease.lease_id)
+        with self._metrics_lock:
+            self.metrics.total_requests += 1
+            self.metrics.last_request_time = datetime.utcnow()
+            if lease.wait_seconds > 0.001:
+                self.metrics.queued_requests += 1
+                self.metrics.total_wait_seconds += lease.wait_seconds
+                self.metrics.max_wait_seconds = max(self.metrics.max_wait_seconds, lease.wait_seconds)
+        return lease
+    
+    def _reject(self, lease: RateLimitLease, reason: str) -> None:
+        with self._metrics_lock:
+            self.metrics.total_requests += 1
+            self.metrics.blocked_requests += 1
+        logger.warning(f"请求被阻塞：{reason} (server={lease.server}, model={lease.model}, user={lease.user_id})")
+        return None
+    
+    def _get_slots(self, server: Optional[str]) -> PrioritySlots:
+        with self._state_lock:
+            slots = self._slots.get(server)
+            if slots is None:
+                capacity = self.config.max_concurrent_requests if server is None else self.config.max_concurrent_per_server
+                slots = self._slots[server] = PrioritySlots(capacity)
+            return slots
+    
+    def _get_gate(self, keys: Tuple[str, ...]) -> PrioritySlots:
+        with self._state_lock:
+            gate = self._gates.get(keys)
+            if gate is None:
+                gate = self._gates[keys] = PrioritySlots(1)
+            return gate
+    
+    def _build_buckets(self, lease: RateLimitLease) -> Tuple[List[BucketRequest], List[BucketRequest]]:
+        """根据许可的维度生成需要扣减的令牌桶，返回 (全部桶, 其中的TPM桶)"""
+        buckets: List[BucketRequest] = []
+        token_buckets: List[BucketRequest] = []
+        
+        if lease.server is None and self.config.min_interval_seconds > 0:
+            # 未指定服务器的调用保持全局最小间隔
+            buckets.append(("global:interval", 1.0 / self.config.min_interval_seconds, 1.0, 1.0))
+        
+        for scope, name in (("server", lease.server), ("model", lease.model), ("user", lease.user_id)):
+            if not name:
+                continue
+            budget = self.config.get_budget(scope, name)
+            if budget.requests_per_minute > 0:
+                rate = budget.requests_per_minute / 60.0
+                buckets.append((f"{scope}:{name}:rpm", rate, self._capacity(rate), 1.0))
+            if budget.tokens_per_minute > 0:
+                rate = budget.tokens_per_minute / 60.0
+                capacity = self._capacity(rate)
+                # 单次请求超过桶容量时按容量扣减，避免永远无法获得许可
+                bucket = (f"{scope}:{name}:tpm", rate, capacity, float(min(lease.estimated_tokens, capacity)))
+                buckets.append(bucket)
+                token_buckets.append(bucket)
+        return buckets, token_buckets
+    
+    def _capacity(self, rate: float) -> float:
+        return max(1.0, rate * self.config.burst_seconds)
+    
+    def _update_metrics(self, success: bool, tokens_used: int, response_time: float):
         """更新指标"""
-        async with self._lock:
+        with self._metrics_lock:
             if success:
                 self.metrics.successful_requests += 1
             else:
@@ -151,7 +621,7 @@ class LLMRateLimiter:
             self.metrics.total_tokens += tokens_used
             
             # 更新平均响应时间
-            if response_time > 0:
+            if response_time > 0 and success:
                 total_response_time = (
                     self.metrics.average_response_time * (self.metrics.successful_requests - 1) + response_time
                 )
@@ -160,12 +630,19 @@ class LLMRateLimiter:
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
         uptime = datetime.utcnow() - self.start_time
+        global_slots = self._get_slots(None)
         
         return {
             "rate_limiter_config": self.config.to_dict(),
             "current_status": {
                 "active_requests": len(self.active_requests),
-                "available_slots": self.request_semaphore._value if self.config.enable_concurrency_limiting else -1,
+                "available_slots": global_slots.available if self.config.enable_concurrency_limiting else -1,
+                "waiting_requests": sum(slots.waiting for slots in list(self._slots.values())),
+                "server_slots": {
+                    server: {"in_use": slots.in_use, "waiting": slots.waiting}
+                    for server, slots in list(self._slots.items()) if server is not None
+                },
+                "backend": "redis" if isinstance(self._store, RedisBucketStore) else "local",
                 "last_request_time": self.metrics.last_request_time.isoformat() if self.metrics.last_request_time else None,
                 "uptime_seconds": uptime.total_seconds()
             },
@@ -178,6 +655,9 @@ class LLMRateLimiter:
                 "block_rate": self.metrics.block_rate,
                 "total_tokens": self.metrics.total_tokens,
                 "average_response_time": self.metrics.average_response_time,
+                "queued_requests": self.metrics.queued_requests,
+                "average_wait_seconds": self.metrics.average_wait_seconds,
+                "max_wait_seconds": self.metrics.max_wait_seconds,
                 "requests_per_minute": self._calculate_rpm()
             }
         }
@@ -240,19 +720,21 @@ _global_rate_limiter: Optional[LLMRateLimiter] = None
 
 
 def get_llm_rate_limiter(
-    max_concurrent_requests: int = 3,
-    min_interval_seconds: float = 2.0,
-    request_timeout_seconds: float = 120.0
+    max_concurrent_requests: Optional[int] = None,
+    min_interval_seconds: Optional[float] = None,
+    request_timeout_seconds: Optional[float] = None
 ) -> LLMRateLimiter:
-    """获取全局LLM速度限制器"""
+    """获取全局LLM速度限制器（未指定的参数使用配置值）"""
     global _global_rate_limiter
     
     if _global_rate_limiter is None:
-        config = LimiterConfig(
-            max_concurrent_requests=max_concurrent_requests,
-            min_interval_seconds=min_interval_seconds,
-            request_timeout_seconds=request_timeout_seconds
-        )
+        config = LimiterConfig.from_settings()
+        if max_concurrent_requests is not None:
+            config.max_concurrent_requests = max_concurrent_requests
+        if min_interval_seconds is not None:
+            config.min_interval_seconds = min_interval_seconds
+        if request_timeout_seconds is not None:
+            config.request_timeout_seconds = request_timeout_seconds
         _global_rate_limiter = LLMRateLimiter(config)
     
     return _global_rate_limiter
@@ -267,29 +749,17 @@ def reset_llm_rate_limiter():
 
 # 装饰器用法
 def rate_limited(func):
-    """装饰器：为函数添加速率限制"""
+    """装饰器：为函数添加速率限制（排队等待，超时抛出 RateLimitExceeded）"""
     async def wrapper(*args, **kwargs):
         limiter = get_llm_rate_limiter()
         
-        if not await limiter.acquire():
-            raise Exception("请求被速率限制器阻塞")
-        
-        start_time = time.time()
-        success = False
-        tokens_used = 0
-        
-        try:
+        async with limiter.limit() as lease:
             result = await func(*args, **kwargs)
-            success = True
             
             # 尝试从结果中提取token信息
             if isinstance(result, dict) and 'usage' in result:
-                tokens_used = result['usage'].get('total_tokens', 0)
+                lease.tokens_used = result['usage'].get('total_tokens', 0)
             
             return result
-            
-        finally:
-            response_time = time.time() - start_time
-            limiter.release(success=success, tokens_used=tokens_used, response_time=response_time)
     
-    return wrapper
\ No newline at end of file
+    return wrapper
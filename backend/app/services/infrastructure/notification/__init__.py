@@ -10,10 +10,16 @@ __version__ = "1.0.0"
 # 导入核心组件
 from .email_service import EmailService
 from .notification_service import NotificationService, get_notification_service
+from .smtp_pool import MailDeliveryResult, OutgoingMail, SmtpMailer, SmtpPoolConfig, get_smtp_mailer
 
 # 模块导出
 __all__ = [
     "EmailService",
     "NotificationService",
-    "get_notification_service"
+    "get_notification_service",
+    "MailDeliveryResult",
+    "OutgoingMail",
+    "SmtpMailer",
+    "SmtpPoolConfig",
+    "get_smtp_mailer",
 ]
\ No newline at end of file
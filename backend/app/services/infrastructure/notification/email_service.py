@@ -1,16 +1,19 @@
+import asyncio
 import logging
-import smtplib
 import os
-from email import encoders
-from email.mime.base import MIMEBase
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
+from dataclasses import replace
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime
 
 from app.core.config import settings
+from app.services.infrastructure.notification.smtp_pool import (
+    MailDeliveryResult,
+    OutgoingMail,
+    SmtpMailer,
+    SmtpPoolConfig,
+    get_smtp_mailer,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -59,105 +62,111 @@ class EmailService:
 
         return True
 
+    @property
+    def mailer(self) -> SmtpMailer:
+        """进程内按 SMTP 配置共享的连接池投递器"""
+        config = replace(
+            SmtpPoolConfig.from_settings(),
+            host=self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+        )
+        return get_smtp_mailer(config)
+
     def test_connection(self) -> bool:
         """测试邮件服务器连接"""
         try:
             if not self.validate_email_config():
                 return False
 
-            server = smtplib.SMTP(self.host, self.port)
-            if self.use_tls:
-                server.starttls()
-            server.login(self.username, self.password)
-            server.quit()
-            logger.info("邮件服务器连接测试成功")
-            return True
+            # 借出池中的连接并探活，同时预热连接池
+            with self.mailer.pool.session() as session:
+                alive = session.is_alive()
+            if alive:
+                logger.info("邮件服务器连接测试成功")
+            else:
+                logger.error("邮件服务器连接测试失败: NOOP 无响应")
+            return alive
         except Exception as e:
             logger.error(f"邮件服务器连接测试失败: {e}")
             return False
 
-    def _send_email(self, subject: str, body: str, to_emails: List[str], attachments: List[str] = None) -> bool:
-        """发送邮件 - 优化版本"""
-        if attachments is None:
-            attachments = []
+    def _build_mail(
+        self,
+        subject: str,
+        body: str,
+        to_emails: List[str],
+        attachments: Optional[List[str]] = None,
+        cc_emails: Optional[List[str]] = None,
+        bcc_emails: Optional[List[str]] = None,
+    ) -> OutgoingMail:
+        """构建待发送邮件，附件在发送时才按块读取编码"""
+        valid_attachments = []
+        for attachment_path in attachments or []:
+            if os.path.isfile(attachment_path):
+                valid_attachments.append(attachment_path)
+                filename = os.path.basename(attachment_path)
+                mime_info = 'Word文档' if filename.lower().endswith(('.docx', '.doc')) else '其他文档'
+                logger.info(f"📎 已添加附件: {filename} ({mime_info})")
+            else:
+                logger.warning(f"⚠️ 附件文件不存在: {attachment_path}")
+
+        return OutgoingMail(
+            sender=self.from_email,
+            sender_name=self.sender_name,
+            to=list(to_emails),
+            cc=list(cc_emails or []),
+            bcc=list(bcc_emails or []),
+            subject=subject,
+            html_body=body,
+            attachments=valid_attachments,
+        )
+
+    def _deliver(self, mail: OutgoingMail) -> MailDeliveryResult:
+        """通过连接池发送邮件（失败时按退避策略重试）"""
+        result = self.mailer.send(mail)
+        if result.success:
+            logger.info(f"✅ 邮件发送成功: {', '.join(result.recipients)} (连接 #{result.connection_id})")
+            if mail.attachments:
+                logger.info(f"📎 包含 {len(mail.attachments)} 个附件")
+            if result.refused:
+                logger.warning(f"⚠️ 部分收件人被拒收: {', '.join(result.refused)}")
+        return result
 
+    def _send_email(self, subject: str, body: str, to_emails: List[str], attachments: List[str] = None) -> bool:
+        """发送邮件 - 连接池版本"""
         try:
             # 验证邮箱配置
             if not self.validate_email_config():
                 return False
 
-            # 创建邮件
-            msg = MIMEMultipart()
-            msg['From'] = self.from_email
-            msg['To'] = ', '.join(to_emails)
-            msg['Subject'] = subject
-
-            # 添加HTML正文
-            msg.attach(MIMEText(body, 'html', 'utf-8'))
-
-            # 添加附件
-            for attachment_path in attachments:
-                if os.path.exists(attachment_path):
-                    filename = os.path.basename(attachment_path)
-                    try:
-                        # 读取文档内容
-                        with open(attachment_path, 'rb') as f:
-                            attachment_data = f.read()
-
-                        # 使用MIMEApplication处理Word文档
-                        if filename.lower().endswith('.docx'):
-                            part = MIMEApplication(
-                                attachment_data,
-                                _subtype='vnd.openxmlformats-officedocument.wordprocessingml.document',
-                                name=filename
-                            )
-                            part.set_type('application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-                        elif filename.lower().endswith('.doc'):
-                            part = MIMEApplication(
-                                attachment_data,
-                                _subtype='msword',
-                                name=filename
-                            )
-                            part.set_type('application/msword')
-                        else:
-                            part = MIMEApplication(
-                                attachment_data,
-                                _subtype='octet-stream',
-                                name=filename
-                            )
-
-                        part.add_header('Content-Disposition', 'attachment', filename=filename)
-                        msg.attach(part)
-
-                        mime_info = 'Word文档' if filename.lower().endswith(('.docx', '.doc')) else '其他文档'
-                        logger.info(f"📎 已添加附件: {filename} ({mime_info})")
-
-                    except Exception as e:
-                        logger.warning(f"⚠️ 无法添加附件 {attachment_path}: {e}")
-                else:
-                    logger.warning(f"⚠️ 附件文件不存在: {attachment_path}")
-
-            # 发送邮件
-            server = smtplib.SMTP(self.host, self.port)
-            try:
-                if self.use_tls:
-                    server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
-            finally:
-                server.quit()
-
-            logger.info(f"✅ 邮件发送成功: {', '.join(to_emails)}")
-            if attachments:
-                logger.info(f"📎 包含 {len(attachments)} 个附件")
-            return True
+            return self._deliver(self._build_mail(subject, body, to_emails, attachments)).success
 
         except Exception as e:
             logger.error(f"❌ SMTP发送失败: {e}")
-            import traceback
-            traceback.print_exc()
             return False
 
+    async def send_email_async(
+        self,
+        to_emails: List[str],
+        subject: str,
+        body: str,
+        html_body: Optional[str] = None,
+        attachments: Optional[List[str]] = None,
+        cc_emails: Optional[List[str]] = None,
+        bcc_emails: Optional[List[str]] = None,
+    ) -> MailDeliveryResult:
+        """异步发送邮件 - 在线程中通过连接池发送，不阻塞事件循环"""
+        recipients = [*to_emails, *(cc_emails or []), *(bcc_emails or [])]
+        if not self.validate_email_config():
+            return MailDeliveryResult(recipients=recipients, success=False, attempts=0, error="邮箱配置不完整")
+
+        email_body = html_body if html_body else f"<pre>{body}</pre>"
+        mail = self._build_mail(subject, email_body, to_emails, attachments, cc_emails, bcc_emails)
+        return await asyncio.to_thread(self._deliver, mail)
+
     def send_email(
         self,
         to_emails: List[str],
@@ -0,0 +1,494 @@
+"""
+SMTP 连接池与批量邮件投递
+
+- 每个进程按 SMTP 配置维护一个连接池，已完成 STARTTLS + 登录的会话在多封邮件间复用，
+  空闲过久的会话使用前先 NOOP 探活，失效则重连；进程 fork 后自动丢弃继承的连接
+- 批量发送时多个工作线程共享同一队列，每个线程复用自己取到的连接连续发送，
+  结果中记录每封邮件使用的连接，便于按连接统计
+- MIME 报文按块流式生成并直接写入 DATA 通道，大附件按块读取、Base64 编码，不整体读入内存
+- 连接断开、4xx 临时错误等可重试错误按指数退避重试；认证失败、收件人被拒等永久错误不重试
+- 异步调用方通过 send_async / send_batch_async 在线程池中执行，不阻塞事件循环
+"""
+
+import asyncio
+import base64
+import itertools
+import logging
+import mimetypes
+import os
+import queue
+import re
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import astuple, dataclass, field
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.policy import compat32
+from email.utils import formataddr, formatdate, make_msgid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 报文统一使用 CRLF 换行
+_SMTP_POLICY = compat32.clone(linesep="\r\n")
+_LEADING_DOT = re.compile(rb"^\.", re.MULTILINE)
+# Base64 每行 76 个字符对应 57 个原始字节
+_BASE64_LINE_BYTES = 57
+
+_ATTACHMENT_TYPES = {
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".doc": "application/msword",
+}
+
+
+@dataclass
+class SmtpPoolConfig:
+    """SMTP 连接池配置"""
+    host: str = "localhost"
+    port: int = 25
+    username: str = ""
+    password: str = ""
+    use_tls: bool = False
+    # 建立连接与单次命令的超时（秒）
+    timeout: float = 30.0
+    # 每个进程同一 SMTP 配置的最大连接数（也是批量发送的并发度）
+    pool_size: int = 4
+    # 单个连接发送多少封后主动重建（部分服务商限制单连接发信数）
+    max_messages_per_connection: int = 100
+    # 空闲超过该秒数的连接使用前先 NOOP 探活
+    idle_check_interval: float = 30.0
+    # 可重试错误的最大重试次数
+    max_retries: int = 2
+    # 重试前等待的秒数（按次数指数增长）
+    retry_backoff: float = 1.0
+    # 附件每次读取的字节数，取 57 的整数倍使 Base64 行不跨块
+    attachment_chunk_size: int = _BASE64_LINE_BYTES * 1024
+
+    @classmethod
+    def from_settings(cls) -> "SmtpPoolConfig":
+        """从全局配置创建"""
+        return cls(
+            host=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USERNAME,
+            password=settings.SMTP_PASSWORD,
+            use_tls=settings.SMTP_USE_TLS,
+            timeout=settings.SMTP_TIMEOUT,
+            pool_size=max(1, settings.SMTP_POOL_SIZE),
+            max_messages_per_connection=max(1, settings.SMTP_MAX_MESSAGES_PER_CONNECTION),
+            max_retries=max(0, settings.SMTP_MAX_RETRIES),
+            retry_backoff=settings.SMTP_RETRY_BACKOFF,
+        )
+
+
+@dataclass
+class OutgoingMail:
+    """待发送的邮件"""
+    sender: str
+    to: List[str]
+    subject: str
+    html_body: str
+    sender_name: Optional[str] = None
+    cc: List[str] = field(default_factory=list)
+    # 密送地址只出现在信封中，不写入邮件头
+    bcc: List[str] = field(default_factory=list)
+    attachments: List[str] = field(default_factory=list)
+
+    @property
+    def envelope_recipients(self) -> List[str]:
+        return list(dict.fromkeys([*self.to, *self.cc, *self.bcc]))
+
+
+@dataclass
+class MailDeliveryResult:
+    """单封邮件的投递结果"""
+    recipients: List[str]
+    success: bool
+    attempts: int
+    message_id: Optional[str] = None
+    connection_id: Optional[int] = None
+    # 被服务器拒收的收件人: {address: (code, message)}
+    refused: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class SmtpDataCommittedError(smtplib.SMTPException):
+    """报文终止符已发送后出现的错误：服务器可能已经接收了邮件，重试会造成重复投递"""
+
+    def __init__(self, error: BaseException):
+        super().__init__(f"报文已提交，投递结果未知: {error}")
+        self.error = error
+
+
+def is_transient_smtp_error(error: BaseException) -> bool:
+    """
+    连接类错误与 4xx 响应可以重试；认证失败、5xx、收件人全部被拒不重试
+
+    报文终止符发出之后的任何错误都不重试
+    """
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, SmtpDataCommittedError)):
+        return False
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # 附件文件读取失败重试也无济于事
+    if isinstance(error, (FileNotFoundError, IsADirectoryError, PermissionError)):
+        return False
+    return isinstance(error, OSError)
+
+
+def _header_block(message: MIMEBase) -> bytes:
+    return b"".join(_SMTP_POLICY.fold_binary(name, value) for name, value in message.items()) + b"\r\n"
+
+
+def _base64_lines(data: bytes) -> bytes:
+    return base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+
+def _attachment_part(path: str) -> MIMEBase:
+    filename = os.path.basename(path)
+    content_type = (
+        _ATTACHMENT_TYPES.get(os.path.splitext(filename)[1].lower())
+        or mimetypes.guess_type(filename)[0]
+        or "application/octet-stream"
+    )
+    maintype, subtype = content_type.split("/", 1)
+    part = MIMEBase(maintype, subtype, name=filename)
+    part["Content-Transfer-Encoding"] = "base64"
+    part.add_header("Content-Disposition", "attachment", filename=filename)
+    return part
+
+
+def iter_mime_chunks(
+    mail: OutgoingMail,
+    message_id: Optional[str] = None,
+    chunk_size: int = _BASE64_LINE_BYTES * 1024,
+) -> Iterator[bytes]:
+    """
+    按块生成 multipart/mixed 报文（CRLF 换行，每块以 CRLF 结尾）
+
+    附件在生成时才按块读取并编码，整封邮件不会同时驻留内存。
+    """
+    chunk_size = max(_BASE64_LINE_BYTES, chunk_size - chunk_size % _BASE64_LINE_BYTES)
+    boundary = f"=_autoreport_{make_msgid().strip('<>').split('@')[0]}"
+
+    envelope = MIMEMultipart(boundary=boundary)
+    envelope["From"] = formataddr((mail.sender_name, mail.sender), charset="utf-8") if mail.sender_name else mail.sender
+    envelope["To"] = ", ".join(mail.to)
+    if mail.cc:
+        envelope["Cc"] = ", ".join(mail.cc)
+    envelope["Subject"] = mail.subject
+    envelope["Date"] = formatdate(localtime=True)
+    envelope["Message-ID"] = message_id or make_msgid()
+    yield _header_block(envelope)
+
+    delimiter = f"--{boundary}\r\n".encode("ascii")
+    body = MIMEBase("text", "html", charset="utf-8")
+    body["Content-Transfer-Encoding"] = "base64"
+    yield delimiter + _header_block(body) + _base64_lines(mail.html_body.encode("utf-8"))
+
+    for path in mail.attachments:
+        yield delimiter + _header_block(_attachment_part(path))
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                yield _base64_lines(data)
+
+    yield f"--{boundary}--\r\n".encode("ascii")
+
+
+class SmtpSession:
+    """一个已认证的 SMTP 连接"""
+
+    def __init__(self, connection_id: int, smtp: smtplib.SMTP):
+        self.id = connection_id
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+    def send(self, mail: OutgoingMail, message_id: str, chunk_size: int) -> Dict[str, Any]:
+        """
+        发送一封邮件，报文分块写入 DATA 通道
+
+        Returns:
+            被拒收的收件人；全部被拒时抛出 SMTPRecipientsRefused
+        """
+        smtp = self.smtp
+        smtp.ehlo_or_helo_if_needed()
+        code, response = smtp.mail(mail.sender)
+        if code != 250:
+            smtp.rset()
+            raise smtplib.SMTPSenderRefused(code, response, mail.sender)
+
+        recipients = mail.envelope_recipients
+        refused = {}
+        for recipient in recipients:
+            code, response = smtp.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, response)
+        if len(refused) == len(recipients):
+            smtp.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, response = smtp.docmd("data")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, response)
+        for chunk in iter_mime_chunks(mail, message_id, chunk_size):
+            smtp.send(_LEADING_DOT.sub(b"..", chunk))
+        # 终止符一旦写出，服务器可能已入队该邮件（即使随后断线或超时），之后的错误不能再重试
+        try:
+            smtp.send(b".\r\n")
+            code, response = smtp.getreply()
+        except Exception as e:
+            raise SmtpDataCommittedError(e) from e
+        if code != 250:
+            raise SmtpDataCommittedError(smtplib.SMTPDataError(code, response))
+
+        self.messages_sent += 1
+        self.last_used = time.monotonic()
+        return refused
+
+    def is_alive(self) -> bool:
+        try:
+            return self.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SmtpConnectionPool:
+    """进程内的 SMTP 连接池"""
+
+    def __init__(
+        self,
+        config: Optional[SmtpPoolConfig] = None,
+        smtp_factory: Optional[Callable[..., smtplib.SMTP]] = None,
+    ):
+        self.config = config or SmtpPoolConfig.from_settings()
+        self._smtp_factory = smtp_factory or smtplib.SMTP
+        self._idle: List[SmtpSession] = []
+        self._created = 0
+        self._ids = itertools.count(1)
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+
+    def _reset_after_fork(self) -> None:
+        # 父进程的连接不能在子进程中复用，直接丢弃（不发送 QUIT，避免影响父进程）
+        if self._pid != os.getpid():
+            self._idle, self._created, self._pid = [], 0, os.getpid()
+
+    def _connect(self) -> SmtpSession:
+        config = self.config
+        smtp = self._smtp_factory(config.host, config.port, timeout=config.timeout)
+        try:
+            if config.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+            if config.username:
+                smtp.login(config.username, config.password)
+        except Exception:
+            SmtpSession(0, smtp).close()
+            raise
+        session = SmtpSession(next(self._ids), smtp)
+        logger.info(f"SMTP 连接已建立: #{session.id} {config.host}:{config.port}")
+        return session
+
+    def _acquire(self) -> SmtpSession:
+        with self._cond:
+            self._reset_after_fork()
+            while not self._idle and self._created >= self.config.pool_size:
+                self._cond.wait()
+            session = self._idle.pop() if self._idle else None
+            if session is None:
+                self._created += 1
+
+        if session is not None:
+            if time.monotonic() - session.last_used < self.config.idle_check_interval or session.is_alive():
+                return session
+            logger.info(f"SMTP 连接已失效，重新建立: #{session.id}")
+            session.close()
+
+        try:
+            return self._connect()
+        except BaseException:
+            self._discard()
+            raise
+
+    def _discard(self) -> None:
+        with self._cond:
+            self._created = max(0, self._created - 1)
+            self._cond.notify()
+
+    def _release(self, session: SmtpSession, reusable: bool) -> None:
+        if reusable and session.messages_sent < self.config.max_messages_per_connection:
+            with self._cond:
+                if self._pid == os.getpid():
+                    self._idle.append(session)
+                    self._cond.notify()
+                    return
+        session.close()
+        self._discard()
+
+    @contextmanager
+    def session(self) -> Iterator[SmtpSession]:
+        """借出一个已认证的连接；发送中途出错的连接直接关闭，不放回池中"""
+        session = self._acquire()
+        reusable = False
+        try:
+            yield session
+            reusable = True
+        except (smtplib.SMTPSenderRefused, smtplib.SMTPRecipientsRefused):
+            # 已 RSET，连接状态正常
+            reusable = True
+            raise
+        finally:
+            self._release(session, reusable)
+
+    def close(self) -> None:
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for session in idle:
+            session.close()
+
+
+class SmtpMailer:
+    """基于连接池的邮件投递器"""
+
+    def __init__(
+        self,
+        config: Optional[SmtpPoolConfig] = None,
+        smtp_factory: Optional[Callable[..., smtplib.SMTP]] = None,
+    ):
+        self.config = config or SmtpPoolConfig.from_settings()
+        self.pool = SmtpConnectionPool(self.config, smtp_factory)
+
+    def send(self, mail: OutgoingMail) -> MailDeliveryResult:
+        """同步发送一封邮件，可重试错误按指数退避重试"""
+        message_id = make_msgid()
+        recipients = mail.envelope_recipients
+        attempts = 0
+        while True:
+            attempts += 1
+            connection_id = None
+            try:
+                with self.pool.session() as session:
+                    connection_id = session.id
+                    refused = session.send(mail, message_id, self.config.attachment_chunk_size)
+                return MailDeliveryResult(
+                    recipients=recipients,
+                    success=True,
+                    attempts=attempts,
+                    message_id=message_id,
+                    connection_id=connection_id,
+                    refused=refused,
+                )
+            except Exception as e:
+                if attempts > self.config.max_retries or not is_transient_smtp_error(e):
+                    logger.error(f"❌ SMTP发送失败: {', '.join(recipients)}, {e}")
+                    return MailDeliveryResult(
+                        recipients=recipients,
+                        success=False,
+                        attempts=attempts,
+                        message_id=message_id,
+                        connection_id=connection_id,
+                        refused=getattr(e, "recipients", {}),
+                        error=str(e),
+                    )
+                logger.warning(f"🔁 SMTP发送失败，第 {attempts} 次重试: {e}")
+                time.sleep(self.config.retry_backoff * (2 ** (attempts - 1)))
+
+    def send_batch(self, mails: Sequence[OutgoingMail]) -> List[MailDeliveryResult]:
+        """
+        批量发送，按输入顺序返回结果
+
+        最多 pool_size 个线程从同一队列取邮件，每个线程连续复用同一个连接。
+        """
+        jobs: queue.SimpleQueue = queue.SimpleQueue()
+        for item in enumerate(mails):
+            jobs.put(item)
+        results: List[Optional[MailDeliveryResult]] = [None] * len(mails)
+
+        def _drain() -> None:
+            while True:
+                try:
+                    index, mail = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                results[index] = self.send(mail)
+
+        workers = [
+            threading.Thread(target=_drain, name=f"smtp-batch-{i}", daemon=True)
+            for i in range(max(1, min(self.config.pool_size, len(mails))) - 1)
+        ]
+        for worker in workers:
+            worker.start()
+        _drain()
+        for worker in workers:
+            worker.join()
+        return results
+
+    async def send_async(self, mail: OutgoingMail) -> MailDeliveryResult:
+        """在线程池中发送，不阻塞事件循环"""
+        return await asyncio.to_thread(self.send, mail)
+
+    async def send_batch_async(self, mails: Sequence[OutgoingMail]) -> List[MailDeliveryResult]:
+        return await asyncio.to_thread(self.send_batch, mails)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+_mailers: Dict[tuple, SmtpMailer] = {}
+_mailers_lock = threading.Lock()
+
+
+def get_smtp_mailer(config: Optional[SmtpPoolConfig] = None) -> SmtpMailer:
+    """获取与 SMTP 配置对应的进程内共享投递器"""
+    config = config or SmtpPoolConfig.from_settings()
+    key = astuple(config)
+    with _mailers_lock:
+        mailer = _mailers.get(key)
+        if mailer is None:
+            mailer = _mailers[key] = SmtpMailer(config)
+        return mailer
+
+
+def close_smtp_mailers() -> None:
+    """关闭本进程所有投递器的空闲连接（worker 进程退出时调用）"""
+    with _mailers_lock:
+        mailers = list(_mailers.values())
+    for mailer in mailers:
+        mailer.close()
+
+
+__all__ = [
+    "MailDeliveryResult",
+    "OutgoingMail",
+    "SmtpConnectionPool",
+    "SmtpDataCommittedError",
+    "SmtpMailer",
+    "SmtpPoolConfig",
+    "SmtpSession",
+    "close_smtp_mailers",
+    "get_smtp_mailer",
+    "is_transient_smtp_error",
+    "iter_mime_chunks",
+]
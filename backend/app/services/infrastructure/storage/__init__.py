@@ -5,11 +5,26 @@ Storage Services Module
 - MinIO对象存储
 - 本地文件系统存储  
 - 混合存储策略
+- 异步流式存储（分片上传、范围读取、内容去重）
 - 文件管理接口
 """
 
 from .file_storage_service import FileStorageService
+from .async_storage import (
+    AsyncStorageConfig,
+    AsyncStorageService,
+    RangeNotSatisfiable,
+    StorageDownload,
+    get_async_storage_service,
+    parse_range_header,
+)
 
 __all__ = [
-    "FileStorageService"
+    "FileStorageService",
+    "AsyncStorageConfig",
+    "AsyncStorageService",
+    "RangeNotSatisfiable",
+    "StorageDownload",
+    "get_async_storage_service",
+    "parse_range_header",
 ]
\ No newline at end of file
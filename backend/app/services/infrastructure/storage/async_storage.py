@@ -0,0 +1,393 @@
+"""
+异步存储服务
+
+在混合存储之上提供不阻塞事件循环的存储接口：
+- 流式上传：接受 bytes、同步文件对象、UploadFile 或异步字节迭代器，按块转交存储，不拼装整个文件
+- 分片上传：长度未知或超过分片大小时由 MinIO 客户端分片上传，多个分片并行传输
+- 流式下载与范围读取：按块输出，支持 HTTP Range；大文件按范围并行预取、按顺序输出
+- 内容寻址去重：按 SHA-256 生成对象键，相同内容（图表、模板）只存储一份
+
+所有存储调用在专用线程池中执行，避免占用默认线程池或阻塞事件循环
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import io
+import logging
+import os
+import tempfile
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AsyncStorageConfig:
+    """异步存储配置"""
+    chunk_size: int = 1024 * 1024
+    part_size: int = 16 * 1024 * 1024
+    parallel_parts: int = 4
+    io_threads: int = 8
+    dedup_spool_size: int = 8 * 1024 * 1024
+    # 并行下载时每个范围请求的大小
+    download_part_size: int = 4 * 1024 * 1024
+
+    @classmethod
+    def from_settings(cls) -> "AsyncStorageConfig":
+        """从全局配置创建"""
+        return cls(
+            chunk_size=settings.STORAGE_CHUNK_SIZE,
+            part_size=settings.STORAGE_MULTIPART_PART_SIZE,
+            parallel_parts=settings.STORAGE_PARALLEL_PARTS,
+            io_threads=settings.STORAGE_IO_THREADS,
+            dedup_spool_size=settings.STORAGE_DEDUP_SPOOL_SIZE,
+        )
+
+
+class RangeNotSatisfiable(ValueError):
+    """请求的范围超出文件大小"""
+
+    def __init__(self, size: int):
+        super().__init__(f"请求范围无效，文件大小 {size}")
+        self.size = size
+
+
+def parse_range_header(value: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析 HTTP Range 头，返回 (offset, length)
+
+    未提供、格式不支持或包含多个范围时返回 None（按完整文件响应）；范围越界时抛出 RangeNotSatisfiable
+    """
+    if not value or not value.strip().lower().startswith("bytes="):
+        return None
+    spec = value.strip()[6:].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    start_text, end_text = (part.strip() for part in spec.split("-", 1))
+    try:
+        start = int(start_text) if start_text else None
+        end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+    if start is None:
+        # 后缀范围：最后 N 个字节
+        if not end:
+            raise RangeNotSatisfiable(size)
+        start, end = max(0, size - end), size - 1
+    else:
+        end = size - 1 if end is None else min(end, size - 1)
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(size)
+    return start, end - start + 1
+
+
+@dataclass
+class StorageDownload:
+    """流式下载：body 为按块输出的异步迭代器，headers 含长度与范围信息"""
+    body: AsyncIterator[bytes]
+    status_code: int
+    size: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    stat: Dict[str, Any] = field(default_factory=dict)
+
+
+class _AsyncSourceReader(io.RawIOBase):
+    """
+    在存储线程中同步读取异步数据源
+
+    存储客户端只接受同步 read()，这里把每次读取提交回事件循环执行，数据按需拉取而不在内存中累积
+    """
+
+    def __init__(self, source: Any, loop: asyncio.AbstractEventLoop, chunk_size: int):
+        self._loop = loop
+        self._chunk_size = chunk_size
+        self._read = source.read if hasattr(source, "read") else None
+        self._iterator = None if self._read else source.__aiter__()
+        self._buffer = bytearray()
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    async def _next_chunk(self) -> bytes:
+        if self._read is not None:
+            return await self._read(self._chunk_size)
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size is None or size < 0 or len(self._buffer) < size):
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            if chunk:
+                self._buffer.extend(chunk)
+            else:
+                self._eof = True
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def _is_async_source(source: Any) -> bool:
+    read = getattr(source, "read", None)
+    if read is not None:
+        return inspect.iscoroutinefunction(read)
+    return hasattr(source, "__aiter__")
+
+
+def _stream_length(stream: BinaryIO) -> int:
+    """可定位的流返回剩余长度，否则返回 -1（由存储按分片上传）"""
+    try:
+        position = stream.tell()
+        end = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except Exception:
+        return -1
+
+
+class AsyncStorageService:
+    """异步存储服务"""
+
+    def __init__(self, storage: Any = None, config: Optional[AsyncStorageConfig] = None):
+        self.config = config or AsyncStorageConfig.from_settings()
+        self._storage = storage
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config.io_threads), thread_name_prefix="storage-io"
+        )
+
+    @property
+    def storage(self) -> Any:
+        """底层同步存储（默认混合存储）"""
+        if self._storage is None:
+            from .hybrid_storage_service import get_hybrid_storage_service
+            self._storage = get_hybrid_storage_service()
+        return self._storage
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    # ------------------------------------------------------------------
+    # 上传
+    # ------------------------------------------------------------------
+    async def upload(
+        self,
+        source: Any,
+        original_filename: str,
+        file_type: str = "general",
+        content_type: Optional[str] = None,
+        dedup: bool = False,
+        object_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        流式上传
+
+        Args:
+            source: bytes、同步文件对象、带异步 read() 的对象（如 UploadFile）或异步字节迭代器
+            original_filename: 原始文件名，用于保留扩展名
+            file_type: 对象键前缀（templates/reports/charts 等）
+            dedup: 按内容哈希存储，相同内容只保留一份
+            object_name: 指定对象键（dedup 时忽略）
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            stream: BinaryIO = io.BytesIO(bytes(source))
+        elif _is_async_source(source):
+            stream = _AsyncSourceReader(source, asyncio.get_running_loop(), self.config.chunk_size)
+        elif hasattr(source, "read"):
+            stream = source
+        else:
+            raise TypeError(f"不支持的上传数据类型: {type(source).__name__}")
+
+        extension = os.path.splitext(original_filename or "")[1]
+        if dedup:
+            result = await self._run(self._upload_dedup, stream, file_type, extension, content_type)
+        else:
+            file_id = str(uuid.uuid4())
+            object_name = object_name or f"{file_type}/{file_id}{extension}"
+            result = await self._run(self._upload_stream, stream, object_name, content_type)
+            result.setdefault("file_id", file_id)
+
+        result.update({
+            "filename": os.path.basename(result["file_path"]),
+            "original_filename": original_filename,
+            "file_type": file_type,
+            "content_type": content_type,
+        })
+        return result
+
+    async def upload_path(
+        self, local_path: str, object_name: str, content_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """按块上传本地文件"""
+        def _upload():
+            with open(local_path, "rb") as f:
+                return self._upload_stream(f, object_name, content_type)
+
+        return await self._run(_upload)
+
+    def _upload_stream(self, stream: BinaryIO, object_name: str, content_type: Optional[str]) -> Dict[str, Any]:
+        return self.storage.upload_stream(
+            stream,
+            object_name,
+            length=_stream_length(stream),
+            content_type=content_type,
+            part_size=self.config.part_size,
+            parallel_parts=self.config.parallel_parts,
+        )
+
+    def _upload_dedup(
+        self, stream: BinaryIO, file_type: str, extension: str, content_type: Optional[str]
+    ) -> Dict[str, Any]:
+        """边计算哈希边暂存（超过上限落盘），对象已存在时跳过上传"""
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=self.config.dedup_spool_size) as spool:
+            while True:
+                chunk = stream.read(self.config.chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            object_name = f"cas/{file_type}/{sha256[:2]}/{sha256}{extension}"
+            if self.storage.file_exists(object_name):
+                logger.info(f"内容已存在，跳过上传: {object_name}")
+                result = {
+                    "file_path": object_name,
+                    "size": size,
+                    "uploaded_at": datetime.now().isoformat(),
+                    "backend": getattr(self.storage, "backend_type", None),
+                    "deduplicated": True,
+                }
+            else:
+                spool.seek(0)
+                result = self._upload_stream(spool, object_name, content_type)
+                result["deduplicated"] = False
+
+        result.update({"file_id": sha256, "sha256": sha256})
+        return result
+
+    # ------------------------------------------------------------------
+    # 下载
+    # ------------------------------------------------------------------
+    async def stat(self, file_path: str) -> Dict[str, Any]:
+        return await self._run(self.storage.stat_file, file_path)
+
+    async def exists(self, file_path: str) -> bool:
+        return await self._run(self.storage.file_exists, file_path)
+
+    async def download(self, file_path: str) -> Tuple[bytes, str]:
+        """读取完整文件（仅用于必须整体处理内容的场景）"""
+        return await self._run(self.storage.download_file, file_path)
+
+    async def read_range(self, file_path: str, offset: int, length: int) -> bytes:
+        return await self._run(self._read_range, file_path, offset, length)
+
+    def _read_range(self, file_path: str, offset: int, length: int) -> bytes:
+        return b"".join(self.storage.iter_file(file_path, self.config.chunk_size, offset, length))
+
+    async def iter_download(
+        self,
+        file_path: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        size: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        按块输出文件内容
+
+        已知文件大小且读取范围超过一个下载分片时，按范围并行预取 parallel_parts 个分片并按顺序输出，
+        同时驻留内存的数据不超过 parallel_parts 个分片
+        """
+        if size is not None and self.config.parallel_parts > 1:
+            span = (size - offset) if length is None else length
+            if span > self.config.download_part_size:
+                async for chunk in self._iter_parallel(file_path, offset, span):
+                    yield chunk
+                return
+
+        chunks = await self._run(self.storage.iter_file, file_path, self.config.chunk_size, offset, length)
+        try:
+            while True:
+                chunk = await self._run(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                await self._run(close)
+
+    async def _iter_parallel(self, file_path: str, offset: int, span: int) -> AsyncIterator[bytes]:
+        part_size = self.config.download_part_size
+        parts = deque((start, min(part_size, offset + span - start)) for start in range(offset, offset + span, part_size))
+        loop = asyncio.get_running_loop()
+        pending: deque = deque()
+
+        def _schedule():
+            while parts and len(pending) < self.config.parallel_parts:
+                start, length = parts.popleft()
+                pending.append(loop.run_in_executor(self._executor, self._read_range, file_path, start, length))
+
+        try:
+            _schedule()
+            while pending:
+                data = await pending.popleft()
+                _schedule()
+                view = memoryview(data)
+                for position in range(0, len(data), self.config.chunk_size):
+                    yield bytes(view[position:position + self.config.chunk_size])
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def open_download(self, file_path: str, range_header: Optional[str] = None) -> StorageDownload:
+        """
+        准备流式下载响应
+
+        Raises:
+            RangeNotSatisfiable: Range 超出文件大小（调用方应返回 416）
+        """
+        stat = await self.stat(file_path)
+        size = int(stat["size"])
+        headers = {"Accept-Ranges": "bytes"}
+        requested = parse_range_header(range_header, size)
+        if requested is None:
+            offset, length, status_code = 0, size, 200
+        else:
+            offset, length = requested
+            status_code = 206
+            headers["Content-Range"] = f"bytes {offset}-{offset + length - 1}/{size}"
+        headers["Content-Length"] = str(length)
+        body = self.iter_download(file_path, offset=offset, length=length, size=size)
+        return StorageDownload(body=body, status_code=status_code, size=size, headers=headers, stat=stat)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# 全局实例
+_async_storage_service: Optional[AsyncStorageService] = None
+
+
+def get_async_storage_service() -> AsyncStorageService:
+    """获取异步存储服务实例"""
+    global _async_storage_service
+    if _async_storage_service is None:
+        _async_storage_service = AsyncStorageService()
+    return _async_storage_service
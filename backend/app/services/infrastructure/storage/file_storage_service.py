@@ -5,7 +5,7 @@
 
 import os
 import logging
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Iterator, Optional
 from datetime import datetime
 from io import BytesIO
 import uuid
@@ -443,6 +443,90 @@ class FileStorageService:
             logger.error(f"文件下载失败: {e}")
             raise
     
+    def _local_path(self, file_path: str) -> str:
+        return os.path.join(self.base_path, file_path) if not os.path.isabs(file_path) else file_path
+
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        object_name: str,
+        length: int = -1,
+        content_type: Optional[str] = None,
+        part_size: int = 1024 * 1024,
+        parallel_parts: int = 1
+    ) -> Dict[str, Any]:
+        """
+        按块写入本地文件，写完后原子替换，读取方不会看到半个文件
+
+        本地写入不分片上传，part_size 仅作为每次读写的块大小，parallel_parts 为与对象存储保持接口一致
+        """
+        chunk_size = min(part_size, 1024 * 1024)
+        full_path = self._local_path(object_name)
+        os.makedirs(os.path.dirname(full_path) or ".", exist_ok=True)
+        temp_path = f"{full_path}.{uuid.uuid4().hex}.part"
+        size = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(temp_path, full_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return {
+            "file_path": object_name,
+            "size": size,
+            "content_type": content_type,
+            "uploaded_at": datetime.now().isoformat(),
+            "backend": "local"
+        }
+
+    def stat_file(self, file_path: str) -> Dict[str, Any]:
+        """获取文件元数据"""
+        full_path = self._local_path(file_path)
+        if not os.path.isfile(full_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        stat = os.stat(full_path)
+        return {
+            "file_path": file_path,
+            "size": stat.st_size,
+            "content_type": None,
+            "etag": None,
+            "modified_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            "backend": "local"
+        }
+
+    def iter_file(
+        self,
+        file_path: str,
+        chunk_size: int = 1024 * 1024,
+        offset: int = 0,
+        length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """按块读取文件，offset/length 对应 HTTP Range 读取"""
+        full_path = self._local_path(file_path)
+        if not os.path.isfile(full_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        return self._iter_local(full_path, chunk_size, offset, length)
+
+    @staticmethod
+    def _iter_local(full_path: str, chunk_size: int, offset: int, length: Optional[int]) -> Iterator[bytes]:
+        remaining = length
+        with open(full_path, 'rb') as f:
+            f.seek(offset)
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
     def get_download_url(self, file_path: str, expires: int = 3600) -> str:
         """获取文件下载URL（本地存储返回相对路径）"""
         # 本地存储直接返回API路径
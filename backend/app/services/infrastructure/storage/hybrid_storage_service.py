@@ -6,7 +6,7 @@
 import logging
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Tuple
+from typing import BinaryIO, Dict, Any, Iterator, Optional, List, Tuple
 from io import BytesIO
 
 from app.core.config import settings
@@ -185,6 +185,79 @@ class HybridStorageService:
             normalized_path = self._normalize_path(file_path)
             return self.fallback_service.download_file(normalized_path)
     
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        object_name: str,
+        length: int = -1,
+        content_type: Optional[str] = None,
+        part_size: int = 16 * 1024 * 1024,
+        parallel_parts: int = 1
+    ) -> Dict[str, Any]:
+        """按指定对象键流式上传（MinIO分片上传，失败且流可回退时写入本地）"""
+        storage = self.storage_service
+        try:
+            return storage.upload_stream(
+                stream, object_name, length, content_type,
+                part_size=part_size, parallel_parts=parallel_parts
+            )
+        except Exception as e:
+            if storage is self.fallback_service or not self._rewind(stream):
+                raise
+            logger.warning(f"{self.backend_type}流式上传失败，回退到本地存储: {e}")
+            result = self.fallback_service.upload_stream(stream, object_name, length, content_type)
+            result["backend"] = "local_fallback"
+            return result
+
+    @staticmethod
+    def _rewind(stream: BinaryIO) -> bool:
+        try:
+            stream.seek(0)
+            return True
+        except Exception:
+            return False
+
+    def stat_file(self, file_path: str) -> Dict[str, Any]:
+        """获取文件元数据"""
+        normalized_path = self._normalize_path(file_path)
+        try:
+            return self.storage_service.stat_file(normalized_path)
+        except Exception:
+            return self.fallback_service.stat_file(normalized_path)
+
+    def iter_file(
+        self,
+        file_path: str,
+        chunk_size: int = 1024 * 1024,
+        offset: int = 0,
+        length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        按块读取文件
+
+        预读第一块以便在主存储打开失败时回退到本地存储；开始输出后出现的错误直接抛出
+        """
+        normalized_path = self._normalize_path(file_path)
+        try:
+            chunks = iter(self.storage_service.iter_file(normalized_path, chunk_size, offset, length))
+            first = next(chunks, b"")
+        except Exception as e:
+            logger.warning(f"{self.backend_type}读取失败，使用本地存储: {e}")
+            chunks = iter(self.fallback_service.iter_file(normalized_path, chunk_size, offset, length))
+            first = next(chunks, b"")
+        return self._resume(first, chunks)
+
+    @staticmethod
+    def _resume(first: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        try:
+            if first:
+                yield first
+            yield from chunks
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
     def get_download_url(self, file_path: str, expires: int = 3600) -> str:
         """获取文件下载URL"""
         try:
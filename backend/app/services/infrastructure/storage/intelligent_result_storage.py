@@ -6,18 +6,21 @@ Intelligent Result Storage
 """
 
 import asyncio
+import concurrent.futures
 import gzip
 import json
 import logging
 import pickle
+import queue
 import sqlite3
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, field, asdict
 from enum import Enum
-from contextlib import asynccontextmanager
 import hashlib
 import threading
 
@@ -83,44 +86,52 @@ class StorageResult:
 
 
 class InMemoryStorage:
-    """内存存储管理器"""
+    """内存存储管理器（按写入时记录的字节数做 O(1) LRU 淘汰）"""
     
     def __init__(self, max_memory_mb: int = 500):
         self.max_memory_bytes = max_memory_mb * 1024 * 1024
-        self.storage: Dict[str, Any] = {}
+        # 有序字典：最近访问的在末尾，淘汰时从头部弹出
+        self.storage: "OrderedDict[str, Any]" = OrderedDict()
         self.metadata_cache: Dict[str, StorageMetadata] = {}
-        self.access_times: Dict[str, float] = {}
+        self.sizes: Dict[str, int] = {}
         self.lock = threading.RLock()
         self._current_size = 0
+        self._evictions = 0
     
     def get_current_size(self) -> int:
         """获取当前使用的内存大小"""
         return self._current_size
     
-    def store(self, result_id: str, data: Any, metadata: StorageMetadata) -> bool:
-        """存储到内存"""
+    def store(self, result_id: str, data: Any, metadata: StorageMetadata, size_bytes: Optional[int] = None) -> bool:
+        """
+        存储到内存
+        
+        size_bytes 为数据的字节数（通常是写入时已序列化的大小），未提供时才序列化计算一次
+        """
         try:
+            if size_bytes is None:
+                size_bytes = metadata.size_bytes or len(pickle.dumps(data))
+            
             with self.lock:
-                # 序列化数据以计算大小
-                serialized_data = pickle.dumps(data)
-                data_size = len(serialized_data)
+                # 单个结果超过总容量时直接拒绝，避免为它清空整个缓存
+                if size_bytes > self.max_memory_bytes:
+                    logger.warning(f"结果超过内存容量，无法存储: {result_id}")
+                    return False
                 
-                # 检查是否需要清理内存
-                if self._current_size + data_size > self.max_memory_bytes:
-                    self._evict_lru_items(data_size)
+                # 覆盖写入时先释放旧条目
+                self._discard(result_id)
                 
-                # 如果仍然超过限制，拒绝存储
-                if self._current_size + data_size > self.max_memory_bytes:
-                    logger.warning(f"内存不足，无法存储结果: {result_id}")
-                    return False
+                # 检查是否需要清理内存
+                if self._current_size + size_bytes > self.max_memory_bytes:
+                    self._evict_lru_items(self._current_size + size_bytes - self.max_memory_bytes)
                 
                 # 存储数据
                 self.storage[result_id] = data
                 self.metadata_cache[result_id] = metadata
-                self.access_times[result_id] = time.time()
-                self._current_size += data_size
+                self.sizes[result_id] = size_bytes
+                self._current_size += size_bytes
                 
-                logger.debug(f"结果存储到内存: {result_id}, 大小: {data_size} bytes")
+                logger.debug(f"结果存储到内存: {result_id}, 大小: {size_bytes} bytes")
                 return True
                 
         except Exception as e:
@@ -134,16 +145,14 @@ class InMemoryStorage:
                 if result_id not in self.storage:
                     return None
                 
-                # 更新访问时间和计数
-                self.access_times[result_id] = time.time()
-                if result_id in self.metadata_cache:
-                    self.metadata_cache[result_id].accessed_at = datetime.now()
-                    self.metadata_cache[result_id].access_count += 1
-                
-                data = self.storage[result_id]
+                # 标记为最近使用并更新访问计数
+                self.storage.move_to_end(result_id)
                 metadata = self.metadata_cache.get(result_id)
+                if metadata:
+                    metadata.accessed_at = datetime.now()
+                    metadata.access_count += 1
                 
-                return data, metadata
+                return self.storage[result_id], metadata
                 
         except Exception as e:
             logger.error(f"内存检索失败: {e}")
@@ -153,22 +162,8 @@ class InMemoryStorage:
         """从内存删除"""
         try:
             with self.lock:
-                if result_id not in self.storage:
+                if not self._discard(result_id):
                     return False
-                
-                # 计算释放的大小
-                data = self.storage[result_id]
-                data_size = len(pickle.dumps(data))
-                
-                # 删除数据
-                del self.storage[result_id]
-                if result_id in self.metadata_cache:
-                    del self.metadata_cache[result_id]
-                if result_id in self.access_times:
-                    del self.access_times[result_id]
-                
-                self._current_size -= data_size
-                
                 logger.debug(f"从内存删除结果: {result_id}")
                 return True
                 
@@ -176,29 +171,26 @@ class InMemoryStorage:
             logger.error(f"内存删除失败: {e}")
             return False
     
+    def _discard(self, result_id: str) -> bool:
+        """删除条目并释放记录的大小（调用方持有锁）"""
+        if result_id not in self.storage:
+            return False
+        del self.storage[result_id]
+        self.metadata_cache.pop(result_id, None)
+        self._current_size -= self.sizes.pop(result_id, 0)
+        return True
+    
     def _evict_lru_items(self, needed_size: int):
-        """清理最少使用的项目"""
-        # 按访问时间排序，最旧的在前
-        sorted_items = sorted(self.access_times.items(), key=lambda x: x[1])
-        
+        """从最久未使用的一端淘汰，直到释放 needed_size 字节（调用方持有锁）"""
         freed_size = 0
-        for result_id, _ in sorted_items:
-            if freed_size >= needed_size:
-                break
-                
-            if result_id in self.storage:
-                data = self.storage[result_id]
-                data_size = len(pickle.dumps(data))
-                
-                del self.storage[result_id]
-                if result_id in self.metadata_cache:
-                    del self.metadata_cache[result_id]
-                del self.access_times[result_id]
-                
-                self._current_size -= data_size
-                freed_size += data_size
-                
-                logger.debug(f"LRU清理: {result_id}, 释放: {data_size} bytes")
+        while self.storage and freed_size < needed_size:
+            result_id, _ = self.storage.popitem(last=False)
+            self.metadata_cache.pop(result_id, None)
+            data_size = self.sizes.pop(result_id, 0)
+            self._current_size -= data_size
+            freed_size += data_size
+            self._evictions += 1
+            logger.debug(f"LRU清理: {result_id}, 释放: {data_size} bytes")
     
     def get_stats(self) -> Dict[str, Any]:
         """获取存储统计"""
@@ -208,22 +200,144 @@ class InMemoryStorage:
                 "current_size_bytes": self._current_size,
                 "current_size_mb": self._current_size / 1024 / 1024,
                 "max_size_mb": self.max_memory_bytes / 1024 / 1024,
-                "usage_percentage": (self._current_size / self.max_memory_bytes) * 100
+                "usage_percentage": (self._current_size / self.max_memory_bytes) * 100,
+                "evictions": self._evictions
             }
 
 
+class SQLiteWriter:
+    """
+    SQLite 单写线程
+    
+    所有写操作进入队列，由一个专用线程按批执行：队列中积压的操作合并在同一个事务中提交，
+    每个操作使用独立的 SAVEPOINT，单个操作失败不影响同批其他操作
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, db_path: Path, batch_size: int = 100):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats = {"batches": 0, "operations": 0, "failures": 0}
+        self._thread = threading.Thread(target=self._run, name="result-db-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, operation: Callable[[sqlite3.Connection], Any]) -> "concurrent.futures.Future":
+        """提交写操作，返回在提交完成后才会就绪的 Future"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._queue.put((operation, future))
+        return future
+    
+    def close(self, timeout: float = 5.0):
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats, pending=self._queue.qsize())
+    
+    def _run(self):
+        conn = _open_sqlite_connection(self.db_path)
+        conn.isolation_level = None  # 手动管理事务
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._STOP:
+                    return
+                
+                batch = [item]
+                stop = False
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is self._STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                
+                try:
+                    self._execute_batch(conn, batch)
+                except Exception as e:
+                    # 单批异常不能结束写线程，否则之后的写入会永远等待
+                    logger.error(f"结果数据库写线程处理批次失败: {e}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                if stop:
+                    return
+        finally:
+            conn.close()
+    
+    def _execute_batch(self, conn: sqlite3.Connection, batch: List[Tuple[Callable, "concurrent.futures.Future"]]):
+        # 调用方已取消（仍在排队）的操作不再执行
+        batch = [(operation, future) for operation, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for index, (operation, future) in enumerate(batch):
+                savepoint = f"op_{index}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    outcomes.append((future, operation(conn), None))
+                    conn.execute(f"RELEASE {savepoint}")
+                except Exception as e:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                    outcomes.append((future, None, e))
+                    self._stats["failures"] += 1
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"结果数据库批量写入失败: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            outcomes = [(future, None, e) for _, future in batch]
+        
+        self._stats["batches"] += 1
+        self._stats["operations"] += len(batch)
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def _open_sqlite_connection(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
 class ResultDatabase:
-    """结果数据库管理器"""
+    """结果数据库管理器：单写线程 + 有界读连接池，均不阻塞事件循环"""
     
-    def __init__(self, db_path: str = "intelligent_results.db"):
+    def __init__(self, db_path: str = "intelligent_results.db", reader_pool_size: int = 4, write_batch_size: int = 100):
         self.db_path = Path(db_path)
-        self._connection_pool = {}
-        self._lock = asyncio.Lock()
         self._initialize_database()
+        self._writer = SQLiteWriter(self.db_path, batch_size=write_batch_size)
+        self._reader_local = threading.local()
+        self._reader_connections: List[sqlite3.Connection] = []
+        self._reader_lock = threading.Lock()
+        self._reader_executor = ThreadPoolExecutor(
+            max_workers=max(1, reader_pool_size), thread_name_prefix="result-db-reader"
+        )
     
     def _initialize_database(self):
         """初始化数据库表"""
-        with sqlite3.connect(self.db_path) as conn:
+        conn = _open_sqlite_connection(self.db_path)
+        try:
+            tag_table_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'result_tags'"
+            ).fetchone() is not None
             conn.executescript("""
                 CREATE TABLE IF NOT EXISTS result_metadata (
                     result_id TEXT PRIMARY KEY,
@@ -259,215 +373,309 @@ class ResultDatabase:
                     FOREIGN KEY (result_id) REFERENCES result_metadata (result_id)
                 );
                 
+                CREATE TABLE IF NOT EXISTS result_tags (
+                    tag TEXT NOT NULL,
+                    result_id TEXT NOT NULL,
+                    PRIMARY KEY (tag, result_id)
+                );
+                
                 CREATE INDEX IF NOT EXISTS idx_result_type ON result_metadata (result_type);
                 CREATE INDEX IF NOT EXISTS idx_context_id ON result_metadata (context_id);
                 CREATE INDEX IF NOT EXISTS idx_created_at ON result_metadata (created_at);
                 CREATE INDEX IF NOT EXISTS idx_expires_at ON result_metadata (expires_at);
                 CREATE INDEX IF NOT EXISTS idx_access_count ON result_metadata (access_count);
                 CREATE INDEX IF NOT EXISTS idx_index_key ON result_index (index_key, index_value);
+                CREATE INDEX IF NOT EXISTS idx_index_result_id ON result_index (result_id);
+                CREATE INDEX IF NOT EXISTS idx_tags_result_id ON result_tags (result_id);
             """)
+            if not tag_table_exists:
+                # 从旧的 JSON 标签列回填标签索引
+                rows = conn.execute("SELECT result_id, tags FROM result_metadata WHERE tags IS NOT NULL").fetchall()
+                conn.executemany(
+                    "INSERT OR IGNORE INTO result_tags (tag, result_id) VALUES (?, ?)",
+                    [(tag, row['result_id']) for row in rows for tag in _load_tags(row['tags'])]
+                )
             conn.commit()
+        finally:
+            conn.close()
     
-    @asynccontextmanager
-    async def get_connection(self):
-        """获取数据库连接"""
-        async with self._lock:
-            thread_id = asyncio.current_task()
-            if thread_id not in self._connection_pool:
-                self._connection_pool[thread_id] = sqlite3.connect(self.db_path)
-                self._connection_pool[thread_id].row_factory = sqlite3.Row
-            
-            conn = self._connection_pool[thread_id]
-            try:
-                yield conn
-            finally:
-                conn.commit()
+    # ------------------------------------------------------------------
+    # 执行
+    # ------------------------------------------------------------------
+    async def _write(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """交给写线程执行，提交完成后返回"""
+        return await asyncio.wrap_future(self._writer.submit(operation))
+    
+    async def _read(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """在读线程池中执行，每个读线程持有一个只读连接"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._reader_executor, self._run_read, operation)
+    
+    def _run_read(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        conn = getattr(self._reader_local, "connection", None)
+        if conn is None:
+            conn = _open_sqlite_connection(self.db_path)
+            self._reader_local.connection = conn
+            with self._reader_lock:
+                self._reader_connections.append(conn)
+        return operation(conn)
+    
+    def close(self):
+        """关闭写线程与所有读连接"""
+        self._writer.close()
+        self._reader_executor.shutdown(wait=True)
+        with self._reader_lock:
+            for conn in self._reader_connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._reader_connections.clear()
     
+    # ------------------------------------------------------------------
+    # 写操作
+    # ------------------------------------------------------------------
     async def save_metadata(self, metadata: StorageMetadata, storage_location: Optional[str] = None, is_cached: bool = False):
-        """保存元数据"""
-        async with self.get_connection() as conn:
+        """保存元数据（同时维护标签索引表）"""
+        params = (
+            metadata.result_id,
+            metadata.result_type.value,
+            metadata.context_id,
+            metadata.storage_policy.value,
+            metadata.compression.value,
+            metadata.created_at.isoformat(),
+            metadata.updated_at.isoformat(),
+            metadata.accessed_at.isoformat(),
+            metadata.expires_at.isoformat() if metadata.expires_at else None,
+            metadata.access_count,
+            metadata.size_bytes,
+            metadata.checksum,
+            json.dumps(metadata.tags),
+            metadata.priority,
+            storage_location,
+            is_cached
+        )
+        tags = list(dict.fromkeys(metadata.tags))
+        
+        def _save(conn: sqlite3.Connection):
             conn.execute("""
                 INSERT OR REPLACE INTO result_metadata (
                     result_id, result_type, context_id, storage_policy, compression,
                     created_at, updated_at, accessed_at, expires_at, access_count,
                     size_bytes, checksum, tags, priority, storage_location, is_cached
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                metadata.result_id,
-                metadata.result_type.value,
-                metadata.context_id,
-                metadata.storage_policy.value,
-                metadata.compression.value,
-                metadata.created_at.isoformat(),
-                metadata.updated_at.isoformat(),
-                metadata.accessed_at.isoformat(),
-                metadata.expires_at.isoformat() if metadata.expires_at else None,
-                metadata.access_count,
-                metadata.size_bytes,
-                metadata.checksum,
-                json.dumps(metadata.tags),
-                metadata.priority,
-                storage_location,
-                is_cached
-            ))
-    
-    async def get_metadata(self, result_id: str) -> Optional[StorageMetadata]:
-        """获取元数据"""
-        async with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT * FROM result_metadata WHERE result_id = ?
-            """, (result_id,))
-            
-            row = cursor.fetchone()
-            if not row:
-                return None
-            
-            return StorageMetadata(
-                result_id=row['result_id'],
-                result_type=ResultType(row['result_type']),
-                context_id=row['context_id'],
-                storage_policy=StoragePolicy(row['storage_policy']),
-                compression=CompressionType(row['compression']),
-                created_at=datetime.fromisoformat(row['created_at']),
-                updated_at=datetime.fromisoformat(row['updated_at']),
-                accessed_at=datetime.fromisoformat(row['accessed_at']),
-                expires_at=datetime.fromisoformat(row['expires_at']) if row['expires_at'] else None,
-                access_count=row['access_count'],
-                size_bytes=row['size_bytes'],
-                checksum=row['checksum'] or "",
-                tags=json.loads(row['tags']) if row['tags'] else [],
-                priority=row['priority']
+            """, params)
+            conn.execute("DELETE FROM result_tags WHERE result_id = ?", (metadata.result_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO result_tags (tag, result_id) VALUES (?, ?)",
+                [(tag, metadata.result_id) for tag in tags]
             )
+        
+        await self._write(_save)
     
     async def save_data(self, result_id: str, compressed_data: bytes):
         """保存压缩数据"""
-        async with self.get_connection() as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO result_data (result_id, compressed_data)
-                VALUES (?, ?)
-            """, (result_id, compressed_data))
-    
-    async def get_data(self, result_id: str) -> Optional[bytes]:
-        """获取压缩数据"""
-        async with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT compressed_data FROM result_data WHERE result_id = ?
-            """, (result_id,))
-            
-            row = cursor.fetchone()
-            if row:
-                return row['compressed_data']
-            return None
+        await self._write(lambda conn: conn.execute("""
+            INSERT OR REPLACE INTO result_data (result_id, compressed_data)
+            VALUES (?, ?)
+        """, (result_id, compressed_data)))
     
     async def update_access(self, result_id: str):
         """更新访问信息"""
-        async with self.get_connection() as conn:
-            conn.execute("""
-                UPDATE result_metadata 
-                SET accessed_at = ?, access_count = access_count + 1
-                WHERE result_id = ?
-            """, (datetime.now().isoformat(), result_id))
+        accessed_at = datetime.now().isoformat()
+        await self._write(lambda conn: conn.execute("""
+            UPDATE result_metadata 
+            SET accessed_at = ?, access_count = access_count + 1
+            WHERE result_id = ?
+        """, (accessed_at, result_id)))
     
     async def create_index(self, result_id: str, index_key: str, index_value: str):
         """创建索引"""
-        async with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO result_index (result_id, index_key, index_value, created_at)
-                VALUES (?, ?, ?, ?)
-            """, (result_id, index_key, index_value, datetime.now().isoformat()))
+        await self.create_indexes(result_id, [(index_key, index_value)])
     
-    async def search_by_index(self, index_key: str, index_value: str, limit: int = 50) -> List[str]:
-        """根据索引搜索"""
-        async with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT DISTINCT ri.result_id 
-                FROM result_index ri
-                JOIN result_metadata rm ON ri.result_id = rm.result_id
-                WHERE ri.index_key = ? AND ri.index_value = ?
-                ORDER BY rm.created_at DESC
-                LIMIT ?
-            """, (index_key, index_value, limit))
-            
-            return [row['result_id'] for row in cursor.fetchall()]
+    async def create_indexes(self, result_id: str, entries: List[Tuple[str, str]]):
+        """批量创建索引（一次写入）"""
+        if not entries:
+            return
+        created_at = datetime.now().isoformat()
+        await self._write(lambda conn: conn.executemany("""
+            INSERT INTO result_index (result_id, index_key, index_value, created_at)
+            VALUES (?, ?, ?, ?)
+        """, [(result_id, key, value, created_at) for key, value in entries]))
+    
+    async def delete_result(self, result_id: str) -> Optional[str]:
+        """删除结果的全部记录，返回分布式存储位置（如有）"""
+        def _delete(conn: sqlite3.Connection) -> Optional[str]:
+            row = conn.execute(
+                "SELECT storage_location FROM result_metadata WHERE result_id = ?", (result_id,)
+            ).fetchone()
+            conn.execute("DELETE FROM result_data WHERE result_id = ?", (result_id,))
+            conn.execute("DELETE FROM result_index WHERE result_id = ?", (result_id,))
+            conn.execute("DELETE FROM result_tags WHERE result_id = ?", (result_id,))
+            conn.execute("DELETE FROM result_metadata WHERE result_id = ?", (result_id,))
+            return row['storage_location'] if row else None
+        
+        return await self._write(_delete)
     
     async def cleanup_expired(self) -> int:
         """清理过期结果"""
         now = datetime.now().isoformat()
         
-        async with self.get_connection() as conn:
-            cursor = conn.execute("""
-                DELETE FROM result_data 
-                WHERE result_id IN (
-                    SELECT result_id FROM result_metadata 
-                    WHERE expires_at IS NOT NULL AND expires_at < ?
-                )
-            """, (now,))
-            
-            deleted_data = cursor.rowcount
-            
-            cursor = conn.execute("""
-                DELETE FROM result_index 
-                WHERE result_id IN (
-                    SELECT result_id FROM result_metadata 
-                    WHERE expires_at IS NOT NULL AND expires_at < ?
-                )
-            """, (now,))
-            
+        def _cleanup(conn: sqlite3.Connection) -> int:
+            expired = "SELECT result_id FROM result_metadata WHERE expires_at IS NOT NULL AND expires_at < ?"
+            conn.execute(f"DELETE FROM result_data WHERE result_id IN ({expired})", (now,))
+            conn.execute(f"DELETE FROM result_index WHERE result_id IN ({expired})", (now,))
+            conn.execute(f"DELETE FROM result_tags WHERE result_id IN ({expired})", (now,))
             cursor = conn.execute("""
                 DELETE FROM result_metadata 
                 WHERE expires_at IS NOT NULL AND expires_at < ?
             """, (now,))
-            
-            deleted_metadata = cursor.rowcount
-            
-            return deleted_metadata
+            return cursor.rowcount
+        
+        return await self._write(_cleanup)
+    
+    # ------------------------------------------------------------------
+    # 读操作
+    # ------------------------------------------------------------------
+    async def get_metadata(self, result_id: str) -> Optional[StorageMetadata]:
+        """获取元数据"""
+        row = await self._read(lambda conn: conn.execute("""
+            SELECT * FROM result_metadata WHERE result_id = ?
+        """, (result_id,)).fetchone())
+        
+        if not row:
+            return None
+        
+        return StorageMetadata(
+            result_id=row['result_id'],
+            result_type=ResultType(row['result_type']),
+            context_id=row['context_id'],
+            storage_policy=StoragePolicy(row['storage_policy']),
+            compression=CompressionType(row['compression']),
+            created_at=datetime.fromisoformat(row['created_at']),
+            updated_at=datetime.fromisoformat(row['updated_at']),
+            accessed_at=datetime.fromisoformat(row['accessed_at']),
+            expires_at=datetime.fromisoformat(row['expires_at']) if row['expires_at'] else None,
+            access_count=row['access_count'],
+            size_bytes=row['size_bytes'],
+            checksum=row['checksum'] or "",
+            tags=_load_tags(row['tags']),
+            priority=row['priority']
+        )
+    
+    async def get_storage_location(self, result_id: str) -> Optional[str]:
+        """获取分布式存储位置"""
+        row = await self._read(lambda conn: conn.execute(
+            "SELECT storage_location FROM result_metadata WHERE result_id = ?", (result_id,)
+        ).fetchone())
+        return row['storage_location'] if row else None
+    
+    async def get_data(self, result_id: str) -> Optional[bytes]:
+        """获取压缩数据"""
+        row = await self._read(lambda conn: conn.execute("""
+            SELECT compressed_data FROM result_data WHERE result_id = ?
+        """, (result_id,)).fetchone())
+        return row['compressed_data'] if row else None
+    
+    async def search_by_index(self, index_key: str, index_value: str, limit: int = 50) -> List[str]:
+        """根据索引搜索"""
+        rows = await self._read(lambda conn: conn.execute("""
+            SELECT DISTINCT ri.result_id 
+            FROM result_index ri
+            JOIN result_metadata rm ON ri.result_id = rm.result_id
+            WHERE ri.index_key = ? AND ri.index_value = ?
+            ORDER BY rm.created_at DESC
+            LIMIT ?
+        """, (index_key, index_value, limit)).fetchall())
+        return [row['result_id'] for row in rows]
+    
+    async def search_result_ids(
+        self,
+        result_type: Optional[ResultType] = None,
+        context_id: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        result_ids: Optional[List[str]] = None,
+        limit: int = 50
+    ) -> List[str]:
+        """按元数据条件搜索结果ID，标签通过 result_tags 索引表匹配（任一标签命中即可）"""
+        conditions = []
+        params: List[Any] = []
+        
+        if result_type:
+            conditions.append("result_type = ?")
+            params.append(result_type.value)
+        
+        if context_id:
+            conditions.append("context_id = ?")
+            params.append(context_id)
+        
+        if tags:
+            tag_placeholders = ",".join("?" for _ in tags)
+            conditions.append(f"result_id IN (SELECT result_id FROM result_tags WHERE tag IN ({tag_placeholders}))")
+            params.extend(tags)
+        
+        if result_ids:
+            id_placeholders = ",".join("?" for _ in result_ids)
+            conditions.append(f"result_id IN ({id_placeholders})")
+            params.extend(result_ids)
+        
+        where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+        params.append(limit)
+        
+        rows = await self._read(lambda conn: conn.execute(f"""
+            SELECT result_id FROM result_metadata {where_clause}
+            ORDER BY priority DESC, created_at DESC
+            LIMIT ?
+        """, params).fetchall())
+        return [row['result_id'] for row in rows]
     
     async def get_statistics(self) -> Dict[str, Any]:
         """获取数据库统计"""
-        async with self.get_connection() as conn:
-            cursor = conn.execute("""
+        now = datetime.now().isoformat()
+        
+        def _statistics(conn: sqlite3.Connection):
+            type_rows = conn.execute("""
+                SELECT result_type, COUNT(*) as type_count
+                FROM result_metadata
+                GROUP BY result_type
+            """).fetchall()
+            totals = conn.execute("""
                 SELECT 
                     COUNT(*) as total_results,
                     SUM(size_bytes) as total_size_bytes,
-                    AVG(access_count) as avg_access_count,
-                    result_type,
-                    COUNT(*) as type_count
+                    AVG(access_count) as avg_access_count
                 FROM result_metadata
-                GROUP BY result_type
-            """)
-            
-            type_stats = {}
-            total_results = 0
-            total_size = 0
-            total_access = 0
-            
-            for row in cursor.fetchall():
-                if row['result_type']:
-                    type_stats[row['result_type']] = row['type_count']
-                if row['total_results']:
-                    total_results = row['total_results']
-                if row['total_size_bytes']:
-                    total_size = row['total_size_bytes']
-                if row['avg_access_count']:
-                    total_access = row['avg_access_count']
-            
-            # 获取过期统计
-            cursor = conn.execute("""
+            """).fetchone()
+            expired = conn.execute("""
                 SELECT COUNT(*) as expired_count
                 FROM result_metadata 
                 WHERE expires_at IS NOT NULL AND expires_at < ?
-            """, (datetime.now().isoformat(),))
-            
-            expired_count = cursor.fetchone()['expired_count']
-            
-            return {
-                "total_results": total_results,
-                "total_size_bytes": total_size,
-                "total_size_mb": total_size / 1024 / 1024 if total_size else 0,
-                "average_access_count": total_access,
-                "type_distribution": type_stats,
-                "expired_count": expired_count
-            }
+            """, (now,)).fetchone()
+            return type_rows, totals, expired
+        
+        type_rows, totals, expired = await self._read(_statistics)
+        total_size = totals['total_size_bytes'] or 0
+        
+        return {
+            "total_results": totals['total_results'] or 0,
+            "total_size_bytes": total_size,
+            "total_size_mb": total_size / 1024 / 1024 if total_size else 0,
+            "average_access_count": totals['avg_access_count'] or 0,
+            "type_distribution": {row['result_type']: row['type_count'] for row in type_rows if row['result_type']},
+            "expired_count": expired['expired_count'],
+            "writer": self._writer.get_stats()
+        }
+
+
+def _load_tags(raw: Optional[str]) -> List[str]:
+    """解析 JSON 标签列"""
+    if not raw:
+        return []
+    try:
+        tags = json.loads(raw)
+        return [str(tag) for tag in tags] if isinstance(tags, list) else []
+    except (TypeError, ValueError):
+        return []
 
 
 class IntelligentResultStorage:
@@ -568,7 +776,8 @@ class IntelligentResultStorage:
             elif storage_policy == StoragePolicy.DISTRIBUTED:
                 # 分布式存储（使用文件存储服务）
                 from io import BytesIO
-                storage_result = file_storage_service.upload_file(
+                storage_result = await asyncio.to_thread(
+                    file_storage_service.upload_file,
                     file_data=BytesIO(compressed_data),
                     original_filename=f"{result_id}.dat",
                     file_type="intelligent_results",
@@ -629,15 +838,10 @@ class IntelligentResultStorage:
                 # 根据存储策略从不同位置获取
                 if metadata.storage_policy == StoragePolicy.DISTRIBUTED:
                     # 从分布式存储获取
-                    async with self.database.get_connection() as conn:
-                        cursor = conn.execute("""
-                            SELECT storage_location FROM result_metadata WHERE result_id = ?
-                        """, (result_id,))
-                        row = cursor.fetchone()
-                        
-                        if row and row['storage_location']:
-                            file_data, _ = file_storage_service.download_file(row['storage_location'])
-                            data = await self._decompress_data(file_data, metadata.compression)
+                    storage_location = await self.database.get_storage_location(result_id)
+                    if storage_location:
+                        file_data, _ = await asyncio.to_thread(file_storage_service.download_file, storage_location)
+                        data = await self._decompress_data(file_data, metadata.compression)
                 
                 else:
                     # 从数据库获取
@@ -675,21 +879,10 @@ class IntelligentResultStorage:
             self.memory_storage.remove(result_id)
             
             # 从数据库删除
-            async with self.database.get_connection() as conn:
-                # 获取存储位置信息
-                cursor = conn.execute("""
-                    SELECT storage_location FROM result_metadata WHERE result_id = ?
-                """, (result_id,))
-                row = cursor.fetchone()
-                
-                if row and row['storage_location']:
-                    # 删除分布式存储文件
-                    file_storage_service.delete_file(row['storage_location'])
-                
-                # 删除数据库记录
-                conn.execute("DELETE FROM result_data WHERE result_id = ?", (result_id,))
-                conn.execute("DELETE FROM result_index WHERE result_id = ?", (result_id,))
-                conn.execute("DELETE FROM result_metadata WHERE result_id = ?", (result_id,))
+            storage_location = await self.database.delete_result(result_id)
+            if storage_location:
+                # 删除分布式存储文件
+                await asyncio.to_thread(file_storage_service.delete_file, storage_location)
             
             return True
             
@@ -730,51 +923,14 @@ class IntelligentResultStorage:
                     else:
                         result_ids = set(ids)
             
-            # 基于元数据搜索
-            async with self.database.get_connection() as conn:
-                conditions = []
-                params = []
-                
-                if result_type:
-                    conditions.append("result_type = ?")
-                    params.append(result_type.value)
-                
-                if context_id:
-                    conditions.append("context_id = ?")
-                    params.append(context_id)
-                
-                if tags:
-                    # 简单的标签匹配
-                    tag_conditions = []
-                    for tag in tags:
-                        tag_conditions.append("tags LIKE ?")
-                        params.append(f'%"{tag}"%')
-                    
-                    if tag_conditions:
-                        conditions.append(f"({' OR '.join(tag_conditions)})")
-                
-                where_clause = ""
-                if conditions:
-                    where_clause = "WHERE " + " AND ".join(conditions)
-                
-                # 如果有索引过滤结果，限制搜索范围
-                if result_ids:
-                    id_placeholders = ",".join("?" for _ in result_ids)
-                    if where_clause:
-                        where_clause += f" AND result_id IN ({id_placeholders})"
-                    else:
-                        where_clause = f"WHERE result_id IN ({id_placeholders})"
-                    params.extend(list(result_ids))
-                
-                params.append(limit)
-                
-                cursor = conn.execute(f"""
-                    SELECT result_id FROM result_metadata {where_clause}
-                    ORDER BY priority DESC, created_at DESC
-                    LIMIT ?
-                """, params)
-                
-                found_ids = [row['result_id'] for row in cursor.fetchall()]
+            # 基于元数据搜索（标签走 result_tags 索引表）
+            found_ids = await self.database.search_result_ids(
+                result_type=result_type,
+                context_id=context_id,
+                tags=tags,
+                result_ids=list(result_ids) if result_ids else None,
+                limit=limit
+            )
             
             # 检索结果数据
             results = []
@@ -810,19 +966,23 @@ class IntelligentResultStorage:
         """创建智能索引"""
         try:
             # 基于结果类型创建索引
-            await self.database.create_index(result_id, "result_type", metadata.result_type.value)
-            await self.database.create_index(result_id, "context_id", metadata.context_id)
+            entries = [
+                ("result_type", metadata.result_type.value),
+                ("context_id", metadata.context_id),
+            ]
             
             # 基于标签创建索引
-            for tag in metadata.tags:
-                await self.database.create_index(result_id, "tag", tag)
+            entries.extend(("tag", tag) for tag in metadata.tags)
             
             # 基于数据内容创建索引
             if isinstance(data, dict):
                 # 为字典类型数据的关键字段创建索引
                 for key, value in data.items():
                     if isinstance(value, (str, int, float)) and len(str(value)) < 100:
-                        await self.database.create_index(result_id, f"data.{key}", str(value))
+                        entries.append((f"data.{key}", str(value)))
+            
+            # 一次写入全部索引
+            await self.database.create_indexes(result_id, entries)
                         
         except Exception as e:
             logger.warning(f"创建索引失败: {e}")
@@ -889,9 +1049,10 @@ class IntelligentResultStorage:
             expired_memory_items = []
             current_time = datetime.now()
             
-            for result_id, metadata in self.memory_storage.metadata_cache.items():
-                if metadata.expires_at and current_time > metadata.expires_at:
-                    expired_memory_items.append(result_id)
+            with self.memory_storage.lock:
+                for result_id, metadata in self.memory_storage.metadata_cache.items():
+                    if metadata.expires_at and current_time > metadata.expires_at:
+                        expired_memory_items.append(result_id)
             
             for result_id in expired_memory_items:
                 self.memory_storage.remove(result_id)
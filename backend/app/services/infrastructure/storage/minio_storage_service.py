@@ -7,7 +7,7 @@ import os
 import logging
 import uuid
 from io import BytesIO
-from typing import Dict, Any, Optional, List, Tuple
+from typing import BinaryIO, Dict, Any, Iterator, Optional, List, Tuple
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -21,6 +21,19 @@ except ImportError:
     MINIO_AVAILABLE = False
 
 
+class _CountingReader:
+    """统计已读取字节数的只读包装（长度未知的流式上传用）"""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
 class MinIOStorageService:
     """MinIO 对象存储服务"""
     
@@ -146,6 +159,69 @@ class MinIOStorageService:
             logger.error(f"upload_with_key failed: {e}")
             raise
     
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        object_name: str,
+        length: int = -1,
+        content_type: Optional[str] = None,
+        part_size: int = 16 * 1024 * 1024,
+        parallel_parts: int = 1
+    ) -> Dict[str, Any]:
+        """
+        流式上传，不在内存中拼装整个文件
+
+        长度未知（-1）或超过 part_size 时由客户端按分片上传，parallel_parts 个分片并行传输
+        """
+        counter = _CountingReader(stream)
+        result = self.client.put_object(
+            bucket_name=self.bucket_name,
+            object_name=object_name,
+            data=counter,
+            length=length,
+            content_type=content_type or 'application/octet-stream',
+            part_size=part_size,
+            num_parallel_uploads=max(1, parallel_parts)
+        )
+        logger.info(f"File streamed to MinIO: {object_name} ({counter.bytes_read} bytes)")
+        return {
+            "file_path": object_name,
+            "size": counter.bytes_read if length < 0 else length,
+            "etag": getattr(result, "etag", None),
+            "uploaded_at": datetime.now().isoformat(),
+            "backend": "minio"
+        }
+
+    def stat_file(self, object_name: str) -> Dict[str, Any]:
+        """获取对象元数据"""
+        stat = self.client.stat_object(self.bucket_name, object_name)
+        return {
+            "file_path": object_name,
+            "size": stat.size,
+            "content_type": stat.content_type,
+            "etag": stat.etag,
+            "modified_at": stat.last_modified.isoformat() if stat.last_modified else None,
+            "backend": "minio"
+        }
+
+    def iter_file(
+        self,
+        object_name: str,
+        chunk_size: int = 1024 * 1024,
+        offset: int = 0,
+        length: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """按块读取对象，offset/length 对应 HTTP Range 读取"""
+        response = self.client.get_object(
+            self.bucket_name, object_name, offset=offset, length=length or 0
+        )
+        try:
+            for chunk in response.stream(chunk_size):
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
     def file_exists(self, object_name: str) -> bool:
         """检查文件是否存在"""
         try:
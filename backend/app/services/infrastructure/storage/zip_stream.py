@@ -0,0 +1,154 @@
+"""
+流式ZIP打包
+
+边获取边写入：有界并发地从存储获取文件，每个文件到达后立即压缩写入并把产生的字节交给调用方，
+不在内存中拼装整个压缩包。同时在内存中的文件数量不超过并发上限。
+
+- 输出流不可回退，zipfile 自动为每个条目写入数据描述符
+- 压缩与同步存储读取在线程中执行，不阻塞事件循环
+- 已压缩格式（docx/xlsx/pdf/图片等）直接存储，不再重复压缩
+"""
+
+import asyncio
+import io
+import logging
+import os
+import zipfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 本身已压缩的扩展名，再次 deflate 只消耗CPU
+_PRECOMPRESSED_EXTENSIONS = {
+    ".docx", ".xlsx", ".pptx", ".zip", ".gz", ".pdf", ".png", ".jpg", ".jpeg", ".gif", ".webp",
+}
+
+
+@dataclass
+class ZipStreamEntry:
+    """待打包的条目：path 从存储获取，或直接提供 data"""
+    name: str
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+    meta: Any = None
+
+
+@dataclass
+class ZipStreamFailure:
+    """获取失败的条目"""
+    entry: ZipStreamEntry
+    error: Exception
+
+
+# 打包结束时追加的条目（如清单文件）：(已写入条目, 失败条目) -> [(压缩包内路径, 数据)]
+TrailerBuilder = Callable[[List[ZipStreamEntry], List[ZipStreamFailure]], List[Tuple[str, bytes]]]
+
+
+class _ChunkSink(io.RawIOBase):
+    """只追加的输出流，zipfile 写入的字节暂存后由生成器取走"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_name(name: str, used: Set[str]) -> str:
+    if name not in used:
+        used.add(name)
+        return name
+    stem, ext = os.path.splitext(name)
+    index = 2
+    while f"{stem}_{index}{ext}" in used:
+        index += 1
+    unique = f"{stem}_{index}{ext}"
+    used.add(unique)
+    return unique
+
+
+def _write_entry(archive: zipfile.ZipFile, name: str, data: bytes):
+    compression = (
+        zipfile.ZIP_STORED
+        if os.path.splitext(name)[1].lower() in _PRECOMPRESSED_EXTENSIONS
+        else zipfile.ZIP_DEFLATED
+    )
+    archive.writestr(name, data, compress_type=compression)
+
+
+async def stream_zip(
+    entries: Iterable[ZipStreamEntry],
+    fetch: Callable[[str], bytes],
+    concurrency: int = 8,
+    trailer: Optional[TrailerBuilder] = None,
+) -> AsyncIterator[bytes]:
+    """
+    生成ZIP字节流
+
+    Args:
+        entries: 待打包条目，按到达顺序写入
+        fetch: 同步读取函数，参数为条目的 path，在线程中执行
+        concurrency: 同时获取/驻留内存的文件数上限
+        trailer: 所有条目写完后追加的文件（如清单）
+    """
+    entries = list(entries)
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    ready: asyncio.Queue = asyncio.Queue()
+
+    async def _load(entry: ZipStreamEntry):
+        # 名额在条目写入压缩包后才释放，保证驻留内存的文件数有界
+        await slots.acquire()
+        try:
+            data = entry.data if entry.data is not None else await asyncio.to_thread(fetch, entry.path)
+            await ready.put((entry, data, None))
+        except Exception as e:
+            await ready.put((entry, None, e))
+
+    loaders = [asyncio.ensure_future(_load(entry)) for entry in entries]
+    written: List[ZipStreamEntry] = []
+    failed: List[ZipStreamFailure] = []
+    used_names: Set[str] = set()
+    try:
+        for _ in range(len(entries)):
+            entry, data, error = await ready.get()
+            try:
+                if error is not None:
+                    logger.error(f"打包文件获取失败: {entry.path or entry.name}, error={error}")
+                    failed.append(ZipStreamFailure(entry, error))
+                    continue
+                entry.name = _unique_name(entry.name, used_names)
+                await asyncio.to_thread(_write_entry, archive, entry.name, data)
+                entry.data = None
+                written.append(entry)
+            finally:
+                slots.release()
+            del data
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+        for name, data in (trailer(written, failed) if trailer else []):
+            archive.writestr(_unique_name(name, used_names), data)
+        archive.close()
+        yield sink.drain()
+    finally:
+        # 客户端中途断开时取消尚未完成的获取
+        for loader in loaders:
+            loader.cancel()
@@ -0,0 +1,130 @@
+"""
+Celery worker 常驻异步运行时
+
+每个 worker 进程维护一个在后台线程中常驻的事件循环，同步任务代码通过线程安全的
+submit/run 接口把协程提交到该循环执行：
+- 绑定在事件循环上的资源（aiohttp 会话、异步连接池、Redis 连接等）在多次调用、多个任务间复用
+- 进程 fork 后自动在子进程中重建（事件循环线程不会随 fork 继承）
+- 在 worker_process_init 时预先启动，在 worker_process_shutdown 时关闭
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerAsyncRuntime:
+    """后台线程中常驻的事件循环"""
+
+    def __init__(self, name: str = "celery-async-runtime"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.start()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """启动（或在 fork 后重建）事件循环线程"""
+        with self._lock:
+            if (
+                self._loop is not None
+                and self._pid == os.getpid()
+                and self._thread.is_alive()
+            ):
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def _run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            thread.start()
+            started.wait()
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            logger.info(f"✅ 异步运行时已启动: pid={self._pid}")
+            return loop
+
+    def in_loop_thread(self) -> bool:
+        """当前是否运行在运行时的事件循环线程中"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """线程安全地提交协程，立即返回 Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """提交协程并阻塞等待结果；调用方被中断（超时、软时间限制等）时取消协程"""
+        if self.in_loop_thread():
+            # 在运行时线程内同步等待会死锁，改为在独立线程的临时事件循环中执行
+            return _run_in_new_thread(coro)
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """取消未完成的协程并停止事件循环"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = self._pid = None
+        if loop is None or not thread.is_alive():
+            return
+
+        async def _cancel_pending() -> None:
+            current = asyncio.current_task()
+            pending = [task for task in asyncio.all_tasks() if task is not current]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await loop.shutdown_asyncgens()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_cancel_pending(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"异步运行时关闭时清理任务失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+        logger.info("异步运行时已关闭")
+
+
+def _run_in_new_thread(coro: Awaitable[Any]) -> Any:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+_worker_runtime = WorkerAsyncRuntime()
+
+
+def get_worker_async_runtime() -> WorkerAsyncRuntime:
+    """获取当前进程的常驻异步运行时"""
+    return _worker_runtime
+
+
+def run_in_worker_loop(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """在常驻事件循环中执行协程并返回结果（同步调用）"""
+    return _worker_runtime.run(coro, timeout)
+
+
+__all__ = [
+    "WorkerAsyncRuntime",
+    "get_worker_async_runtime",
+    "run_in_worker_loop",
+]
@@ -7,7 +7,14 @@ Infrastructure层 - Celery配置
 
 import logging
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 from app.core.config import settings
+from app.services.infrastructure.task_queue.async_runtime import get_worker_async_runtime
+from app.services.infrastructure.notification.smtp_pool import close_smtp_mailers
+from app.services.infrastructure.visualization.chart_render_pool import (
+    start_chart_render_service,
+    stop_chart_render_service,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +98,32 @@ try:
 except ImportError as e:
     logger.warning(f"⚠️ Failed to import workflow tasks: {e}")
 
+# 图表渲染服务在主进程 fork worker 子进程之前启动，守护子进程通过它使用渲染进程池
+@worker_init.connect
+def start_chart_render_service_before_fork(**kwargs):
+    try:
+        start_chart_render_service()
+    except Exception as e:
+        logger.warning(f"⚠️ 图表渲染服务启动失败，worker 将在进程内渲染图表: {e}")
+
+
+@worker_shutdown.connect
+def stop_chart_render_service_on_shutdown(**kwargs):
+    stop_chart_render_service()
+
+
+# 每个worker进程一个常驻事件循环：fork之后启动，进程退出前关闭
+@worker_process_init.connect
+def start_worker_async_runtime(**kwargs):
+    get_worker_async_runtime().start()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_async_runtime(**kwargs):
+    get_worker_async_runtime().shutdown()
+    close_smtp_mailers()
+
+
 # 健康检查任务
 @celery_app.task(name='infrastructure.health.ping')
 def health_ping():
@@ -233,7 +233,8 @@ def batch_analyze_placeholders_task(
     """
     批量占位符分析 Celery 任务
     
-    并行处理多个占位符的分析
+    在共享并发预算内并行分析多个占位符，每完成一个即更新任务进度；
+    传入上次失败的占位符子集即可只重跑失败部分
     
     Args:
         template_id: 模板ID
@@ -292,94 +293,79 @@ def batch_analyze_placeholders_task(
             }
         )
         
-        # 导入编排服务
+        # 导入编排服务与批量分析引擎
         from app.api.endpoints.placeholders import PlaceholderOrchestrationService
+        from app.services.application.placeholder.batch_analysis_engine import BatchPlaceholderAnalysisEngine
         
-        # 创建编排服务实例
+        # 创建编排服务实例（模板内容、Schema 与 Agent 运行时整批只构建一次）
         orchestration_service = PlaceholderOrchestrationService()
+        engine = BatchPlaceholderAnalysisEngine(orchestration_service)
+        
+        common_params = {
+            'template_context': template_context,
+            'time_window': time_window,
+            'time_column': time_column,
+            'data_range': data_range,
+            'requirements': requirements,
+            'execute_sql': execute_sql,
+            'row_limit': row_limit,
+            'time_placeholders': time_placeholder_result.get('time_placeholders', {}),
+            'time_context': time_placeholder_result.get('time_context', {}),
+            **kwargs
+        }
         
         # 存储所有分析结果
         results = []
         success_count = 0
         failed_count = 0
         
-        # 逐个处理占位符
-        for idx, placeholder_spec in enumerate(placeholder_specs):
-            try:
-                placeholder_name = placeholder_spec.get('name', f'placeholder_{idx}')
-                placeholder_text = placeholder_spec.get('text', '')
-                
-                # 更新进度
-                progress = 10 + int(80 * idx / total_placeholders)
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
-                        'current_step': f'分析占位符: {placeholder_name}',
-                        'progress': progress,
-                        'total_placeholders': total_placeholders,
-                        'processed': idx,
-                        'current_placeholder': placeholder_name
-                    }
-                )
-                
-                # 构建分析参数
-                analysis_params = {
-                    'placeholder_name': placeholder_name,
-                    'placeholder_text': placeholder_text,
-                    'template_id': template_id,
-                    'data_source_id': data_source_id,
-                    'user_id': user_id,
-                    'template_context': template_context,
-                    'time_window': time_window,
-                    'time_column': time_column,
-                    'data_range': data_range,
-                    'requirements': requirements,
-                    'execute_sql': execute_sql,
-                    'row_limit': row_limit,
-                    'time_placeholders': time_placeholder_result.get('time_placeholders', {}),
-                    'time_context': time_placeholder_result.get('time_context', {}),
-                    **kwargs
-                }
-                
-                # 执行异步分析
-                async def run_single_analysis():
-                    return await orchestration_service.analyze_placeholder_with_full_pipeline(**analysis_params)
-                
-                result = run_async(run_single_analysis())
-                
-                # 记录结果
+        # 并发分析，每完成一个占位符就更新一次进度
+        async def run_batch_analysis():
+            nonlocal success_count, failed_count
+            async for item in engine.stream(
+                placeholder_specs,
+                template_id=template_id,
+                data_source_id=data_source_id,
+                user_id=user_id,
+                **common_params
+            ):
+                placeholder_name = item['placeholder_name']
+                result = item['result']
                 placeholder_result = {
                     'placeholder_name': placeholder_name,
-                    'placeholder_text': placeholder_text,
+                    'placeholder_text': item['placeholder_text'],
                     'analysis_result': result,
-                    'success': result.get('status') == 'success',
-                    'processed_at': datetime.now().isoformat()
+                    'success': item['success'],
+                    'attempts': item['attempts'],
+                    'processed_at': item['processed_at']
                 }
+                if result.get('error'):
+                    placeholder_result['error'] = result.get('error')
+                results.append((item['index'], placeholder_result))
                 
-                results.append(placeholder_result)
-                
-                if result.get('status') == 'success':
+                if item['success']:
                     success_count += 1
-                    logger.info(f"✅ 占位符分析成功: {placeholder_name} ({idx + 1}/{total_placeholders})")
+                    logger.info(f"✅ 占位符分析成功: {placeholder_name} ({len(results)}/{total_placeholders})")
                 else:
                     failed_count += 1
-                    logger.warning(f"⚠️ 占位符分析失败: {placeholder_name} ({idx + 1}/{total_placeholders})")
-                
-            except Exception as e:
-                failed_count += 1
-                error_message = str(e)
-                logger.error(f"❌ 占位符分析异常: {placeholder_spec.get('name', f'placeholder_{idx}')}, 错误: {error_message}")
+                    logger.warning(f"⚠️ 占位符分析失败: {placeholder_name} ({len(results)}/{total_placeholders})")
                 
-                # 记录失败结果
-                placeholder_result = {
-                    'placeholder_name': placeholder_spec.get('name', f'placeholder_{idx}'),
-                    'placeholder_text': placeholder_spec.get('text', ''),
-                    'analysis_result': {'status': 'error', 'error': error_message},
-                    'success': False,
-                    'processed_at': datetime.now().isoformat(),
-                    'error': error_message
-                }
-                results.append(placeholder_result)
+                self.update_state(
+                    state='PROGRESS',
+                    meta={
+                        'current_step': f'已完成占位符: {placeholder_name}',
+                        'progress': 10 + int(80 * len(results) / total_placeholders),
+                        'total_placeholders': total_placeholders,
+                        'processed': len(results),
+                        'success_count': success_count,
+                        'failed_count': failed_count,
+                        'last_result': placeholder_result
+                    }
+                )
+        
+        run_async(run_batch_analysis())
+        # 结果按输入顺序返回
+        results = [placeholder_result for _, placeholder_result in sorted(results, key=lambda pair: pair[0])]
         
         # 构建最终结果
         batch_result = {
@@ -2,21 +2,31 @@
 统一任务进度记录与通知工具
 
 负责：
-- 将进度事件写入 TaskExecution.progress_details
-- 更新进度百分比与当前步骤
-- 通过 WebSocket 流水线通知服务推送实时进度
+- 进度事件先写入内存缓冲区，按数量/时间批量刷新（write-behind）：
+  一次刷新只改写一次 TaskExecution.progress_details 并同时更新进度百分比与当前步骤
+- 进度写入使用独立的短会话提交，不会提交或回滚任务主流程的事务
+- 每个事件追加写入 Redis Stream（task_progress:{execution_id}），保留完整事件历史
+- 取消检测读取 Redis 取消标记，Redis 不可用时按间隔只查询执行状态列
+- WebSocket 通知统一投递到 worker 进程的常驻事件循环，同步代码中不再为每条通知创建事件循环
 """
 
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.infrastructure.task_queue.async_runtime import get_worker_async_runtime
 from app.services.infrastructure.websocket.pipeline_notifications import (
     PipelineTaskStatus,
     PipelineTaskType,
@@ -28,29 +38,118 @@ from app.services.infrastructure.websocket.pipeline_notifications import (
 
 logger = logging.getLogger(__name__)
 
+PROGRESS_STREAM_PREFIX = "task_progress"
+CANCEL_FLAG_PREFIX = "task_cancel"
+CANCEL_FLAG_TTL = 86400
+
+
+@dataclass
+class ProgressRecorderConfig:
+    """进度记录配置"""
+    # 距上次刷新超过该秒数时写入数据库
+    flush_interval: float = 2.0
+    # 缓冲事件达到该数量时写入数据库
+    flush_batch_size: int = 20
+    # progress_details 中保留的最近事件数
+    max_events: int = 200
+    # Redis Stream 保留的事件数（近似裁剪）
+    stream_maxlen: int = 2000
+    # Redis 不可用时，查询数据库取消状态的最小间隔（秒）
+    cancel_check_interval: float = 5.0
+
+    @classmethod
+    def from_settings(cls) -> "ProgressRecorderConfig":
+        """从全局配置创建"""
+        return cls(
+            flush_interval=settings.TASK_PROGRESS_FLUSH_INTERVAL,
+            flush_batch_size=settings.TASK_PROGRESS_FLUSH_BATCH_SIZE,
+            stream_maxlen=settings.TASK_PROGRESS_STREAM_MAXLEN,
+            cancel_check_interval=settings.TASK_CANCEL_DB_CHECK_INTERVAL,
+        )
+
+
+def _log_notification_error(future) -> None:
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.warning(f"进度通知发送失败: {error}")
+
 
 def _dispatch_async(coro):
     """在同步或异步环境中安全调度协程执行。"""
     try:
         loop = asyncio.get_running_loop()
     except RuntimeError:
-        asyncio.run(coro)
+        get_worker_async_runtime().submit(coro).add_done_callback(_log_notification_error)
     else:
         loop.create_task(coro)
 
 
+# ----------------------------------------------------------------------
+# Redis 标记与事件流
+# ----------------------------------------------------------------------
+def _default_redis_client():
+    try:
+        from app.services.infrastructure.cache.redis_cache_service import cache_service
+        return cache_service.client if cache_service.enabled else None
+    except Exception:
+        return None
+
+
+def progress_stream_key(execution_id: str) -> str:
+    return f"{PROGRESS_STREAM_PREFIX}:{execution_id}"
+
+
+def cancel_flag_key(execution_id: str) -> str:
+    return f"{CANCEL_FLAG_PREFIX}:{execution_id}"
+
+
+def request_cancellation(execution_id: str, redis_client=None) -> bool:
+    """设置执行的取消标记（执行中的任务在下一次进度更新时检测到）"""
+    client = redis_client or _default_redis_client()
+    if client is None:
+        return False
+    try:
+        client.set(cancel_flag_key(str(execution_id)), "1", ex=CANCEL_FLAG_TTL)
+        return True
+    except Exception as e:
+        logger.warning(f"设置任务取消标记失败: {e}")
+        return False
+
+
+def read_progress_events(execution_id: str, count: Optional[int] = None, redis_client=None) -> List[Dict[str, Any]]:
+    """读取执行的完整进度事件流（按时间顺序）"""
+    client = redis_client or _default_redis_client()
+    if client is None:
+        return []
+    try:
+        entries = client.xrange(progress_stream_key(str(execution_id)), count=count)
+    except Exception as e:
+        logger.warning(f"读取进度事件流失败: {e}")
+        return []
+    return [json.loads(fields["event"]) for _, fields in entries]
+
+
 class TaskProgressRecorder:
-    """封装任务进度写入和通知逻辑。"""
+    """
+    封装任务进度写入和通知逻辑。
+
+    进度通过 session_factory 创建的独立会话写入，任务主流程的会话只在各阶段结束时提交；
+    task_execution 上的进度字段只同步内存值，不会在主会话中被标记为待写入。
+    """
 
     def __init__(
         self,
-        db: Session,
         task,
         task_execution,
         *,
         websocket_task_id: Optional[str] = None,
+        config: Optional[ProgressRecorderConfig] = None,
+        redis_client=None,
+        session_factory: Callable[[], Session] = SessionLocal,
     ) -> None:
-        self.db = db
+        self._session_factory = session_factory
         self.task = task
         self.task_execution = task_execution
         self.task_id = task.id
@@ -61,6 +160,20 @@ class TaskProgressRecorder:
         self.data_source_id = str(getattr(task, "data_source_id", "") or "")
         self.started = False
 
+        self.config = config or ProgressRecorderConfig.from_settings()
+        self._redis = redis_client if redis_client is not None else _default_redis_client()
+        self._buffer: List[Dict[str, Any]] = []
+        self._progress_details: List[Dict[str, Any]] = list(task_execution.progress_details or [])
+        self._progress_percentage = task_execution.progress_percentage or 0
+        self._current_step: Optional[str] = None
+        self._last_flush = time.monotonic()
+        self._last_cancel_check = 0.0
+
+    @property
+    def progress_percentage(self) -> int:
+        """当前进度百分比（包含尚未写入数据库的事件）"""
+        return self._progress_percentage
+
     # ------------------------------------------------------------------ #
     # 公共 API
     # ------------------------------------------------------------------ #
@@ -149,7 +262,7 @@ class TaskProgressRecorder:
             "placeholder": placeholder,
             **(details or {}),
         }
-        ws_progress = (self.task_execution.progress_percentage or 0) / 100.0
+        ws_progress = (self._progress_percentage or 0) / 100.0
         _dispatch_async(
             notify_task_progress(
                 task_id=self.websocket_task_id,
@@ -167,6 +280,7 @@ class TaskProgressRecorder:
             message=message,
             stage="completion",
             status="success",
+            force_flush=True,
         )
         _dispatch_async(
             notify_task_complete(
@@ -185,11 +299,13 @@ class TaskProgressRecorder:
     ) -> None:
         """任务失败通知。"""
         self._append_event(
-            progress=self.task_execution.progress_percentage or 0,
+            progress=self._progress_percentage or 0,
             message=message,
             stage=stage,
             status="failed",
             details=error_details,
+            check_cancelled=False,
+            force_flush=True,
         )
         _dispatch_async(
             notify_task_error(
@@ -199,6 +315,77 @@ class TaskProgressRecorder:
             )
         )
 
+    def is_cancelled(self) -> bool:
+        """
+        检查任务是否已被取消
+
+        优先读取 Redis 取消标记；未发现标记时仍按间隔查询执行状态列（不刷新整行），
+        取消标记写入失败时仍能通过数据库状态检测到取消
+        """
+        if self._redis is not None:
+            try:
+                if self._redis.exists(cancel_flag_key(self.execution_id)):
+                    return True
+            except Exception as e:
+                logger.debug(f"读取任务取消标记失败，改为查询数据库: {e}")
+
+        now = time.monotonic()
+        if now - self._last_cancel_check < self.config.cancel_check_interval:
+            return False
+        self._last_cancel_check = now
+
+        from app.models.task import TaskExecution, TaskStatus
+
+        with self._session_factory() as session:
+            status = (
+                session.query(TaskExecution.execution_status)
+                .filter(TaskExecution.id == self.task_execution.id)
+                .scalar()
+            )
+        return status == TaskStatus.CANCELLED
+
+    def check_cancelled(self) -> None:
+        """任务已被取消时抛出异常"""
+        if self.is_cancelled():
+            raise Exception("任务已被用户取消")
+
+    def flush(self) -> None:
+        """将缓冲的事件写入事件流和数据库（独立会话中一次 UPDATE、一次提交）"""
+        if not self._buffer:
+            return
+
+        events, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        self._append_to_stream(events)
+
+        self._progress_details.extend(events)
+        # 限制长度，避免无限增长（完整历史保存在事件流中）
+        self._progress_details = self._progress_details[-self.config.max_events:]
+
+        values: Dict[str, Any] = {
+            "progress_details": list(self._progress_details),
+            "progress_percentage": self._progress_percentage,
+        }
+        if self._current_step is not None:
+            values["current_step"] = self._current_step
+
+        from app.models.task import TaskExecution
+
+        with self._session_factory() as session:
+            session.execute(
+                update(TaskExecution).where(TaskExecution.id == self.task_execution.id).values(**values)
+            )
+            session.commit()
+        # 同步主会话中对象的内存值，但不标记为脏数据，避免阶段提交时重复写入进度
+        for key, value in values.items():
+            set_committed_value(self.task_execution, key, value)
+        logger.debug(
+            "Task %s flushed %s progress events (%s%%)",
+            self.task_id,
+            len(events),
+            self._progress_percentage,
+        )
+
     # ------------------------------------------------------------------ #
     # 内部工具
     # ------------------------------------------------------------------ #
@@ -213,13 +400,12 @@ class TaskProgressRecorder:
         details: Optional[Dict[str, Any]] = None,
         error: Optional[str] = None,
         update_percentage: bool = True,
+        check_cancelled: bool = True,
+        force_flush: bool = False,
     ) -> None:
-        """写入数据库 JSON 字段并更新基础进度信息。"""
-        from app.models.task import TaskStatus
-
-        self.db.refresh(self.task_execution)
-        if self.task_execution.execution_status == TaskStatus.CANCELLED:
-            raise Exception("任务已被用户取消")
+        """将事件加入缓冲区，达到数量或时间阈值时批量写入。"""
+        if check_cancelled:
+            self.check_cancelled()
 
         event: Dict[str, Any] = {
             "timestamp": datetime.utcnow().isoformat() + "Z",
@@ -235,17 +421,11 @@ class TaskProgressRecorder:
         if error:
             event["error"] = error
 
-        progress_details = list(self.task_execution.progress_details or [])
-        progress_details.append(event)
-        # 限制长度，避免无限增长
-        self.task_execution.progress_details = progress_details[-200:]
-        flag_modified(self.task_execution, "progress_details")
-
+        self._buffer.append(event)
         if update_percentage:
-            self.task_execution.progress_percentage = progress
-            self.task_execution.current_step = message
+            self._progress_percentage = progress
+            self._current_step = message
 
-        self.db.commit()
         logger.info(
             "Task %s progress updated to %s%% - %s",
             self.task_id,
@@ -253,3 +433,37 @@ class TaskProgressRecorder:
             message,
         )
 
+        if (
+            force_flush
+            or len(self._buffer) >= self.config.flush_batch_size
+            or time.monotonic() - self._last_flush >= self.config.flush_interval
+        ):
+            self.flush()
+
+    def _append_to_stream(self, events: List[Dict[str, Any]]) -> None:
+        if self._redis is None:
+            return
+        key = progress_stream_key(self.execution_id)
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for event in events:
+                pipe.xadd(
+                    key,
+                    {"event": json.dumps(event, ensure_ascii=False, default=str)},
+                    maxlen=self.config.stream_maxlen,
+                    approximate=True,
+                )
+            pipe.expire(key, CANCEL_FLAG_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"进度事件写入事件流失败: {e}")
+
+
+__all__ = [
+    "ProgressRecorderConfig",
+    "TaskProgressRecorder",
+    "cancel_flag_key",
+    "progress_stream_key",
+    "read_progress_events",
+    "request_cancellation",
+]
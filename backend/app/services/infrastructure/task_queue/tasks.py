@@ -27,6 +27,7 @@ from app.services.infrastructure.notification.notification_service import Notifi
 from app.services.infrastructure.storage.hybrid_storage_service import (
     get_hybrid_storage_service,
 )
+from app.services.infrastructure.task_queue.async_runtime import run_in_worker_loop
 from app.services.infrastructure.task_queue.celery_config import celery_app
 from app.services.infrastructure.agents.messaging import (
     TaskMessageOrchestrator,
@@ -45,42 +46,10 @@ def run_async(coro):
     """
     在同步上下文中安全地执行异步代码。
 
-    规则：
-    - 若当前线程没有运行中的事件循环：直接 asyncio.run(coro)
-    - 若已有运行中的事件循环（如 Celery/WSGI 环境）：在新线程创建独立事件循环执行并返回结果
+    协程提交到当前 worker 进程的常驻事件循环执行，绑定在循环上的
+    HTTP 会话、连接池等资源在多次调用和多个任务之间复用。
     """
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        # 当前线程没有运行中的事件循环
-        return asyncio.run(coro)
-    else:
-        # 当前线程已存在事件循环，转移到新线程执行
-        import threading
-        from queue import Queue
-
-        result_queue: "Queue[Tuple[bool, Any]]" = Queue(maxsize=1)
-
-        def _runner():
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                res = loop.run_until_complete(coro)
-                result_queue.put((True, res))
-            except Exception as exc:  # noqa: BLE001
-                result_queue.put((False, exc))
-            finally:
-                try:
-                    loop.close()
-                except Exception:
-                    pass
-
-        t = threading.Thread(target=_runner, daemon=True)
-        t.start()
-        ok, payload = result_queue.get()
-        if ok:
-            return payload
-        raise payload
+    return run_in_worker_loop(coro)
 
 class DatabaseTask(CeleryTask):
     """带数据库会话的基础任务类"""
@@ -120,12 +89,10 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                 logger.info(f"Task {task_id} detected as REVOKED via Celery state")
                 raise Exception("任务已被用户取消")
 
-            # 方法2: 检查数据库中的执行状态
-            if task_execution_id:
-                exec_record = db.query(TaskExecution).filter(TaskExecution.id == task_execution_id).first()
-                if exec_record and exec_record.execution_status == TaskStatus.CANCELLED:
-                    logger.info(f"Task {task_id} detected as CANCELLED in database")
-                    raise Exception("任务已被用户取消")
+            # 方法2: 检查取消标记（Redis 不可用时按间隔查询数据库执行状态）
+            if task_execution_id and progress_recorder.is_cancelled():
+                logger.info(f"Task {task_id} detected as CANCELLED")
+                raise Exception("任务已被用户取消")
         except Exception as e:
             if "取消" in str(e) or "cancelled" in str(e).lower():
                 raise
@@ -155,7 +122,6 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
         task_execution_id = task_execution.id
 
         progress_recorder = TaskProgressRecorder(
-            db=db,
             task=task,
             task_execution=task_execution,
         )
@@ -609,13 +575,11 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
 
                 优化策略:
                 - 保持串行处理确保质量稳定
-                - 每5个占位符批量提交一次，减少数据库压力
-                - 支持断点续传（定期保存进度）
+                - 占位符的SQL更新只在内存中累积，阶段结束时一次flush+commit（单个事务）
                 """
                 processed_count = 0
                 total_count = len(placeholders_need_analysis)
                 batch_updates = []  # 👈 收集批量更新
-                BATCH_SIZE = 5  # 👈 批量大小配置
 
                 for ph in placeholders_need_analysis:
                     try:
@@ -833,17 +797,11 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                             logger.info(msg_orchestrator.sql_generation_success_batch(
                                 ph.placeholder_name,
                                 len(batch_updates),
-                                BATCH_SIZE,
+                                total_count,
                                 auto_fix_info,
                                 validation_status
                             ))
 
-                            # 👇 达到批量大小时提交
-                            if len(batch_updates) >= BATCH_SIZE:
-                                db.commit()
-                                logger.info(msg_orchestrator.sql_generation_batch_commit(len(batch_updates)))
-                                batch_updates.clear()
-
                         else:
                             error_msg = sql_result.get("error", "SQL生成失败")
                             logger.error(msg_orchestrator.sql_generation_failed(ph.placeholder_name, error_msg))
@@ -871,7 +829,7 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                             })
 
                             update_progress(
-                                task_execution.progress_percentage or 30,
+                                progress_recorder.progress_percentage or 30,
                                 msg_orchestrator.sql_generation_failed_progress(ph.placeholder_name),
                                 stage="placeholder_analysis",
                                 status="failed",
@@ -898,7 +856,7 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                         })
 
                         update_progress(
-                            task_execution.progress_percentage or 30,
+                            progress_recorder.progress_percentage or 30,
                             msg_orchestrator.placeholder_exception_progress(ph.placeholder_name),
                             stage="placeholder_analysis",
                             status="failed",
@@ -913,7 +871,7 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
 
                     processed_count += 1
 
-                # 👇 提交剩余的占位符
+                # 👇 阶段结束统一提交（一次flush批量写入全部占位符更新）
                 if batch_updates:
                     db.commit()
                     logger.info(msg_orchestrator.sql_generation_batch_commit(len(batch_updates)))
@@ -1012,8 +970,55 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                 stage="etl_processing",
             )
 
-            # 对每个有效的占位符进行单个处理
+            # 获取数据源配置（与Agent分析阶段保持一致，整份报告只构建一次）
+            from app.crud.crud_data_source import crud_data_source
+            from app.models.data_source import DataSourceType
+            from app.core.data_source_utils import DataSourcePasswordManager
+
+            data_source = crud_data_source.get(db, id=str(task.data_source_id))
+            if not data_source:
+                raise ValueError(f"数据源不存在: {task.data_source_id}")
+
+            # 构建数据源配置字典（参考_get_data_source_info的实现）
+            data_source_config = {}
+            if data_source.source_type == DataSourceType.doris:
+                data_source_config = {
+                    "source_type": "doris",
+                    "name": data_source.name,
+                    "database": getattr(data_source, "doris_database", "default"),
+                    "fe_hosts": list(getattr(data_source, "doris_fe_hosts", []) or ["localhost"]),
+                    "be_hosts": list(getattr(data_source, "doris_be_hosts", []) or ["localhost"]),
+                    "http_port": getattr(data_source, "doris_http_port", 8030),
+                    "query_port": getattr(data_source, "doris_query_port", 9030),
+                    "username": getattr(data_source, "doris_username", "root"),
+                    "password": DataSourcePasswordManager.get_password(data_source.doris_password) if getattr(data_source, "doris_password", None) else "",
+                    "timeout": 30
+                }
+            elif data_source.source_type == DataSourceType.sql:
+                from app.core.security_utils import decrypt_data
+                conn_str = data_source.connection_string
+                try:
+                    if conn_str:
+                        conn_str = decrypt_data(conn_str)
+                except Exception:
+                    pass
+                data_source_config = {
+                    "source_type": "sql",
+                    "name": data_source.name,
+                    "connection_string": conn_str,
+                    "database": getattr(data_source, "database_name", None),
+                    "host": getattr(data_source, "host", None),
+                    "port": getattr(data_source, "port", None),
+                    "username": getattr(data_source, "username", None),
+                    "password": getattr(data_source, "password", None),
+                }
+
+            logger.info(f"数据源配置: {data_source.source_type}, database: {data_source_config.get('database')}")
+
+            # 对每个有效的占位符先逐个准备SQL（参数替换、列验证与修复），再统一并发执行
             total_placeholders_count = len(placeholders or [])
+            pending_queries: List[Tuple[int, Any, str]] = []
+            sql_fixes_pending = 0
             for i, ph in enumerate(placeholders or []):
                 # 只要有生成的SQL就尝试执行，不要求必须验证通过
                 # sql_validated 应该在执行成功后设置，而不是作为执行的前提条件
@@ -1027,7 +1032,7 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                         skipped=True,
                     )
                     update_progress(
-                        task_execution.progress_percentage or 75,
+                        progress_recorder.progress_percentage or 75,
                         f"跳过占位符 {ph.placeholder_name}: 无有效SQL",
                         stage="etl_processing",
                         status="failed",
@@ -1064,52 +1069,7 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                         )
                         logger.info(f"替换后SQL: {final_sql[:100]}...")
 
-                    # 2. 获取数据源配置（与Agent分析阶段保持一致）
-                    from app.crud.crud_data_source import crud_data_source
-                    from app.models.data_source import DataSourceType
-                    from app.core.data_source_utils import DataSourcePasswordManager
-
-                    data_source = crud_data_source.get(db, id=str(task.data_source_id))
-                    if not data_source:
-                        raise ValueError(f"数据源不存在: {task.data_source_id}")
-
-                    # 构建数据源配置字典（参考_get_data_source_info的实现）
-                    data_source_config = {}
-                    if data_source.source_type == DataSourceType.doris:
-                        data_source_config = {
-                            "source_type": "doris",
-                            "name": data_source.name,
-                            "database": getattr(data_source, "doris_database", "default"),
-                            "fe_hosts": list(getattr(data_source, "doris_fe_hosts", []) or ["localhost"]),
-                            "be_hosts": list(getattr(data_source, "doris_be_hosts", []) or ["localhost"]),
-                            "http_port": getattr(data_source, "doris_http_port", 8030),
-                            "query_port": getattr(data_source, "doris_query_port", 9030),
-                            "username": getattr(data_source, "doris_username", "root"),
-                            "password": DataSourcePasswordManager.get_password(data_source.doris_password) if getattr(data_source, "doris_password", None) else "",
-                            "timeout": 30
-                        }
-                    elif data_source.source_type == DataSourceType.sql:
-                        from app.core.security_utils import decrypt_data
-                        conn_str = data_source.connection_string
-                        try:
-                            if conn_str:
-                                conn_str = decrypt_data(conn_str)
-                        except Exception:
-                            pass
-                        data_source_config = {
-                            "source_type": "sql",
-                            "name": data_source.name,
-                            "connection_string": conn_str,
-                            "database": getattr(data_source, "database_name", None),
-                            "host": getattr(data_source, "host", None),
-                            "port": getattr(data_source, "port", None),
-                            "username": getattr(data_source, "username", None),
-                            "password": getattr(data_source, "password", None),
-                        }
-
-                    logger.info(f"数据源配置: {data_source.source_type}, database: {data_source_config.get('database')}")
-
-                    # 2.5 SQL列验证和自动修复
+                    # 2. SQL列验证和自动修复
                     validation_passed = True
                     try:
                         # 尝试导入列验证工具
@@ -1199,8 +1159,8 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                                             "original_errors": validation_result.get("errors", [])
                                         }
 
-                                        db.commit()
-                                        logger.info(f"💾 已保存修复后的 SQL: {ph.placeholder_name}")
+                                        sql_fixes_pending += 1
+                                        logger.info(f"💾 已记录修复后的 SQL（阶段结束统一提交）: {ph.placeholder_name}")
                                     else:
                                         # 自动修复失败
                                         logger.error(f"❌ SQL 自动修复失败: {ph.placeholder_name}")
@@ -1221,7 +1181,7 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                                     )
 
                                     update_progress(
-                                        task_execution.progress_percentage or 75,
+                                        progress_recorder.progress_percentage or 75,
                                         f"占位符 {ph.placeholder_name} SQL 列验证失败",
                                         stage="etl_processing",
                                         status="failed",
@@ -1245,50 +1205,102 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                     except Exception as val_error:
                         logger.warning(f"列验证过程异常，继续执行: {val_error}")
 
-                    # 3. 使用connector直接执行查询（与Agent保持一致）
-                    from app.services.data.connectors.connector_factory import create_connector_from_config
+                    pending_queries.append((i, ph, final_sql))
 
-                    async def _execute_query_async():
-                        connector = create_connector_from_config(
-                            source_type=data_source.source_type,
-                            name=data_source.name,
-                            config=data_source_config
-                        )
-                        try:
-                            await connector.connect()
-                            result = await connector.execute_query(final_sql)
-                            return result
-                        finally:
-                            await connector.disconnect()
-
-                    # 📊 记录SQL执行指标
-                    metrics["sql_execution"]["total"] += 1
-                    
-                    query_result = run_async(_execute_query_async())
-
-                    # 4. 解包查询结果，提取实际数据值
+                except Exception as e:
+                    logger.error(f"Failed to prepare SQL for placeholder {ph.placeholder_name}: {e}")
+                    _set_etl_result(
+                        ph.placeholder_name,
+                        success=False,
+                        error=str(e),
+                        metadata={"reason": "execution_error"},
+                    )
+
+                    update_progress(
+                        progress_recorder.progress_percentage or 75,
+                        f"执行占位符 {ph.placeholder_name} SQL 失败",
+                        stage="etl_processing",
+                        status="failed",
+                        placeholder=ph.placeholder_name,
+                        details={
+                            "current": i + 1,
+                            "total": total_placeholders_count,
+                        },
+                        error=str(e),
+                        record_only=True,
+                    )
+
+            # 准备阶段的SQL修复在一个事务中提交
+            if sql_fixes_pending:
+                db.commit()
+                logger.info(f"💾 已保存 {sql_fixes_pending} 个占位符修复后的 SQL")
+
+            # 3. 使用同一个connector在单个事件循环内并发执行全部占位符SQL（与Agent保持一致）
+            from app.services.data.query.batch_query_executor import BatchQueryItem, run_batch_queries
+
+            pending_by_key = {str(i): ph for i, ph, _ in pending_queries}
+
+            def _on_query_complete(completed: int, total: int, outcome) -> None:
+                progress_increment = 10 / total if total else 0
+                update_progress(
+                    int(75 + completed * progress_increment),
+                    f"已执行 {completed}/{total} 个占位符查询",
+                    stage="etl_processing",
+                    placeholder=pending_by_key[outcome.key].placeholder_name,
+                    details={
+                        "current": completed,
+                        "total": total,
+                    },
+                )
+
+            query_outcomes = {}
+            if pending_queries:
+                # 📊 记录SQL执行指标
+                metrics["sql_execution"]["total"] += len(pending_queries)
+                query_outcomes = run_async(run_batch_queries(
+                    source_type=data_source.source_type,
+                    name=data_source.name,
+                    config=data_source_config,
+                    items=[
+                        BatchQueryItem(key=str(i), sql=final_sql)
+                        for i, _, final_sql in pending_queries
+                    ],
+                    max_concurrency=settings.ETL_QUERY_CONCURRENCY,
+                    on_complete=_on_query_complete,
+                    # 已结束周期的结果长时间缓存，重新生成同一周期报告时不再查询数据源
+                    time_window={
+                        **time_window,
+                        "report_period": task.report_period.value if task.report_period else None,
+                    },
+                ))
+
+            # 4. 按占位符原始顺序记录执行结果
+            for i, ph, final_sql in pending_queries:
+                try:
+                    outcome = query_outcomes.get(str(i))
+                    if outcome is None:
+                        raise RuntimeError("查询未执行")
+                    if outcome.error is not None:
+                        raise outcome.error
+                    query_result = outcome.result
+
+                    # 解包查询结果，提取实际数据值
                     # DorisQueryResult 没有 success 属性，只要没抛异常就是成功
-                    if hasattr(query_result, 'data') and query_result.data is not None and not query_result.data.empty:
+                    columnar = query_result.to_columnar() if hasattr(query_result, 'to_columnar') else None
+                    if columnar is not None and not columnar.is_empty:
                         metrics["sql_execution"]["success"] += 1
-                        # 将DataFrame转换为字典列表
-                        result_data = query_result.data.to_dict('records')
-
-                        # 转换 Decimal 类型为 float，确保 JSON 可序列化
-                        from app.utils.json_utils import convert_decimals
-                        result_data = convert_decimals(result_data)
-
-                        # 智能解包：单行单列返回值，多行返回列表
-                        actual_value = None
-                        if result_data:
-                            if len(result_data) == 1 and len(result_data[0]) == 1:
-                                # 单行单列：返回值本身
-                                actual_value = list(result_data[0].values())[0]
-                            elif len(result_data) == 1:
-                                # 单行多列：返回行字典
-                                actual_value = result_data[0]
-                            else:
-                                # 多行：返回完整列表（用于图表）
-                                actual_value = result_data
+                        row_count = len(columnar)
+
+                        # 智能解包：单行单列返回值，多行返回列表（Decimal已在列式结果中转换为float）
+                        if row_count == 1 and len(columnar.columns) == 1:
+                            # 单行单列：返回值本身
+                            actual_value = columnar.scalar()
+                        elif row_count == 1:
+                            # 单行多列：返回行字典
+                            actual_value = dict(columnar[0])
+                        else:
+                            # 多行：返回完整列表（用于图表）
+                            actual_value = columnar.to_records()
 
                         logger.info(f"✅ 占位符 {ph.placeholder_name} 查询成功，结果类型: {type(actual_value)}, 值: {str(actual_value)[:100]}")
 
@@ -1298,8 +1310,8 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                                 tool_name=f"sql_execution_{ph.placeholder_name}",
                                 result={
                                     "success": True,
-                                    "row_count": len(result_data),
-                                    "rows": result_data[:3] if len(result_data) > 3 else result_data  # 只记录前3行
+                                    "row_count": row_count,
+                                    "rows": columnar.head(3).to_records()  # 只记录前3行
                                 }
                             )
 
@@ -1310,7 +1322,7 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                             value=actual_value,
                             metadata={
                                 "reason": "query_success",
-                                "row_count": len(result_data),
+                                "row_count": row_count,
                             },
                         )
                     else:
@@ -1329,20 +1341,6 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                             },
                         )
 
-                    # 更新进度
-                    progress_increment = 10 / total_placeholders_count if total_placeholders_count else 0
-                    current_progress = 75 + (i + 1) * progress_increment
-                    update_progress(
-                        int(current_progress),
-                        f"已处理 {i + 1}/{total_placeholders_count} 个占位符",
-                        stage="etl_processing",
-                        placeholder=ph.placeholder_name,
-                        details={
-                            "current": i + 1,
-                            "total": total_placeholders_count,
-                        },
-                    )
-
                 except Exception as e:
                     logger.error(f"Failed to execute SQL for placeholder {ph.placeholder_name}: {e}")
                     metrics["sql_execution"]["failed"] += 1
@@ -1354,7 +1352,7 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
                     )
 
                     update_progress(
-                        task_execution.progress_percentage or int(current_progress),
+                        progress_recorder.progress_percentage or 85,
                         f"执行占位符 {ph.placeholder_name} SQL 失败",
                         stage="etl_processing",
                         status="failed",
@@ -1921,6 +1919,10 @@ def execute_report_task(self, db: Session, task_id: int, execution_context: Opti
         else:
             logger.error(f"Task {task_id} failed: {error_message}", exc_info=True)
 
+        # 丢弃失败阶段未提交的写入；主会话可能持有 task_execution 的行锁，
+        # 不先回滚的话进度记录器的独立会话会一直等待该锁
+        db.rollback()
+
         if 'progress_recorder' in locals():
             try:
                 progress_recorder.fail(
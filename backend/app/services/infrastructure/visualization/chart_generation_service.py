@@ -17,6 +17,8 @@ from dataclasses import dataclass
 from enum import Enum
 import pandas as pd
 
+from .chart_render_pool import ChartSpec, get_chart_render_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -170,7 +172,7 @@ class ChartGenerationService:
         try:
             # 使用统一AI门面进行图表类型分析
             # Service orchestrator migrated to agents
-from app.services.infrastructure.agents import execute_agent_task
+            from app.services.infrastructure.agents import execute_agent_task
             
             orchestrator = execute_agent_task
             
@@ -435,48 +437,30 @@ from app.services.infrastructure.agents import execute_agent_task
         filename = f"chart_{chart_id}_{timestamp}.png"
         file_path = os.path.join(self.output_dir, filename)
         
-        # 设置图表样式
-        self.plt.style.use('default')
-        self.plt.figure(figsize=(config.width/100, config.height/100), dpi=100)
-        
-        try:
-            # 根据图表类型生成图表
-            if config.chart_type == ChartType.BAR:
-                self.plt.bar(data[config.x_column], data[config.y_column])
-            elif config.chart_type == ChartType.LINE:
-                self.plt.plot(data[config.x_column], data[config.y_column], marker='o')
-            elif config.chart_type == ChartType.PIE:
-                self.plt.pie(data[config.y_column], labels=data[config.x_column], autopct='%1.1f%%')
-            elif config.chart_type == ChartType.SCATTER:
-                self.plt.scatter(data[config.x_column], data[config.y_column])
-            else:
-                # 默认使用柱状图
-                self.plt.bar(data[config.x_column], data[config.y_column])
-            
-            # 设置标题和标签
-            self.plt.title(config.title, fontsize=14, pad=20)
-            if config.x_label:
-                self.plt.xlabel(config.x_label)
-            if config.y_label:
-                self.plt.ylabel(config.y_label)
-            
-            # 显示网格
-            if config.show_grid:
-                self.plt.grid(True, alpha=0.3)
-            
-            # 调整布局
-            self.plt.tight_layout()
-            
-            # 保存文件
-            self.plt.savefig(file_path, dpi=150, bbox_inches='tight')
-            self.plt.close()
-            
-            logger.debug(f"图表文件已保存: {file_path}")
-            return file_path
-            
-        except Exception as e:
-            self.plt.close()  # 确保清理资源
-            raise e
+        # 在图表渲染进程池中渲染；generate_charts_for_data 并发调用时整批并行
+        chart_type = getattr(config.chart_type, "value", None)
+        spec = ChartSpec(
+            chart_type=chart_type if chart_type in ("bar", "line", "pie", "scatter") else "bar",
+            title=config.title,
+            labels=tuple(data[config.x_column].tolist()),
+            values=tuple(data[config.y_column].tolist()),
+            width=config.width / 100,
+            height=config.height / 100,
+            dpi=150,
+            x_label=config.x_label,
+            y_label=config.y_label,
+            show_grid=config.show_grid,
+            title_size=14,
+        )
+        png = await get_chart_render_pool().render(spec)
+        if not png:
+            raise Exception(f"图表渲染失败: {config.title}")
+
+        with open(file_path, "wb") as f:
+            f.write(png)
+
+        logger.debug(f"图表文件已保存: {file_path}")
+        return file_path
     
     def get_chart_preview(self, chart_id: str) -> Optional[str]:
         """获取图表预览（Base64格式）"""
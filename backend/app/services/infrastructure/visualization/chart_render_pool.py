@@ -0,0 +1,412 @@
+"""
+图表渲染进程池
+
+matplotlib 渲染是 CPU 密集型且持有 GIL，pyplot 的全局状态也不能在线程间共享，
+因此图表在独立进程中渲染：
+- 工作进程启动时完成 matplotlib 后端、中文字体等初始化，后续渲染不再重复加载
+- 批量提交图表规格（ChartSpec），并行渲染为 PNG 字节，整批耗时约等于最慢的一张
+- 按规格内容哈希缓存渲染结果，同一报告或多份报告中完全相同的图表只渲染一次
+- Celery prefork 的 worker 子进程是守护进程，不能再创建子进程：由主进程在 fork 之前启动
+  渲染服务（start_chart_render_service），子进程把渲染请求提交给该服务的进程池
+- 进程池和渲染服务都不可用时回退为当前进程内的渲染线程逐个渲染
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.managers import BaseManager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    """图表渲染规格（可序列化，传给工作进程）"""
+    chart_type: str
+    title: str
+    labels: Tuple[Any, ...]
+    values: Tuple[float, ...]
+    width: float = 10.0
+    height: float = 6.0
+    dpi: int = 150
+    x_label: Optional[str] = None
+    y_label: Optional[str] = None
+    show_grid: bool = False
+    rotate_labels: bool = False
+    title_size: int = 16
+    font_path: Optional[str] = None
+
+    def content_hash(self) -> str:
+        payload = json.dumps(asdict(self), ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChartRenderConfig:
+    """图表渲染池配置"""
+    workers: int = field(default_factory=lambda: min(4, os.cpu_count() or 1))
+    cache_size: int = 256
+    font_path: Optional[str] = None
+
+    @classmethod
+    def from_settings(cls) -> "ChartRenderConfig":
+        """从全局配置创建"""
+        return cls(
+            workers=settings.CHART_RENDER_WORKERS or min(4, os.cpu_count() or 1),
+            cache_size=settings.CHART_RENDER_CACHE_SIZE,
+            font_path=settings.CHART_FONT_PATH or None,
+        )
+
+
+# ----------------------------------------------------------------------
+# 工作进程
+# ----------------------------------------------------------------------
+_plt = None
+_font_properties: Dict[str, Any] = {}
+_inline_render_lock = threading.Lock()
+
+
+def _init_worker(font_path: Optional[str] = None) -> None:
+    """工作进程初始化：加载 matplotlib 与字体（每个进程只做一次）"""
+    global _plt
+    if _plt is not None:
+        return
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.rcParams["font.sans-serif"] = ["SimHei", "Arial Unicode MS"]  # 支持中文
+    plt.rcParams["axes.unicode_minus"] = False
+    _plt = plt
+    if font_path:
+        _get_font(font_path)
+    # 预热字体缓存，首张图表不再承担字体扫描的开销
+    from matplotlib import font_manager
+    font_manager.findfont(plt.rcParams["font.sans-serif"][0], fallback_to_default=True)
+
+
+def _get_font(font_path: Optional[str]) -> Any:
+    if not font_path:
+        return None
+    if font_path not in _font_properties:
+        try:
+            from matplotlib import font_manager
+            _font_properties[font_path] = font_manager.FontProperties(fname=font_path)
+        except Exception as e:
+            logger.warning(f"字体文件加载失败: {e}")
+            _font_properties[font_path] = None
+    return _font_properties[font_path]
+
+
+def render_chart_png(spec: ChartSpec) -> bytes:
+    """按规格渲染 PNG（在工作进程中执行，也可在当前进程直接调用）"""
+    _init_worker()
+    plt = _plt
+    font = _get_font(spec.font_path)
+    labels = list(spec.labels)
+    values = list(spec.values)
+
+    fig, ax = plt.subplots(figsize=(spec.width, spec.height))
+    try:
+        ax.set_title(str(spec.title), fontsize=spec.title_size, fontproperties=font)
+
+        if spec.chart_type == "pie":
+            text_props = {"fontproperties": font} if font else {}
+            ax.pie(values, labels=labels, autopct="%1.1f%%", startangle=90, textprops=text_props)
+            ax.axis("equal")
+        else:
+            if spec.chart_type == "line":
+                ax.plot(labels, values, marker="o")
+            elif spec.chart_type == "scatter":
+                ax.scatter(labels, values)
+            else:
+                ax.bar(labels, values)
+            if spec.x_label:
+                ax.set_xlabel(spec.x_label, fontproperties=font)
+            if spec.y_label:
+                ax.set_ylabel(spec.y_label, fontsize=12, fontproperties=font)
+            if spec.rotate_labels:
+                plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+            if font:
+                for tick_label in ax.get_xticklabels():
+                    tick_label.set_fontproperties(font)
+            if spec.show_grid:
+                ax.grid(True, alpha=0.3)
+            fig.tight_layout()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=spec.dpi, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+# ----------------------------------------------------------------------
+# 渲染服务（Celery 主进程在 fork worker 子进程之前启动）
+# ----------------------------------------------------------------------
+class _RenderService:
+    """在渲染服务进程中持有渲染进程池"""
+
+    def __init__(self, workers: int, font_path: Optional[str]):
+        self._executor = _create_process_pool(workers, font_path)
+
+    def run(self, fn, *args):
+        return self._executor.submit(fn, *args).result()
+
+
+_render_service: Optional[_RenderService] = None
+
+
+def _init_render_service(workers: int, font_path: Optional[str]) -> None:
+    global _render_service
+    _render_service = _RenderService(workers, font_path)
+
+
+def _get_render_service() -> Optional[_RenderService]:
+    return _render_service
+
+
+class _RenderServiceManager(BaseManager):
+    pass
+
+
+_RenderServiceManager.register("get_render_service", callable=_get_render_service)
+
+_render_service_manager: Optional[_RenderServiceManager] = None
+# (地址, authkey)，fork 出的 worker 子进程继承后据此连接渲染服务
+_render_service_endpoint: Optional[Tuple[Any, bytes]] = None
+
+
+def _create_process_pool(workers: int, font_path: Optional[str]) -> ProcessPoolExecutor:
+    # spawn：不继承父进程（事件循环、数据库连接、线程）的状态
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(font_path,),
+    )
+
+
+def start_chart_render_service(config: Optional[ChartRenderConfig] = None) -> None:
+    """启动渲染服务进程（在 Celery 主进程 fork worker 子进程之前调用）"""
+    global _render_service_manager, _render_service_endpoint
+    if _render_service_manager is not None:
+        return
+    config = config or ChartRenderConfig.from_settings()
+    if config.workers <= 0:
+        return
+    authkey = os.urandom(32)
+    manager = _RenderServiceManager(authkey=authkey, ctx=multiprocessing.get_context("spawn"))
+    manager.start(initializer=_init_render_service, initargs=(config.workers, config.font_path))
+    _render_service_manager = manager
+    _render_service_endpoint = (manager.address, authkey)
+    logger.info(f"图表渲染服务已启动: {config.workers} 个渲染进程")
+
+
+def stop_chart_render_service() -> None:
+    """关闭渲染服务进程"""
+    global _render_service_manager, _render_service_endpoint
+    manager, _render_service_manager, _render_service_endpoint = _render_service_manager, None, None
+    if manager is not None:
+        manager.shutdown()
+
+
+class _RenderServiceExecutor(Executor):
+    """把任务转交给渲染服务进程池的执行器（每个线程使用自己的连接）"""
+
+    def __init__(self, endpoint: Tuple[Any, bytes], max_workers: int):
+        address, authkey = endpoint
+        manager = _RenderServiceManager(address=address, authkey=authkey)
+        manager.connect()
+        self._service = manager.get_render_service()
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chart-render")
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self._threads.submit(self._run, fn, *args)
+
+    def _run(self, fn, *args):
+        try:
+            return self._service.run(fn, *args)
+        except (OSError, EOFError) as e:
+            # 与渲染服务的连接断开，按进程池损坏处理（回退进程内渲染并重建）
+            raise BrokenProcessPool(f"图表渲染服务不可用: {e}") from e
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._threads.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+# ----------------------------------------------------------------------
+# 渲染池
+# ----------------------------------------------------------------------
+class ChartRenderPool:
+    """图表渲染进程池（带内容哈希缓存）"""
+
+    def __init__(self, config: Optional[ChartRenderConfig] = None):
+        self.config = config or ChartRenderConfig.from_settings()
+        self._executor: Optional[Executor] = None
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._renders = 0
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.config.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                if _render_service_endpoint is not None:
+                    # fork 之前启动的渲染服务：worker 子进程共用一个渲染进程池
+                    self._executor = _RenderServiceExecutor(_render_service_endpoint, self.config.workers)
+                elif multiprocessing.current_process().daemon:
+                    # 守护进程不能创建子进程，又没有可用的渲染服务
+                    return None
+                else:
+                    self._executor = _create_process_pool(self.config.workers, self.config.font_path)
+            return self._executor
+
+    def _cached(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+            return png
+
+    def _store(self, key: str, png: bytes) -> None:
+        with self._lock:
+            self._renders += 1
+            self._cache[key] = png
+            self._cache.move_to_end(key)
+            while len(self._cache) > max(0, self.config.cache_size):
+                self._cache.popitem(last=False)
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def render_many(self, specs: Sequence[ChartSpec]) -> List[Optional[bytes]]:
+        """
+        并行渲染一批图表
+
+        Returns:
+            与 specs 一一对应的 PNG 字节，渲染失败的位置为 None
+        """
+        keys = [spec.content_hash() for spec in specs]
+        results: Dict[str, Optional[bytes]] = {}
+        pending: Dict[str, ChartSpec] = {}
+        for key, spec in zip(keys, specs):
+            if key in results or key in pending:
+                continue
+            png = self._cached(key)
+            if png is not None:
+                results[key] = png
+            else:
+                pending[key] = spec
+
+        if pending:
+            rendered = await self._render_pending(pending)
+            for key, png in rendered.items():
+                if png:
+                    self._store(key, png)
+                results[key] = png
+
+        return [results.get(key) for key in keys]
+
+    async def render(self, spec: ChartSpec) -> Optional[bytes]:
+        """渲染单个图表"""
+        return (await self.render_many([spec]))[0]
+
+    async def _render_pending(self, pending: Dict[str, ChartSpec]) -> Dict[str, Optional[bytes]]:
+        loop = asyncio.get_running_loop()
+        executor = None
+        try:
+            executor = self._get_executor()
+        except Exception as e:
+            logger.warning(f"图表渲染进程池启动失败，改为进程内渲染: {e}")
+
+        if executor is not None:
+            try:
+                futures = [loop.run_in_executor(executor, render_chart_png, spec) for spec in pending.values()]
+            except Exception as e:
+                logger.warning(f"图表渲染进程池提交失败，改为进程内渲染: {e}")
+                self._reset_executor()
+                futures = None
+            if futures is not None:
+                outcomes = await asyncio.gather(*futures, return_exceptions=True)
+                rendered: Dict[str, Optional[bytes]] = {}
+                broken = False
+                for (key, spec), outcome in zip(pending.items(), outcomes):
+                    if isinstance(outcome, BrokenProcessPool):
+                        broken = True
+                        rendered[key] = await asyncio.to_thread(self._render_inline, spec)
+                    elif isinstance(outcome, BaseException):
+                        logger.error(f"图表渲染失败: {spec.title}, 错误: {outcome}")
+                        rendered[key] = None
+                    else:
+                        rendered[key] = outcome
+                if broken:
+                    logger.warning("图表渲染进程池异常退出，已重建")
+                    self._reset_executor()
+                return rendered
+
+        # 在渲染线程中逐个渲染，不阻塞事件循环
+        return await asyncio.to_thread(
+            lambda: {key: self._render_inline(spec) for key, spec in pending.items()}
+        )
+
+    def _render_inline(self, spec: ChartSpec) -> Optional[bytes]:
+        # pyplot 的全局状态不是线程安全的，进程内渲染串行执行
+        with _inline_render_lock:
+            try:
+                return render_chart_png(spec)
+            except Exception as e:
+                logger.error(f"图表渲染失败: {spec.title}, 错误: {e}")
+                return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.config.workers,
+                "cached": len(self._cache),
+                "hits": self._hits,
+                "renders": self._renders,
+            }
+
+    def shutdown(self) -> None:
+        self._reset_executor()
+
+
+_chart_render_pool: Optional[ChartRenderPool] = None
+
+
+def get_chart_render_pool() -> ChartRenderPool:
+    """获取全局图表渲染池"""
+    global _chart_render_pool
+    if _chart_render_pool is None:
+        _chart_render_pool = ChartRenderPool()
+    return _chart_render_pool
+
+
+__all__ = [
+    "ChartRenderConfig",
+    "ChartRenderPool",
+    "ChartSpec",
+    "get_chart_render_pool",
+    "render_chart_png",
+    "start_chart_render_service",
+    "stop_chart_render_service",
+]
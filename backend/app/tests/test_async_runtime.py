@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.infrastructure.task_queue.async_runtime import WorkerAsyncRuntime
+
+
+def test_calls_share_one_persistent_loop():
+    runtime = WorkerAsyncRuntime(name="test-runtime")
+
+    async def current_loop():
+        return asyncio.get_running_loop(), threading.current_thread().name
+
+    try:
+        first_loop, thread_name = runtime.run(current_loop())
+        second_loop, _ = runtime.run(current_loop())
+        assert first_loop is second_loop
+        assert thread_name == "test-runtime"
+
+        async def nested():
+            # 在运行时线程内同步调用 run 不能死锁
+            return runtime.run(asyncio.sleep(0, result="nested"))
+
+        assert runtime.run(nested()) == "nested"
+
+        with pytest.raises(ValueError):
+            runtime.run(_raise())
+    finally:
+        runtime.shutdown()
+
+
+def test_timeout_cancels_and_restart_after_fork():
+    runtime = WorkerAsyncRuntime(name="test-runtime")
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    try:
+        with pytest.raises(Exception):
+            runtime.run(slow(), timeout=0.05)
+        assert cancelled.wait(1)
+
+        old_loop = runtime.loop
+        runtime._pid = -1  # 模拟 fork 后的子进程
+        assert runtime.loop is not old_loop
+    finally:
+        runtime.shutdown()
+        old_loop.call_soon_threadsafe(old_loop.stop)
+
+
+async def _raise():
+    raise ValueError("boom")
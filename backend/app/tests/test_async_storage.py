@@ -0,0 +1,65 @@
+import pytest
+
+from app.services.infrastructure.storage.async_storage import (
+    AsyncStorageConfig,
+    AsyncStorageService,
+    RangeNotSatisfiable,
+    parse_range_header,
+)
+from app.services.infrastructure.storage.file_storage_service import FileStorageService
+
+PAYLOAD = bytes(range(256)) * 1000
+
+
+@pytest.fixture
+def storage(tmp_path):
+    config = AsyncStorageConfig(chunk_size=4096, download_part_size=64 * 1024, parallel_parts=3, io_threads=4)
+    service = AsyncStorageService(FileStorageService(base_path=str(tmp_path)), config)
+    yield service
+    service.shutdown()
+
+
+async def _collect(body):
+    return b"".join([chunk async for chunk in body])
+
+
+def test_parse_range_header():
+    assert parse_range_header(None, 100) is None
+    assert parse_range_header("bytes=10-19", 100) == (10, 10)
+    assert parse_range_header("bytes=90-", 100) == (90, 10)
+    assert parse_range_header("bytes=-5", 100) == (95, 5)
+    assert parse_range_header("bytes=0-5,10-20", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=100-", 100)
+
+
+@pytest.mark.asyncio
+async def test_upload_from_async_iterator_and_ranged_download(storage):
+    async def source():
+        for start in range(0, len(PAYLOAD), 10000):
+            yield PAYLOAD[start:start + 10000]
+
+    info = await storage.upload(source(), "report.docx", file_type="reports")
+    assert info["file_path"].startswith("reports/") and info["file_path"].endswith(".docx")
+    assert info["size"] == len(PAYLOAD)
+
+    full = await storage.open_download(info["file_path"])
+    assert full.status_code == 200 and full.headers["Content-Length"] == str(len(PAYLOAD))
+    assert await _collect(full.body) == PAYLOAD
+
+    partial = await storage.open_download(info["file_path"], "bytes=1000-200999")
+    assert partial.status_code == 206
+    assert partial.headers["Content-Range"] == f"bytes 1000-200999/{len(PAYLOAD)}"
+    assert await _collect(partial.body) == PAYLOAD[1000:201000]
+
+
+@pytest.mark.asyncio
+async def test_dedup_stores_identical_content_once(storage):
+    first = await storage.upload(PAYLOAD, "chart.png", file_type="charts", dedup=True)
+    second = await storage.upload(PAYLOAD, "other.png", file_type="charts", dedup=True)
+    different = await storage.upload(PAYLOAD[:-1], "chart.png", file_type="charts", dedup=True)
+
+    assert first["file_path"] == second["file_path"] != different["file_path"]
+    assert first["file_path"].startswith("cas/charts/")
+    assert not first["deduplicated"] and second["deduplicated"]
+    assert await storage.read_range(second["file_path"], 0, 256) == PAYLOAD[:256]
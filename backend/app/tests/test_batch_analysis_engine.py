@@ -0,0 +1,104 @@
+import asyncio
+
+from app.services.application.placeholder.batch_analysis_engine import (
+    BatchAnalysisConfig,
+    BatchPlaceholderAnalysisEngine,
+    PlaceholderBatchContext,
+)
+
+
+class _FakeAnalyzer:
+    def __init__(self, delays, flaky=()):
+        self.delays = delays
+        self.flaky = set(flaky)
+        self.contexts = 0
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def build_batch_context(self, template_id, data_source_id, user_id, adapter_count=1):
+        self.contexts += 1
+        return PlaceholderBatchContext(
+            template_id=template_id,
+            data_source_id=data_source_id,
+            user_id=user_id,
+            agent_adapters=[f"adapter-{i}" for i in range(adapter_count)],
+        )
+
+    async def analyze_placeholder_with_full_pipeline(self, placeholder_name, batch_context, agent_adapter, **kwargs):
+        self.calls.append((placeholder_name, agent_adapter, kwargs["data_range"]))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delays[placeholder_name])
+        finally:
+            self.active -= 1
+        if placeholder_name in self.flaky:
+            self.flaky.discard(placeholder_name)
+            raise TimeoutError("LLM timeout")
+        if placeholder_name == "invalid":
+            return {"status": "error", "error": "SQL验证失败", "analysis_result": {"analysis_type": "validation"}}
+        return {"status": "success", "placeholder_name": placeholder_name}
+
+
+def _specs(names):
+    return [{"name": name, "text": f"{{{{{name}}}}}"} for name in names]
+
+
+def test_stream_yields_in_completion_order_within_budget():
+    analyzer = _FakeAnalyzer({"slow": 0.05, "a": 0.01, "b": 0.01, "c": 0.01})
+    engine = BatchPlaceholderAnalysisEngine(analyzer, BatchAnalysisConfig(concurrency=2, max_retries=0))
+
+    async def collect():
+        return [
+            item["placeholder_name"]
+            async for item in engine.stream(
+                _specs(["slow", "a", "b", "c"]), template_id="t", data_source_id="ds", user_id="u", data_range="day"
+            )
+        ]
+
+    order = asyncio.run(collect())
+    assert order[-1] == "slow"
+    assert sorted(order) == ["a", "b", "c", "slow"]
+    assert analyzer.contexts == 1
+    assert analyzer.max_active == 2
+    assert {adapter for _, adapter, _ in analyzer.calls} == {"adapter-0", "adapter-1"}
+
+
+def test_run_retries_only_transient_failures_and_keeps_input_order():
+    analyzer = _FakeAnalyzer({"flaky": 0.0, "invalid": 0.0, "ok": 0.0}, flaky=["flaky"])
+    engine = BatchPlaceholderAnalysisEngine(
+        analyzer, BatchAnalysisConfig(concurrency=3, max_retries=1, retry_backoff=0)
+    )
+
+    results = asyncio.run(engine.run(
+        _specs(["flaky", "invalid", "ok"]), template_id="t", data_source_id="ds", user_id="u", data_range="day"
+    ))
+
+    assert [item["placeholder_name"] for item in results] == ["flaky", "invalid", "ok"]
+    assert [item["success"] for item in results] == [True, False, True]
+    assert [item["attempts"] for item in results] == [2, 1, 1]
+    assert "retryable" not in results[1]["result"]
+
+
+def test_runtime_tools_receive_their_own_connection_config(monkeypatch):
+    from types import SimpleNamespace
+
+    from app.services.infrastructure.agents import runtime
+
+    created = []
+
+    def fake_executor_tool(container, connection_config=None):
+        created.append(connection_config)
+        return SimpleNamespace(name="sql_executor", connection_config=connection_config)
+
+    monkeypatch.setattr(runtime, "create_sql_executor_tool", fake_executor_tool)
+    monkeypatch.setattr(runtime, "_tool_cache", runtime.ToolInstanceCache())
+    config = SimpleNamespace(tools=SimpleNamespace(enabled_tools=["sql_executor"]))
+    container = SimpleNamespace()
+
+    first = runtime._create_tools_from_config(container, config, {"source_type": "doris", "database": "a"})
+    second = runtime._create_tools_from_config(container, config, {"source_type": "doris", "database": "b"})
+
+    assert [tool.connection_config["database"] for tool in first + second] == ["a", "b"]
+    assert not hasattr(container, "_temp_connection_config")
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.data.query.batch_query_executor import BatchQueryItem, execute_queries_concurrently
+
+
+class _StubConnector:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def execute_query(self, sql):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if "fail" in sql:
+                raise RuntimeError("boom")
+            if "soft" in sql:
+                return SimpleNamespace(success=False, error_message="soft error")
+            return SimpleNamespace(sql=sql)
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_execute_queries_concurrently_respects_limit_and_order():
+    connector = _StubConnector()
+    items = [BatchQueryItem(key=str(i), sql=f"SELECT {i}") for i in range(10)]
+    progress = []
+
+    outcomes = await execute_queries_concurrently(
+        connector, items, max_concurrency=3, on_complete=lambda done, total, _: progress.append((done, total))
+    )
+
+    assert list(outcomes.keys()) == [str(i) for i in range(10)]
+    assert all(outcome.success for outcome in outcomes.values())
+    assert connector.max_active == 3
+    assert progress[-1] == (10, 10)
+
+
+@pytest.mark.asyncio
+async def test_execute_queries_concurrently_isolates_failures():
+    connector = _StubConnector()
+    items = [
+        BatchQueryItem(key="ok", sql="SELECT 1"),
+        BatchQueryItem(key="hard", sql="SELECT fail"),
+        BatchQueryItem(key="soft", sql="SELECT soft"),
+    ]
+
+    outcomes = await execute_queries_concurrently(connector, items, max_concurrency=2)
+
+    assert outcomes["ok"].success is True
+    assert isinstance(outcomes["hard"].error, RuntimeError)
+    assert "soft error" in str(outcomes["soft"].error)
@@ -0,0 +1,72 @@
+import asyncio
+import multiprocessing
+
+from app.services.infrastructure.visualization import chart_render_pool
+from app.services.infrastructure.visualization.chart_render_pool import (
+    ChartRenderConfig,
+    ChartRenderPool,
+    ChartSpec,
+)
+
+
+def _spec(title, values=(1.0, 2.0)):
+    return ChartSpec(chart_type="bar", title=title, labels=("a", "b"), values=values)
+
+
+def test_content_hash_depends_on_every_field():
+    assert _spec("销售").content_hash() == _spec("销售").content_hash()
+    assert _spec("销售").content_hash() != _spec("销售", (1.0, 3.0)).content_hash()
+    assert _spec("销售").content_hash() != ChartSpec("pie", "销售", ("a", "b"), (1.0, 2.0)).content_hash()
+
+
+def test_render_many_dedups_and_caches(monkeypatch):
+    rendered = []
+
+    def fake_render(spec):
+        rendered.append(spec.title)
+        if spec.title == "broken":
+            raise ValueError("bad data")
+        return f"png:{spec.title}".encode()
+
+    monkeypatch.setattr(chart_render_pool, "render_chart_png", fake_render)
+    pool = ChartRenderPool(ChartRenderConfig(workers=-1, cache_size=8))
+
+    first = asyncio.run(pool.render_many([_spec("a"), _spec("b"), _spec("a"), _spec("broken")]))
+    assert first == [b"png:a", b"png:b", b"png:a", None]
+    assert rendered == ["a", "b", "broken"]
+
+    second = asyncio.run(pool.render_many([_spec("b"), _spec("c")]))
+    assert second == [b"png:b", b"png:c"]
+    assert rendered == ["a", "b", "broken", "c"]
+    assert pool.get_stats()["hits"] == 1
+
+
+def _render_in_daemon(results):
+    pool = ChartRenderPool(ChartRenderConfig(workers=2, cache_size=8))
+
+    def no_inline(spec):
+        raise AssertionError("daemonic worker rendered in-process")
+
+    pool._render_inline = no_inline
+    try:
+        pngs = asyncio.run(pool.render_many([_spec("a"), _spec("b")]))
+        results.put([png[:8] for png in pngs])
+    except BaseException as e:  # 子进程中的异常传回主进程断言
+        results.put(repr(e))
+    finally:
+        pool.shutdown()
+
+
+def test_daemonic_worker_renders_through_render_service():
+    # Celery prefork 的 worker 子进程是守护进程：渲染服务须在 fork 之前由主进程启动
+    chart_render_pool.start_chart_render_service(ChartRenderConfig(workers=2))
+    try:
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        worker = context.Process(target=_render_in_daemon, args=(results,), daemon=True)
+        worker.start()
+        outcome = results.get(timeout=60)
+        worker.join(10)
+    finally:
+        chart_render_pool.stop_chart_render_service()
+    assert outcome == [b"\x89PNG\r\n\x1a\n"] * 2
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from app.services.data.connectors.base_connector import QueryResult
+from app.services.data.connectors.columnar_result import DECIMAL_KEEP, ColumnarResult
+
+
+def test_from_rows_builds_typed_columns_and_converts_decimals():
+    rows = [(1, Decimal("1.50"), "a"), (2, Decimal("2.25"), "b")]
+    result = ColumnarResult.from_rows(rows, ["id", "amount", "name"])
+
+    assert result.column("id").dtype == np.int64
+    assert result.column("amount").dtype == np.float64
+    assert result.to_records() == [
+        {"id": 1, "amount": 1.5, "name": "a"},
+        {"id": 2, "amount": 2.25, "name": "b"},
+    ]
+
+
+def test_from_rows_keeps_nulls_and_optional_decimal_policy():
+    rows = [(Decimal("1.1"), None), (None, 3)]
+    result = ColumnarResult.from_rows(rows, ["amount", "qty"], decimal_policy=DECIMAL_KEEP)
+
+    records = result.to_records()
+    assert records[0]["amount"] == Decimal("1.1")
+    assert records[1] == {"amount": None, "qty": 3}
+
+
+def test_row_views_read_without_materializing():
+    result = ColumnarResult.from_rows([(10, "x"), (20, "y")], ["value", "label"])
+
+    row = result[1]
+    assert row["value"] == 20 and isinstance(row["value"], int)
+    assert dict(row) == {"value": 20, "label": "y"}
+    assert [r["label"] for r in result] == ["x", "y"]
+    assert result.head(1).to_records() == [{"value": 10, "label": "x"}]
+
+
+def test_scalar_and_nan_become_json_safe():
+    result = ColumnarResult.from_rows([("1",), (None,)], ["total"], column_types=["DOUBLE"])
+    assert result.column("total").dtype == np.float64
+    assert result.to_records() == [{"total": 1.0}, {"total": None}]
+    assert ColumnarResult.from_rows([(42,)], ["cnt"]).scalar() == 42
+
+
+def test_http_date_and_boolean_columns_are_converted():
+    rows = [("2024-01-31", "2024-01-31 08:30:00", "true"), ("bad", None, "0")]
+    result = ColumnarResult.from_rows(
+        rows, ["day", "created_at", "active"], column_types=["DATE", "DATETIME", "BOOLEAN"]
+    )
+
+    records = result.to_records()
+    assert records[0]["day"] == pd.Timestamp("2024-01-31")
+    assert records[0]["created_at"] == pd.Timestamp("2024-01-31 08:30:00")
+    assert records[1]["day"] is None and records[1]["created_at"] is None
+    assert result.column("active").dtype == np.bool_
+    assert [r["active"] for r in records] == [True, False]
+
+
+def test_from_dataframe_shares_numeric_buffers():
+    df = pd.DataFrame({"a": np.arange(5, dtype=np.int64), "b": [Decimal("1")] * 5})
+    result = ColumnarResult.from_dataframe(df)
+
+    assert np.shares_memory(result.column("a"), df["a"].to_numpy())
+    assert result.to_records()[0] == {"a": 0, "b": 1.0}
+
+
+def test_query_result_to_dict_uses_columnar_records():
+    columnar = ColumnarResult.from_rows([(1, Decimal("2.5"))], ["id", "amount"])
+    result = QueryResult(data=columnar.to_dataframe(), execution_time=0.1, success=True, columnar=columnar)
+
+    payload = result.to_dict()
+    assert payload["data"] == [{"id": 1, "amount": 2.5}]
+    assert payload["columns"] == ["id", "amount"]
+    assert payload["row_count"] == 1
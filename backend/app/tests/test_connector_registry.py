@@ -0,0 +1,96 @@
+import pytest
+
+from app.services.data.connectors.connector_registry import (
+    ConnectorRegistry,
+    ConnectorRegistryConfig,
+    build_connection_fingerprint,
+)
+
+CONFIG = {"source_type": "doris", "fe_hosts": ["fe2", "fe1"], "database": "sales", "username": "u", "password": "p"}
+
+
+class _FakeConnector:
+    instances = []
+
+    def __init__(self, source_type, name, config):
+        self.connects = 0
+        self.disconnects = 0
+        self.healthy = True
+        _FakeConnector.instances.append(self)
+
+    async def connect(self):
+        self.connects += 1
+
+    async def disconnect(self):
+        self.disconnects += 1
+
+    async def test_connection(self):
+        return {"success": self.healthy}
+
+
+def _registry(**overrides):
+    _FakeConnector.instances = []
+    return ConnectorRegistry(ConnectorRegistryConfig(**overrides))
+
+
+def test_fingerprint_ignores_non_identity_fields():
+    base = build_connection_fingerprint("doris", CONFIG)
+    assert build_connection_fingerprint("doris", {**CONFIG, "name": "x", "timeout": 5}) == base
+    assert build_connection_fingerprint("doris", {**CONFIG, "fe_hosts": ["fe1", "fe2"]}) == base
+    assert build_connection_fingerprint("doris", {**CONFIG, "database": "other"}) != base
+
+
+@pytest.mark.asyncio
+async def test_connector_is_reused_across_queries():
+    registry = _registry()
+    for _ in range(3):
+        async with registry.connection("doris", "a", CONFIG, factory=_FakeConnector) as connector:
+            pass
+    assert len(_FakeConnector.instances) == 1
+    assert connector.connects == 1 and connector.disconnects == 0
+    assert registry.get_stats()["reused"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidated_connector_closes_after_return():
+    registry = _registry()
+    async with registry.connection("doris", "a", CONFIG, factory=_FakeConnector) as connector:
+        assert registry.invalidate_config("doris", {**CONFIG, "name": "renamed"}) == 1
+        assert connector.disconnects == 0
+    assert connector.disconnects == 1
+
+    async with registry.connection("doris", "a", CONFIG, factory=_FakeConnector) as fresh:
+        assert fresh is not connector
+
+
+@pytest.mark.asyncio
+async def test_failed_query_and_health_check_replace_connector():
+    registry = _registry(health_check_interval_seconds=0)
+    with pytest.raises(RuntimeError):
+        async with registry.connection("doris", "a", CONFIG, factory=_FakeConnector) as first:
+            raise RuntimeError("boom")
+    assert first.disconnects == 1
+
+    async with registry.connection("doris", "a", CONFIG, factory=_FakeConnector) as second:
+        second.healthy = False
+    async with registry.connection("doris", "a", CONFIG, factory=_FakeConnector) as third:
+        pass
+    assert third is not second and second.disconnects == 1
+    assert registry.get_stats()["health_check_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_registry_uses_one_shot_connections():
+    registry = _registry(enabled=False)
+
+    class _Managed(_FakeConnector):
+        async def __aenter__(self):
+            await self.connect()
+            return self
+
+        async def __aexit__(self, *exc):
+            await self.disconnect()
+
+    async with registry.connection("doris", "a", CONFIG, factory=_Managed) as connector:
+        pass
+    assert connector.disconnects == 1
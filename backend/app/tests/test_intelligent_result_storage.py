@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import threading
+import types
+
+import pytest
+
+# 性能监控模块不在本仓库中，测试时以空实现代替
+_monitor = types.ModuleType("app.services.llm_agents.monitoring.performance_monitor")
+_monitor.get_performance_monitor = lambda: None
+_monitor.monitor_performance = lambda *args, **kwargs: (lambda func: func)
+sys.modules.setdefault(_monitor.__name__, _monitor)
+
+from app.services.infrastructure.storage.intelligent_result_storage import (  # noqa: E402
+    InMemoryStorage,
+    ResultDatabase,
+    ResultType,
+    StorageMetadata,
+)
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = ResultDatabase(str(tmp_path / "results.db"), reader_pool_size=2)
+    yield db
+    db.close()
+
+
+def _metadata(result_id, tags=(), priority=1):
+    return StorageMetadata(
+        result_id=result_id,
+        result_type=ResultType.SQL_GENERATION,
+        context_id="ctx",
+        tags=list(tags),
+        priority=priority,
+    )
+
+
+def test_cancelled_queued_write_is_skipped_and_writer_survives(database):
+    release = threading.Event()
+    executed = []
+
+    def _blocking(conn):
+        release.wait(5)
+        executed.append("blocking")
+
+    def _cancelled(conn):
+        executed.append("cancelled")
+
+    async def scenario():
+        blocker = asyncio.ensure_future(database._write(_blocking))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(database._write(_cancelled))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        await blocker
+        await asyncio.wait_for(database.save_metadata(_metadata("r1", tags=["daily"])), 2)
+
+    asyncio.run(scenario())
+    assert executed == ["blocking"]
+    assert database._writer._thread.is_alive()
+
+
+def test_tag_index_search_and_batched_writes(database):
+    async def scenario():
+        await asyncio.gather(
+            database.save_metadata(_metadata("a", tags=["daily", "sales"], priority=1)),
+            database.save_metadata(_metadata("b", tags=["weekly"], priority=5)),
+            database.save_metadata(_metadata("c", tags=["sales"], priority=3)),
+        )
+        await database.save_data("a", b"payload")
+        by_tag = await database.search_result_ids(tags=["sales"])
+        by_any_tag = await database.search_result_ids(tags=["weekly", "daily"])
+        data = await database.get_data("a")
+        removed = await database.delete_result("c")
+        after_delete = await database.search_result_ids(tags=["sales"])
+        return by_tag, by_any_tag, data, removed, after_delete
+
+    by_tag, by_any_tag, data, removed, after_delete = asyncio.run(scenario())
+    assert by_tag == ["c", "a"]
+    assert by_any_tag == ["b", "a"]
+    assert data == b"payload"
+    assert removed is None
+    assert after_delete == ["a"]
+
+
+def test_memory_storage_evicts_least_recently_used():
+    storage = InMemoryStorage(max_memory_mb=1)
+    half = 512 * 1024
+    assert storage.store("old", "x", _metadata("old"), size_bytes=half)
+    assert storage.store("recent", "y", _metadata("recent"), size_bytes=half - 10)
+    assert storage.retrieve("old")[0] == "x"
+
+    assert storage.store("new", "z", _metadata("new"), size_bytes=100)
+    assert storage.retrieve("recent") is None
+    assert storage.retrieve("old") is not None
+    assert storage.get_current_size() == half + 100
+    assert not storage.store("huge", "w", _metadata("huge"), size_bytes=2 * 1024 * 1024)
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services.infrastructure.llm.http_client_pool import HttpPoolConfig, LLMHttpClientPool
+
+SERVER = SimpleNamespace(id=1, name="local", base_url="http://llm.local/v1")
+
+
+def _pool_with_transport(handler):
+    pool = LLMHttpClientPool(HttpPoolConfig(http2=False, coalesce_json_requests=True))
+    clients = []
+
+    def get_client(server):
+        if not clients:
+            clients.append(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        return clients[0]
+
+    pool.get_client = get_client
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_identical_json_requests_are_sent_once():
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "{}"}}]})
+
+    pool = _pool_with_transport(handler)
+    url = f"{SERVER.base_url}/chat/completions"
+    payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+
+    responses = await asyncio.gather(*(pool.post(SERVER, url, payload, {}, coalesce=True) for _ in range(5)))
+    assert calls == 1
+    assert all(response.json()["choices"] for response in responses)
+
+    await pool.post(SERVER, url, payload, {})
+    assert calls == 2
+
+    # 采样请求（temperature > 0）每次都单独发送
+    sampled = dict(payload, temperature=0.2)
+    await asyncio.gather(*(pool.post(SERVER, url, sampled, {}, coalesce=True) for _ in range(3)))
+    assert calls == 5
+
+    metrics = pool.get_metrics()["servers"]["local"]
+    assert metrics["requests"] == 5
+    assert metrics["coalesced"] == 4
+    assert metrics["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_error_statuses_are_counted():
+    pool = _pool_with_transport(lambda request: httpx.Response(503, text="busy"))
+    response = await pool.post(SERVER, f"{SERVER.base_url}/messages", {}, {})
+    assert response.status_code == 503
+
+    metrics = pool.get_metrics()["servers"]["local"]
+    assert metrics["errors"] == 1
+    assert metrics["status_codes"] == {503: 1}
+    assert metrics["last_error"] == "HTTP 503"
+
+
+@pytest.mark.asyncio
+async def test_client_is_reused_within_event_loop():
+    pool = LLMHttpClientPool(HttpPoolConfig(http2=False))
+    first = pool.get_client(SERVER)
+    assert pool.get_client(SERVER) is first
+    assert pool.get_client(SimpleNamespace(id=2, name="other", base_url="http://other")) is not first
+    await pool.aclose()
+    assert first.is_closed
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.infrastructure.llm.rate_limiter import (
+    BudgetSpec,
+    LimiterConfig,
+    LLMRateLimiter,
+    LocalBucketStore,
+    PrioritySlots,
+    RateLimitExceeded,
+)
+
+
+def _limiter(**overrides):
+    config = LimiterConfig(min_interval_seconds=0, request_timeout_seconds=5, burst_seconds=1)
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return LLMRateLimiter(config)
+
+
+@pytest.mark.asyncio
+async def test_requests_queue_instead_of_being_rejected():
+    limiter = _limiter(max_concurrent_per_server=1)
+    first = await limiter.acquire(server="s1")
+
+    waiter = asyncio.ensure_future(limiter.acquire(server="s1"))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    limiter.release(lease=first)
+    second = await asyncio.wait_for(waiter, 1)
+    assert second and second.wait_seconds > 0
+    limiter.release(lease=second)
+    assert limiter.metrics.blocked_requests == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline_returns_none():
+    limiter = _limiter(max_concurrent_per_server=1)
+    held = await limiter.acquire(server="s1")
+    assert await limiter.acquire(server="s1", timeout=0.05) is None
+    assert limiter.metrics.blocked_requests == 1
+
+    with pytest.raises(RateLimitExceeded):
+        async with limiter.limit(server="s1", timeout=0.05):
+            pass
+    limiter.release(lease=held)
+
+
+@pytest.mark.asyncio
+async def test_priority_waiters_are_served_first():
+    slots = PrioritySlots(1)
+    assert await slots.acquire()
+    order = []
+
+    async def wait(name, priority):
+        await slots.acquire(priority)
+        order.append(name)
+        slots.release()
+
+    tasks = [asyncio.ensure_future(wait("low", 0)), asyncio.ensure_future(wait("high", 5))]
+    await asyncio.sleep(0.01)
+    slots.release()
+    await asyncio.gather(*tasks)
+    assert order == ["high", "low"]
+
+
+@pytest.mark.asyncio
+async def test_request_budget_spaces_calls_per_server():
+    limiter = _limiter(server_budget=BudgetSpec(requests_per_minute=600))  # 10/s，突发容量10
+    start = time.monotonic()
+    for _ in range(12):
+        limiter.release(lease=await limiter.acquire(server="s1"))
+    assert time.monotonic() - start >= 0.15
+
+    # 其他服务器使用独立的令牌桶
+    start = time.monotonic()
+    limiter.release(lease=await limiter.acquire(server="s2"))
+    assert time.monotonic() - start < 0.05
+
+
+def test_token_budget_is_corrected_with_actual_usage():
+    store = LocalBucketStore()
+    bucket = ("user:u1:tpm", 10.0, 100.0, 80.0)
+    assert store.try_take([bucket]) == 0
+    # 实际用量比预估多50，补扣后余额为负，需要等待
+    store.adjust([(bucket[0], bucket[1], bucket[2], 50.0)])
+    assert store.try_take([(bucket[0], bucket[1], bucket[2], 10.0)]) > 3
+
+
+def test_overrides_take_precedence():
+    config = LimiterConfig(
+        server_budget=BudgetSpec(100, 0),
+        budget_overrides={"server:main": BudgetSpec.from_dict({"rpm": 500, "tpm": 1000})},
+    )
+    assert config.get_budget("server", "main").requests_per_minute == 500
+    assert config.get_budget("server", "other").requests_per_minute == 100
+
+
+@pytest.mark.asyncio
+async def test_adapter_calls_are_charged_to_the_user_budget(monkeypatch):
+    import app.services.infrastructure.llm as llm
+    from types import SimpleNamespace
+    from app.core.container import RealLLMServiceAdapter
+    from app.services.infrastructure.llm import model_executor
+
+    limiter = _limiter(user_budget=BudgetSpec(tokens_per_minute=600))  # 10 token/s，容量10
+    executor = model_executor.ModelExecutor(enable_streaming=False)
+    model = SimpleNamespace(id=1, name="m1", server_id=1, model_type="default", is_active=True, is_healthy=True)
+    server = SimpleNamespace(id=1, name="main", provider_type="openai", is_active=True, is_healthy=True)
+
+    async def select_model(**kwargs):
+        return {"model_id": 1, "model": "m1", "server_name": "main"}
+
+    async def call_provider(self, server, model, prompt, **kwargs):
+        return {"success": True, "result": '{"ok": true}', "tokens_used": 40}
+
+    monkeypatch.setattr(llm, "select_best_model_for_user", select_model)
+    monkeypatch.setattr(llm, "get_model_executor", lambda: executor)
+    monkeypatch.setattr(model_executor, "SessionLocal", lambda: SimpleNamespace(close=lambda: None))
+    monkeypatch.setattr(model_executor, "crud_llm_model", SimpleNamespace(get=lambda db, id: model))
+    monkeypatch.setattr(model_executor, "crud_llm_server", SimpleNamespace(get=lambda db, id: server))
+    monkeypatch.setattr(model_executor, "get_llm_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(model_executor.ModelExecutor, "_call_openai_compatible", call_provider)
+
+    response = await RealLLMServiceAdapter().ask("u1", "生成查询", llm_policy={"stage": "sql_generation"})
+    assert response["response"] == '{"ok": true}'
+
+    # 实际用量40超出用户桶容量，同一用户的下一次调用需要排队，其他用户不受影响
+    assert await limiter.acquire(server="main", user_id="u1", estimated_tokens=1, timeout=0.05) is None
+    other = await limiter.acquire(server="main", user_id="u2", estimated_tokens=1, timeout=0.05)
+    assert other
+    limiter.release(lease=other)
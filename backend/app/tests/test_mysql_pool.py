@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.services.data.connectors import mysql_pool
+from app.services.data.connectors.mysql_pool import MySQLConnectionPool, MySQLPoolConfig, build_pool_fingerprint
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.ping_calls = 0
+        self.healthy = True
+
+    def ping(self, reconnect=False):
+        self.ping_calls += 1
+        if not self.healthy:
+            raise mysql_pool.pymysql.err.OperationalError(2006, "MySQL server has gone away")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    created = []
+
+    def _connect(**kwargs):
+        conn = _FakeConnection()
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(mysql_pool.pymysql, "connect", _connect)
+    return created
+
+
+def _make_pool(**config):
+    kwargs = {"host": "doris", "port": 9030, "user": "root", "password": "pw", "database": "db"}
+    return MySQLConnectionPool(build_pool_fingerprint(kwargs), kwargs, MySQLPoolConfig(**config))
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_connections(fake_connect):
+    pool = _make_pool(min_size=1, max_size=4)
+    try:
+        for _ in range(5):
+            await pool.run(lambda conn: id(conn))
+        assert len(fake_connect) == 1
+        metrics = pool.get_metrics()
+        assert metrics["borrowed_total"] == 5
+        assert metrics["in_use"] == 0
+        assert metrics["idle"] == 1
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_bounds_concurrency_by_max_size(fake_connect):
+    pool = _make_pool(min_size=0, max_size=2)
+    try:
+        import time
+
+        await asyncio.gather(*(pool.run(lambda conn: time.sleep(0.05)) for _ in range(6)))
+        assert len(fake_connect) <= 2
+        assert pool.get_metrics()["size"] <= 2
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_discards_unhealthy_connection_on_borrow(fake_connect):
+    pool = _make_pool(min_size=0, max_size=1, health_check_interval=0)
+    try:
+        await pool.run(lambda conn: None)
+        fake_connect[0].healthy = False
+        await pool.run(lambda conn: None)
+        assert len(fake_connect) == 2
+        assert fake_connect[0].closed is True
+        assert pool.get_metrics()["health_check_failures"] == 1
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_reaps_idle_connections_above_min_size(fake_connect):
+    pool = _make_pool(min_size=0, max_size=2, idle_timeout=0)
+    try:
+        await pool.run(lambda conn: None)
+        await asyncio.sleep(0.01)
+        pool.reap_idle()
+        assert pool.get_metrics()["idle"] == 0
+        assert fake_connect[0].closed is True
+    finally:
+        pool.close()
+
+
+def test_fingerprint_distinguishes_credentials():
+    base = {"host": "doris", "port": 9030, "user": "root", "database": "db"}
+    fp1 = build_pool_fingerprint({**base, "password": "a"})
+    fp2 = build_pool_fingerprint({**base, "password": "b"})
+    assert fp1 != fp2
+    assert len(fp1) == 64
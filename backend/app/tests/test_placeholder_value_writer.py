@@ -0,0 +1,88 @@
+import json
+import uuid
+
+from app import crud
+from app.services.data.persistence.placeholder_value_writer import (
+    PlaceholderValueWriter,
+    PlaceholderValueWriterConfig,
+    is_raw_result_ref,
+    load_raw_query_result,
+)
+
+
+class _FakeStorage:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def file_exists(self, path):
+        return path in self.objects
+
+    def upload_with_key(self, data, object_name, content_type=None):
+        self.uploads += 1
+        self.objects[object_name] = data.read()
+        return {"file_path": object_name}
+
+    def download_file(self, path):
+        return self.objects[path], "minio"
+
+
+def _value(placeholder_id, data_source_id, raw, cache_key=None, success=True):
+    return {
+        "placeholder_id": placeholder_id,
+        "data_source_id": data_source_id,
+        "raw_query_result": raw,
+        "success": success,
+        "is_latest_version": True,
+        "cache_key": cache_key,
+    }
+
+
+def test_build_rows_offloads_large_results_and_dedups_cache_keys():
+    storage = _FakeStorage()
+    writer = PlaceholderValueWriter(None, PlaceholderValueWriterConfig(offload_threshold=64), storage=storage)
+    ph, ds = uuid.uuid4(), uuid.uuid4()
+    big = [{"region": f"区域{i}", "amount": i} for i in range(20)]
+
+    writer.extend([
+        _value(ph, ds, [{"v": 1}], cache_key="k1"),
+        _value(ph, ds, big, cache_key="k1"),
+        _value(uuid.uuid4(), ds, big),
+    ])
+    rows = writer.build_rows()
+
+    assert len(rows) == 2
+    assert all(row["id"] for row in rows)
+    assert "created_at" not in rows[0]
+    assert is_raw_result_ref(rows[0]["raw_query_result"])
+    assert rows[0]["raw_query_result"] == rows[1]["raw_query_result"]
+    assert storage.uploads == 1
+    assert load_raw_query_result(rows[0]["raw_query_result"], storage=storage) == json.loads(
+        json.dumps(big, ensure_ascii=False)
+    )
+    assert load_raw_query_result([{"v": 1}]) == [{"v": 1}]
+
+
+def test_flush_flips_latest_versions_for_successful_rows_only(monkeypatch):
+    calls = {}
+
+    def mark_as_outdated_bulk(db, *, pairs):
+        calls["pairs"] = list(pairs)
+        return 1
+
+    def bulk_upsert(db, *, rows):
+        calls["rows"] = rows
+        return len(rows)
+
+    monkeypatch.setattr(crud.placeholder_value, "mark_as_outdated_bulk", mark_as_outdated_bulk)
+    monkeypatch.setattr(crud.placeholder_value, "bulk_upsert", bulk_upsert)
+
+    ok_id, failed_id, ds = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    writer = PlaceholderValueWriter(None, PlaceholderValueWriterConfig())
+    writer.add(_value(ok_id, ds, [1]))
+    writer.add(_value(failed_id, ds, None, success=False))
+
+    assert writer.flush() == 2
+    assert calls["pairs"] == [(ok_id, ds)]
+    assert len(writer) == 0
+    assert writer.flush() == 0
@@ -0,0 +1,142 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.infrastructure.task_queue import progress_recorder
+from app.services.infrastructure.task_queue.progress_recorder import (
+    ProgressRecorderConfig,
+    TaskProgressRecorder,
+    progress_stream_key,
+    request_cancellation,
+)
+
+
+class _FakeDB:
+    def __init__(self):
+        self.commits = 0
+        self.updates = []
+        self.status = None
+        self.status_queries = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement):
+        self.updates.append(statement)
+
+    def commit(self):
+        self.commits += 1
+
+    def query(self, *columns):
+        return self
+
+    def filter(self, *conditions):
+        return self
+
+    def scalar(self):
+        self.status_queries += 1
+        return self.status
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.ops.append((key, fields))
+
+    def expire(self, key, ttl):
+        pass
+
+    def execute(self):
+        self.redis.pipelines += 1
+        for key, fields in self.ops:
+            self.redis.streams.setdefault(key, []).append(fields)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.keys = {}
+        self.streams = {}
+        self.pipelines = 0
+
+    def set(self, key, value, ex=None):
+        self.keys[key] = value
+
+    def exists(self, key):
+        return int(key in self.keys)
+
+    def pipeline(self, transaction=False):
+        return _FakePipeline(self)
+
+
+@pytest.fixture
+def db():
+    return _FakeDB()
+
+
+@pytest.fixture
+def recorder(monkeypatch, db):
+    monkeypatch.setattr(progress_recorder, "set_committed_value", setattr)
+    monkeypatch.setattr(progress_recorder, "_dispatch_async", lambda coro: coro.close())
+
+    task = SimpleNamespace(id=1, owner_id=uuid.uuid4(), template_id=None, data_source_id=None)
+    execution = SimpleNamespace(
+        id=1, execution_id=uuid.uuid4(), progress_details=None, progress_percentage=0, current_step=None
+    )
+    config = ProgressRecorderConfig(flush_interval=3600, flush_batch_size=5)
+    return TaskProgressRecorder(
+        task, execution, config=config, redis_client=_FakeRedis(), session_factory=lambda: db
+    )
+
+
+def test_events_are_flushed_in_batches(recorder, db):
+    for i in range(9):
+        recorder.update(i * 10, f"步骤{i}")
+
+    # start + 9 次更新 = 10 个事件，两次批量写入（各在独立会话中一次 UPDATE）
+    assert db.commits == 2
+    assert len(db.updates) == 2
+    assert len(recorder.task_execution.progress_details) == 10
+    assert recorder.task_execution.progress_percentage == 80
+    assert recorder.task_execution.current_step == "步骤8"
+
+    recorder.update(90, "只记录", record_only=True)
+    assert recorder.progress_percentage == 80
+    recorder.complete()
+    assert db.commits == 3
+    assert recorder.task_execution.progress_percentage == 100
+
+    stream = recorder._redis.streams[progress_stream_key(recorder.execution_id)]
+    assert [json.loads(fields["event"])["progress"] for fields in stream][-2:] == [90, 100]
+    assert recorder._redis.pipelines == 3
+
+
+def test_cancellation_flag_stops_updates_but_not_failure(recorder):
+    recorder.update(10, "运行中")
+    request_cancellation(recorder.execution_id, redis_client=recorder._redis)
+
+    with pytest.raises(Exception, match="取消"):
+        recorder.update(20, "继续")
+
+    recorder.fail("任务已取消", stage="cancelled")
+    assert recorder.task_execution.progress_details[-1]["status"] == "failed"
+    assert recorder.task_execution.progress_percentage == 10
+
+
+def test_database_status_detects_cancellation_without_redis_flag(recorder, db):
+    from app.models.task import TaskStatus
+
+    recorder.config.cancel_check_interval = 0
+    assert not recorder.is_cancelled()
+
+    # 取消标记写入 Redis 失败，但执行状态已在数据库中标记为取消
+    db.status = TaskStatus.CANCELLED
+    assert recorder.is_cancelled()
+    assert db.status_queries == 2
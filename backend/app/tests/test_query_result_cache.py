@@ -0,0 +1,146 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.data.connectors import connector_factory
+from app.services.data.connectors.columnar_result import ColumnarResult
+from app.services.data.query import query_result_cache
+from app.services.data.query.batch_query_executor import BatchQueryItem, run_batch_queries
+from app.services.data.query.query_result_cache import (
+    QueryResultCache,
+    QueryResultCacheConfig,
+    canonicalize_sql,
+    extract_tables,
+)
+from app.services.infrastructure.cache.unified_cache_system import UnifiedCacheManager
+
+CONFIG = {"source_type": "doris", "fe_hosts": ["fe1"], "database": "sales", "username": "u", "password": "p"}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(QueryResultCache, "_get_redis_client", staticmethod(lambda: None))
+    instance = QueryResultCache(
+        QueryResultCacheConfig(), manager=UnifiedCacheManager(enable_redis=False, enable_database=False)
+    )
+    monkeypatch.setattr(query_result_cache, "_query_result_cache", instance)
+    return instance
+
+
+def test_canonicalize_sql_keeps_literals():
+    sql = "SELECT  a -- comment\n FROM   t /* x */ WHERE s = 'a  b';"
+    assert canonicalize_sql(sql) == "SELECT a FROM t WHERE s = 'a  b'"
+    assert extract_tables("SELECT * FROM db.`Orders` o JOIN items i ON o.id = i.oid WHERE x = 'from y'") == [
+        "items",
+        "orders",
+    ]
+
+
+def test_ttl_depends_on_report_period(cache):
+    today = date(2024, 6, 15)
+    closed = {"start": "2024-06-01 00:00:00", "end": "2024-06-14 23:59:59"}
+    open_monthly = {"start_date": "2024-06-01", "end_date": "2024-06-30", "report_period": "monthly"}
+    assert cache.resolve_ttl(closed, today) == cache.config.closed_period_ttl_seconds
+    assert cache.resolve_ttl(open_monthly, today) == cache.config.open_period_ttl_seconds * 4
+    assert cache.resolve_ttl(None, today) == cache.config.default_ttl_seconds
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_caches_success_only(cache):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"success": True, "rows": [{"v": 1}], "columns": ["v"]}
+
+    for sql in ("SELECT v FROM t", "SELECT  v\nFROM t;"):
+        result = await cache.get_or_load("doris", {**CONFIG, "name": "n"}, sql, loader)
+        assert result["rows"] == [{"v": 1}]
+    assert len(calls) == 1
+
+    async def failing():
+        calls.append(1)
+        return None
+
+    assert await cache.get_or_load("doris", CONFIG, "SELECT 2", failing) is None
+    assert await cache.get_or_load("doris", CONFIG, "SELECT 2", failing) is None
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_table_invalidation_changes_key(cache):
+    before = await cache.build_key("doris", CONFIG, "SELECT * FROM orders")
+    unrelated = await cache.build_key("doris", CONFIG, "SELECT * FROM items")
+    cache.invalidate_table("doris", CONFIG, "sales.orders")
+    assert await cache.build_key("doris", CONFIG, "SELECT * FROM orders") != before
+    assert await cache.build_key("doris", CONFIG, "SELECT * FROM items") == unrelated
+
+    # ETL 重写目标表时不区分数据源
+    before = await cache.build_key("doris", CONFIG, "SELECT * FROM orders")
+    cache.invalidate_table(None, None, "orders")
+    assert await cache.build_key("doris", CONFIG, "SELECT * FROM orders") != before
+    assert await cache.build_key("doris", CONFIG, "SELECT * FROM items") == unrelated
+
+    # 数据源被修改或删除时失效该数据源的全部结果
+    other_source = {**CONFIG, "database": "hr"}
+    other = await cache.build_key("doris", other_source, "SELECT * FROM items")
+    cache.invalidate_source("doris", CONFIG)
+    assert await cache.build_key("doris", CONFIG, "SELECT * FROM items") != unrelated
+    assert await cache.build_key("doris", other_source, "SELECT * FROM items") == other
+
+
+@pytest.mark.asyncio
+async def test_batch_queries_skip_connection_when_cached(cache, monkeypatch):
+    created = []
+
+    class _Connector:
+        def __init__(self):
+            created.append(self)
+
+        async def connect(self):
+            pass
+
+        async def disconnect(self):
+            pass
+
+        async def execute_query(self, sql):
+            return SimpleNamespace(success=True, to_columnar=lambda: ColumnarResult.from_rows([(len(sql),)], ["n"]))
+
+    monkeypatch.setattr(connector_factory, "create_connector_from_config", lambda **kwargs: _Connector())
+    items = [BatchQueryItem(key=str(i), sql=f"SELECT {i} FROM t") for i in range(3)]
+    window = {"start": "2020-01-01 00:00:00", "end": "2020-01-31 23:59:59"}
+
+    first = await run_batch_queries("doris", "ds", CONFIG, items, time_window=window)
+    progress = []
+    second = await run_batch_queries(
+        "doris", "ds", CONFIG, items, time_window=window, on_complete=lambda done, total, _: progress.append(done)
+    )
+
+    assert len(created) == 1
+    assert list(second) == list(first)
+    assert [o.result.to_columnar().scalar() for o in second.values()] == [
+        o.result.to_columnar().scalar() for o in first.values()
+    ]
+    assert progress == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_cached_run_query_runs_a_failing_query_once(cache):
+    calls = []
+
+    async def raising(config, sql, limit):
+        calls.append(sql)
+        raise ConnectionError("connection reset")
+
+    async def failing(config, sql, limit):
+        calls.append(sql)
+        return {"success": False, "error": "syntax error"}
+
+    with pytest.raises(ConnectionError):
+        await query_result_cache.cached_run_query(raising, CONFIG, "SELECT 1 FROM t")
+    assert len(calls) == 1
+
+    result = await query_result_cache.cached_run_query(failing, CONFIG, "SELECT 2 FROM t")
+    assert result == {"success": False, "error": "syntax error"}
+    assert len(calls) == 2
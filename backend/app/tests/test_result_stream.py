@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from app.services.data.connectors.columnar_result import ColumnarResult
+from app.services.data.connectors.result_stream import (
+    ResultSpool,
+    StreamAborted,
+    aggregate_stream,
+    collect_stream,
+    iterate_producer,
+    sample_stream,
+)
+
+
+def _threaded_stream(total_rows, chunk_rows, produced):
+    """模拟连接器：在工作线程中逐块读取"""
+
+    def _produce(emit):
+        for start in range(0, total_rows, chunk_rows):
+            rows = [(i, i % 3) for i in range(start, min(start + chunk_rows, total_rows))]
+            produced.append(len(rows))
+            if not emit(ColumnarResult.from_rows(rows, ["id", "grp"])):
+                raise StreamAborted("stopped")
+
+    return iterate_producer(lambda emit: asyncio.to_thread(_produce, emit), max_buffered_chunks=1)
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_all_chunks_in_order():
+    produced = []
+    ids = []
+    async for chunk in _threaded_stream(25, 10, produced):
+        ids.extend(chunk.column("id").tolist())
+    assert ids == list(range(25))
+    assert produced == [10, 10, 5]
+
+
+@pytest.mark.asyncio
+async def test_stream_applies_backpressure_and_stops_producer_early():
+    produced = []
+    spool = await collect_stream(_threaded_stream(10_000, 100, produced), memory_budget_bytes=1 << 20, max_rows=150)
+    with spool:
+        assert spool.row_count == 150
+        assert spool.to_columnar().column("id").tolist() == list(range(150))
+    # 生产者受有界队列约束，只比消费者多读少量数据块
+    assert len(produced) <= 5
+
+
+@pytest.mark.asyncio
+async def test_producer_errors_propagate_to_consumer():
+    def _produce(emit):
+        emit(ColumnarResult.from_rows([(1,)], ["x"]))
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        async for _ in iterate_producer(lambda emit: asyncio.to_thread(_produce, emit)):
+            pass
+
+
+def test_spool_spills_to_disk_beyond_budget():
+    chunk = ColumnarResult.from_rows([(i, float(i)) for i in range(100)], ["a", "b"])
+    with ResultSpool(memory_budget_bytes=chunk.nbytes) as spool:
+        for _ in range(3):
+            spool.append(chunk)
+        stats = spool.get_stats()
+        assert stats["spilled"] is True
+        assert stats["spilled_chunks"] == 2
+        assert spool.row_count == 300
+        assert len(spool.to_columnar()) == 300
+        assert spool.head(150).column("a").tolist() == list(range(100)) + list(range(50))
+
+
+@pytest.mark.asyncio
+async def test_sample_and_aggregate_consume_incrementally():
+    sample = await sample_stream(_threaded_stream(1000, 64, []), sample_size=20, seed=7)
+    assert len(sample) == 20
+    assert len(set(sample.column("id").tolist())) == 20
+
+    records = await aggregate_stream(
+        _threaded_stream(30, 7, []), group_by=["grp"], aggregations={"id": "count"}
+    )
+    assert sorted((r["grp"], r["id"]) for r in records) == [(0, 10), (1, 10), (2, 10)]
+
+
+class _StreamingConnector:
+    def __init__(self, total_rows, chunk_rows):
+        self.total_rows = total_rows
+        self.chunk_rows = chunk_rows
+
+    async def execute_query_stream(self, query, chunk_rows=None):
+        for start in range(0, self.total_rows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, self.total_rows)
+            yield ColumnarResult.from_rows([(i,) for i in range(start, stop)], ["id"])
+
+
+@pytest.mark.asyncio
+async def test_etl_query_stream_materializes_only_on_request():
+    from app.services.data.processing.etl.etl_service import ETLService
+
+    service = ETLService(user_id="tester")
+    connector = _StreamingConnector(total_rows=250, chunk_rows=100)
+
+    result = await service._consume_query_stream(connector, {"query": "SELECT id FROM t", "preview_rows": 5})
+    with result["spool"] as spool:
+        assert result["row_count"] == 250
+        assert [r["id"] for r in result["data"]] == [0, 1, 2, 3, 4]
+        assert sum(len(chunk) for chunk in spool.iter_chunks()) == 250
+
+    seen = []
+
+    async def on_chunk(chunk):
+        seen.append(len(chunk))
+
+    result = await service._consume_query_stream(
+        connector, {"query": "SELECT id FROM t", "on_chunk": on_chunk, "max_rows": 150}
+    )
+    assert seen == [100, 50]
+    assert result["row_count"] == 150 and result["data"] == []
+
+    result = await service._consume_query_stream(connector, {"query": "SELECT id FROM t", "materialize": True})
+    assert [r["id"] for r in result["data"]] == list(range(250))
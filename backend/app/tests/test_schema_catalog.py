@@ -0,0 +1,88 @@
+import pytest
+
+from app.services.infrastructure.agents.tools.schema.catalog import SchemaCatalog, build_catalog_key
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return False
+        self.store[key] = value
+        return True
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+class _StubDataSource:
+    def __init__(self):
+        self.queries = []
+        self.update_time = "2024-01-01 00:00:00"
+
+    async def run_query(self, connection_config, sql, limit=1000):
+        self.queries.append(sql)
+        if "information_schema.tables" in sql:
+            return {"success": True, "rows": [
+                {"TABLE_NAME": "orders", "TABLE_TYPE": "BASE TABLE", "TABLE_COMMENT": "订单", "UPDATE_TIME": self.update_time},
+                {"TABLE_NAME": "users", "TABLE_TYPE": "BASE TABLE", "TABLE_COMMENT": "", "UPDATE_TIME": "2024-01-01"},
+            ]}
+        if "information_schema.columns" in sql:
+            rows = [
+                {"TABLE_NAME": "orders", "COLUMN_NAME": "id", "COLUMN_TYPE": "bigint", "IS_NULLABLE": "NO", "COLUMN_KEY": "PRI"},
+                {"TABLE_NAME": "orders", "COLUMN_NAME": "amount", "COLUMN_TYPE": "decimal(10,2)", "IS_NULLABLE": "YES"},
+                {"TABLE_NAME": "users", "COLUMN_NAME": "id", "COLUMN_TYPE": "bigint", "IS_NULLABLE": "NO", "COLUMN_KEY": "PRI"},
+            ]
+            if "TABLE_NAME IN" in sql:
+                rows = [row for row in rows if f"'{row['TABLE_NAME']}'" in sql]
+            return {"success": True, "rows": rows}
+        return {"success": False, "error": "unsupported"}
+
+
+CONFIG = {"source_type": "doris", "fe_hosts": ["doris"], "query_port": 9030, "database": "sales", "password": "pw"}
+
+
+@pytest.mark.asyncio
+async def test_catalog_loads_once_and_is_shared_across_instances():
+    redis = _FakeRedis()
+    source = _StubDataSource()
+
+    first = SchemaCatalog(redis_client=redis)
+    columns = await first.get_columns(source, CONFIG, ["orders"])
+    assert [row["Field"] for row in columns["orders"]] == ["id", "amount"]
+    assert columns["orders"][0]["Key"] == "PRI"
+    query_count = len(source.queries)
+
+    # 另一个进程（新实例）直接从Redis读取，不再查询数据源
+    second = SchemaCatalog(redis_client=redis)
+    assert sorted(await second.get_table_names(source, CONFIG)) == ["orders", "users"]
+    assert len(source.queries) == query_count
+
+
+@pytest.mark.asyncio
+async def test_catalog_incremental_refresh_reloads_only_changed_tables():
+    source = _StubDataSource()
+    catalog = SchemaCatalog(refresh_interval=0, redis_client=_FakeRedis())
+
+    await catalog.get_snapshot(source, CONFIG)
+    source.update_time = "2024-02-01 00:00:00"
+    source.queries.clear()
+
+    snapshot = await catalog.get_snapshot(source, CONFIG)
+    column_queries = [sql for sql in source.queries if "information_schema.columns" in sql]
+    assert len(column_queries) == 1
+    assert "'orders'" in column_queries[0] and "'users'" not in column_queries[0]
+    assert snapshot.tables["orders"]["version"] == "2024-02-01 00:00:00"
+    assert catalog.get_stats()["tables_reloaded"] == 1
+
+
+def test_catalog_key_excludes_password():
+    assert build_catalog_key(CONFIG) == build_catalog_key({**CONFIG, "password": "other"})
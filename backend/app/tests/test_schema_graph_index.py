@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+from app.services.data.schemas.query_builder import NaturalLanguageQueryBuilder
+from app.services.data.schemas.schema_graph_index import (
+    SchemaGraphIndex,
+    SchemaGraphIndexStore,
+    schema_version,
+)
+
+
+def _table(columns, foreign_keys=()):
+    return SimpleNamespace(
+        columns=[{"name": name} for name in columns],
+        foreign_keys=[
+            {"column": column, "referenced_table": table, "referenced_column": referenced}
+            for column, table, referenced in foreign_keys
+        ],
+    )
+
+
+def _schema():
+    return SimpleNamespace(tables={
+        "users": _table(["id", "user_name", "created_at"]),
+        "orders": _table(["id", "user_id", "amount"], [("user_id", "users", "id")]),
+        "order_items": _table(["id", "order_id", "product_id"], [
+            ("order_id", "orders", "id"), ("product_id", "products", "id"),
+        ]),
+        "products": _table(["id", "title"]),
+        "audit_log": _table(["id", "message"]),
+    })
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_join_paths_follow_fk_edges_in_both_directions():
+    index = SchemaGraphIndex.build(_schema())
+
+    path = index.join_path("users", "products")
+    assert [(step["from_table"], step["to_table"]) for step in path] == [
+        ("users", "orders"), ("orders", "order_items"), ("order_items", "products"),
+    ]
+    assert (path[0]["from_column"], path[0]["to_column"]) == ("id", "user_id")
+    assert (path[-1]["from_column"], path[-1]["to_column"]) == ("product_id", "id")
+    assert index.join_path("users", "audit_log") == []
+    assert index.join_path("users", "users") == []
+
+    # 同一源表的 BFS 树只构建一次
+    assert index.bfs_tree("users") is index.bfs_tree("users")
+
+
+def test_keyword_index_matches_words_and_phrases():
+    builder = NaturalLanguageQueryBuilder(_schema())
+
+    context = builder.parse_natural_query("list order items with product_id and amount for each user")
+    assert context.target_tables == ["users", "orders", "order_items"]
+    assert builder._extract_columns("show user name, amount and id", ["orders", "users"]) == [
+        "id", "amount", "user_name",
+    ]
+    # 中文查询中紧邻的英文表名也能匹配，但不再按子串误匹配（username 不是 users）
+    assert builder._extract_tables("查询orders表中的username") == ["orders"]
+    assert builder.query_builder._find_column_table("title", "orders") == "products"
+
+
+def test_store_persists_index_and_rebuilds_on_schema_change():
+    redis = _FakeRedis()
+    schema = _schema()
+    first = SchemaGraphIndexStore(redis_client=redis).get_or_build(schema)
+
+    other_worker = SchemaGraphIndexStore(redis_client=redis)
+    restored = other_worker.get_or_build(schema)
+    assert restored is not first
+    assert restored.join_path("users", "products") == first.join_path("users", "products")
+    assert other_worker.get_stats()["redis_hits"] == 1
+
+    schema.tables["products"].foreign_keys.append(
+        {"column": "id", "referenced_table": "audit_log", "referenced_column": "id"}
+    )
+    assert schema_version(schema) != first.version
+    rebuilt = other_worker.get_or_build(schema)
+    assert rebuilt.join_path("users", "audit_log")[-1]["to_table"] == "audit_log"
+    assert other_worker.get_stats()["builds"] == 1
@@ -0,0 +1,180 @@
+import email
+import socketserver
+import threading
+
+import pytest
+
+from app.services.infrastructure.notification.smtp_pool import (
+    OutgoingMail,
+    SmtpMailer,
+    SmtpPoolConfig,
+)
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """最小化的本地 SMTP 服务器，用于替代真实邮件服务器"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                with server.lock:
+                    server.logins += 1
+                self.reply("235 ok")
+            elif verb == "RCPT" and "rejected" in command:
+                self.reply("550 no such user")
+            elif verb == "DATA":
+                with server.lock:
+                    drop = server.drop_data > 0
+                    server.drop_data -= int(drop)
+                if drop:
+                    self.reply("421 try again later")
+                    return
+                self.reply("354 go ahead")
+                lines = []
+                for data_line in iter(self.rfile.readline, b""):
+                    if data_line == b".\r\n":
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                with server.lock:
+                    server.messages.append(b"".join(lines))
+                    hang_up = server.drop_after_data > 0
+                    server.drop_after_data -= int(hang_up)
+                if hang_up:
+                    # 邮件已入队，但确认之前连接断开
+                    return
+                self.reply("250 queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class _LocalSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.logins = 0
+        self.drop_data = 0
+        self.drop_after_data = 0
+        self.messages = []
+
+
+@pytest.fixture
+def smtp_server():
+    server = _LocalSmtpServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _mailer(server, **overrides):
+    config = SmtpPoolConfig(
+        host="127.0.0.1",
+        port=server.server_address[1],
+        username="reporter",
+        password="secret",
+        pool_size=2,
+        retry_backoff=0,
+        attachment_chunk_size=57 * 4,
+        **overrides,
+    )
+    return SmtpMailer(config)
+
+
+def test_batch_reuses_authenticated_connections_and_streams_attachments(smtp_server, tmp_path):
+    report = tmp_path / "周报.docx"
+    payload = bytes(range(256)) * 40
+    report.write_bytes(payload)
+    mailer = _mailer(smtp_server)
+
+    mails = [
+        OutgoingMail(
+            sender="noreply@example.com",
+            sender_name="AutoReportAI",
+            to=[f"user{i}@example.com"],
+            subject=f"报告已生成 {i}",
+            html_body="<p>报告见附件</p>",
+            attachments=[str(report)],
+        )
+        for i in range(6)
+    ]
+    try:
+        results = mailer.send_batch(mails)
+    finally:
+        mailer.close()
+
+    assert [result.recipients for result in results] == [mail.to for mail in mails]
+    assert all(result.success and result.attempts == 1 for result in results)
+    assert len({result.connection_id for result in results}) <= 2
+    assert smtp_server.connections <= 2
+    assert smtp_server.logins == smtp_server.connections
+    assert len(smtp_server.messages) == 6
+
+    message = email.message_from_bytes(smtp_server.messages[0])
+    body, attachment = message.get_payload()
+    assert body.get_payload(decode=True).decode("utf-8") == "<p>报告见附件</p>"
+    assert attachment.get_filename() == "周报.docx"
+    assert attachment.get_content_type().endswith("wordprocessingml.document")
+    assert attachment.get_payload(decode=True) == payload
+
+
+def test_retries_transient_errors_but_not_refused_recipients(smtp_server):
+    smtp_server.drop_data = 1
+    mailer = _mailer(smtp_server, max_retries=2)
+    try:
+        retried = mailer.send(OutgoingMail(
+            sender="noreply@example.com", to=["a@example.com"], subject="s", html_body="b"
+        ))
+        partial = mailer.send(OutgoingMail(
+            sender="noreply@example.com", to=["b@example.com"], bcc=["rejected@example.com"],
+            subject="s", html_body="b",
+        ))
+        refused = mailer.send(OutgoingMail(
+            sender="noreply@example.com", to=["rejected@example.com"], subject="s", html_body="b"
+        ))
+    finally:
+        mailer.close()
+
+    assert retried.success and retried.attempts == 2
+    assert partial.success and list(partial.refused) == ["rejected@example.com"]
+    assert b"rejected@example.com" not in smtp_server.messages[-1]
+    assert not refused.success and refused.attempts == 1
+    # 收件人被拒后连接仍可复用：首个连接因 421 断开，之后只新建了一个连接
+    assert smtp_server.connections == 2
+
+
+def test_does_not_retry_once_the_message_is_committed(smtp_server):
+    smtp_server.drop_after_data = 1
+    mailer = _mailer(smtp_server, max_retries=2)
+    try:
+        result = mailer.send(OutgoingMail(
+            sender="noreply@example.com", to=["a@example.com"], subject="s", html_body="b"
+        ))
+    finally:
+        mailer.close()
+
+    # 终止符发出后断线：服务器可能已投递，不能重发
+    assert not result.success and result.attempts == 1
+    assert len(smtp_server.messages) == 1
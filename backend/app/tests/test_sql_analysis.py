@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from app.models.data_source import DataSource, DataSourceType
+from app.services.infrastructure.agents.tools.sql.analysis import (
+    SQLAnalyzer,
+    SQLDialect,
+    SchemaInfoCache,
+    resolve_dialect,
+)
+
+
+def _analyze(sql, dialect=SQLDialect.DORIS):
+    return SQLAnalyzer().analyze(sql, dialect)
+
+
+def _columns(analysis):
+    return {(column.table, column.name) for column in analysis.checkable_columns}
+
+
+def test_cte_and_derived_tables_are_not_physical_tables():
+    analysis = _analyze(
+        "WITH recent AS (SELECT o.user_id, o.amount FROM orders o WHERE o.dt >= '2024-01-01') "
+        "SELECT r.user_id, SUM(r.amount) AS total FROM recent r "
+        "JOIN (SELECT id, name FROM users) u ON u.id = r.user_id "
+        "GROUP BY r.user_id ORDER BY total DESC"
+    )
+
+    assert analysis.ctes == ("recent",)
+    assert analysis.table_names == ["orders", "users"]
+    assert _columns(analysis) == {
+        ("orders", "user_id"), ("orders", "amount"), ("orders", "dt"),
+        ("users", "id"), ("users", "name"),
+    }
+    assert "total" not in analysis.column_names
+    assert analysis.has_join and analysis.has_group_by and not analysis.has_limit
+
+
+def test_correlated_subquery_resolves_columns_by_scope():
+    analysis = _analyze(
+        "SELECT name FROM users u WHERE EXISTS "
+        "(SELECT 1 FROM orders o WHERE o.user_id = u.id AND status = 'paid')"
+    )
+
+    assert analysis.subquery_count == 1
+    assert _columns(analysis) == {
+        ("users", "name"), ("orders", "user_id"), ("users", "id"), ("orders", "status"),
+    }
+
+
+def test_union_and_insert_select():
+    union = _analyze("SELECT id FROM a UNION ALL SELECT id FROM b LIMIT 10")
+    assert union.table_names == ["a", "b"]
+    assert not union.has_join
+
+    insert = _analyze("INSERT INTO archive (id, total) SELECT id, amount FROM orders WHERE amount > {{min_amount}}")
+    assert insert.statement_type == "INSERT"
+    assert insert.placeholders == ("min_amount",)
+    assert {("archive", "id"), ("archive", "total"), ("orders", "amount")} <= _columns(insert)
+
+
+def test_double_quotes_depend_on_dialect():
+    sql = 'SELECT id FROM users WHERE "status" = \'active\''
+    assert "status" not in _analyze(sql, SQLDialect.MYSQL).column_names
+    assert "status" in _analyze(sql, SQLDialect.POSTGRESQL).column_names
+    assert resolve_dialect({"source_type": "postgresql"}) is SQLDialect.POSTGRESQL
+    assert resolve_dialect({}) is SQLDialect.DORIS
+
+
+@pytest.mark.parametrize(
+    "connection_string, expected",
+    [
+        ("postgresql://u:p@db/reports", SQLDialect.POSTGRESQL),
+        ("postgres+asyncpg://u:p@db/reports", SQLDialect.POSTGRESQL),
+        ("mysql+pymysql://u:p@db/reports", SQLDialect.MYSQL),
+        ("", SQLDialect.DORIS),
+    ],
+)
+def test_sql_source_dialect_comes_from_connection_string(connection_string, expected):
+    source = DataSource(source_type=DataSourceType.sql, connection_string=connection_string)
+    assert source.connection_config["source_type"] == "sql"
+    assert resolve_dialect(source.connection_config) is expected
+    assert resolve_dialect(DataSource(source_type=DataSourceType.doris).connection_config) is SQLDialect.DORIS
+
+
+def test_analyzer_caches_by_sql_and_dialect():
+    analyzer = SQLAnalyzer(max_entries=2)
+    first = analyzer.analyze("SELECT 1", SQLDialect.DORIS)
+    assert analyzer.analyze("SELECT 1", SQLDialect.DORIS) is first
+    assert analyzer.analyze("SELECT 1", SQLDialect.POSTGRESQL) is not first
+    analyzer.analyze("SELECT 2", SQLDialect.DORIS)
+    assert analyzer.get_stats() == {"entries": 2, "hits": 1, "misses": 3}
+
+
+def test_schema_info_cache_shares_one_retrieval():
+    calls = []
+
+    async def loader(container, connection_config, table_names):
+        calls.append(table_names)
+        await asyncio.sleep(0.01)
+        return {"tables": table_names}
+
+    cache = SchemaInfoCache(ttl_seconds=60, loader=loader)
+    config = {"source_type": "doris", "host": "db", "database": "sales"}
+
+    async def scenario():
+        results = await asyncio.gather(*[
+            cache.get(None, config, ["orders", "users"]) for _ in range(3)
+        ])
+        results.append(await cache.get(None, config, ["USERS", "orders"]))
+        cache.invalidate(config)
+        results.append(await cache.get(None, config, ["orders", "users"]))
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(result == {"tables": ["orders", "users"]} for result in results)
+
+
+def test_schema_info_cache_recovers_after_cancelled_retrieval():
+    async def slow_loader(container, connection_config, table_names):
+        await asyncio.sleep(10)
+
+    async def fast_loader(container, connection_config, table_names):
+        return {"tables": table_names}
+
+    cache = SchemaInfoCache(ttl_seconds=60, loader=slow_loader)
+    config = {"source_type": "doris", "host": "db", "database": "sales"}
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(cache.get(None, config, ["orders"]), 0.01)
+        cache._loader = fast_loader
+        return await asyncio.wait_for(cache.get(None, config, ["orders"]), 1)
+
+    assert asyncio.run(scenario()) == {"tables": ["orders"]}
+
+
+def test_schema_info_cache_waiter_retries_when_owner_is_cancelled():
+    calls = []
+
+    async def loader(container, connection_config, table_names):
+        calls.append(table_names)
+        await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+        return {"tables": table_names}
+
+    cache = SchemaInfoCache(ttl_seconds=60, loader=loader)
+    config = {"source_type": "doris", "host": "db", "database": "sales"}
+
+    async def scenario():
+        owner = asyncio.create_task(cache.get(None, config, ["orders"]))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get(None, config, ["orders"]))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(scenario()) == {"tables": ["orders"]}
+    assert len(calls) == 2
@@ -0,0 +1,95 @@
+import math
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+from app.services.infrastructure.agents.tools.data.stats_kernel import (
+    ColumnarStats,
+    average_ranks,
+    detect_change_points,
+    detect_periodicity,
+    gini,
+    linear_trend,
+)
+
+
+def _rows(count=200, seed=11):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        x = rng.gauss(50, 10)
+        rows.append({
+            "x": x,
+            "y": str(2 * x + rng.gauss(0, 1)),
+            "z": rng.choice([rng.uniform(0, 1), None, "n/a"]),
+            "category": rng.choice(["a", "b", "c"]),
+        })
+    rows[5].pop("x")
+    return rows
+
+
+def _reference_change_points(values):
+    def vol(part):
+        if len(part) < 2:
+            return 0.0
+        mean = sum(part) / len(part)
+        std = math.sqrt(sum((v - mean) ** 2 for v in part) / len(part))
+        return std / mean if mean != 0 else 0.0
+
+    points = []
+    for i in range(2, len(values) - 2):
+        if abs(sum(values[i:i + 2]) / 2 - sum(values[i - 2:i]) / 2) > 2 * vol(values[:i]):
+            points.append(i)
+    return points
+
+
+def test_describe_matches_statistics_module():
+    rows = _rows()
+    stats = ColumnarStats.from_rows(rows, ["x", "y", "z", "category"])
+    expected = [row["x"] for row in rows if "x" in row]
+    described = stats.describe("x")
+
+    assert described["count"] == len(expected)
+    assert described["mean"] == pytest.approx(statistics.mean(expected))
+    assert described["median"] == pytest.approx(statistics.median(expected))
+    assert described["std"] == pytest.approx(statistics.stdev(expected))
+    assert described["q25"] == sorted(expected)[int(len(expected) * 0.25)]
+    assert stats.describe("category") == {}
+    assert stats.numeric_columns(min_count=2) == ["x", "y", "z"]
+
+
+def test_correlation_matrix_handles_missing_values_and_ranks():
+    stats = ColumnarStats.from_rows(_rows(), ["x", "y", "z"])
+    matrix = stats.correlation_matrix(["x", "y", "z"])
+    assert matrix["x"]["x"] == pytest.approx(1.0)
+    assert matrix["x"]["y"] == pytest.approx(matrix["y"]["x"])
+    assert matrix["x"]["y"] > 0.95
+
+    monotonic = ColumnarStats({"a": [1, 2, 3, 4, 5], "b": [1, 4, 9, 16, 1000], "c": [7, 7, 7, 7, 7]})
+    spearman = monotonic.correlation_matrix(method="spearman")
+    assert spearman["a"]["b"] == pytest.approx(1.0)
+    assert spearman["a"]["c"] == 0.0
+    assert average_ranks(np.array([3.0, 1.0, 3.0])).tolist() == [2.5, 1.0, 2.5]
+
+
+@pytest.mark.parametrize("method,expected", [
+    ("iqr", [100.0]),
+    ("zscore", [100.0]),
+    ("modified_zscore", [100.0]),
+])
+def test_outliers(method, expected):
+    stats = ColumnarStats({"v": [10, 11, 12, 11, 10, 12, 11, 100]})
+    assert stats.outliers("v", method).tolist() == expected
+
+
+def test_series_kernels_match_reference_loops():
+    rng = random.Random(3)
+    values = [rng.choice([1.0, 1.05, 5.0]) + i * 0.01 for i in range(60)]
+    array = np.array(values)
+
+    assert detect_change_points(array) == _reference_change_points(values)
+    assert detect_periodicity(np.array([1.0, 2.0, 3.0] * 6)) == 3
+    assert linear_trend(np.array([1.0, 3.0, 5.0, 7.0]))["slope"] == pytest.approx(2.0)
+    assert gini(np.array([1.0, 1.0, 1.0])) == 0.0
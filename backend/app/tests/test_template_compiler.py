@@ -0,0 +1,98 @@
+import pytest
+
+from app.services.infrastructure.document.template_compiler import (
+    TemplateIndexCache,
+    TemplateIndexMismatch,
+    compile_template,
+    render_template,
+)
+
+
+class _Run:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Paragraph:
+    def __init__(self, *texts):
+        self.runs = [_Run(text) for text in texts]
+
+    @property
+    def text(self):
+        return "".join(run.text for run in self.runs)
+
+
+class _Container:
+    def __init__(self, paragraphs=(), tables=()):
+        self.paragraphs = list(paragraphs)
+        self.tables = list(tables)
+
+
+class _Row:
+    def __init__(self, *cells):
+        self.cells = list(cells)
+
+
+class _Table:
+    def __init__(self, *rows):
+        self.rows = list(rows)
+
+
+def _document():
+    merged = _Container([_Paragraph("合并 {{", "region}}")])
+    nested = _Table(_Row(_Container([_Paragraph("{{count}} 条")])))
+    return _Container(
+        paragraphs=[
+            _Paragraph("本期销售额 {{", "sales", "}} 元，环比 {{ratio}}。"),
+            _Paragraph("没有占位符"),
+            _Paragraph("{{图表：销售趋势}}"),
+            _Paragraph("{{unknown}} 与 {{sales}}"),
+        ],
+        tables=[_Table(_Row(merged, merged), _Row(_Container(tables=[nested]), _Container([_Paragraph("{{empty}}")])))],
+    )
+
+
+DATA = {"{{sales}}": 1200, "ratio": "5%", "region": "华东", "count": 3, "empty": None}
+
+
+def test_compile_records_run_spans_and_cells():
+    compiled = compile_template(_document(), key="k")
+    assert compiled.placeholders == [
+        "{{sales}}", "{{ratio}}", "{{图表：销售趋势}}", "{{unknown}}", "{{region}}", "{{count}}", "{{empty}}",
+    ]
+    first = compiled.slots[0].spans[0]
+    assert (first.start_run, first.start_offset, first.end_run, first.end_offset) == (0, 6, 2, 2)
+    # 合并单元格只编译一次
+    assert sum(1 for slot in compiled.slots if slot.cell_path == ((0, 0, 0),)) == 1
+    assert compiled.slots[-2].cell_path == ((0, 1, 0), (0, 0, 0))
+
+
+def test_render_replaces_all_placeholders_in_one_pass():
+    doc = _document()
+    missing = []
+    replaced = render_template(doc, compile_template(doc), DATA, on_missing=missing.append)
+
+    assert replaced == 6
+    assert missing == ["{{unknown}}"]
+    assert [p.text for p in doc.paragraphs] == [
+        "本期销售额 1200 元，环比 5%。", "没有占位符", "{{图表：销售趋势}}", "{{unknown}} 与 1200",
+    ]
+    assert [run.text for run in doc.paragraphs[0].runs] == ["本期销售额 1200", "", " 元，环比 5%。"]
+    table = doc.tables[0]
+    assert table.rows[0].cells[0].paragraphs[0].text == "合并 华东"
+    assert table.rows[1].cells[0].tables[0].rows[0].cells[0].paragraphs[0].text == "3 条"
+    assert table.rows[1].cells[1].paragraphs[0].text == ""
+
+
+def test_cached_index_is_reused_and_validated():
+    cache = TemplateIndexCache(max_entries=2)
+    compiled = cache.get_or_compile(_document(), "hash")
+    assert cache.get_or_compile(_document(), "hash") is compiled
+    assert cache.get_stats()["hits"] == 1
+
+    other = _document()
+    render_template(other, compiled, DATA)
+    assert other.paragraphs[0].text == "本期销售额 1200 元，环比 5%。"
+
+    with pytest.raises(TemplateIndexMismatch):
+        render_template(other, compiled, DATA)
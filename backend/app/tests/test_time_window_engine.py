@@ -0,0 +1,89 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.infrastructure.agents.tools.time.window import (
+    TimeUnit,
+    TimeWindowTool,
+    WindowConfig,
+    WindowType,
+)
+from app.services.infrastructure.agents.tools.time.window_engine import (
+    aggregate_windows,
+    session_bounds,
+    sliding_bounds,
+    tumbling_bounds,
+)
+
+
+def _rows(count=300, seed=7):
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    rows = []
+    for _ in range(count):
+        ts = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 10))
+        rows.append({
+            "timestamp": ts.isoformat() if rng.random() < 0.5 else ts,
+            "amount": rng.choice([rng.uniform(0, 100), None, "n/a"]),
+        })
+    # 与窗口边界重合的最后一条记录
+    rows.append({"timestamp": base + timedelta(days=12), "amount": 1})
+    return rows
+
+
+def _dict_path(tool, data, config, aggregation):
+    sorted_data = tool._sort_by_time(data, config.time_column)
+    creators = {
+        WindowType.TUMBLING: tool._create_tumbling_windows,
+        WindowType.SLIDING: tool._create_sliding_windows,
+        WindowType.SESSION: tool._create_session_windows,
+    }
+    windows = creators[config.window_type](sorted_data, config)
+    return tool._apply_aggregation(windows, aggregation) if aggregation else windows
+
+
+def test_bounds_match_scan_semantics():
+    epochs = np.array([0, 5, 10, 20, 30], dtype=np.int64)
+    tumbling = tumbling_bounds(epochs, 10)
+    # 起点等于最后一条记录的窗口不生成
+    assert tumbling.lo.tolist() == [0, 2, 3] and tumbling.hi.tolist() == [2, 3, 4]
+    assert tumbling.starts.tolist() == [0, 10, 20]
+
+    sliding = sliding_bounds(epochs, 10, 5)
+    assert sliding.starts.tolist() == [0, 5, 10, 15, 20, 25]
+    assert (sliding.hi - sliding.lo).tolist() == [2, 2, 1, 1, 1, 1]
+
+    session = session_bounds(epochs, 5)
+    assert session.lo.tolist() == [0, 3, 4] and session.hi.tolist() == [3, 4, 5]
+
+    values = np.array([1.0, np.nan, 3.0, 4.0, 5.0])
+    assert aggregate_windows(values, tumbling, "sum")["values"].tolist() == [1.0, 3.0, 4.0]
+    assert aggregate_windows(values, tumbling, "count")["counts"].tolist() == [1, 1, 1]
+    assert aggregate_windows(values, tumbling, "median") is None
+
+
+@pytest.mark.parametrize("window_type,size,slide,unit", [
+    (WindowType.TUMBLING, 1, None, TimeUnit.DAY),
+    (WindowType.SLIDING, 6, 1, TimeUnit.HOUR),
+    (WindowType.SLIDING, 1, 3, TimeUnit.HOUR),
+    (WindowType.SESSION, 1, None, TimeUnit.HOUR),
+])
+@pytest.mark.parametrize("aggregation", [None, {"amount": "avg", "missing": "sum"}, {"amount": "max"}])
+def test_vectorized_windows_match_dict_path(window_type, size, slide, unit, aggregation):
+    tool = TimeWindowTool(container=None)
+    data = _rows()
+    config = WindowConfig(window_type=window_type, size=size, time_unit=unit, slide_size=slide, session_timeout=3600)
+
+    expected = _dict_path(tool, data, config, aggregation)
+    actual = tool._process_windows_vectorized(data, config, aggregation)
+
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        assert got.keys() == want.keys()
+        for key in want:
+            if key == "aggregated_data":
+                assert got[key] == pytest.approx(want[key])
+            else:
+                assert got[key] == want[key]
@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.infrastructure.cache.unified_cache_system import (
+    LOAD_LOCK_PREFIX,
+    CacheLevel,
+    CacheType,
+    UnifiedCacheManager,
+)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, value))
+
+    def set(self, key, value):
+        self.commands.append((key, value))
+
+    def execute(self, raise_on_error=True):
+        self.redis.round_trips += 1
+        for key, value in self.commands:
+            self.redis.store[key] = value
+        return [True] * len(self.commands)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.round_trips = 0
+
+    def get(self, key):
+        self.round_trips += 1
+        return self.store.get(key)
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self.store.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self.round_trips += 1
+        self.store[key] = value
+
+    def set(self, key, value, nx=False, px=None):
+        self.round_trips += 1
+        if nx and key in self.store:
+            return False
+        self.store[key] = value
+        return True
+
+    def exists(self, key):
+        self.round_trips += 1
+        return int(key in self.store)
+
+    def delete(self, *keys):
+        self.round_trips += 1
+        for key in keys:
+            self.store.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+def _manager(redis):
+    return UnifiedCacheManager(enable_database=False, redis_client=redis)
+
+
+@pytest.mark.asyncio
+async def test_get_many_and_set_many_use_single_round_trip():
+    redis = _FakeRedis()
+    writer = _manager(redis)
+    results = await writer.set_many(
+        {"a": {"value": 1}, "b": {"value": 2}}, CacheType.PLACEHOLDER_RESULT, CacheLevel.REDIS
+    )
+    assert results == {"a": True, "b": True}
+    assert redis.round_trips == 1
+
+    reader = _manager(redis)
+    redis.round_trips = 0
+    entries = await reader.get_many(["a", "b", "missing"])
+    assert {key: entry.value["value"] for key, entry in entries.items()} == {"a": 1, "b": 2}
+    assert redis.round_trips == 1
+
+    # 已提升到内存层，再次读取不访问Redis
+    redis.round_trips = 0
+    assert set(await reader.get_many(["a", "b"])) == {"a", "b"}
+    assert redis.round_trips == 0
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_collapses_concurrent_misses():
+    manager = _manager(_FakeRedis())
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"rows": [1, 2, 3], "extra": "kept"}
+
+    values = await asyncio.gather(*(manager.get_or_load("ctx", loader) for _ in range(40)))
+    assert calls == 1
+    assert all(value == {"rows": [1, 2, 3], "extra": "kept"} for value in values)
+    assert manager.stats["coalesced_loads"] == 39
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_waits_for_other_process_lock():
+    redis = _FakeRedis()
+    redis.store[f"{LOAD_LOCK_PREFIX}ctx"] = "other-process"
+    holder, waiter = _manager(redis), _manager(redis)
+
+    async def never_called():
+        raise AssertionError("loader should not run while another process holds the lock")
+
+    async def publish():
+        await asyncio.sleep(0.1)
+        await holder.set("ctx", "loaded", CacheType.PLACEHOLDER_RESULT, CacheLevel.REDIS)
+
+    value, _ = await asyncio.gather(waiter.get_or_load("ctx", never_called, lock_timeout=2), publish())
+    assert value == "loaded"
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_takes_over_when_lock_released_without_entry():
+    redis = _FakeRedis()
+    lock_key = f"{LOAD_LOCK_PREFIX}ctx"
+    redis.store[lock_key] = "other-process"
+    waiter = _manager(redis)
+
+    async def loader():
+        return "loaded-by-waiter"
+
+    async def release_without_writing():
+        await asyncio.sleep(0.1)
+        redis.store.pop(lock_key)
+
+    started = time.monotonic()
+    value, _ = await asyncio.gather(
+        waiter.get_or_load("ctx", loader, lock_timeout=5), release_without_writing()
+    )
+    assert value == "loaded-by-waiter"
+    assert time.monotonic() - started < 1
+    assert lock_key not in redis.store
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_serves_stale_value_and_refreshes():
+    manager = _manager(_FakeRedis())
+    versions = iter(["v1", "v2"])
+
+    async def loader():
+        return next(versions)
+
+    assert await manager.get_or_load("ctx", loader, ttl_seconds=1, stale_ttl_seconds=60) == "v1"
+    await asyncio.sleep(1.05)
+
+    assert await manager.get_or_load("ctx", loader, ttl_seconds=60, stale_ttl_seconds=60) == "v1"
+    await asyncio.gather(*manager._background_refreshes)
+    assert await manager.get_or_load("ctx", loader) == "v2"
+    assert manager.stats["stale_served"] == 1
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.api_specification import WebSocketMessage, WebSocketMessageType
+from app.websocket.manager import WebSocketManager
+
+
+class _FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.release = asyncio.Event()
+        if not delay:
+            self.release.set()
+
+    async def send_text(self, text):
+        await self.release.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def _progress(task_id, progress, status="running"):
+    return WebSocketMessage(
+        type=WebSocketMessageType.TASK_UPDATE,
+        data={"task_id": task_id, "status": status, "progress": progress},
+    )
+
+
+async def _connect(manager, websocket, user_id):
+    session_id = await manager.connect(websocket, user_id)
+    await manager.subscribe(session_id, "reports")
+    return session_id
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_does_not_delay_other_sessions(monkeypatch):
+    manager = WebSocketManager()
+    monkeypatch.setattr(manager, "_deliver_offline_messages", lambda session_id: asyncio.sleep(0))
+    fast, slow = _FakeWebSocket(), _FakeWebSocket(delay=1)
+    await _connect(manager, fast, "u1")
+    await _connect(manager, slow, "u2")
+
+    sent = await manager.broadcast_to_channel(
+        "reports", WebSocketMessage(type=WebSocketMessageType.NOTIFICATION, message="done")
+    )
+    assert sent == 2
+    await asyncio.sleep(0.05)
+    assert [m["message"] for m in fast.sent if m["type"] == "notification"][-1] == "done"
+    assert slow.sent == []
+
+    slow.release.set()
+    await asyncio.sleep(0.05)
+    assert slow.sent[-1]["message"] == "done"
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_progress_messages_are_coalesced_per_task(monkeypatch):
+    manager = WebSocketManager()
+    monkeypatch.setattr(manager, "_deliver_offline_messages", lambda session_id: asyncio.sleep(0))
+    websocket = _FakeWebSocket(delay=1)
+    await _connect(manager, websocket, "u1")
+    await asyncio.sleep(0)  # 发送任务阻塞在欢迎消息上
+
+    for progress in range(100):
+        await manager.broadcast_to_channel("reports", _progress("t1", progress))
+    await manager.broadcast_to_channel("reports", _progress("t2", 50))
+    await manager.broadcast_to_channel("reports", _progress("t1", 100, status="completed"))
+
+    websocket.release.set()
+    await asyncio.sleep(0.05)
+    updates = [(m["data"]["task_id"], m["data"]["progress"]) for m in websocket.sent if m["type"] == "task_update"]
+    assert updates == [("t1", 99), ("t2", 50), ("t1", 100)]
+    assert manager.get_system_stats()["coalesced_messages"] == 99
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_progress_before_disconnecting(monkeypatch):
+    manager = WebSocketManager()
+    manager.send_queue_size = 3
+    monkeypatch.setattr(manager, "_deliver_offline_messages", lambda session_id: asyncio.sleep(0))
+    websocket = _FakeWebSocket(delay=1)
+    session_id = await _connect(manager, websocket, "u1")
+    await asyncio.sleep(0)
+
+    for index in range(3):
+        await manager.broadcast_to_channel("reports", _progress(f"t{index}", 10))
+    notice = WebSocketMessage(type=WebSocketMessageType.NOTIFICATION, message="kept")
+    assert await manager.send_to_session(session_id, notice)
+    assert manager.get_system_stats()["dropped_messages"] == 1
+
+    for index in range(3):
+        await manager.send_to_session(session_id, notice)
+    await asyncio.sleep(0)
+    assert session_id not in manager.connections
+    assert manager.get_system_stats()["slow_consumer_disconnects"] == 1
+    await manager.shutdown()
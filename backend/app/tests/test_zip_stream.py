@@ -0,0 +1,66 @@
+import io
+import threading
+import time
+import zipfile
+
+import pytest
+
+from app.services.infrastructure.storage.zip_stream import ZipStreamEntry, stream_zip
+
+
+async def _collect(stream):
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+    return chunks
+
+
+@pytest.mark.asyncio
+async def test_entries_are_streamed_with_bounded_fetches():
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def fetch(path):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.01)
+        with lock:
+            active["now"] -= 1
+        return path.encode() * 100
+
+    entries = [ZipStreamEntry(name=f"reports/r{i}.md", path=f"p{i}") for i in range(12)]
+    chunks = await _collect(stream_zip(entries, fetch, concurrency=3))
+
+    assert len(chunks) > 1
+    assert active["max"] <= 3
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.testzip() is None
+    assert archive.read("reports/r5.md") == b"p5" * 100
+
+
+@pytest.mark.asyncio
+async def test_failures_and_duplicate_names_are_reported_in_trailer():
+    def fetch(path):
+        if path == "missing":
+            raise FileNotFoundError(path)
+        return b"data"
+
+    entries = [
+        ZipStreamEntry(name="reports/a.docx", path="one"),
+        ZipStreamEntry(name="reports/a.docx", path="two"),
+        ZipStreamEntry(name="reports/b.md", path="missing"),
+        ZipStreamEntry(name="reports/c.md", data=b"inline"),
+    ]
+
+    def trailer(written, failed):
+        return [("manifest.csv", ",".join(sorted(e.name for e in written)).encode())] + [
+            ("failed.csv", failure.entry.name.encode()) for failure in failed
+        ]
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(await _collect(stream_zip(entries, fetch, trailer=trailer)))))
+
+    assert archive.read("manifest.csv") == b"reports/a.docx,reports/a_2.docx,reports/c.md"
+    assert archive.read("failed.csv") == b"reports/b.md"
+    assert archive.getinfo("reports/a.docx").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("reports/c.md").compress_type == zipfile.ZIP_DEFLATED
@@ -14,6 +14,7 @@ from enum import Enum
 import uuid
 
 from fastapi import WebSocket
+from app.core.config import settings
 from app.core.api_specification import (
     WebSocketMessage, WebSocketMessageType, NotificationMessage,
     TaskUpdateMessage, ReportUpdateMessage
@@ -25,6 +26,54 @@ from app.services.infrastructure.cache.unified_cache_system import (
 
 logger = logging.getLogger(__name__)
 
+# 可被丢弃/合并的消息类型（只反映最新状态，丢失中间值无影响）
+_DROPPABLE_MESSAGE_TYPES = {
+    WebSocketMessageType.PING,
+    WebSocketMessageType.TASK_UPDATE,
+    WebSocketMessageType.USER_STATUS,
+    WebSocketMessageType.SYSTEM_STATUS,
+}
+
+# 任务终态消息必须送达，不参与丢弃
+_TERMINAL_TASK_STATUSES = {"completed", "failed", "cancelled", "error", "success"}
+
+
+def _get_send_settings() -> tuple:
+    """(队列上限, 发送超时)"""
+    return settings.WS_SEND_QUEUE_SIZE, settings.WS_SEND_TIMEOUT_SECONDS
+
+
+class OutboundMessage:
+    """已序列化的待发送消息，同一条广播在所有连接间共享"""
+    
+    __slots__ = ("text", "size", "coalesce_key", "droppable")
+    
+    def __init__(self, text: str, coalesce_key: Optional[str] = None, droppable: bool = False):
+        self.text = text
+        self.size = len(text.encode('utf-8'))
+        self.coalesce_key = coalesce_key
+        self.droppable = droppable
+    
+    @classmethod
+    def from_message(cls, message: WebSocketMessage) -> "OutboundMessage":
+        """序列化一次，并根据消息类型确定合并键和丢弃策略"""
+        text = json.dumps(message.model_dump(), ensure_ascii=False, default=str)
+        
+        coalesce_key = None
+        droppable = message.type in _DROPPABLE_MESSAGE_TYPES
+        if message.type == WebSocketMessageType.TASK_UPDATE:
+            task_id = getattr(message, "task_id", None) or message.data.get("task_id")
+            status = str(getattr(message, "status", None) or message.data.get("status") or "").lower()
+            if status in _TERMINAL_TASK_STATUSES:
+                droppable = False
+            elif task_id:
+                # 同一任务的进度消息只保留最新一条
+                coalesce_key = f"task:{task_id}"
+        elif message.type == WebSocketMessageType.PING:
+            coalesce_key = "ping"
+        
+        return cls(text, coalesce_key, droppable)
+
 
 class ConnectionState(str, Enum):
     """连接状态"""
@@ -60,6 +109,14 @@ class ConnectionInfo:
         # 消息队列（离线时暂存）
         self.message_queue: deque = deque(maxlen=100)
         
+        # 待发送队列，由独立的发送任务消费，慢连接不会阻塞其他连接
+        self.send_queue: deque = deque()
+        self.pending_coalesced: Dict[str, OutboundMessage] = {}
+        self.send_event = asyncio.Event()
+        self.sender_task: Optional[asyncio.Task] = None
+        self.messages_dropped = 0
+        self.messages_coalesced = 0
+        
     @property
     def is_alive(self) -> bool:
         """检查连接是否活跃"""
@@ -87,6 +144,9 @@ class ConnectionInfo:
             "messages_received": self.messages_received,
             "bytes_sent": self.bytes_sent,
             "bytes_received": self.bytes_received,
+            "messages_dropped": self.messages_dropped,
+            "messages_coalesced": self.messages_coalesced,
+            "send_queue_size": len(self.send_queue),
             "client_info": self.client_info,
             "subscriptions": list(self.subscriptions),
             "is_alive": self.is_alive
@@ -114,9 +174,14 @@ class WebSocketManager:
             "active_connections": 0,
             "total_messages": 0,
             "total_bytes": 0,
+            "dropped_messages": 0,
+            "coalesced_messages": 0,
+            "slow_consumer_disconnects": 0,
             "uptime": datetime.utcnow()
         }
         
+        self.send_queue_size, self.send_timeout = _get_send_settings()
+        
         # 后台任务
         self._cleanup_task: Optional[asyncio.Task] = None
         self._heartbeat_task: Optional[asyncio.Task] = None
@@ -259,6 +324,12 @@ class WebSocketManager:
         if not self.user_sessions[conn.user_id]:
             del self.user_sessions[conn.user_id]
         
+        # 停止发送任务并丢弃未发送的消息
+        if conn.sender_task and conn.sender_task is not asyncio.current_task():
+            conn.sender_task.cancel()
+        conn.send_queue.clear()
+        conn.pending_coalesced.clear()
+        
         # 移除连接
         del self.connections[session_id]
         
@@ -278,33 +349,13 @@ class WebSocketManager:
             await self.disconnect(session_id, reason)
     
     async def send_to_session(self, session_id: str, message: WebSocketMessage) -> bool:
-        """发送消息到指定会话"""
+        """发送消息到指定会话（入队后由连接的发送任务异步发送）"""
         if session_id not in self.connections:
             # 会话不存在，缓存消息
             await self._cache_offline_message(session_id, message)
             return False
         
-        conn = self.connections[session_id]
-        
-        try:
-            message_data = json.dumps(message.model_dump(), ensure_ascii=False, default=str)
-            await conn.websocket.send_text(message_data)
-            
-            # 更新统计
-            conn.messages_sent += 1
-            conn.bytes_sent += len(message_data.encode('utf-8'))
-            conn.last_activity = datetime.utcnow()
-            
-            self.stats["total_messages"] += 1
-            self.stats["total_bytes"] += len(message_data.encode('utf-8'))
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error sending message to session {session_id}: {e}")
-            # 连接异常，标记清理
-            conn.state = ConnectionState.DISCONNECTED
-            return False
+        return self._enqueue(self.connections[session_id], OutboundMessage.from_message(message))
     
     async def send_to_user(self, user_id: str, message: WebSocketMessage) -> int:
         """发送消息到用户的所有会话"""
@@ -313,40 +364,138 @@ class WebSocketManager:
             await self._cache_offline_message_for_user(user_id, message)
             return 0
         
-        sent_count = 0
-        sessions = list(self.user_sessions[user_id])  # 复制以避免并发修改
-        
-        for session_id in sessions:
-            if await self.send_to_session(session_id, message):
-                sent_count += 1
-        
-        return sent_count
+        return self._fan_out(self.user_sessions[user_id], message)
     
     async def broadcast_to_channel(self, channel: str, message: WebSocketMessage) -> int:
         """广播消息到频道"""
         if channel not in self.channels:
             return 0
         
-        sent_count = 0
-        sessions = list(self.channels[channel])  # 复制以避免并发修改
-        
-        for session_id in sessions:
-            if await self.send_to_session(session_id, message):
-                sent_count += 1
-        
-        return sent_count
+        return self._fan_out(self.channels[channel], message)
     
     async def broadcast_to_all(self, message: WebSocketMessage) -> int:
         """广播消息到所有连接"""
+        return self._fan_out(self.connections.keys(), message)
+    
+    def _fan_out(self, session_ids, message: WebSocketMessage) -> int:
+        """消息只序列化一次，分发到各连接的发送队列"""
+        outbound = OutboundMessage.from_message(message)
         sent_count = 0
-        sessions = list(self.connections.keys())  # 复制以避免并发修改
-        
-        for session_id in sessions:
-            if await self.send_to_session(session_id, message):
+        for session_id in list(session_ids):  # 复制以避免并发修改
+            conn = self.connections.get(session_id)
+            if conn and self._enqueue(conn, outbound):
                 sent_count += 1
-        
         return sent_count
     
+    def _enqueue(self, conn: ConnectionInfo, outbound: OutboundMessage) -> bool:
+        """把消息放入连接的发送队列，处理合并、丢弃和慢连接"""
+        if conn.state in (ConnectionState.DISCONNECTING, ConnectionState.DISCONNECTED):
+            return False
+        
+        # 同一合并键的消息尚未发出时直接替换为最新内容
+        if outbound.coalesce_key:
+            pending = conn.pending_coalesced.get(outbound.coalesce_key)
+            if pending is not None:
+                index = self._find_pending(conn.send_queue, pending)
+                if index is not None:
+                    conn.send_queue[index] = outbound
+                    conn.pending_coalesced[outbound.coalesce_key] = outbound
+                    conn.messages_coalesced += 1
+                    self.stats["coalesced_messages"] += 1
+                    return True
+        
+        if len(conn.send_queue) >= self.send_queue_size:
+            if not self._drop_one(conn, outbound):
+                self._drop_slow_consumer(conn)
+                return False
+            if outbound.droppable and len(conn.send_queue) >= self.send_queue_size:
+                # 新消息本身被丢弃
+                return False
+        
+        conn.send_queue.append(outbound)
+        if outbound.coalesce_key:
+            conn.pending_coalesced[outbound.coalesce_key] = outbound
+        conn.send_event.set()
+        self._ensure_sender(conn)
+        return True
+    
+    @staticmethod
+    def _find_pending(queue: deque, outbound: OutboundMessage) -> Optional[int]:
+        for index, item in enumerate(queue):
+            if item is outbound:
+                return index
+        return None
+    
+    def _drop_one(self, conn: ConnectionInfo, incoming: OutboundMessage) -> bool:
+        """队列已满：优先丢弃最早的可丢弃消息，其次丢弃新的可丢弃消息"""
+        for index, item in enumerate(conn.send_queue):
+            if item.droppable:
+                del conn.send_queue[index]
+                if item.coalesce_key and conn.pending_coalesced.get(item.coalesce_key) is item:
+                    del conn.pending_coalesced[item.coalesce_key]
+                break
+        else:
+            if not incoming.droppable:
+                return False
+        
+        conn.messages_dropped += 1
+        self.stats["dropped_messages"] += 1
+        return True
+    
+    def _drop_slow_consumer(self, conn: ConnectionInfo):
+        """队列被必须送达的消息占满，断开慢连接（客户端重连后通过离线消息补齐）"""
+        logger.warning(
+            f"WebSocket slow consumer disconnected: session={conn.session_id}, "
+            f"queued={len(conn.send_queue)}"
+        )
+        self.stats["slow_consumer_disconnects"] += 1
+        conn.state = ConnectionState.DISCONNECTED
+        conn.send_queue.clear()
+        conn.pending_coalesced.clear()
+        try:
+            asyncio.get_running_loop().create_task(
+                self._force_disconnect(conn.session_id, "slow_consumer")
+            )
+        except RuntimeError:
+            pass
+    
+    def _ensure_sender(self, conn: ConnectionInfo):
+        """按需启动连接的发送任务"""
+        if conn.sender_task is None or conn.sender_task.done():
+            conn.sender_task = asyncio.create_task(self._sender_loop(conn))
+    
+    async def _sender_loop(self, conn: ConnectionInfo):
+        """逐条发送连接队列中的消息"""
+        while conn.state not in (ConnectionState.DISCONNECTING, ConnectionState.DISCONNECTED):
+            if not conn.send_queue:
+                conn.send_event.clear()
+                await conn.send_event.wait()
+                continue
+            
+            outbound = conn.send_queue.popleft()
+            if outbound.coalesce_key and conn.pending_coalesced.get(outbound.coalesce_key) is outbound:
+                del conn.pending_coalesced[outbound.coalesce_key]
+            
+            try:
+                await asyncio.wait_for(conn.websocket.send_text(outbound.text), timeout=self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error sending message to session {conn.session_id}: {e!r}")
+                # 连接异常，标记清理
+                conn.state = ConnectionState.DISCONNECTED
+                conn.send_queue.clear()
+                conn.pending_coalesced.clear()
+                return
+            
+            # 更新统计
+            conn.messages_sent += 1
+            conn.bytes_sent += outbound.size
+            conn.last_activity = datetime.utcnow()
+            
+            self.stats["total_messages"] += 1
+            self.stats["total_bytes"] += outbound.size
+    
     async def subscribe(self, session_id: str, channel: str) -> bool:
         """订阅频道"""
         if session_id not in self.connections:
@@ -531,6 +680,10 @@ class WebSocketManager:
             "active_users": active_users,
             "total_messages": self.stats["total_messages"],
             "total_bytes": self.stats["total_bytes"],
+            "dropped_messages": self.stats["dropped_messages"],
+            "coalesced_messages": self.stats["coalesced_messages"],
+            "slow_consumer_disconnects": self.stats["slow_consumer_disconnects"],
+            "queued_messages": sum(len(conn.send_queue) for conn in self.connections.values()),
             "channels": channel_stats,
             "avg_messages_per_connection": (
                 self.stats["total_messages"] / max(self.stats["total_connections"], 1)